@@ -0,0 +1,179 @@
+"""
+Database Migration: Add canonical_code to Location table
+
+Persists the normalized location code so lookups, bulk loads and validation
+become a single equality match on (warehouse_id, canonical_code) instead of
+generating and querying several string variants per location.
+
+MIGRATION STRATEGY:
+1. Add canonical_code column (nullable)
+2. Backfill existing locations with the shared location normalizer
+3. Add composite (warehouse_id, canonical_code) index
+
+New and updated rows are maintained by the Location model's insert/update
+hooks. Rows left NULL keep working through the variant fallback lookups.
+Safe to run multiple times (SQLite and PostgreSQL).
+"""
+
+import os
+import sys
+from sqlalchemy import inspect, text
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from app import app, db
+from location_normalizer import normalize_series
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def column_exists():
+    """Check if the canonical_code column already exists"""
+    columns = inspect(db.engine).get_columns('location')
+    return any(column['name'] == 'canonical_code' for column in columns)
+
+
+def add_column():
+    """Add canonical_code column"""
+    print("\n" + "="*60)
+    print("STEP 1: ADDING canonical_code COLUMN")
+    print("="*60)
+
+    with app.app_context():
+        if column_exists():
+            print("\n[INFO] canonical_code column already exists")
+            return True
+
+        try:
+            db.session.execute(text("ALTER TABLE location ADD COLUMN canonical_code VARCHAR(50)"))
+            db.session.commit()
+            print("[OK] Column added successfully")
+            return True
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n[FAIL] Error adding column: {e}")
+            return False
+
+
+def backfill_data():
+    """Backfill canonical_code for locations that do not have it yet"""
+    print("\n" + "="*60)
+    print("STEP 2: BACKFILLING EXISTING LOCATIONS")
+    print("="*60)
+
+    with app.app_context():
+        try:
+            updated_count = 0
+            last_id = 0
+
+            while True:
+                rows = db.session.execute(text("""
+                    SELECT id, code
+                    FROM location
+                    WHERE canonical_code IS NULL AND id > :last_id
+                    ORDER BY id
+                    LIMIT :batch_size
+                """), {'last_id': last_id, 'batch_size': BACKFILL_BATCH_SIZE}).fetchall()
+
+                if not rows:
+                    break
+
+                # PERFORMANCE: Each distinct code is normalized once per batch
+                canonical_codes = normalize_series([code for _, code in rows], 'canonical')
+                db.session.execute(
+                    text("UPDATE location SET canonical_code = :canonical_code WHERE id = :id"),
+                    [{'id': location_id, 'canonical_code': canonical}
+                     for (location_id, _), canonical in zip(rows, canonical_codes)]
+                )
+                db.session.commit()
+
+                updated_count += len(rows)
+                last_id = rows[-1][0]
+                print(f"  [OK] Backfilled {updated_count} locations")
+
+            print(f"\n[SUMMARY]")
+            print(f"  Locations updated: {updated_count}")
+            return True
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n[FAIL] Error during backfill: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+
+def add_index():
+    """Add composite (warehouse_id, canonical_code) index"""
+    print("\n" + "="*60)
+    print("STEP 3: ADDING PERFORMANCE INDEX")
+    print("="*60)
+
+    with app.app_context():
+        try:
+            db.session.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_location_warehouse_canonical
+                ON location(warehouse_id, canonical_code);
+            """))
+            db.session.commit()
+            print("[OK] Index created successfully")
+            return True
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n[FAIL] Error adding index: {e}")
+            return False
+
+
+def verify_migration():
+    """Verify the migration worked"""
+    print("\n" + "="*60)
+    print("VERIFICATION")
+    print("="*60)
+
+    with app.app_context():
+        if not column_exists():
+            print("\n[FAIL] Column not found!")
+            return False
+        print("\n[OK] Column exists: canonical_code")
+
+        indexes = inspect(db.engine).get_indexes('location')
+        if any(index['name'] == 'idx_location_warehouse_canonical' for index in indexes):
+            print("[OK] Performance index exists")
+        else:
+            print("[WARNING] Performance index not found")
+
+        total, missing = db.session.execute(text("""
+            SELECT COUNT(*), COUNT(*) - COUNT(canonical_code)
+            FROM location
+        """)).fetchone()
+
+        print(f"\n[DATA DISTRIBUTION]")
+        print(f"  Total locations: {total}")
+        print(f"  Without canonical_code: {missing}")
+
+        return missing == 0
+
+
+if __name__ == '__main__':
+    print("""
+===============================================================
+  Database Migration: Add canonical_code to Location
+===============================================================
+    """)
+
+    for step_number, step in enumerate((add_column, backfill_data, add_index), start=1):
+        if not step():
+            print(f"\n[FAIL] Migration aborted at step {step_number}")
+            sys.exit(1)
+
+    print("\n" + "="*60)
+    verified = verify_migration()
+    print("="*60)
+
+    if verified:
+        print("\n[SUCCESS] Migration completed successfully!")
+    else:
+        print("\n[WARNING] Migration finished with locations left to backfill - run it again")
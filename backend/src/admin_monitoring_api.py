@@ -262,6 +262,47 @@ def check_database_health(current_user):
         }), 500
 
 
+@admin_monitoring_bp.route('/cache-stats', methods=['GET'])
+@token_required
+def get_cache_statistics(current_user):
+    """
+    Get hit rates and build times of the process-wide evaluation caches
+    Read-only endpoint - statistics are per worker process
+    """
+    try:
+        from virtual_template_integration import get_virtual_engine_cache_stats
+        from rule_plan_cache import get_rule_plan_cache
+        from services.capacity_resolver import get_capacity_resolver_stats
+        from location_search_index import get_search_index_cache_stats
+        from location_normalizer import get_location_normalizer
+        from services.shared_location_snapshot import get_shared_snapshot_stats
+        from services.location_repository import get_warehouse_repository_stats
+        from session_safe_cache import get_cache_stats as get_session_cache_stats
+        from services.warehouse_detection_index import get_detection_index_stats
+        from rule_pattern_resolver import get_pattern_set_cache_stats
+
+        return jsonify({
+            'virtual_engines': get_virtual_engine_cache_stats(),
+            'rule_plans': get_rule_plan_cache().get_stats(),
+            'capacity_resolver': get_capacity_resolver_stats(),
+            'location_search': get_search_index_cache_stats(),
+            'location_normalizer': get_location_normalizer().get_stats(),
+            'location_snapshots': get_shared_snapshot_stats(),
+            'location_repositories': get_warehouse_repository_stats(),
+            'session_location_cache': get_session_cache_stats(),
+            'warehouse_detection_index': get_detection_index_stats(),
+            'pattern_sets': get_pattern_set_cache_stats(),
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+
+    except Exception as e:
+        current_app.logger.error(f"Error getting cache statistics: {str(e)}")
+        return jsonify({
+            'error': 'Failed to retrieve cache statistics',
+            'details': str(e)
+        }), 500
+
+
 @admin_monitoring_bp.route('/user-stats/<int:user_id>', methods=['GET'])
 @token_required
 def get_user_statistics(current_user, user_id):
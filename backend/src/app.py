@@ -542,6 +542,14 @@ with app.app_context():
         print(f"Migration/Initialization failed: {e}")
         # App continues to work even if migrations fail
 
+# PERFORMANCE: Resolve and precompile rule location patterns once per worker,
+# before the first analysis (shared by every RuleEngine in the process)
+try:
+    from rule_pattern_resolver import warm_pattern_cache
+    warm_pattern_cache(app)
+except Exception as e:
+    print(f"Pattern cache warmup failed: {e}")
+
 # --- Authentication Routes (DEPRECATED - Use JWT API endpoints instead) ---
 
 # @app.route('/login', methods=['GET', 'POST'])
@@ -0,0 +1,457 @@
+"""
+Offline Batch Analysis CLI
+
+Runs the database rules engine over many inventory files (nightly multi-site
+runs) across a process pool. Each worker builds ONE warm RuleEngine inside a
+pushed app context and reuses it for every file it processes, so evaluator
+caches, pattern resolvers and per-warehouse location caches survive between
+files of the same site.
+
+Inputs:
+    --input-dir DIR       every .xlsx/.xls/.csv/.parquet file in DIR
+                          (requires --warehouse-id)
+    --manifest FILE       .csv / .json / .jsonl with path, warehouse_id and
+                          optional user_id, rule_ids per file
+
+Outputs (per file, in --output-dir):
+    <name>.<path hash>.anomalies.parquet | <name>.<path hash>.anomalies.jsonl
+    (the hash of the source path keeps site1/inventory.xlsx, site2/inventory.xlsx
+    and inventory.csv apart)
+    optional AnalysisReport + Anomaly rows (--persist, needs a user id)
+
+Usage:
+    python batch_analysis.py --manifest nightly_sites.csv --output-dir out --workers 4
+    python batch_analysis.py --input-dir exports/ --warehouse-id USER_ACME --format jsonl
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+SUPPORTED_EXTENSIONS = ('.xlsx', '.xls', '.csv', '.parquet')
+OUTPUT_FORMATS = ('parquet', 'jsonl')
+
+# Worker process state, populated by _init_batch_worker
+_WORKER_STATE: Dict[str, Any] = {}
+
+
+@dataclass
+class BatchJob:
+    """One inventory file to analyze"""
+    path: str
+    warehouse_id: Optional[str] = None
+    user_id: Optional[int] = None
+    rule_ids: Optional[List[int]] = None
+
+
+@dataclass
+class BatchFileResult:
+    """Outcome and timings for one inventory file"""
+    path: str
+    warehouse_id: Optional[str]
+    success: bool
+    rows: int = 0
+    anomalies: int = 0
+    failed_rules: List[int] = field(default_factory=list)
+    skipped_rules: List[int] = field(default_factory=list)  # Pruned by the rule planner (not failures)
+    load_ms: int = 0
+    evaluate_ms: int = 0
+    write_ms: int = 0
+    output_path: Optional[str] = None
+    report_id: Optional[int] = None
+    error: Optional[str] = None
+
+    @property
+    def total_ms(self) -> int:
+        return self.load_ms + self.evaluate_ms + self.write_ms
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / (self.total_ms / 1000) if self.total_ms > 0 else 0.0
+
+
+# ==================== JOB DISCOVERY ====================
+
+def discover_jobs(input_dir: str, warehouse_id: str, user_id: int = None) -> List[BatchJob]:
+    """Create one job per supported inventory file in a directory"""
+    jobs = []
+    for name in sorted(os.listdir(input_dir)):
+        if name.startswith('~$') or not name.lower().endswith(SUPPORTED_EXTENSIONS):
+            continue
+        jobs.append(BatchJob(path=os.path.join(input_dir, name), warehouse_id=warehouse_id, user_id=user_id))
+    return jobs
+
+
+def load_manifest(manifest_path: str, default_warehouse_id: str = None,
+                  default_user_id: int = None) -> List[BatchJob]:
+    """
+    Load jobs from a manifest file
+
+    Supports .csv (header row), .json (list of objects) and .jsonl. Relative
+    paths resolve against the manifest's directory. rule_ids may be a list or
+    a comma-separated string.
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    extension = os.path.splitext(manifest_path)[1].lower()
+
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        if extension == '.csv':
+            entries = list(csv.DictReader(f))
+        elif extension == '.json':
+            entries = json.load(f)
+        elif extension == '.jsonl':
+            entries = [json.loads(line) for line in f if line.strip()]
+        else:
+            raise ValueError(f"Unsupported manifest format: {extension} (use .csv, .json or .jsonl)")
+
+    jobs = []
+    for line_number, entry in enumerate(entries, 1):
+        path = (entry.get('path') or '').strip()
+        if not path:
+            raise ValueError(f"Manifest entry {line_number} has no path")
+
+        rule_ids = entry.get('rule_ids')
+        if isinstance(rule_ids, str):
+            rule_ids = [int(x) for x in rule_ids.split(',') if x.strip()] or None
+
+        user_id = entry.get('user_id') or default_user_id
+        jobs.append(BatchJob(
+            path=path if os.path.isabs(path) else os.path.join(base_dir, path),
+            warehouse_id=entry.get('warehouse_id') or default_warehouse_id,
+            user_id=int(user_id) if user_id not in (None, '') else None,
+            rule_ids=rule_ids
+        ))
+    return jobs
+
+
+# ==================== WORKER ====================
+
+def create_app_engine():
+    """Default engine factory: warm RuleEngine bound to the app's session"""
+    from app import app
+    from database import db
+    from rule_engine import RuleEngine
+
+    # Keep the context pushed for the worker's lifetime
+    context = app.app_context()
+    context.push()
+    _WORKER_STATE['app_context'] = context
+
+    return RuleEngine(db.session, app=app)
+
+
+def _init_batch_worker(engine_factory: Callable, output_dir: str, output_format: str, persist: bool):
+    """Pool initializer: build the worker's warm engine once"""
+    _WORKER_STATE['engine'] = engine_factory()
+    _WORKER_STATE['output_dir'] = output_dir
+    _WORKER_STATE['output_format'] = output_format
+    _WORKER_STATE['persist'] = persist
+    _WORKER_STATE['pid'] = os.getpid()
+
+
+def read_inventory_file(path: str) -> pd.DataFrame:
+    """Read an inventory export by extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.xlsx', '.xls'):
+        return pd.read_excel(path)
+    if extension == '.csv':
+        return pd.read_csv(path)
+    if extension == '.parquet':
+        return pd.read_parquet(path)
+    raise ValueError(f"Unsupported inventory format: {extension}")
+
+
+def _analyze_file(job: BatchJob) -> BatchFileResult:
+    """Evaluate one inventory file on the worker's warm engine"""
+    engine = _WORKER_STATE['engine']
+    result = BatchFileResult(path=job.path, warehouse_id=job.warehouse_id, success=False)
+
+    try:
+        t0 = time.time()
+        inventory_df = read_inventory_file(job.path)
+        result.rows = len(inventory_df)
+        t1 = time.time()
+        result.load_ms = int((t1 - t0) * 1000)
+
+        # Same explicit-warehouse override the upload flow uses
+        engine._warehouse_context = {
+            'warehouse_id': job.warehouse_id,
+            'detection_method': 'batch_manifest',
+            'confidence': 'EXPLICIT',
+            'coverage': 100.0
+        } if job.warehouse_id else None
+
+        evaluation_results = engine.evaluate_all_rules(inventory_df, job.rule_ids)
+        t2 = time.time()
+        result.evaluate_ms = int((t2 - t1) * 1000)
+
+        anomalies = []
+        for evaluation in evaluation_results:
+            if evaluation.success:
+                anomalies.extend(evaluation.anomalies)
+            elif evaluation.skipped:
+                result.skipped_rules.append(evaluation.rule_id)
+            else:
+                result.failed_rules.append(evaluation.rule_id)
+        result.anomalies = len(anomalies)
+
+        result.output_path = write_anomalies(
+            anomalies, job, _WORKER_STATE['output_dir'], _WORKER_STATE['output_format']
+        )
+        if _WORKER_STATE['persist']:
+            result.report_id = persist_report(anomalies, job, result.rows)
+        result.write_ms = int((time.time() - t2) * 1000)
+
+        result.success = True
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+
+    return result
+
+
+# ==================== OUTPUT ====================
+
+def output_stem(job: BatchJob) -> str:
+    """Output name for a job: file stem plus a short hash of its full source path"""
+    path_hash = hashlib.sha1(os.path.abspath(job.path).encode('utf-8')).hexdigest()[:8]
+    return f"{os.path.splitext(os.path.basename(job.path))[0]}.{path_hash}"
+
+
+def write_anomalies(anomalies: List[Dict[str, Any]], job: BatchJob,
+                    output_dir: str, output_format: str) -> str:
+    """Write one file's anomaly batch as Parquet or JSONL"""
+    stem = output_stem(job)
+    records = [
+        dict(anomaly, source_file=os.path.basename(job.path), warehouse_id=job.warehouse_id)
+        for anomaly in anomalies
+    ]
+
+    if output_format == 'jsonl':
+        output_path = os.path.join(output_dir, f"{stem}.anomalies.jsonl")
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, default=str) + '\n')
+        return output_path
+
+    output_path = os.path.join(output_dir, f"{stem}.anomalies.parquet")
+    anomalies_df = pd.DataFrame.from_records(records)
+    # Anomaly fields are free-form; Parquet needs one type per column
+    for column in anomalies_df.columns:
+        if anomalies_df[column].dtype == object and \
+                pd.api.types.infer_dtype(anomalies_df[column], skipna=True) not in ('string', 'empty'):
+            anomalies_df[column] = anomalies_df[column].map(lambda v: v if v is None else str(v))
+    anomalies_df.to_parquet(output_path, index=False)
+    return output_path
+
+
+def persist_report(anomalies: List[Dict[str, Any]], job: BatchJob, inventory_count: int) -> int:
+    """Persist anomalies as an AnalysisReport, mirroring the upload flow"""
+    from datetime import datetime
+    from app import default_json_serializer
+    from core_models import AnalysisReport, Anomaly
+    from database import db
+    from main import summarize_anomalies_by_location
+
+    if job.user_id is None:
+        raise ValueError("Persisting reports requires a user_id (manifest column or --user-id)")
+
+    try:
+        report = AnalysisReport(
+            report_name=f"Batch - {os.path.basename(job.path)} - {datetime.utcnow().strftime('%Y-%m-%d %H:%M')}",
+            user_id=job.user_id,
+            location_summary=json.dumps(summarize_anomalies_by_location(anomalies), default=default_json_serializer),
+            inventory_count=inventory_count,
+            warehouse_id=job.warehouse_id
+        )
+        db.session.add(report)
+        db.session.flush()
+
+        db.session.add_all([
+            Anomaly(
+                description=str(anomaly.get('anomaly_type', 'Uncategorized Anomaly'))[:255],
+                details=json.dumps(anomaly, default=default_json_serializer),
+                report_id=report.id
+            )
+            for anomaly in anomalies
+        ])
+        db.session.commit()
+        return report.id
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+# ==================== DRIVER ====================
+
+def run_batch(jobs: List[BatchJob], output_dir: str, workers: int = None,
+              output_format: str = 'parquet', persist: bool = False,
+              engine_factory: Callable = create_app_engine,
+              on_result: Callable[[BatchFileResult], None] = None) -> List[BatchFileResult]:
+    """
+    Analyze jobs across a process pool of warm engines
+
+    Args:
+        jobs: Files to analyze
+        output_dir: Directory for anomaly batches
+        workers: Worker processes (1 = in-process, default = CPU count)
+        output_format: 'parquet' or 'jsonl'
+        persist: Also store each file as an AnalysisReport
+        engine_factory: Top-level callable returning a RuleEngine per worker
+        on_result: Optional callback per finished file (progress output)
+
+    Returns:
+        Results in job order
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"output_format must be one of {OUTPUT_FORMATS}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs) or 1))
+    results: List[Optional[BatchFileResult]] = [None] * len(jobs)
+
+    if workers == 1:
+        _init_batch_worker(engine_factory, output_dir, output_format, persist)
+        for index, job in enumerate(jobs):
+            results[index] = _analyze_file(job)
+            if on_result:
+                on_result(results[index])
+        return results
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_batch_worker,
+        initargs=(engine_factory, output_dir, output_format, persist)
+    ) as pool:
+        futures = {pool.submit(_analyze_file, job): index for index, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                # Worker died (e.g. out of memory) - record and keep going
+                job = jobs[index]
+                results[index] = BatchFileResult(
+                    path=job.path, warehouse_id=job.warehouse_id, success=False,
+                    error=f"Worker failure: {type(e).__name__}: {e}"
+                )
+            if on_result:
+                on_result(results[index])
+
+    return results
+
+
+def summarize_batch(results: List[BatchFileResult], wall_seconds: float) -> Dict[str, Any]:
+    """Aggregate throughput and failure statistics for a batch run"""
+    succeeded = [r for r in results if r.success]
+    total_rows = sum(r.rows for r in succeeded)
+
+    return {
+        'files': len(results),
+        'succeeded': len(succeeded),
+        'failed': len(results) - len(succeeded),
+        'files_with_rule_failures': sum(1 for r in succeeded if r.failed_rules),
+        'files_with_skipped_rules': sum(1 for r in succeeded if r.skipped_rules),
+        'total_rows': total_rows,
+        'total_anomalies': sum(r.anomalies for r in succeeded),
+        'wall_seconds': round(wall_seconds, 2),
+        'rows_per_second': round(total_rows / wall_seconds, 1) if wall_seconds > 0 else 0.0,
+    }
+
+
+def _print_file_result(result: BatchFileResult):
+    name = os.path.basename(result.path)
+    if result.success:
+        rule_note = f", {len(result.failed_rules)} rule failures" if result.failed_rules else ""
+        rule_note += f", {len(result.skipped_rules)} rules skipped" if result.skipped_rules else ""
+        print(f"[BATCH] OK   {name} ({result.warehouse_id}): {result.rows:,} rows, {result.anomalies:,} anomalies "
+              f"in {result.total_ms}ms (load {result.load_ms}ms, evaluate {result.evaluate_ms}ms, "
+              f"write {result.write_ms}ms) - {result.rows_per_second:,.0f} rows/s{rule_note}")
+    else:
+        print(f"[BATCH] FAIL {name} ({result.warehouse_id}): {result.error}")
+
+
+def main():
+    """
+    Command line interface for nightly batch analysis
+    """
+    parser = argparse.ArgumentParser(
+        description="Batch Warehouse Analysis: evaluate many inventory files across a process pool.",
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--input-dir', help='Directory of inventory files (.xlsx, .xls, .csv, .parquet)')
+    source.add_argument('--manifest', help='Manifest (.csv/.json/.jsonl) with path, warehouse_id[, user_id, rule_ids]')
+
+    parser.add_argument('-o', '--output-dir', default='batch_output',
+                        help='Directory for anomaly batches. (Default: batch_output)')
+    parser.add_argument('--warehouse-id', help='Warehouse for --input-dir files / manifest default')
+    parser.add_argument('--user-id', type=int, help='Report owner when persisting (manifest default)')
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='Worker processes, each holding a warm engine. (Default: CPU count)')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='parquet',
+                        help='Anomaly batch format. (Default: parquet)')
+    parser.add_argument('--persist', action='store_true',
+                        help='Also store each file as an AnalysisReport')
+
+    args = parser.parse_args()
+
+    if args.input_dir:
+        if not args.warehouse_id:
+            parser.error('--input-dir requires --warehouse-id')
+        jobs = discover_jobs(args.input_dir, args.warehouse_id, args.user_id)
+    else:
+        jobs = load_manifest(args.manifest, args.warehouse_id, args.user_id)
+
+    if not jobs:
+        print("[BATCH] No inventory files found.")
+        return 0
+
+    print(f"[BATCH] Analyzing {len(jobs)} files with {args.workers or os.cpu_count()} workers -> {args.output_dir} ({args.format})")
+
+    start_time = time.time()
+    results = run_batch(jobs, args.output_dir, workers=args.workers, output_format=args.format,
+                        persist=args.persist, on_result=_print_file_result)
+    summary = summarize_batch(results, time.time() - start_time)
+
+    print("\n" + "=" * 50)
+    print("BATCH SUMMARY")
+    print("=" * 50)
+    print(f"  Files:       {summary['succeeded']}/{summary['files']} succeeded")
+    print(f"  Rows:        {summary['total_rows']:,}")
+    print(f"  Anomalies:   {summary['total_anomalies']:,}")
+    print(f"  Wall time:   {summary['wall_seconds']}s")
+    print(f"  Throughput:  {summary['rows_per_second']:,.1f} rows/s")
+
+    failures = [r for r in results if not r.success]
+    if failures:
+        print(f"\n  Failures ({len(failures)}):")
+        for result in failures:
+            print(f"    - {os.path.basename(result.path)}: {result.error}")
+    if summary['files_with_rule_failures']:
+        print(f"\n  Files with failed rules: {summary['files_with_rule_failures']}")
+        for result in results:
+            if result.success and result.failed_rules:
+                print(f"    - {os.path.basename(result.path)}: rules {result.failed_rules}")
+    if summary['files_with_skipped_rules']:
+        print(f"\n  Files with skipped rules: {summary['files_with_skipped_rules']}")
+        for result in results:
+            if result.success and result.skipped_rules:
+                print(f"    - {os.path.basename(result.path)}: rules {result.skipped_rules}")
+
+    print("=" * 50)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    sys.exit(main())
@@ -17,4 +17,20 @@ def get_upload_folder():
     """
     Returns the path to the temporary upload folder for Vercel.
     """
-    return '/tmp/wie_uploads'
\ No newline at end of file
+    return '/tmp/wie_uploads'
+
+
+def get_location_snapshot_folder():
+    """
+    Returns the local folder for memory-mapped warehouse location snapshots
+    shared by all worker processes on this machine (LOCATION_SNAPSHOT_DIR overrides).
+    """
+    return os.environ.get('LOCATION_SNAPSHOT_DIR', '/tmp/wie_location_snapshots')
+
+
+def get_session_cache_shared_path():
+    """
+    Returns the SQLite file backing the machine-wide tier of the session-safe
+    location cache (SESSION_CACHE_SHARED_PATH), or None when the tier is disabled.
+    """
+    return os.environ.get('SESSION_CACHE_SHARED_PATH') or None
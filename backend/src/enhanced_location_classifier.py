@@ -4,10 +4,21 @@ Zero-Cost Solution for Location Type Dependency Crisis
 
 This module provides intelligent location classification without external AI dependencies,
 designed to reduce "UNKNOWN" classifications from 70% to <25% immediately.
+
+PERFORMANCE: classify_batch classifies an inventory's unique locations in one pass:
+- behavioral features (pallet count, product/lot mix, age distribution) for
+  every location from one groupby instead of one DataFrame filter per location
+- pattern classification once per unique code with patterns compiled at init
+- user corrections resolved from a per-warehouse map loaded with one query,
+  with applied counts written back in a single commit
 """
 
 import re
+import warnings
+from datetime import datetime
+import numpy as np
 import pandas as pd
+from pandas.tseries.api import guess_datetime_format
 from typing import Dict, Any, Optional, Tuple, List
 from dataclasses import dataclass
 from enum import Enum
@@ -31,6 +42,58 @@ class LocationCategory(Enum):
     SPECIAL = "SPECIAL"
     UNKNOWN = "UNKNOWN"
 
+class UserCorrectionMap:
+    """
+    Active user corrections of one warehouse, resolved in memory
+
+    Same precedence as LocationClassificationCorrection.find_correction_for_location:
+    an exact location_code match (best accuracy first), then the first
+    correction whose extracted pattern matches the upper-cased code.
+    """
+
+    def __init__(self, corrections: List[Any]):
+        self.corrections = list(corrections)
+        self._exact = {}          # location_code -> best-accuracy correction
+        self._pattern_exact = {}  # EXACT/FALLBACK pattern value -> first correction position
+        self._ordered = []        # (position, pattern type, value, correction) for PREFIX/SUFFIX/KEYWORD
+
+        for correction in sorted(self.corrections, key=lambda c: -(c.accuracy_score if c.accuracy_score is not None else 0)):
+            self._exact.setdefault(correction.location_code, correction)
+
+        for position, correction in enumerate(self.corrections):
+            pattern = correction.location_pattern
+            if not pattern:
+                continue
+            pattern_type, value = pattern.split(':', 1) if ':' in pattern else ('EXACT', pattern)
+            if pattern_type in ('EXACT', 'FALLBACK'):
+                self._pattern_exact.setdefault(value, position)
+            elif pattern_type in ('PREFIX', 'SUFFIX', 'KEYWORD'):
+                self._ordered.append((position, pattern_type, value.replace('*', '') if pattern_type != 'KEYWORD' else value,
+                                      correction))
+
+    def __len__(self) -> int:
+        return len(self.corrections)
+
+    def find(self, location_code: str):
+        """Best correction for a location (or None)"""
+        exact = self._exact.get(location_code)
+        if exact is not None:
+            return exact
+
+        location_upper = location_code.upper()
+        if not location_upper:
+            return None
+        first = self._pattern_exact.get(location_upper, len(self.corrections))
+        for position, pattern_type, value, correction in self._ordered:
+            if position >= first:
+                break
+            if ((pattern_type == 'PREFIX' and location_upper.startswith(value)) or
+                    (pattern_type == 'SUFFIX' and location_upper.endswith(value)) or
+                    (pattern_type == 'KEYWORD' and value in location_upper)):
+                return correction
+        return self.corrections[first] if first < len(self.corrections) else None
+
+
 class EnhancedLocationClassifier:
     """
     Intelligent location classification system combining multiple approaches:
@@ -40,10 +103,14 @@ class EnhancedLocationClassifier:
     4. Confidence scoring
     """
 
+    # Pattern groups checked (in order) for every location type
+    PATTERN_GROUPS = ('positional_patterns', 'semantic_patterns', 'grid_patterns', 'level_patterns',
+                      'workflow_patterns', 'shipping_patterns', 'dock_patterns', 'aisle_patterns')
+
     def __init__(self, db_session=None, virtual_engine=None):
         self.db = db_session
         self.virtual_engine = virtual_engine
-        self.user_corrections = {}  # Cache for user corrections
+        self.user_corrections = {}  # warehouse_id -> UserCorrectionMap (batch classification)
         self._initialize_patterns()
 
     def _initialize_patterns(self):
@@ -138,6 +205,16 @@ class EnhancedLocationClassifier:
             }
         }
 
+        # PERFORMANCE: Compile the library once (keywords upper-cased, regexes compiled in check order)
+        self._compiled_library = {
+            location_type: (
+                [(keyword, keyword.upper()) for keyword in patterns.get('explicit_keywords', [])],
+                [(pattern, re.compile(pattern)) for group in self.PATTERN_GROUPS for pattern in patterns.get(group, [])],
+                patterns.get('confidence_weight', 0.7)
+            )
+            for location_type, patterns in self.pattern_library.items()
+        }
+
     def classify_location(self, location: str, inventory_context: pd.DataFrame = None,
                          warehouse_context: dict = None) -> ClassificationResult:
         """
@@ -184,28 +261,25 @@ class EnhancedLocationClassifier:
 
         classification_scores = {}
 
-        for location_type, patterns in self.pattern_library.items():
+        for location_type, (keywords, regexes, confidence_weight) in self._compiled_library.items():
             total_score = 0
             matches = []
 
             # Check explicit keywords
-            for keyword in patterns.get('explicit_keywords', []):
-                if keyword.upper() in location_clean:
+            for keyword, keyword_upper in keywords:
+                if keyword_upper in location_clean:
                     total_score += 1.0
                     matches.append(f"keyword:{keyword}")
 
             # Check pattern groups
-            for pattern_group in ['positional_patterns', 'semantic_patterns',
-                                'grid_patterns', 'level_patterns', 'workflow_patterns',
-                                'shipping_patterns', 'dock_patterns', 'aisle_patterns']:
-                for pattern in patterns.get(pattern_group, []):
-                    if re.match(pattern, location_clean):
-                        total_score += 0.8
-                        matches.append(f"pattern:{pattern}")
+            for pattern, regex in regexes:
+                if regex.match(location_clean):
+                    total_score += 0.8
+                    matches.append(f"pattern:{pattern}")
 
             if total_score > 0:
                 # Apply confidence weight and normalize
-                confidence = min(total_score * patterns.get('confidence_weight', 0.7), 0.95)
+                confidence = min(total_score * confidence_weight, 0.95)
                 classification_scores[location_type] = {
                     'confidence': confidence,
                     'matches': matches
@@ -389,20 +463,244 @@ class EnhancedLocationClassifier:
             return pattern_result
 
     def classify_batch(self, locations: List[str], inventory_df: pd.DataFrame = None,
-                      warehouse_context: dict = None) -> Dict[str, ClassificationResult]:
-        """Batch classification for efficiency"""
+                      warehouse_context: dict = None, apply_user_corrections: bool = True) -> Dict[str, ClassificationResult]:
+        """
+        Batch classification for efficiency
+
+        Gives the same result per location as classify_location() with that
+        location's inventory rows, but computes behavioral features for all
+        locations in one groupby, pattern-matches each unique code once and
+        resolves user corrections from one preloaded map (applied counts are
+        committed once for the whole batch).
+        """
         results = {}
+        if not locations:
+            return results
+
+        corrections = None
+        if apply_user_corrections:
+            corrections = self._load_user_corrections(warehouse_context)
+
+        features = {}
+        if inventory_df is not None and len(inventory_df) > 0 and 'location' in inventory_df.columns:
+            feature_frame = self.behavioral_features(inventory_df)
+            features = dict(zip(feature_frame.index, feature_frame.itertuples(index=False)))
+
+        pattern_results = {}
+        applied = {}  # correction id -> (correction, times applied in this batch)
 
         for location in locations:
-            # Filter inventory data for this location if available
-            location_inventory = None
-            if inventory_df is not None:
-                location_inventory = inventory_df[inventory_df['location'] == location]
+            if pd.isna(location) or not str(location).strip():
+                results[location] = ClassificationResult('MISSING', 1.0, 'validation', 'Empty location code')
+                continue
+
+            location_str = str(location).strip()
+
+            # Priority 1: User corrections (perfect accuracy)
+            correction = corrections.find(location_str) if corrections else None
+            if correction is not None:
+                previous = applied.get(id(correction), (correction, 0))[1]
+                applied[id(correction)] = (correction, previous + 1)
+                results[location] = ClassificationResult(
+                    location_type=correction.corrected_type,
+                    confidence=correction.pattern_confidence,
+                    method='user_correction',
+                    reasoning=f"User correction applied (used {(correction.applied_count or 0) + previous + 1} times)"
+                )
+                continue
+
+            # Priority 2: Virtual engine validation (if available)
+            virtual_result = self._check_virtual_engine(location_str)
+            if virtual_result and virtual_result.confidence > 0.8:
+                results[location] = virtual_result
+                continue
+
+            # Priority 3: Enhanced pattern matching (once per unique code)
+            pattern_result = pattern_results.get(location_str)
+            if pattern_result is None:
+                pattern_result = pattern_results[location_str] = self._classify_by_patterns(location_str)
+
+            # Priority 4: Behavioral analysis (rows are matched on the code as given)
+            behavioral_result = None
+            location_features = features.get(location_str) if location == location_str else None
+            if location_features is not None:
+                behavioral_result = self._classify_features(location_features)
+            if behavioral_result and behavioral_result.confidence > 0.7:
+                results[location] = self._combine_classifications(pattern_result, behavioral_result)
+            else:
+                results[location] = pattern_result
 
-            results[location] = self.classify_location(location, location_inventory, warehouse_context)
+        if applied:
+            self._record_correction_usage(applied.values())
 
         return results
 
+    def behavioral_features(self, inventory_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Per-location behavioral features from one groupby over the inventory
+
+        Columns: pallet_count, unique_products, unique_lots (receipt numbers), avg_dwell_hours and
+        max_dwell_hours (NaN where creation dates are missing or unparseable).
+        """
+        frame = pd.DataFrame({'location': inventory_df['location']})
+        for feature, column in (('product', 'product'), ('lot', 'receipt_number')):
+            frame[feature] = inventory_df[column] if column in inventory_df.columns else np.nan
+
+        if 'creation_date' in inventory_df.columns:
+            dwell, dwell_valid = self._dwell_hours(inventory_df['location'], inventory_df['creation_date'])
+        else:
+            dwell, dwell_valid = np.full(len(frame), np.nan), np.zeros(len(frame), dtype=bool)
+        frame['dwell'] = dwell
+        frame['dwell_valid'] = dwell_valid
+
+        grouped = frame.groupby('location', sort=False)
+        features = pd.DataFrame({
+            'pallet_count': grouped.size(),
+            'unique_products': grouped['product'].nunique(),
+            'unique_lots': grouped['lot'].nunique(),
+            'avg_dwell_hours': grouped['dwell'].mean(),
+            'max_dwell_hours': grouped['dwell'].max(),
+        })
+        invalid = ~grouped['dwell_valid'].all()
+        features.loc[invalid, ['avg_dwell_hours', 'max_dwell_hours']] = np.nan
+        return features
+
+    @staticmethod
+    def _dwell_hours(locations: pd.Series, raw_dates: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Dwell hours per row and per-row validity, with dates parsed as the per-location analysis parses them
+
+        pd.to_datetime infers a single format from the first date it sees, so each location's dates are
+        parsed with the format of that location's first date (one call per distinct format). Locations
+        whose dates fail to parse that way are re-parsed on their own; if that raises too, the
+        location gets no dwell time (as in _classify_by_behavior).
+        """
+        now = pd.Timestamp.now()
+        count = len(raw_dates)
+        if pd.api.types.is_datetime64_any_dtype(raw_dates):
+            if getattr(raw_dates.dt, 'tz', None) is not None:
+                return np.full(count, np.nan), np.zeros(count, dtype=bool)
+            return ((now - raw_dates).dt.total_seconds() / 3600).to_numpy(), np.ones(count, dtype=bool)
+
+        dwell = np.full(count, np.nan)
+        valid = np.ones(count, dtype=bool)
+        locations = locations.reset_index(drop=True)
+        raw_dates = raw_dates.reset_index(drop=True)
+
+        # Format of each location's first date ('' when it is not a string: no format is inferred)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            first_dates = raw_dates.groupby(locations, sort=False).first()
+            formats = first_dates.map(lambda value: guess_datetime_format(value) if isinstance(value, str) else '')
+        retry = set(formats.index[formats.isna()])  # Unrecognized first date
+
+        row_formats = locations.map(formats)
+        for date_format, positions in row_formats.groupby(row_formats, sort=False).indices.items():
+            subset = raw_dates.iloc[positions]
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore')
+                    parsed = pd.to_datetime(subset, format=date_format or None, errors='coerce')
+                hours = ((now - parsed).dt.total_seconds() / 3600).to_numpy()
+            except (TypeError, ValueError, AttributeError):  # Time zones: re-parse per location
+                retry.update(locations.iloc[positions].unique())
+                continue
+            dwell[positions] = hours
+            failed = (parsed.isna() & subset.notna()).to_numpy()
+            retry.update(locations.iloc[positions[failed]].unique())
+
+        if retry:
+            groups = locations.groupby(locations, sort=False).indices
+            for location in retry:
+                positions = groups[location]
+                try:
+                    with warnings.catch_warnings():
+                        warnings.simplefilter('ignore')
+                        parsed = pd.to_datetime(raw_dates.iloc[positions])
+                    dwell[positions] = ((now - parsed).dt.total_seconds() / 3600).to_numpy()
+                except Exception:
+                    valid[positions] = False
+        return dwell, valid
+
+    def _classify_features(self, features) -> Optional[ClassificationResult]:
+        """Behavioral classification rules (as _classify_by_behavior) applied to one behavioral_features() row"""
+        total_pallets = int(features.pallet_count)
+        if total_pallets < 2:  # Need minimum data for behavioral analysis
+            return None
+
+        diversity_ratio = features.unique_products / total_pallets
+        avg_dwell_time = None if pd.isna(features.avg_dwell_hours) else float(features.avg_dwell_hours)
+
+        if diversity_ratio > 0.8:  # High product diversity suggests receiving/transitional
+            confidence = min(0.7 + (diversity_ratio - 0.8) * 0.5, 0.9)
+            return ClassificationResult(
+                location_type='RECEIVING',
+                confidence=confidence,
+                method='behavioral',
+                reasoning=f"High product diversity ({diversity_ratio:.2f}) indicates receiving area"
+            )
+
+        if diversity_ratio < 0.2 and total_pallets > 3:  # Low diversity, consistent products
+            confidence = min(0.7 + (0.2 - diversity_ratio) * 1.0, 0.9)
+            return ClassificationResult(
+                location_type='STORAGE',
+                confidence=confidence,
+                method='behavioral',
+                reasoning=f"Low product diversity ({diversity_ratio:.2f}) indicates storage area"
+            )
+
+        if avg_dwell_time is not None:
+            if avg_dwell_time < 24:
+                return ClassificationResult(
+                    location_type='RECEIVING',
+                    confidence=0.75,
+                    method='behavioral',
+                    reasoning=f"Short average dwell time ({avg_dwell_time:.1f}h) indicates receiving"
+                )
+            elif avg_dwell_time > 168:
+                return ClassificationResult(
+                    location_type='STORAGE',
+                    confidence=0.8,
+                    method='behavioral',
+                    reasoning=f"Long average dwell time ({avg_dwell_time:.1f}h) indicates storage"
+                )
+
+        return None
+
+    def _load_user_corrections(self, warehouse_context: dict = None) -> Optional[UserCorrectionMap]:
+        """Active corrections of the context warehouse in one query (cached on this classifier)"""
+        if not warehouse_context or not warehouse_context.get('warehouse_id') or not self.db:
+            return None
+
+        warehouse_id = warehouse_context['warehouse_id']
+        if warehouse_id in self.user_corrections:
+            return self.user_corrections[warehouse_id]
+
+        try:
+            from models import LocationClassificationCorrection
+
+            corrections = LocationClassificationCorrection.query.filter_by(
+                warehouse_id=warehouse_id,
+                is_active=True
+            ).order_by(LocationClassificationCorrection.id).all()
+            self.user_corrections[warehouse_id] = UserCorrectionMap(corrections)
+            return self.user_corrections[warehouse_id]
+
+        except Exception as e:
+            print(f"[ENHANCED_CLASSIFIER] Error loading user corrections: {e}")
+            return None
+
+    def _record_correction_usage(self, applied) -> None:
+        """Add each correction's batch usage to its applied count, in one commit"""
+        try:
+            now = datetime.utcnow()
+            for correction, times in applied:
+                correction.applied_count = (correction.applied_count or 0) + times
+                correction.last_applied = now
+            getattr(self.db, 'session', self.db).commit()
+        except Exception as e:
+            print(f"[ENHANCED_CLASSIFIER] Error recording correction usage: {e}")
+
     def get_classification_summary(self, results: Dict[str, ClassificationResult]) -> Dict[str, Any]:
         """Generate summary statistics for classification results"""
         if not results:
@@ -109,6 +109,8 @@ def _run_database_rules_engine(inventory_df: pd.DataFrame,
                         print(f"[RULE_RESULT] {rule_name}: {len(result.anomalies)} anomalies ({result.execution_time_ms}ms)")
                     except Exception:
                         print(f"[RULE_RESULT] Rule {result.rule_id}: {len(result.anomalies)} anomalies ({result.execution_time_ms}ms)")
+            elif result.skipped:
+                print(f"[RULE_SKIPPED] Rule {result.rule_id}: {result.error_message}")
             else:
                 try:
                     rule = Rule.query.get(result.rule_id)
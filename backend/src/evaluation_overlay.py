@@ -0,0 +1,288 @@
+"""
+Derived Column Overlay for Copy-Free Rule Evaluation
+
+Rule evaluators share ONE normalized inventory DataFrame per analysis. Older
+evaluators copied that frame to attach helper columns (is_final, is_source,
+location_type) or materialized filtered sub-frames with boolean indexing.
+On large inventories (500k+ rows) each of those copies costs hundreds of MB.
+
+Contract for evaluators:
+- Never mutate or copy the shared frame
+- Derived per-row values live in a DerivedColumnOverlay keyed by row position
+- Filtering returns positional index arrays, not sub-DataFrames
+- Row values are read column-by-column at those positions
+
+Location masks are shared the same way: several rules filter on the same
+location sets (RECEIVING/STAGING patterns resolved through the template or
+DEFAULT_WAREHOUSE_PATTERNS), so each overlay carries a LocationMaskCache
+keyed by a canonical pattern-set hash and every rule needing the same subset
+reuses one computed mask.
+
+Usage:
+    overlay = DerivedColumnOverlay(inventory_df)
+    overlay.set('is_final', final_mask)
+    positions = overlay.positions(overlay.get('is_final'))
+    pallet_ids = overlay.values_at('pallet_id', positions)
+    receiving = overlay.location_masks.positions(receiving_patterns)
+"""
+
+import hashlib
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def pattern_set_hash(pattern_set: Any) -> str:
+    """Canonical hash of a pattern set (pattern order and duplicates ignored)"""
+    return hashlib.sha1('\x1f'.join(pattern_set.key).encode('utf-8')).hexdigest()[:16]
+
+
+class LocationMaskCache:
+    """
+    Analysis-scoped cache of location pattern masks for one shared frame.
+
+    Masks use the evaluators' matching semantics: location cast to str,
+    upper-cased, re.match against any pattern. The upper-cased column itself
+    is computed once and shared by every mask.
+    """
+
+    def __init__(self, frame: pd.DataFrame, column: str = 'location'):
+        self._frame = frame
+        self._column = column
+        self._location_upper: Optional[pd.Series] = None
+        self._masks: Dict[str, np.ndarray] = {}
+        self._positions: Dict[str, np.ndarray] = {}
+        self._compute_ms: Dict[str, float] = {}
+        self.stats = {'computed': 0, 'reused': 0, 'saved_ms': 0.0}
+
+    def location_upper(self) -> pd.Series:
+        """Upper-cased string view of the location column (computed once)"""
+        if self._location_upper is None:
+            self._location_upper = self._frame[self._column].astype(str).str.upper()
+        return self._location_upper
+
+    def mask(self, patterns) -> np.ndarray:
+        """
+        Boolean mask (read-only) of rows whose location matches any pattern
+
+        Args:
+            patterns: Pattern list or CompiledPatternSet
+        """
+        return self._lookup(patterns)[1]
+
+    def positions(self, patterns) -> np.ndarray:
+        """Positional row indices (read-only) matching any pattern"""
+        key, mask = self._lookup(patterns)
+        if key is None:
+            return np.array([], dtype=np.intp)
+
+        positions = self._positions.get(key)
+        if positions is None:
+            positions = np.flatnonzero(mask)
+            positions.flags.writeable = False
+            self._positions[key] = positions
+        return positions
+
+    def _lookup(self, patterns):
+        from rule_plan_cache import compile_pattern_set
+
+        pattern_set = compile_pattern_set(patterns)
+        if not pattern_set:
+            return None, np.zeros(len(self._frame), dtype=bool)
+
+        key = pattern_set_hash(pattern_set)
+        cached = self._masks.get(key)
+        if cached is not None:
+            self.stats['reused'] += 1
+            self.stats['saved_ms'] += self._compute_ms[key]
+            return key, cached
+
+        start = time.perf_counter()
+        mask = pattern_set.match_mask(self.location_upper())
+        mask.flags.writeable = False  # Shared across rules
+        self._compute_ms[key] = (time.perf_counter() - start) * 1000
+
+        self._masks[key] = mask
+        self.stats['computed'] += 1
+        return key, mask
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-analysis statistics: distinct masks computed vs. computations saved"""
+        return {
+            'distinct_masks': len(self._masks),
+            'computed': self.stats['computed'],
+            'reused': self.stats['reused'],
+            'saved_ms': round(self.stats['saved_ms'], 2),
+        }
+
+
+class DerivedColumnOverlay:
+    """
+    Side store for derived columns aligned to a shared inventory DataFrame.
+
+    Values are stored as NumPy arrays in the frame's row order, so the shared
+    frame is never widened or copied. Lookups fall back to the frame's own
+    columns, letting evaluators read base and derived columns uniformly.
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        self._frame = frame
+        self._columns: Dict[str, np.ndarray] = {}
+        self.location_masks = LocationMaskCache(frame)
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """The shared (read-only) inventory frame this overlay is bound to."""
+        return self._frame
+
+    def binds(self, frame: pd.DataFrame) -> bool:
+        """Check whether this overlay was built for the given frame object."""
+        return frame is self._frame
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._columns
+
+    def __len__(self) -> int:
+        return len(self._frame)
+
+    def __repr__(self) -> str:
+        return f"<DerivedColumnOverlay rows={len(self._frame)} derived={sorted(self._columns)}>"
+
+    def set(self, name: str, values) -> np.ndarray:
+        """
+        Store a derived column.
+
+        Args:
+            name: Derived column name
+            values: Array-like with one value per frame row (positional)
+
+        Returns:
+            The stored NumPy array
+        """
+        if isinstance(values, pd.Series):
+            values = values.to_numpy()
+        array = np.asarray(values)
+
+        if len(array) != len(self._frame):
+            raise ValueError(
+                f"Derived column '{name}' has {len(array)} values for {len(self._frame)} rows"
+            )
+
+        self._columns[name] = array
+        return array
+
+    def get(self, name: str) -> np.ndarray:
+        """Get a derived column as a positional NumPy array."""
+        return self._columns[name]
+
+    def series(self, name: str) -> pd.Series:
+        """Get a derived column as a Series sharing the frame's index (no copy)."""
+        return pd.Series(self._columns[name], index=self._frame.index, name=name, copy=False)
+
+    def column(self, name: str) -> pd.Series:
+        """Get a derived column if present, otherwise the frame's own column."""
+        if name in self._columns:
+            return self.series(name)
+        return self._frame[name]
+
+    def has_column(self, name: str) -> bool:
+        """Check whether a column is available as derived or base column."""
+        return name in self._columns or name in self._frame.columns
+
+    def drop(self, name: str) -> None:
+        """Remove a derived column if present."""
+        self._columns.pop(name, None)
+
+    @staticmethod
+    def positions(mask) -> np.ndarray:
+        """Convert a boolean mask (Series or array) to positional row indices."""
+        if isinstance(mask, pd.Series):
+            mask = mask.to_numpy(dtype=bool, na_value=False)
+        return np.flatnonzero(np.asarray(mask, dtype=bool))
+
+    def values_at(self, name: str, positions: np.ndarray) -> np.ndarray:
+        """Read a (base or derived) column's values at the given row positions."""
+        if name in self._columns:
+            return self._columns[name][positions]
+        return self._frame[name].to_numpy()[positions]
+
+    def column_at(self, name: str, positions: np.ndarray) -> pd.Series:
+        """Read a (base or derived) column at row positions, keeping the frame index."""
+        return self.column(name).iloc[positions]
+
+
+def get_overlay(inventory_df: pd.DataFrame, warehouse_context: Optional[dict] = None) -> DerivedColumnOverlay:
+    """
+    Get the analysis-scoped overlay for a frame, creating one if needed.
+
+    The rule engine stores one overlay per analysis in
+    warehouse_context['derived_columns']; evaluators called directly (tests,
+    previews) get a private overlay instead.
+    """
+    if warehouse_context:
+        overlay = warehouse_context.get('derived_columns')
+        if isinstance(overlay, DerivedColumnOverlay) and overlay.binds(inventory_df):
+            return overlay
+    return DerivedColumnOverlay(inventory_df)
+
+
+class FrameCopyMonitor:
+    """
+    Context manager counting deep copies and row materializations of large frames.
+
+    Patches DataFrame.copy and DataFrame.take while active. Boolean indexing,
+    .iloc with arrays and .loc with masks all route through take(), so this
+    catches both explicit copies and sub-frame filtering.
+
+    Usage:
+        with FrameCopyMonitor(min_rows=len(df)) as monitor:
+            engine.evaluate_all_rules(df)
+        assert monitor.full_copies == 0
+    """
+
+    def __init__(self, min_rows: int = 1):
+        self.min_rows = min_rows
+        self.copies: List[int] = []
+        self.takes: List[int] = []
+        self._original_copy = None
+        self._original_take = None
+
+    @property
+    def full_copies(self) -> int:
+        """Number of deep copies of frames with at least min_rows rows."""
+        return len(self.copies)
+
+    @property
+    def materializations(self) -> int:
+        """Number of row take/filter operations on frames with at least min_rows rows."""
+        return len(self.takes)
+
+    def __enter__(self) -> 'FrameCopyMonitor':
+        monitor = self
+        self._original_copy = pd.DataFrame.copy
+        self._original_take = pd.DataFrame.take
+        original_copy = self._original_copy
+        original_take = self._original_take
+
+        def counting_copy(frame, deep=True):
+            if deep is not False and len(frame) >= monitor.min_rows:
+                monitor.copies.append(len(frame))
+            return original_copy(frame, deep=deep)
+
+        def counting_take(frame, indices, axis=0, **kwargs):
+            if axis in (0, 'index') and len(frame) >= monitor.min_rows:
+                monitor.takes.append(len(indices))
+            return original_take(frame, indices, axis=axis, **kwargs)
+
+        pd.DataFrame.copy = counting_copy
+        pd.DataFrame.take = counting_take
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pd.DataFrame.copy = self._original_copy
+        pd.DataFrame.take = self._original_take
@@ -5,14 +5,21 @@ Provides CRUD operations and bulk management for warehouse locations
 
 import json
 import re
+import numpy as np
+import pandas as pd
 from flask import Blueprint, request, jsonify, current_app
 from flask_login import current_user, login_required
-from sqlalchemy import and_, or_
+from sqlalchemy import and_
 from functools import wraps
 from database import db
 from models import Location, WarehouseConfig
 from core_models import User
 from virtual_compatibility_layer import get_compatibility_manager
+from location_normalizer import get_location_normalizer, normalize_series
+from location_search_index import (
+    LocationSearchIndex, SearchQuery, get_search_index_cache, intersect_ordinals, parse_search_query
+)
+from services.capacity_resolver import bump_location_version
 
 # Create the location API blueprint
 location_bp = Blueprint('location_api', __name__, url_prefix='/api/v1/locations')
@@ -27,27 +34,7 @@ def _normalize_location_code(location_code: str) -> str:
     - "WH01_RECEIVING" -> "RECEIVING"
     - "A-01-01A" -> "A-01-01A" (unchanged)
     """
-    if not location_code:
-        return location_code
-        
-    code = str(location_code).strip().upper()
-    
-    # Remove common warehouse/user prefixes
-    prefixes_to_remove = [
-        # User-specific warehouse prefixes (USER_USERNAME_)
-        r'^USER_[A-Z0-9]+_',
-        # Simplified user prefixes (USERNAME_)  
-        r'^[A-Z]{2,10}_',  # 2-10 letter username prefixes
-        # Warehouse prefixes (WH01_, WH_)
-        r'^WH\d*_',
-        # Default warehouse prefixes
-        r'^DEFAULT_',
-    ]
-    
-    for prefix_pattern in prefixes_to_remove:
-        code = re.sub(prefix_pattern, '', code)
-        
-    return code
+    return get_location_normalizer().normalize(location_code, 'user_prefix')
 
 # Import auth decorator from app.py
 def token_required(f):
@@ -180,55 +167,8 @@ def _get_physical_locations(current_user, warehouse_id, location_type, zone, is_
         if aisle_number:
             query = query.filter_by(aisle_number=int(aisle_number))
             
-        if search:
-            # Enhanced search with location code normalization
-            search_term = search.strip()
-            
-            # Standard search filters
-            search_filter = or_(
-                Location.code.ilike(f'%{search_term}%'),
-                Location.pattern.ilike(f'%{search_term}%'),
-                Location.zone.ilike(f'%{search_term}%')
-            )
-            
-            # Add normalized code matching for better search results
-            normalized_search = _normalize_location_code(search_term)
-            
-            if normalized_search != search_term:
-                # Get all locations and check normalized matches
-                all_locations = Location.query.filter_by(
-                    warehouse_id=warehouse_id,
-                    created_by=current_user.id
-                ).all()
-                
-                matching_ids = []
-                for loc in all_locations:
-                    normalized_db_code = _normalize_location_code(loc.code)
-                    if (normalized_search in normalized_db_code or 
-                        normalized_db_code in normalized_search or
-                        normalized_search == normalized_db_code):
-                        matching_ids.append(loc.id)
-                
-                if matching_ids:
-                    search_filter = or_(search_filter, Location.id.in_(matching_ids))
-            
-            query = query.filter(search_filter)
-        
         # Order by location type
-        query = query.order_by(
-            db.case(
-                (Location.location_type == 'RECEIVING', 1),
-                (Location.location_type == 'STAGING', 2), 
-                (Location.location_type == 'DOCK', 3),
-                (Location.location_type == 'STORAGE', 4),
-                else_=5
-            ).asc(),
-            Location.aisle_number.asc().nulls_last(),
-            Location.rack_number.asc().nulls_last(),
-            Location.position_number.asc().nulls_last(),
-            Location.level.asc().nulls_last(),
-            Location.code.asc()
-        )
+        query = _physical_order_by(query)
         
         # Debug info (only for first page to reduce spam)
         if page == 1:
@@ -244,8 +184,14 @@ def _get_physical_locations(current_user, warehouse_id, location_type, zone, is_
                 db.session.rollback()
                 # Continue with main query despite debug failure
         
-        # Paginate
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        # Paginate (searches page through the in-process search index instead of ILIKE scans)
+        if search and search.strip():
+            pagination = _search_physical_locations(
+                warehouse_id, current_user.id, warehouse_config, location_type, zone, is_active,
+                aisle_number, search, page, per_page
+            )
+        else:
+            pagination = query.paginate(page=page, per_page=per_page, error_out=False)
         locations = pagination.items
         if page == 1:
             print(f"DEBUG: Physical query returned {len(locations)} locations")
@@ -306,8 +252,141 @@ def _get_physical_locations(current_user, warehouse_id, location_type, zone, is_
         traceback.print_exc()  # Print full stack trace for debugging
         return jsonify({'error': f'Failed to retrieve physical locations: {str(e)}'}), 500
 
+class _IndexPagination:
+    """Page of an index search, shaped like a Flask-SQLAlchemy Pagination"""
+
+    def __init__(self, items, page, per_page, total):
+        self.items = items
+        self.total = total
+        self.pages = (total + per_page - 1) // per_page
+        self.has_next = page < self.pages
+        self.has_prev = page > 1
+
+
+def _physical_order_by(query):
+    """Listing order of physical locations (shared by the listing and its search index)"""
+    return query.order_by(
+        db.case(
+            (Location.location_type == 'RECEIVING', 1),
+            (Location.location_type == 'STAGING', 2),
+            (Location.location_type == 'DOCK', 3),
+            (Location.location_type == 'STORAGE', 4),
+            else_=5
+        ).asc(),
+        Location.aisle_number.asc().nulls_last(),
+        Location.rack_number.asc().nulls_last(),
+        Location.position_number.asc().nulls_last(),
+        Location.level.asc().nulls_last(),
+        Location.code.asc()
+    )
+
+
+def _physical_scope_filter(warehouse_id, user_id, warehouse_config):
+    return and_(
+        Location.warehouse_id == warehouse_id,
+        Location.created_by == user_id,
+        Location.warehouse_config_id == (warehouse_config.id if warehouse_config else None)
+    )
+
+
+def _get_physical_search_index(warehouse_id, user_id, warehouse_config) -> LocationSearchIndex:
+    """
+    Search index over one user's template-bound locations, in listing order
+
+    Versioned by a one-query fingerprint of the scope (row count, max id and
+    sums over the searchable columns); edits through this API also invalidate
+    the warehouse's indexes directly.
+    """
+    scope = _physical_scope_filter(warehouse_id, user_id, warehouse_config)
+    length = db.func.length
+    version = tuple(db.session.query(
+        db.func.count(Location.id), db.func.max(Location.id),
+        db.func.sum(length(Location.code)), db.func.sum(length(Location.pattern)),
+        db.func.sum(length(Location.zone)), db.func.sum(length(Location.location_type)),
+        db.func.sum(db.case((Location.is_active == True, 1), else_=0)),
+        db.func.sum(Location.aisle_number), db.func.sum(Location.rack_number),
+        db.func.sum(Location.position_number), db.func.sum(length(Location.level))
+    ).filter(scope).one())
+
+    def build():
+        rows = _physical_order_by(db.session.query(
+            Location.id, Location.code, Location.pattern, Location.zone, Location.location_type,
+            Location.aisle_number, Location.rack_number, Location.position_number, Location.level,
+            Location.is_active
+        ).filter(scope)).all()
+        ids, codes, patterns, zones, types, aisles, racks, positions, levels, active = (
+            list(column) for column in zip(*rows)
+        ) if rows else ([],) * 10
+        return LocationSearchIndex(
+            codes, text_fields={'pattern': patterns, 'zone': zones}, ids=ids,
+            fields={
+                'location_type': types, 'zone': zones, 'aisle_number': aisles, 'rack': racks,
+                'position_number': positions, 'level': levels, 'is_active': [int(bool(value)) for value in active],
+            }
+        )
+
+    cache_key = ('physical', warehouse_id, user_id, warehouse_config.id if warehouse_config else None)
+    return get_search_index_cache().get_or_build(cache_key, version, build)
+
+
+def _match_physical_term(index: LocationSearchIndex, term: str):
+    """
+    Ordinals whose code, pattern or zone contains term, plus prefix-normalized
+    code matches (e.g. "ALICE_01-A" finds "01-A" and vice versa)
+    """
+    matches = index.match_term(term)
+    normalized_term = _normalize_location_code(term)
+    if normalized_term == term:
+        return matches
+
+    normalized = index.derived('normalized_codes', lambda ix: normalize_series(ix.codes, 'user_prefix').to_numpy(dtype=str))
+    by_normalized = index.derived('normalized_lookup', lambda ix: pd.Series(
+        np.arange(len(normalized)), index=normalized
+    ).groupby(level=0).indices)
+
+    # normalized term within a normalized code (which is a suffix of the code)
+    candidates = index.match_code(normalized_term)
+    extra = [candidates[np.char.find(normalized[candidates], normalized_term) >= 0]]
+    # normalized code within the normalized term
+    substrings = {normalized_term[i:j] for i in range(len(normalized_term))
+                  for j in range(i + 1, len(normalized_term) + 1)}
+    extra += [by_normalized[substring] for substring in substrings if substring in by_normalized]
+    return np.unique(np.concatenate([matches, *extra]).astype(np.int64))
+
+
+def _search_physical_locations(warehouse_id, user_id, warehouse_config, location_type, zone, is_active,
+                               aisle_number, search, page, per_page) -> _IndexPagination:
+    """Filter, order and page a physical location search through the search index"""
+    index = _get_physical_search_index(warehouse_id, user_id, warehouse_config)
+    search_query = parse_search_query(search)
+
+    ordinals = index.query(SearchQuery(prefixes=search_query.prefixes, fields=search_query.fields))
+    for term in search_query.terms:
+        ordinals = intersect_ordinals(ordinals, _match_physical_term(index, term))
+
+    # Request filters (same as the SQL listing)
+    request_filters = [('location_type', location_type), ('zone', zone), ('aisle_number', aisle_number)]
+    if is_active is not None:
+        request_filters.append(('is_active', int(is_active.lower() == 'true')))
+    for name, value in request_filters:
+        if value is not None and value != '':
+            ordinals = ordinals[index.field_mask(name, value)[ordinals]]
+
+    start = (page - 1) * per_page
+    page_ids = index.ids[ordinals[start:start + per_page]].tolist()
+    by_id = {location.id: location for location in Location.query.filter(Location.id.in_(page_ids)).all()} \
+        if page_ids else {}
+    items = [by_id[location_id] for location_id in page_ids if location_id in by_id]
+    return _IndexPagination(items, page, per_page, len(ordinals))
+
+
 def _get_virtual_locations(current_user, warehouse_id, location_type, zone, is_active, aisle_number, search, page, per_page):
-    """Handle virtual location queries using compatibility manager"""
+    """
+    Handle virtual location queries using the lazy virtual location index
+
+    PERFORMANCE: Storage locations are computed from the warehouse dimensions, so
+    counts are exact (no 1000-location sample) and a page costs O(per_page).
+    """
     try:
         # Only log on first page requests to reduce spam
         if page == 1:
@@ -316,13 +395,12 @@ def _get_virtual_locations(current_user, warehouse_id, location_type, zone, is_a
         # Get compatibility manager
         compat_manager = get_compatibility_manager()
 
-        # Get all virtual locations for the warehouse (with safety limit)
-        # MULTI-TENANCY FIX: Pass current_user.id to filter locations by user
-        all_locations = compat_manager.get_all_warehouse_locations(warehouse_id, created_by=current_user.id)
-        if page == 1:
-            print(f"[LOCATION_API] Retrieved {len(all_locations)} virtual locations for user {current_user.id}")
+        # MULTI-TENANCY FIX: Pass current_user.id to filter physical special areas by user
+        location_index = compat_manager.get_virtual_location_index(warehouse_id, created_by=current_user.id)
+        if page == 1 and location_index is not None:
+            print(f"[LOCATION_API] Indexed {len(location_index):,} virtual locations for user {current_user.id}")
         
-        if not all_locations:
+        if not location_index:
             print(f"[LOCATION_API] No virtual locations found - warehouse may not be properly configured")
             return jsonify({
                 'locations': [],
@@ -344,87 +422,25 @@ def _get_virtual_locations(current_user, warehouse_id, location_type, zone, is_a
                 'warning': 'No virtual locations configured for this warehouse'
             }), 200
         
-        # Apply filters to virtual locations
-        filtered_locations = all_locations
-        
-        if location_type:
-            filtered_locations = [loc for loc in filtered_locations if loc.get('location_type') == location_type]
-            if page == 1:
-                print(f"[LOCATION_API] After location_type filter ({location_type}): {len(filtered_locations)} locations")
-        
-        if zone:
-            filtered_locations = [loc for loc in filtered_locations if loc.get('zone') == zone]
-            if page == 1:
-                print(f"[LOCATION_API] After zone filter ({zone}): {len(filtered_locations)} locations")
-            
-        if is_active is not None:
-            is_active_bool = is_active.lower() == 'true'
-            filtered_locations = [loc for loc in filtered_locations if loc.get('is_active', True) == is_active_bool]
-            if page == 1:
-                print(f"[LOCATION_API] After is_active filter ({is_active}): {len(filtered_locations)} locations")
-            
-        if aisle_number:
-            aisle_num = int(aisle_number)
-            filtered_locations = [loc for loc in filtered_locations if loc.get('aisle_number') == aisle_num]
-            if page == 1:
-                print(f"[LOCATION_API] After aisle_number filter ({aisle_number}): {len(filtered_locations)} locations")
-            
-        if search:
-            search_term = search.strip().upper()
-            search_results = []
-            for loc in filtered_locations:
-                code = str(loc.get('code', '')).upper()
-                if (search_term in code or 
-                    search_term in str(loc.get('zone', '')).upper()):
-                    search_results.append(loc)
-            filtered_locations = search_results
-            if page == 1:
-                print(f"[LOCATION_API] After search filter ('{search}'): {len(filtered_locations)} locations")
-        
-        # Sort virtual locations (special areas first, then storage)
-        def sort_key(loc):
-            type_priority = {
-                'RECEIVING': 1,
-                'STAGING': 2, 
-                'DOCK': 3,
-                'TRANSITIONAL': 4,  # CRITICAL FIX: Include AISLE locations in high priority
-                'STORAGE': 5
-            }
-            return (
-                type_priority.get(loc.get('location_type', 'STORAGE'), 5),
-                loc.get('aisle_number') or 0,
-                loc.get('rack_number') or 0,
-                loc.get('position_number') or 0,
-                loc.get('level', '') or '',
-                loc.get('code', '')
-            )
-        
-        filtered_locations.sort(key=sort_key)
+        # Apply filters (special areas first, then storage - same order as before, without sorting)
+        selection = location_index.select(
+            location_type=location_type or None,
+            zone=zone or None,
+            is_active=(is_active.lower() == 'true') if is_active is not None else None,
+            aisle_number=int(aisle_number) if aisle_number else None,
+            search=search
+        )
         
         # Apply pagination to filtered results
-        total_filtered = len(filtered_locations)
+        total_filtered = len(selection)
         start_index = (page - 1) * per_page
-        end_index = start_index + per_page
-        paginated_locations = filtered_locations[start_index:end_index]
+        paginated_locations = selection.page(start_index, per_page)
         
         if page == 1:
             print(f"[LOCATION_API] Pagination: showing {len(paginated_locations)} of {total_filtered} locations (page {page})")
         
-        # Calculate summary statistics
-        total_locations = len(all_locations)
-        storage_locations = len([loc for loc in all_locations if loc.get('location_type') == 'STORAGE'])
-        total_capacity = sum(loc.get('capacity', 1) for loc in all_locations)
-        
-        # Debug: Show location types in response (only for first page to reduce spam)
-        if page == 1:
-            location_types = {}
-            for loc in paginated_locations:
-                loc_type = loc.get('location_type', 'UNKNOWN')
-                location_types[loc_type] = location_types.get(loc_type, 0) + 1
-            print(f"DEBUG: Virtual location types in response: {location_types}")
-            
-            special_areas = [loc.get('code') for loc in paginated_locations if loc.get('location_type') in ['RECEIVING', 'STAGING', 'DOCK', 'TRANSITIONAL']]
-            print(f"DEBUG: Virtual special areas in response: {special_areas}")
+        # Calculate summary statistics (exact, computed arithmetically)
+        summary = location_index.get_summary()
         
         # Calculate pagination info
         total_pages = (total_filtered + per_page - 1) // per_page
@@ -442,9 +458,9 @@ def _get_virtual_locations(current_user, warehouse_id, location_type, zone, is_a
                 'has_prev': has_prev
             },
             'summary': {
-                'total_locations': total_locations,
-                'storage_locations': storage_locations,
-                'total_capacity': total_capacity,
+                'total_locations': summary['total_locations'],
+                'storage_locations': summary['storage_locations'],
+                'total_capacity': summary['total_capacity'],
                 'warehouse_id': warehouse_id
             },
             'location_source': 'virtual'
@@ -539,6 +555,7 @@ def create_location(current_user):
             db.session.add(location)
             db.session.flush()  # Flush to catch constraint violations before commit
             db.session.commit()
+            bump_location_version(location.warehouse_id)
             
             return jsonify({
                 'message': 'Location created successfully',
@@ -574,6 +591,7 @@ def update_location(current_user, location_id):
         
         if not data:
             return jsonify({'error': 'No data provided'}), 400
+        original_warehouse_id = location.warehouse_id
         
         # Check if code is being changed and if it conflicts within user's locations
         if 'code' in data and data['code'] != location.code:
@@ -607,6 +625,9 @@ def update_location(current_user, location_id):
             location.set_special_requirements(data['special_requirements'])
         
         db.session.commit()
+        get_search_index_cache().invalidate(location.warehouse_id)
+        for warehouse_id in {original_warehouse_id, location.warehouse_id}:
+            bump_location_version(warehouse_id)
         
         return jsonify({
             'message': 'Location updated successfully',
@@ -631,6 +652,8 @@ def delete_location(current_user, location_id):
         # Soft delete by setting is_active to False
         location.is_active = False
         db.session.commit()
+        get_search_index_cache().invalidate(location.warehouse_id)
+        bump_location_version(location.warehouse_id)
         
         return jsonify({'message': 'Location deleted successfully'}), 200
         
@@ -721,6 +744,8 @@ def bulk_create_locations(current_user):
         
         if created_locations:
             db.session.commit()
+            for warehouse_id in {location.warehouse_id for location in created_locations}:
+                bump_location_version(warehouse_id)
         
         return jsonify({
             'message': f'Bulk operation completed. Created {len(created_locations)} locations.',
@@ -884,6 +909,7 @@ def bulk_create_location_range(current_user):
         if created_locations:
             try:
                 db.session.commit()
+                bump_location_version(warehouse_id)
                 print(f"[BULK_RANGE] Successfully committed {len(created_locations)} locations")
             except Exception as e:
                 db.session.rollback()
@@ -1133,6 +1159,7 @@ def generate_warehouse_locations(current_user):
         
         if created_locations:
             db.session.commit()
+            bump_location_version(warehouse_id)
         
         # Calculate statistics
         total_storage = sum(1 for loc in created_locations if loc.location_type == 'STORAGE')
@@ -1354,6 +1381,7 @@ def correct_location_classification():
             db.session.add(correction)
 
         db.session.commit()
+        bump_location_version(warehouse_id)
 
         return jsonify({
             'success': True,
@@ -1457,41 +1485,24 @@ def test_location_classification():
         # Initialize classifier
         classifier = EnhancedLocationClassifier(db_session=db)
 
-        # Test each location
-        results = {}
-        for location in locations:
-            try:
-                result = classifier.classify_location(
-                    location=location,
-                    warehouse_context=warehouse_context
-                )
-                results[location] = {
-                    'location_type': result.location_type,
-                    'confidence': result.confidence,
-                    'method': result.method,
-                    'reasoning': result.reasoning
-                }
-            except Exception as e:
-                results[location] = {
-                    'error': str(e),
-                    'location_type': 'ERROR',
-                    'confidence': 0.0,
-                    'method': 'error',
-                    'reasoning': f'Classification failed: {str(e)}'
-                }
+        # Optional inventory rows (list of records with a 'location' column) for behavioral analysis
+        inventory = data.get('inventory')
+        inventory_df = pd.DataFrame.from_records(inventory) if inventory else None
+
+        # PERFORMANCE: Classify all locations in one batch pass
+        classifications = classifier.classify_batch(locations, inventory_df, warehouse_context)
+        results = {
+            location: {
+                'location_type': result.location_type,
+                'confidence': result.confidence,
+                'method': result.method,
+                'reasoning': result.reasoning
+            }
+            for location, result in classifications.items()
+        }
 
         # Generate summary
-        summary = classifier.get_classification_summary({
-            location: type(
-                'MockResult',
-                (),
-                {
-                    'location_type': result['location_type'],
-                    'confidence': result['confidence'],
-                    'method': result['method']
-                }
-            )() for location, result in results.items() if 'error' not in result
-        })
+        summary = classifier.get_classification_summary(classifications)
 
         return jsonify({
             'test_results': results,
@@ -1509,6 +1520,10 @@ def bulk_correct_classifications():
     """
     Apply corrections to multiple locations at once
     Useful for batch learning from user feedback
+
+    Each correction is applied in its own savepoint, so an invalid row is
+    reported in its result without discarding the others; the successful
+    rows are committed together.
     """
     try:
         data = request.get_json()
@@ -1524,64 +1539,125 @@ def bulk_correct_classifications():
             return jsonify({'error': 'warehouse_id required'}), 400
 
         from models import LocationClassificationCorrection
+        from enhanced_location_classifier import EnhancedLocationClassifier
+
+        columns = LocationClassificationCorrection.__table__.c
+        max_lengths = {'location_code': columns.location_code.type.length,
+                       'corrected_type': columns.corrected_type.type.length}
 
         success_count = 0
         error_count = 0
-        results = []
-
-        for correction_data in corrections:
-            try:
-                location_code = correction_data.get('location_code')
-                corrected_type = correction_data.get('corrected_type')
+        results = [None] * len(corrections)
+        valid = []  # (position, location_code, corrected_type)
 
-                if not location_code or not corrected_type:
-                    results.append({
-                        'location_code': location_code,
-                        'success': False,
-                        'error': 'Missing location_code or corrected_type'
-                    })
-                    error_count += 1
-                    continue
-
-                # Create or update correction
-                existing = LocationClassificationCorrection.query.filter_by(
-                    warehouse_id=warehouse_id,
-                    location_code=location_code,
-                    corrected_by=current_user.id
-                ).first()
-
-                if existing:
-                    existing.corrected_type = corrected_type
-                    existing.is_active = True
-                    existing.location_pattern = existing.extract_pattern()
-                    correction = existing
-                else:
-                    correction = LocationClassificationCorrection(
-                        warehouse_id=warehouse_id,
-                        location_code=location_code,
-                        corrected_type=corrected_type,
-                        corrected_by=current_user.id
-                    )
-                    correction.location_pattern = correction.extract_pattern()
-                    db.session.add(correction)
-
-                db.session.commit()
+        for position, correction_data in enumerate(corrections):
+            if not isinstance(correction_data, dict):
+                results[position] = {
+                    'location_code': 'unknown',
+                    'success': False,
+                    'error': 'Correction must be an object with location_code and corrected_type'
+                }
+                error_count += 1
+                continue
 
-                results.append({
-                    'location_code': location_code,
-                    'success': True,
-                    'correction_id': correction.id
-                })
-                success_count += 1
+            location_code = correction_data.get('location_code')
+            corrected_type = correction_data.get('corrected_type')
 
+            error = None
+            if not location_code or not corrected_type:
+                error = 'Missing location_code or corrected_type'
+            elif not isinstance(location_code, str) or not isinstance(corrected_type, str):
+                error = 'location_code and corrected_type must be strings'
+            else:
+                too_long = [field for field, value in (('location_code', location_code), ('corrected_type', corrected_type))
+                            if len(value) > max_lengths[field]]
+                if too_long:
+                    error = f"{too_long[0]} longer than {max_lengths[too_long[0]]} characters"
+
+            if error:
+                results[position] = {
+                    'location_code': location_code if isinstance(location_code, str) else 'unknown',
+                    'success': False,
+                    'error': error
+                }
+                error_count += 1
+                continue
+            valid.append((position, location_code, corrected_type))
+
+        # PERFORMANCE: Load this user's existing corrections in chunked IN queries
+        codes = list(dict.fromkeys(location_code for _, location_code, _ in valid))
+        existing = {}
+        for chunk_start in range(0, len(codes), 10000):
+            for correction in LocationClassificationCorrection.query.filter(
+                LocationClassificationCorrection.warehouse_id == warehouse_id,
+                LocationClassificationCorrection.corrected_by == current_user.id,
+                LocationClassificationCorrection.location_code.in_(codes[chunk_start:chunk_start + 10000])
+            ):
+                existing[correction.location_code] = correction
+
+        # Record what the system would have classified new corrections as (one batch pass)
+        new_codes = [code for code in codes if code not in existing]
+        originals = {}
+        if new_codes:
+            classifier = EnhancedLocationClassifier(db_session=db)
+            originals = classifier.classify_batch(new_codes, warehouse_context={'warehouse_id': warehouse_id},
+                                                  apply_user_corrections=False)
+
+        applied = []  # (position, location_code, correction)
+        for position, location_code, corrected_type in valid:
+            try:
+                # Per-row savepoint: a failing row rolls back alone
+                with db.session.begin_nested():
+                    correction = existing.get(location_code)
+                    if correction is not None:
+                        correction.corrected_type = corrected_type
+                        correction.is_active = True
+                        correction.location_pattern = correction.extract_pattern()
+                    else:
+                        original = originals.get(location_code)
+                        correction = LocationClassificationCorrection(
+                            warehouse_id=warehouse_id,
+                            location_code=location_code,
+                            corrected_type=corrected_type,
+                            corrected_by=current_user.id,
+                            original_type=original.location_type if original else None,
+                            original_confidence=original.confidence if original else None,
+                            original_method=original.method if original else None
+                        )
+                        correction.location_pattern = correction.extract_pattern()
+                        db.session.add(correction)
+                existing[location_code] = correction  # Repeated codes in this request update it
+                applied.append((position, location_code, correction))
             except Exception as e:
-                results.append({
-                    'location_code': correction_data.get('location_code', 'unknown'),
+                results[position] = {
+                    'location_code': location_code,
                     'success': False,
                     'error': str(e)
-                })
+                }
                 error_count += 1
+
+        if applied:
+            try:
+                db.session.commit()
+                success_count = len(applied)
+                for position, location_code, correction in applied:
+                    results[position] = {
+                        'location_code': location_code,
+                        'success': True,
+                        'correction_id': correction.id
+                    }
+            except Exception as e:
                 db.session.rollback()
+                error_count += len(applied)
+                for position, location_code, correction in applied:
+                    results[position] = {
+                        'location_code': location_code,
+                        'success': False,
+                        'error': str(e)
+                    }
+
+        if success_count:
+            bump_location_version(warehouse_id)
 
         return jsonify({
             'results': results,
@@ -11,9 +11,12 @@ Classification Strategy:
 """
 
 import re
-from typing import Dict, Any, Optional, Tuple, List
+from typing import Dict, Any, Iterable, Optional, Tuple, List
 from enum import Enum
 
+import numpy as np
+import pandas as pd
+
 
 class LocationCategory(Enum):
     """Location categories for differentiated overcapacity handling"""
@@ -70,6 +73,13 @@ class LocationClassificationService:
         re.compile(r'^[A-Z]+-\d+$'),                             # Generic NAME-XX format
     ]
 
+    # Substrings that mark a location invalid when no validation result is given
+    INVALID_KEYWORDS = ['NOWHERE', 'INVALID', 'ERROR', 'NULL', 'UNKNOWN', 'TEMP', 'TEST']
+
+    # Keyword fallback (Priority 3)
+    STORAGE_KEYWORDS = ['RACK', 'SHELF', 'STORAGE', 'POSITION']
+    SPECIAL_KEYWORDS = ['RECV', 'RECEIVING', 'STAGE', 'STAGING', 'DOCK', 'AISLE', 'BULK', 'FLOOR']
+
     def __init__(self):
         """Initialize the location classification service"""
         pass
@@ -96,8 +106,7 @@ class LocationClassificationService:
         # Priority 0.5: Basic invalid location patterns (fallback if no validation_result)
         if validation_result is None:
             location_upper = location_code.upper()
-            invalid_patterns = ['NOWHERE', 'INVALID', 'ERROR', 'NULL', 'UNKNOWN', 'TEMP', 'TEST']
-            if any(invalid_pattern in location_upper for invalid_pattern in invalid_patterns):
+            if any(invalid_pattern in location_upper for invalid_pattern in self.INVALID_KEYWORDS):
                 return LocationCategory.INVALID, BusinessPriority.EXCLUDED
             
             # Invalid aisle patterns (AISLE-05+ are typically invalid in most configurations)
@@ -133,14 +142,11 @@ class LocationClassificationService:
                 return LocationCategory.SPECIAL, BusinessPriority.WARNING
         
         # Priority 3: Keyword-based fallback classification
-        storage_keywords = ['RACK', 'SHELF', 'STORAGE', 'POSITION']
-        special_keywords = ['RECV', 'RECEIVING', 'STAGE', 'STAGING', 'DOCK', 'AISLE', 'BULK', 'FLOOR']
-        
-        for keyword in storage_keywords:
+        for keyword in self.STORAGE_KEYWORDS:
             if keyword in location_upper:
                 return LocationCategory.STORAGE, BusinessPriority.CRITICAL
                 
-        for keyword in special_keywords:
+        for keyword in self.SPECIAL_KEYWORDS:
             if keyword in location_upper:
                 return LocationCategory.SPECIAL, BusinessPriority.WARNING
         
@@ -148,6 +154,82 @@ class LocationClassificationService:
         # This ensures data integrity by requiring individual pallet investigation
         return LocationCategory.STORAGE, BusinessPriority.CRITICAL
     
+    def classify_locations_bulk(self, location_codes: Iterable[str],
+                                location_types: Optional[Iterable[Optional[str]]] = None,
+                                valid: Optional[Iterable[bool]] = None) -> pd.DataFrame:
+        """
+        Vectorized classify_location for many locations in one pass.
+
+        Each priority level of classify_location becomes one vectorized string
+        operation over all codes; the first matching level wins, exactly as in
+        the scalar method.
+
+        Args:
+            location_codes: Location codes to classify
+            location_types: Database location_type per code (None when unknown)
+            valid: Per-code validation outcome (like validation_result[0]); when
+                omitted, the keyword/aisle invalid fallback is applied instead
+
+        Returns:
+            DataFrame (positional index) with 'category' (LocationCategory) and
+            'priority' (BusinessPriority) columns
+        """
+        codes = pd.Series(list(location_codes), dtype=object).astype(str)
+        upper = codes.str.upper()
+        count = len(codes)
+
+        if location_types is None:
+            types = pd.Series([None] * count, dtype=object)
+        else:
+            types = pd.Series(list(location_types), dtype=object)
+
+        # Priority 0 / 0.5: invalid locations
+        if valid is not None:
+            is_invalid = ~np.asarray(list(valid), dtype=bool)
+        else:
+            aisle_number = pd.to_numeric(upper.str.split('-').str[1], errors='coerce')
+            is_invalid = (
+                upper.str.contains('|'.join(self.INVALID_KEYWORDS), regex=True) |
+                (upper.str.startswith('AISLE-') & ~upper.str.startswith('AISLE-0') & (aisle_number >= 5))
+            ).to_numpy(dtype=bool)
+
+        def any_match(patterns) -> np.ndarray:
+            mask = np.zeros(count, dtype=bool)
+            for pattern in patterns:
+                mask |= upper.str.match(pattern, na=False).to_numpy(dtype=bool)
+            return mask
+
+        def any_keyword(keywords) -> np.ndarray:
+            return upper.str.contains('|'.join(keywords), regex=True).to_numpy(dtype=bool)
+
+        conditions = [
+            is_invalid,
+            types.isin(self.STORAGE_LOCATION_TYPES).to_numpy(dtype=bool),   # Priority 1
+            types.isin(self.SPECIAL_LOCATION_TYPES).to_numpy(dtype=bool),
+            any_match(self.STORAGE_PATTERNS),                               # Priority 2
+            any_match(self.SPECIAL_PATTERNS),
+            any_keyword(self.STORAGE_KEYWORDS),                             # Priority 3
+            any_keyword(self.SPECIAL_KEYWORDS),
+        ]
+        outcomes = [LocationCategory.INVALID, LocationCategory.STORAGE, LocationCategory.SPECIAL,
+                    LocationCategory.STORAGE, LocationCategory.SPECIAL,
+                    LocationCategory.STORAGE, LocationCategory.SPECIAL]
+
+        # Default: unknown locations are storage (conservative approach)
+        level = np.select(conditions, list(range(len(outcomes))), default=len(outcomes))
+        category_lookup = np.array(outcomes + [LocationCategory.STORAGE], dtype=object)
+        priority_by_category = {
+            LocationCategory.STORAGE: BusinessPriority.CRITICAL,
+            LocationCategory.SPECIAL: BusinessPriority.WARNING,
+            LocationCategory.INVALID: BusinessPriority.EXCLUDED,
+        }
+
+        categories = category_lookup[level]
+        return pd.DataFrame({
+            'category': categories,
+            'priority': [priority_by_category[category] for category in categories],
+        })
+
     def get_alert_strategy(self, category: LocationCategory) -> Dict[str, Any]:
         """
         Get the appropriate alerting strategy for a location category.
@@ -0,0 +1,406 @@
+"""
+Location Normalization Engine
+
+Location codes used to be normalized in four places, each running its own
+regexes per string on every call:
+
+- CanonicalLocationService.to_canonical      -> mode 'canonical'
+- location_api._normalize_location_code       -> mode 'user_prefix'
+- BaseRuleEvaluator._normalize_location_code  -> mode 'warehouse_prefix'
+- RuleEngine._normalize_position_format       -> mode 'position_variants'
+  (BaseRuleEvaluator's reduced variant set    -> mode 'evaluator_variants')
+
+This module holds the single implementation of each of them with
+precompiled patterns; the old entry points delegate here and keep their
+exact results. LocationNormalizer adds:
+
+- a bounded, thread-safe memo per mode, shared across requests (inventory
+  files and Location tables repeat the same few thousand codes)
+- normalize_series(), which normalizes each distinct value once and maps the
+  results back onto the input (index preserved)
+
+Usage:
+    normalizer = get_location_normalizer()
+    normalizer.normalize('USER_TESTF_01-01-01A')                      # '01-01-001A'
+    normalizer.normalize_series(inventory_df['location'], 'user_prefix')
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+# Special locations kept as-is by the canonical normalization
+CANONICAL_SPECIAL_LOCATIONS = frozenset({
+    'RECV-01', 'RECV-02', 'RECV-001', 'RECV-002',
+    'STAGE-01', 'STAGE-02', 'STAGE-001', 'STAGE-002',
+    'DOCK-01', 'DOCK-02', 'DOCK-001', 'DOCK-002',
+    'AISLE-01', 'AISLE-02', 'AISLE-001', 'AISLE-002',
+    'RECEIVING', 'STAGING', 'SHIPPING', 'DOCK'
+})
+
+CANONICAL_FORMAT = "{aisle:02d}-{rack:02d}-{position:03d}{level}"
+
+# Canonical normalization: warehouse and user prefixes (applied in order)
+_CANONICAL_PREFIXES = [re.compile(pattern) for pattern in (
+    r'^USER_[A-Z0-9]+_',    # USER_TESTF_, USER_HOLA3_
+    r'^WH[0-9]+_',          # WH01_, WH001_
+    r'^DEFAULT_',           # DEFAULT_
+    r'^WAREHOUSE_',         # WAREHOUSE_
+)]
+
+# Locations API: user-specific, username, warehouse and default prefixes (applied in order)
+_USER_PREFIXES = [re.compile(pattern) for pattern in (
+    r'^USER_[A-Z0-9]+_',
+    r'^[A-Z]{2,10}_',  # 2-10 letter username prefixes
+    r'^WH\d*_',
+    r'^DEFAULT_',
+)]
+
+# Rule evaluators: only WH/DEFAULT prefixes, USER_ prefixes kept intact (first match only)
+_WAREHOUSE_PREFIXES = ('WH01_', 'WH02_', 'WH03_', 'WH04_', 'WH_', 'DEFAULT_')
+
+_SPECIAL_PATTERN = re.compile(r'^(RECV|STAGE|DOCK|AISLE)-(\d{1,3})$')
+_STANDARD_PATTERN = re.compile(r'^(\d{1,2})-(\d{1,2})-(\d{1,3})([A-Z])$')
+_COMPACT_PATTERN = re.compile(r'^(\d{1,2})([A-Z])(\d{1,2})([A-Z])$')
+_POSITION_LEVEL_RACK_PATTERN = re.compile(r'^(\d{1,3})([A-Z])(\d{1,2})$')
+_LEVEL_RACK_POSITION_PATTERN = re.compile(r'^([A-Z])(\d{1,2})-(\d{1,3})$')
+_NUMBERED_AREA_PATTERN = re.compile(r'^([A-Z]+)-(\d{1,3})$')
+_AREA_NUMBER_PATTERN = re.compile(r'^([A-Z]+)(\d{1,3})$')
+
+
+def _unpadded(number: str) -> str:
+    return number.lstrip('0') or '0'
+
+
+def _unique_in_order(values: List[str]) -> Tuple[str, ...]:
+    return tuple(dict.fromkeys(values))
+
+
+# ==== Canonical format ("XX-XX-XXX{L}") ====
+
+def parse_special(code: str) -> Optional[str]:
+    """RECV-01, AISLE-01, STAGE-01, DOCK-01, RECEIVING, STAGING (numbers padded to 2 digits)"""
+    if code in CANONICAL_SPECIAL_LOCATIONS:
+        return code
+    match = _SPECIAL_PATTERN.match(code)
+    if match:
+        area_type, number = match.groups()
+        return f"{area_type}-{int(number):02d}"
+    return None
+
+
+def parse_standard(code: str) -> Optional[str]:
+    """XX-XX-XXX{L} with variable padding: "1-1-1A" -> "01-01-001A" """
+    match = _STANDARD_PATTERN.match(code)
+    if match:
+        aisle, rack, position, level = match.groups()
+        return f"{int(aisle):02d}-{int(rack):02d}-{int(position):03d}{level}"
+    return None
+
+
+def parse_compact(code: str) -> Optional[str]:
+    """XX{L}XX{L} (aisle, rack level, position, level; rack 01): "02B15C" -> "02-01-015C" """
+    match = _COMPACT_PATTERN.match(code)
+    if match:
+        aisle, rack_level, position, level = match.groups()
+        return f"{int(aisle):02d}-01-{int(position):03d}{level}"
+    return None
+
+
+def parse_user_common(code: str) -> Optional[str]:
+    """PPP{L}RR ("001A01") and {L}R-PPP ("A1-001") user formats, aisle 01"""
+    match = _POSITION_LEVEL_RACK_PATTERN.match(code)
+    if match:
+        position, level, rack = match.groups()
+        return CANONICAL_FORMAT.format(aisle=1, rack=int(rack), position=int(position), level=level)
+
+    match = _LEVEL_RACK_POSITION_PATTERN.match(code)
+    if match:
+        level, rack, position = match.groups()
+        return CANONICAL_FORMAT.format(aisle=1, rack=int(rack), position=int(position), level=level)
+
+    return None
+
+
+# Order matters: the first parser returning a code wins
+CANONICAL_PARSERS = (parse_special, parse_standard, parse_compact, parse_user_common)
+
+
+def remove_canonical_prefixes(code: str) -> str:
+    """Remove USER_x_, WHnn_, DEFAULT_ and WAREHOUSE_ prefixes (in that order)"""
+    for pattern in _CANONICAL_PREFIXES:
+        code = pattern.sub('', code)
+    return code
+
+
+def canonical_code(location_code: Any) -> str:
+    """
+    Any location format -> canonical "XX-XX-XXX{L}" (unparseable codes come back
+    stripped and upper-cased)
+
+    Examples:
+        "01A01A" -> "01-01-001A"
+        "USER_TESTF_01-01-01A" -> "01-01-001A"
+        "RECV-1" -> "RECV-01"
+    """
+    if not location_code or not isinstance(location_code, str):
+        return str(location_code) if location_code else ""
+
+    original_code = location_code.strip().upper()
+    clean_code = remove_canonical_prefixes(original_code)
+    for parser in CANONICAL_PARSERS:
+        canonical = parser(clean_code)
+        if canonical:
+            return canonical
+    return original_code
+
+
+# ==== Prefix stripping ====
+
+def strip_user_prefixes(location_code: Any) -> Any:
+    """
+    Remove user, username, warehouse and default prefixes (locations API)
+
+    Examples:
+    - "ALICE_A-01-01A" -> "A-01-01A"
+    - "USER_BOB_001A" -> "001A"
+    - "WH01_RECEIVING" -> "RECEIVING"
+    """
+    if not location_code:
+        return location_code
+
+    code = str(location_code).strip().upper()
+    for pattern in _USER_PREFIXES:
+        code = pattern.sub('', code)
+    return code
+
+
+def strip_warehouse_prefix(location_code: Any) -> Any:
+    """Conservative normalization: remove one WH/DEFAULT prefix, keep USER_ prefixes intact"""
+    if not location_code:
+        return location_code
+
+    code = str(location_code).strip().upper()
+    for prefix in _WAREHOUSE_PREFIXES:
+        if code.startswith(prefix):
+            return code[len(prefix):]
+    return code
+
+
+# ==== Position format variants ====
+
+def position_variants(location_code: Any) -> List[str]:
+    """
+    Candidate database codes for an inventory location, most likely first
+
+    Cross-format translation between coding systems, e.g. inventory "02-1-011B"
+    (zone-section-position-level) vs database "01-01-001A_1"
+    (aisle-rack-position-level_slot), plus special area padding variants
+    ("RECV-1" -> "RECV-001", "RECV-01") and dashed forms of "DOCK1".
+    """
+    if not location_code:
+        return [location_code]
+
+    code = str(location_code).strip().upper()
+    variants = [code]
+
+    match = _STANDARD_PATTERN.match(code)
+    if match:
+        aisle, rack, position, level = match.groups()
+        base_variants = [
+            f"{aisle.zfill(2)}-{rack.zfill(2)}-{position.zfill(3)}{level}",  # Full padding: 01-01-001A
+            f"{aisle.zfill(2)}-{_unpadded(rack)}-{position.zfill(3)}{level}",  # Mixed: 01-1-001A
+            f"{aisle.zfill(2)}-{rack.zfill(2)}-{position.lstrip('0').zfill(2)}{level}",  # 2-digit pos: 01-01-01A
+            f"{aisle.zfill(2)}-{_unpadded(rack)}-{position.lstrip('0').zfill(2)}{level}",  # Minimal: 01-1-01A
+            f"{_unpadded(aisle)}-{_unpadded(rack)}-{_unpadded(position)}{level}",  # No padding: 1-1-1A
+            f"{aisle.zfill(2)}-{aisle.zfill(2)}-{position.zfill(3)}{level}",  # Map zone to aisle: 02-02-011B
+            f"{aisle.zfill(2)}-01-{position.zfill(3)}{level}",  # Force rack=01: 02-01-011B
+            f"01-{rack.zfill(2)}-{position.zfill(3)}{level}",  # Force aisle=01: 01-01-011B
+            f"01-01-{position.zfill(3)}{level}",  # Force aisle=01,rack=01: 01-01-011B
+        ]
+        variants.extend(base_variants)
+
+        # Database slot suffixes (XX-XX-XXXA_N)
+        for base_variant in base_variants:
+            variants.extend(f"{base_variant}_{slot}" for slot in range(1, 6))
+
+        # A 3-digit position may also be a 1- or 2-digit one (011 -> 11)
+        if len(position) == 3:
+            alt_variants = [
+                f"{aisle.zfill(2)}-{rack.zfill(2)}-{_unpadded(position).zfill(3)}{level}",
+                f"{aisle.zfill(2)}-{rack.zfill(2)}-{_unpadded(position[1:]).zfill(3)}{level}",
+            ]
+            variants.extend(alt_variants)
+            for alt_variant in alt_variants:
+                variants.extend(f"{alt_variant}_{slot}" for slot in range(1, 4))
+
+    match = _NUMBERED_AREA_PATTERN.match(code)
+    if match:
+        prefix, number = match.groups()
+        variants.extend([f"{prefix}-{number.zfill(3)}", f"{prefix}-{number.zfill(2)}", f"{prefix}-{_unpadded(number)}"])
+
+    match = _AREA_NUMBER_PATTERN.match(code)
+    if match:
+        prefix, number = match.groups()
+        variants.extend([f"{prefix}-{number}", f"{prefix}-{number.zfill(2)}", f"{prefix}-{number.zfill(3)}"])
+
+    return list(_unique_in_order(variants))
+
+
+def evaluator_position_variants(location_code: Any) -> List[str]:
+    """Reduced variant set of the rule evaluators (padding, forced rack/aisle 01, slots _1.._3)"""
+    if not location_code:
+        return [location_code]
+
+    code = str(location_code).strip().upper()
+    variants = [code]
+
+    match = _STANDARD_PATTERN.match(code)
+    if match:
+        aisle, rack, position, level = match.groups()
+        base_variants = [
+            f"{aisle.zfill(2)}-{rack.zfill(2)}-{position.zfill(3)}{level}",  # Full padding: 01-01-001A
+            f"{aisle.zfill(2)}-{_unpadded(rack)}-{position.zfill(3)}{level}",  # Mixed: 01-1-001A
+            f"{aisle.zfill(2)}-01-{position.zfill(3)}{level}",  # Force rack=01: 02-01-011B
+            f"01-01-{position.zfill(3)}{level}",  # Force aisle=01,rack=01: 01-01-011B
+        ]
+        variants.extend(base_variants)
+        for base_variant in base_variants:
+            variants.extend(f"{base_variant}_{slot}" for slot in range(1, 4))
+
+    return list(_unique_in_order(variants))
+
+
+NORMALIZATION_MODES: Dict[str, Callable[[Any], Any]] = {
+    'canonical': canonical_code,
+    'user_prefix': strip_user_prefixes,
+    'warehouse_prefix': strip_warehouse_prefix,
+    'position_variants': position_variants,
+    'evaluator_variants': evaluator_position_variants,
+}
+
+# Modes returning lists (memoized as tuples so callers cannot mutate shared entries)
+_LIST_MODES = frozenset({'position_variants', 'evaluator_variants'})
+
+
+class LocationNormalizer:
+    """
+    Memoized front end of the normalization modes
+
+    Each mode has its own bounded LRU of string inputs (max_entries each);
+    non-string inputs (None, NaN, numbers) are normalized without memoizing.
+    """
+
+    def __init__(self, max_entries: int = 50_000):
+        self.max_entries = max_entries
+        self._memos = {mode: OrderedDict() for mode in NORMALIZATION_MODES}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def normalize(self, location_code: Any, mode: str = 'canonical') -> Any:
+        """Normalize one location code (same result as the mode's legacy function)"""
+        normalize = NORMALIZATION_MODES[mode]
+        if not isinstance(location_code, str):
+            return normalize(location_code)
+
+        memo = self._memos[mode]
+        with self._lock:
+            result = memo.get(location_code)
+            if result is not None:
+                memo.move_to_end(location_code)
+                self._stats['hits'] += 1
+                return list(result) if mode in _LIST_MODES else result
+
+        result = normalize(location_code)
+        self._remember(mode, {location_code: result})
+        return result
+
+    def normalize_series(self, values, mode: str = 'canonical') -> pd.Series:
+        """
+        Normalize a Series (or sequence) of location codes, one evaluation per distinct value
+
+        Returns a Series aligned with the input (same index); list modes yield lists.
+        """
+        series = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+        if series.empty:
+            return pd.Series([], index=series.index, dtype=object)
+
+        normalize = NORMALIZATION_MODES[mode]
+        value_ids, uniques = pd.factorize(series)
+        uniques = list(uniques)
+        results = [None] * len(uniques)
+
+        memo = self._memos[mode]
+        missing = []
+        with self._lock:
+            for position, value in enumerate(uniques):
+                cached = memo.get(value) if isinstance(value, str) else None
+                if cached is None:
+                    missing.append(position)
+                else:
+                    memo.move_to_end(value)
+                    results[position] = cached
+            self._stats['hits'] += len(uniques) - len(missing)
+
+        computed = {}
+        for position in missing:
+            value = uniques[position]
+            results[position] = normalize(value)
+            if isinstance(value, str):
+                computed[value] = results[position]
+        self._remember(mode, computed)
+
+        if mode in _LIST_MODES:
+            results = [list(result) for result in results]
+        mapped = pd.Series(results + [None], dtype=object).take(value_ids).to_numpy()
+
+        # Missing values (None, NaN) keep their own legacy results ("" vs "nan")
+        for position in (value_ids == -1).nonzero()[0]:
+            mapped[position] = normalize(series.iat[position])
+        return pd.Series(mapped, index=series.index, dtype=object)
+
+    def _remember(self, mode: str, results: Dict[str, Any]):
+        if not results:
+            return
+        memo = self._memos[mode]
+        with self._lock:
+            self._stats['misses'] += len(results)
+            for code, result in results.items():
+                memo[code] = tuple(result) if mode in _LIST_MODES else result
+                memo.move_to_end(code)
+            while len(memo) > self.max_entries:
+                memo.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def clear(self):
+        """Drop every memoized normalization"""
+        with self._lock:
+            for memo in self._memos.values():
+                memo.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                'max_entries': self.max_entries,
+                'entries': {mode: len(memo) for mode, memo in self._memos.items()},
+                'hit_rate': round(self._stats['hits'] / lookups, 3) if lookups else 0.0,
+                **self._stats,
+            }
+
+
+# Global instance
+_location_normalizer = LocationNormalizer()
+
+
+def get_location_normalizer() -> LocationNormalizer:
+    """Get the process-wide location normalizer"""
+    return _location_normalizer
+
+
+def normalize_series(values, mode: str = 'canonical') -> pd.Series:
+    """Normalize location codes with the shared memo (see LocationNormalizer.normalize_series)"""
+    return _location_normalizer.normalize_series(values, mode)
@@ -0,0 +1,389 @@
+"""
+Location Search Index
+
+The locations API searched with substring scans: SQL ``ILIKE '%x%'`` for
+physical warehouses (plus a Python pass over every location for prefixed
+codes) and ``term in code`` over every location for virtual ones.
+
+LocationSearchIndex is built once per warehouse version and answers, over
+location ordinals (positions in the API's display order):
+
+- infix queries through an n-gram index: 1-, 2- and 3-grams of every code
+  map to sorted ordinal postings; longer terms intersect their trigram
+  postings and verify the (few) candidates
+- prefix queries (``01-A*``) through a sorted code array and binary search
+- structured queries (``aisle:3 level:B``) through aligned attribute arrays
+- free text also matches low-cardinality text fields (zone, pattern),
+  scanned once per distinct value
+
+Results are sorted ordinal arrays, so paginating is a slice. Indexes live in
+a process-wide LRU keyed by warehouse scope and stamped with a version;
+a changed version rebuilds the index on next use.
+
+Usage:
+    index = get_search_index_cache().get_or_build(key, version, lambda: LocationSearchIndex(codes, ...))
+    ordinals = index.query(parse_search_query('aisle:3 B1'))
+    page = ordinals[offset:offset + limit]
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Structured query keys -> attribute names of the indexed locations
+QUERY_FIELDS = {
+    'aisle': 'aisle_number',
+    'rack': 'rack',
+    'position': 'position_number',
+    'pos': 'position_number',
+    'level': 'level',
+    'type': 'location_type',
+    'zone': 'zone',
+}
+
+# n-gram keys pack up to 3 alphabet ranks of 10 bits each (ranks start at 1,
+# so unigram, bigram and trigram keys occupy disjoint ranges)
+_RANK_BITS = 10
+_MAX_ALPHABET = (1 << _RANK_BITS) - 1
+_ORDINAL_BITS = 32
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+@dataclass
+class SearchQuery:
+    """Parsed search: free-text terms, code prefixes and field filters (all ANDed)"""
+    terms: List[str] = field(default_factory=list)
+    prefixes: List[str] = field(default_factory=list)
+    fields: Dict[str, str] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return bool(self.terms or self.prefixes or self.fields)
+
+
+def parse_search_query(search: Optional[str]) -> SearchQuery:
+    """
+    Parse a search string
+
+    Examples:
+    - "01-A"              -> infix term
+    - "01-A*"             -> code prefix
+    - "aisle:3 level:b"   -> field filters (aisle 3, level B)
+    - "type:storage B1"   -> field filter + infix term
+    Unknown ``key:value`` tokens are treated as plain terms.
+    """
+    query = SearchQuery()
+    for token in (search or '').upper().split():
+        key, separator, value = token.partition(':')
+        if separator and value and key.lower() in QUERY_FIELDS:
+            query.fields[QUERY_FIELDS[key.lower()]] = value
+        elif token.endswith('*') and len(token) > 1:
+            query.prefixes.append(token.rstrip('*'))
+        elif token != '*':
+            query.terms.append(token)
+    return query
+
+
+def intersect_ordinals(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Intersection of sorted unique ordinal arrays (binary search of the smaller one)"""
+    if len(left) > len(right):
+        left, right = right, left
+    if not len(left):
+        return left
+    positions = np.minimum(np.searchsorted(right, left), len(right) - 1)
+    return left[right[positions] == left]
+
+
+class LocationSearchIndex:
+    """
+    Search index over location codes in display order
+
+    Args:
+        codes: Location codes, ordinal i = i-th location in display order
+        text_fields: Extra free-text fields (e.g. zone, pattern) aligned with codes
+        fields: Attribute arrays for structured queries, keyed by QUERY_FIELDS values
+        ids: Optional row ids aligned with codes (e.g. Location.id)
+    """
+
+    def __init__(self, codes: Sequence[str], text_fields: Optional[Dict[str, Sequence[Any]]] = None,
+                 fields: Optional[Dict[str, Sequence[Any]]] = None, ids: Optional[Sequence[int]] = None):
+        start = time.perf_counter()
+        self.codes = np.array([str(code).upper() for code in codes], dtype=str)
+        self.size = len(self.codes)
+        self.ids = np.asarray(ids if ids is not None else [], dtype=np.int64)
+        self._derived = {}
+        self._derived_lock = threading.Lock()
+
+        # Low-cardinality text fields: (per-location value id, distinct upper-cased values)
+        self._text_fields = {}
+        for name, values in (text_fields or {}).items():
+            value_ids, uniques = pd.factorize(pd.Series(values, dtype=object).fillna('').astype(str).str.upper())
+            self._text_fields[name] = (value_ids, list(uniques))
+
+        self._fields = {name: self._field_array(values) for name, values in (fields or {}).items()}
+
+        # Prefix search: codes in lexicographic order
+        self._prefix_order = np.argsort(self.codes, kind='stable')
+        self._sorted_codes = self.codes[self._prefix_order]
+
+        self._build_ngrams()
+        self.build_ms = (time.perf_counter() - start) * 1000
+
+    def __len__(self) -> int:
+        return self.size
+
+    @staticmethod
+    def _field_array(values: Sequence[Any]) -> Tuple[np.ndarray, Optional[Dict[str, int]]]:
+        # Numeric attributes compare as numbers (None -> NaN); others as factorized upper-cased strings
+        series = pd.Series(values, dtype=object)
+        numeric = pd.to_numeric(series, errors='coerce')
+        if numeric.notna().sum() == series.notna().sum():
+            return numeric.to_numpy(dtype=np.float64), None
+        value_ids, uniques = pd.factorize(series.fillna('').astype(str).str.upper())
+        return value_ids, {value: value_id for value_id, value in enumerate(uniques)}
+
+    def derived(self, name: str, build: Callable[['LocationSearchIndex'], Any]) -> Any:
+        """Per-index memo for data derived from the indexed codes (built once, on first use)"""
+        with self._derived_lock:
+            if name not in self._derived:
+                self._derived[name] = build(self)
+            return self._derived[name]
+
+    def _build_ngrams(self):
+        self._alphabet = {}
+        self._ranks = np.empty((0, 0), dtype=np.int16)
+        self._gram_keys = _EMPTY
+        self._gram_starts = np.zeros(1, dtype=np.int64)
+        self._gram_ordinals = _EMPTY
+        if not self.size:
+            return
+
+        # Codes as a (locations x max length) matrix of code points, 0 = padding
+        width = self.codes.dtype.itemsize // 4
+        code_points = self.codes.view(np.uint32).reshape(self.size, width)
+        # Dense alphabet ranks through a code point lookup table (padding keeps rank 0)
+        present = np.bincount(code_points.ravel(), minlength=1) > 0
+        present[0] = False
+        if present.sum() > _MAX_ALPHABET:
+            self._alphabet = None  # Exotic alphabets fall back to scanning
+            return
+        rank_table = np.cumsum(present) * present
+        ranks = rank_table[code_points].astype(np.int64)
+        self._alphabet = {chr(point): int(rank_table[point]) for point in np.flatnonzero(present)}
+        self._ranks = ranks.astype(np.int16)  # Kept for vectorized candidate verification
+
+        keys, ordinals = [], []
+        row_ordinals = np.arange(self.size, dtype=np.int64)[:, None]
+        for size in (1, 2, 3):
+            if width < size:
+                break
+            key = np.zeros((self.size, width - size + 1), dtype=np.int64)
+            valid = np.ones(key.shape, dtype=bool)
+            for offset in range(size):
+                column = ranks[:, offset:width - size + 1 + offset]
+                key = (key << _RANK_BITS) | column
+                valid &= column > 0
+            keys.append(key[valid])
+            ordinals.append(np.broadcast_to(row_ordinals, key.shape)[valid])
+
+        # One sort of (key, ordinal) pairs dedupes grams repeated within a code
+        # and leaves each key's postings as a sorted ordinal run
+        pairs = np.sort((np.concatenate(keys) << _ORDINAL_BITS) | np.concatenate(ordinals))
+        pairs = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))]
+        keys = pairs >> _ORDINAL_BITS
+        starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        self._gram_keys = keys[starts]
+        self._gram_starts = np.append(starts, len(pairs))
+        self._gram_ordinals = (pairs & ((1 << _ORDINAL_BITS) - 1)).astype(np.int32)
+
+    def _gram_key(self, gram: str) -> Optional[int]:
+        key = 0
+        for char in gram:
+            rank = self._alphabet.get(char)
+            if rank is None:
+                return None
+            key = (key << _RANK_BITS) | int(rank)
+        return key
+
+    def _postings(self, gram: str) -> np.ndarray:
+        key = self._gram_key(gram)
+        if key is None:
+            return _EMPTY
+        slot = np.searchsorted(self._gram_keys, key)
+        if slot == len(self._gram_keys) or self._gram_keys[slot] != key:
+            return _EMPTY
+        return self._gram_ordinals[self._gram_starts[slot]:self._gram_starts[slot + 1]]
+
+    def match_code(self, term: str) -> np.ndarray:
+        """Sorted ordinals whose code contains term (case-insensitive)"""
+        term = term.upper()
+        if not term:
+            return np.arange(self.size, dtype=np.int64)
+        if self._alphabet is None:
+            return np.flatnonzero(np.char.find(self.codes, term) >= 0)
+        if len(term) <= 3:
+            return self._postings(term)
+
+        postings = sorted((self._postings(term[i:i + 3]) for i in range(len(term) - 2)), key=len)
+        candidates = postings[0]
+        for other in postings[1:]:
+            if not len(candidates):
+                break
+            candidates = intersect_ordinals(candidates, other)
+
+        # Trigram co-occurrence is necessary, not sufficient
+        if len(candidates):
+            candidates = candidates[self._contains(candidates, term)]
+        return candidates
+
+    def _contains(self, candidates: np.ndarray, term: str) -> np.ndarray:
+        """Whether each candidate code contains term, compared on the rank matrix"""
+        ranks = self._ranks[candidates]
+        term_ranks = [self._alphabet[char] for char in term]
+        found = np.zeros(len(candidates), dtype=bool)
+        for offset in range(ranks.shape[1] - len(term_ranks) + 1):
+            at_offset = ranks[:, offset] == term_ranks[0]
+            for position, rank in enumerate(term_ranks[1:], 1):
+                at_offset &= ranks[:, offset + position] == rank
+            found |= at_offset
+        return found
+
+    def match_prefix(self, prefix: str) -> np.ndarray:
+        """Sorted ordinals whose code starts with prefix (case-insensitive)"""
+        prefix = prefix.upper()
+        lo, hi = np.searchsorted(self._sorted_codes, [prefix, prefix + '\U0010ffff'])
+        return np.sort(self._prefix_order[lo:hi]).astype(np.int64)
+
+    def match_term(self, term: str) -> np.ndarray:
+        """Sorted ordinals whose code or any text field contains term"""
+        term = term.upper()
+        matches = self.match_code(term)
+        mask = None
+        for value_ids, uniques in self._text_fields.values():
+            value_hits = np.array([term in value for value in uniques] + [False], dtype=bool)
+            if value_hits.any():
+                mask = value_hits[value_ids] if mask is None else mask | value_hits[value_ids]
+        if mask is None:
+            return matches
+        mask[matches] = True
+        return np.flatnonzero(mask)
+
+    def field_mask(self, name: str, value: Any) -> np.ndarray:
+        """Boolean mask of locations whose attribute equals value (numeric or case-insensitive)"""
+        values, value_ids = self._fields.get(name, (None, None))
+        if values is None:
+            return np.zeros(self.size, dtype=bool)
+        if value_ids is None:
+            try:
+                return values == float(value)
+            except (TypeError, ValueError):
+                return np.zeros(self.size, dtype=bool)
+        return values == value_ids.get(str(value).upper(), -1)
+
+    def query(self, search_query: SearchQuery) -> np.ndarray:
+        """Sorted ordinals matching every term, prefix and field filter of the query"""
+        matches = None
+        for ordinals in (
+            *(self.match_prefix(prefix) for prefix in search_query.prefixes),
+            *(self.match_term(term) for term in search_query.terms),
+        ):
+            matches = ordinals if matches is None else intersect_ordinals(matches, ordinals)
+
+        if search_query.fields:
+            mask = np.ones(self.size, dtype=bool)
+            for name, value in search_query.fields.items():
+                mask &= self.field_mask(name, value)
+            matches = np.flatnonzero(mask) if matches is None else matches[mask[matches]]
+
+        return np.arange(self.size, dtype=np.int64) if matches is None else matches
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'locations': self.size,
+            'ngram_postings': len(self._gram_ordinals),
+            'memory_mb': round((self._gram_keys.nbytes + self._gram_ordinals.nbytes + self._ranks.nbytes +
+                                self.codes.nbytes + self._sorted_codes.nbytes) / 1024 / 1024, 2),
+            'build_ms': round(self.build_ms, 2),
+        }
+
+
+class SearchIndexCache:
+    """
+    Thread-safe LRU of search indexes keyed by warehouse scope
+
+    Keys are tuples starting with (kind, warehouse_id); each entry is stamped
+    with the version it was built for and rebuilt when the caller's version
+    differs.
+    """
+
+    def __init__(self, max_indexes: int = 32):
+        self.max_indexes = max_indexes
+        self._indexes = OrderedDict()  # key -> (version, index)
+        self._lock = threading.RLock()
+        self._stats = {'hits': 0, 'misses': 0, 'rebuilds': 0, 'evictions': 0, 'invalidations': 0,
+                       'builds': 0, 'total_build_ms': 0.0}
+
+    def get_or_build(self, key: tuple, version: Any, build: Callable[[], Any]):
+        """Cached index for (key, version), built with build() on miss or version change"""
+        with self._lock:
+            entry = self._indexes.get(key)
+            if entry is not None and entry[0] == version:
+                self._indexes.move_to_end(key)
+                self._stats['hits'] += 1
+                return entry[1]
+            self._stats['rebuilds' if entry is not None else 'misses'] += 1
+
+        # Build outside the lock (may query the database)
+        start = time.perf_counter()
+        index = build()
+        build_ms = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            self._stats['builds'] += 1
+            self._stats['total_build_ms'] += build_ms
+            self._indexes[key] = (version, index)
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+                self._stats['evictions'] += 1
+
+        print(f"[SEARCH_INDEX] Built search index for {key} ({len(index):,} locations) in {build_ms:.1f}ms")
+        return index
+
+    def invalidate(self, warehouse_id: Optional[str] = None):
+        """Drop the indexes of one warehouse (all scopes) or of every warehouse"""
+        with self._lock:
+            stale = [key for key in self._indexes if warehouse_id is None or key[1] == warehouse_id]
+            for key in stale:
+                del self._indexes[key]
+            self._stats['invalidations'] += len(stale)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses'] + self._stats['rebuilds']
+            return {
+                'size': len(self._indexes),
+                'max_indexes': self.max_indexes,
+                'hit_rate': round(self._stats['hits'] / lookups, 3) if lookups else 0.0,
+                **{key: round(value, 2) if isinstance(value, float) else value for key, value in self._stats.items()},
+                'indexes': {':'.join(str(part) for part in key): index.get_stats()
+                            for key, (version, index) in self._indexes.items()},
+            }
+
+
+# Global instance
+_search_index_cache = SearchIndexCache()
+
+
+def get_search_index_cache() -> SearchIndexCache:
+    """Get the process-wide search index cache"""
+    return _search_index_cache
+
+
+def get_search_index_cache_stats() -> Dict[str, Any]:
+    """Search index cache statistics (for monitoring endpoints)"""
+    return _search_index_cache.get_stats()
@@ -19,12 +19,16 @@ Architecture:
 
 import re
 import logging
+import pandas as pd
 from typing import Optional, Dict, List, Set, Tuple
-from functools import lru_cache
 from sqlalchemy import or_, and_
 from models import Location, db
 from session_manager import RequestScopedSessionManager, ensure_session_bound, ensure_locations_bound
 from session_safe_cache import get_session_safe_cache
+from location_normalizer import (
+    CANONICAL_FORMAT, CANONICAL_SPECIAL_LOCATIONS, get_location_normalizer, normalize_series,
+    parse_compact, parse_special, parse_standard, parse_user_common, remove_canonical_prefixes
+)
 
 logger = logging.getLogger(__name__)
 
@@ -43,7 +47,7 @@ class CanonicalLocationService:
     - Prefixed: "USER_TESTF_01-01-001A", "WH01_RECV-01"
     """
     
-    CANONICAL_FORMAT = "{aisle:02d}-{rack:02d}-{position:03d}{level}"
+    CANONICAL_FORMAT = CANONICAL_FORMAT
     
     def __init__(self):
         self.location_cache = {}
@@ -54,21 +58,17 @@ class CanonicalLocationService:
             self._parse_mixed,         # Mixed separators (01-1-01A)
             self._parse_user_common,   # Common user formats (001A01, A1-001, etc.)
         ]
-        self.special_locations = {
-            'RECV-01', 'RECV-02', 'RECV-001', 'RECV-002',
-            'STAGE-01', 'STAGE-02', 'STAGE-001', 'STAGE-002', 
-            'DOCK-01', 'DOCK-02', 'DOCK-001', 'DOCK-002',
-            'AISLE-01', 'AISLE-02', 'AISLE-001', 'AISLE-002',
-            'RECEIVING', 'STAGING', 'SHIPPING', 'DOCK'
-        }
+        self.special_locations = set(CANONICAL_SPECIAL_LOCATIONS)
         
         logger.info("CanonicalLocationService initialized")
     
-    @lru_cache(maxsize=1000)
     def to_canonical(self, location_code: str) -> str:
         """
         Convert ANY location format to canonical standard.
         
+        PERFORMANCE: Delegates to the shared, memoized location normalizer
+        (see location_normalizer.canonical_code for the parsing rules).
+        
         Args:
             location_code: Input location in any supported format
             
@@ -81,165 +81,35 @@ class CanonicalLocationService:
             "USER_TESTF_01-01-001A" -> "01-01-001A"
             "RECV-01" -> "RECV-01" (special location, unchanged)
         """
-        if not location_code or not isinstance(location_code, str):
-            return str(location_code) if location_code else ""
-        
-        # Clean input
-        original_code = location_code.strip().upper()
-        
-        # Remove common prefixes (USER_, WH_, warehouse IDs)
-        clean_code = self._remove_prefixes(original_code)
-        
-        # Try each parser until one succeeds
-        for parser in self.format_parsers:
-            try:
-                canonical = parser(clean_code)
-                if canonical:
-                    logger.debug(f"Location normalized: '{original_code}' -> '{canonical}'")
-                    return canonical
-            except Exception as e:
-                logger.debug(f"Parser {parser.__name__} failed for '{clean_code}': {e}")
-                continue
-        
-        # Return original if unparseable
-        logger.debug(f"Location unchanged: '{original_code}' (no parser matched)")
-        return original_code
+        return get_location_normalizer().normalize(location_code, 'canonical')
+    
+    def to_canonical_series(self, location_codes) -> pd.Series:
+        """Canonical form of every code of a Series (each distinct code parsed once)"""
+        return get_location_normalizer().normalize_series(location_codes, 'canonical')
     
     def _remove_prefixes(self, location_code: str) -> str:
         """Remove common warehouse and user prefixes"""
-        prefixes_to_remove = [
-            r'^USER_[A-Z0-9]+_',    # USER_TESTF_, USER_HOLA3_
-            r'^WH[0-9]+_',          # WH01_, WH001_
-            r'^DEFAULT_',           # DEFAULT_
-            r'^WAREHOUSE_',         # WAREHOUSE_
-        ]
-        
-        clean_code = location_code
-        for prefix_pattern in prefixes_to_remove:
-            clean_code = re.sub(prefix_pattern, '', clean_code)
-        
-        return clean_code
+        return remove_canonical_prefixes(location_code)
     
     def _parse_special(self, code: str) -> Optional[str]:
-        """
-        Parse special location codes that don't follow standard aisle-rack-position format.
-        
-        Examples: RECV-01, AISLE-01, STAGE-01, DOCK-01, RECEIVING, STAGING
-        """
-        # Direct match for known special locations
-        if code in self.special_locations:
-            return code
-        
-        # Pattern match for numbered special locations
-        special_pattern = r'^(RECV|STAGE|DOCK|AISLE)-(\d{1,3})$'
-        match = re.match(special_pattern, code)
-        if match:
-            area_type, number = match.groups()
-            # Normalize number to 2 digits for consistency
-            return f"{area_type}-{int(number):02d}"
-        
-        return None
+        """Parse special location codes (RECV-01, AISLE-01, STAGE-01, DOCK-01, RECEIVING, STAGING)"""
+        return parse_special(code)
     
     def _parse_standard(self, code: str) -> Optional[str]:
-        """
-        Parse standard format: XX-XX-XXX{L} with variable padding.
-        
-        Examples: 
-            "01-01-001A" -> "01-01-001A" (already canonical)
-            "01-01-01A" -> "01-01-001A" (pad position to 3 digits)
-            "1-1-1A" -> "01-01-001A" (pad all numbers)
-        """
-        standard_pattern = r'^(\d{1,2})-(\d{1,2})-(\d{1,3})([A-Z])$'
-        match = re.match(standard_pattern, code)
-        if match:
-            aisle, rack, position, level = match.groups()
-            return f"{int(aisle):02d}-{int(rack):02d}-{int(position):03d}{level}"
-        
-        return None
+        """Parse standard format XX-XX-XXX{L} with variable padding ("1-1-1A" -> "01-01-001A")"""
+        return parse_standard(code)
     
     def _parse_compact(self, code: str) -> Optional[str]:
-        """
-        Parse compact format: XX{L}XX{L} where first XX is aisle, second XX is position.
-        Assumes rack = 01 for compact format.
-        
-        Examples:
-            "01A01A" -> "01-01-001A"
-            "02B15C" -> "02-01-015C" 
-        """
-        compact_pattern = r'^(\d{1,2})([A-Z])(\d{1,2})([A-Z])$'
-        match = re.match(compact_pattern, code)
-        if match:
-            aisle, rack_level, position, level = match.groups()
-            # For compact format, assume rack = 01 and use the level from the end
-            return f"{int(aisle):02d}-01-{int(position):03d}{level}"
-        
-        return None
+        """Parse compact format XX{L}XX{L}, rack 01 ("02B15C" -> "02-01-015C")"""
+        return parse_compact(code)
     
     def _parse_mixed(self, code: str) -> Optional[str]:
-        """
-        Parse mixed separator format with inconsistent padding.
-        
-        Examples:
-            "01-1-01A" -> "01-01-001A"
-            "2-06-3B" -> "02-06-003B"
-        """
-        # This is handled by _parse_standard since it already supports variable padding
-        return self._parse_standard(code)
+        """Parse mixed separator format (handled by _parse_standard's variable padding)"""
+        return parse_standard(code)
     
     def _parse_user_common(self, code: str) -> Optional[str]:
-        """
-        Parse common user formats that don't fit other patterns.
-        
-        This handles formats commonly used by warehouse operations:
-        
-        Examples:
-            "001A01" -> "01-01-001A" (position + level + rack format)
-            "001B02" -> "01-02-001B" 
-            "A1-001" -> "01-01-001A" (level + rack - position)
-            "B2-015" -> "02-01-015B"
-            "5A10"   -> "01-01-005A" (compact: position + level + rack)
-        """
-        
-        # Pattern 1: PPP{L}RR (position + level + rack) - e.g., "001A01" -> "01-01-001A"  
-        pattern1 = r'^(\d{1,3})([A-Z])(\d{1,2})$'
-        match1 = re.match(pattern1, code)
-        if match1:
-            position, level, rack = match1.groups()
-            aisle = 1  # Default aisle for this format
-            return self.CANONICAL_FORMAT.format(
-                aisle=int(aisle),
-                rack=int(rack), 
-                position=int(position),
-                level=level
-            )
-        
-        # Pattern 2: {L}R-PPP (level + rack - position) - e.g., "A1-001" -> "01-01-001A"
-        pattern2 = r'^([A-Z])(\d{1,2})-(\d{1,3})$'
-        match2 = re.match(pattern2, code)
-        if match2:
-            level, rack, position = match2.groups()
-            aisle = 1  # Default aisle for this format
-            return self.CANONICAL_FORMAT.format(
-                aisle=int(aisle),
-                rack=int(rack),
-                position=int(position), 
-                level=level
-            )
-            
-        # Pattern 3: PP{L}R (compact: position + level + rack) - e.g., "5A10" -> "01-10-005A"
-        pattern3 = r'^(\d{1,2})([A-Z])(\d{1,2})$'
-        match3 = re.match(pattern3, code)
-        if match3:
-            position, level, rack = match3.groups()
-            aisle = 1  # Default aisle for this format
-            return self.CANONICAL_FORMAT.format(
-                aisle=int(aisle),
-                rack=int(rack),
-                position=int(position),
-                level=level
-            )
-        
-        return None
+        """Parse common user formats ("001A01" -> "01-01-001A", "A1-001" -> "01-01-001A")"""
+        return parse_user_common(code)
     
     def generate_search_variants(self, canonical_code: str) -> List[str]:
         """
@@ -335,6 +205,9 @@ class LocationMatcher:
     4. Minimizing database queries through smart caching
     """
     
+    # Keep IN (...) lists of batch lookups well under driver parameter limits
+    LOOKUP_CHUNK_SIZE = 10_000
+    
     def __init__(self, canonical_service: CanonicalLocationService):
         self.canonical = canonical_service
         
@@ -349,6 +222,9 @@ class LocationMatcher:
         # Enable session-safe caching by default
         self.use_session_safe_cache = True
         
+        # Set-based batch lookups (batch_find_locations): database round trips per batch
+        self.batch_stats = {'batches': 0, 'codes': 0, 'round_trips': 0, 'last_round_trips': 0}
+        
         logger.info("LocationMatcher initialized with session-safe caching")
     
     def find_location(self, location_code: str, warehouse_id: str = None) -> Optional[Location]:
@@ -501,9 +377,15 @@ class LocationMatcher:
             ).all()
             
             cache = {}
-            for location in locations:
+            # PERFORMANCE: Persisted canonical codes; only rows not yet backfilled are normalized here
+            canonical_codes = [location.canonical_code for location in locations]
+            missing = [i for i, canonical in enumerate(canonical_codes) if canonical is None]
+            if missing:
+                computed = self.canonical.to_canonical_series([locations[i].code for i in missing])
+                for i, canonical in zip(missing, computed):
+                    canonical_codes[i] = canonical
+            for location, canonical in zip(locations, canonical_codes):
                 # Store by canonical format
-                canonical = self.canonical.to_canonical(location.code)
                 cache[canonical] = location
                 
                 # Also store by original code for direct lookup
@@ -519,12 +401,26 @@ class LocationMatcher:
     
     def _database_lookup_with_variants(self, canonical_code: str, warehouse_id: str = None) -> Optional[Location]:
         """
-        Fallback database lookup using search variants.
+        Fallback database lookup when cache misses occur.
         
-        Uses minimal variant generation (3-5 variants instead of 40+)
-        for database lookup when cache misses occur.
+        PERFORMANCE: A single equality lookup on the persisted canonical_code
+        (served by idx_location_warehouse_canonical). Search variants are only
+        generated when that misses, which covers rows written before the
+        column was backfilled.
         """
         try:
+            query = Location.query.filter(
+                Location.canonical_code == canonical_code,
+                or_(Location.is_active == True, Location.is_active.is_(None))
+            )
+            if warehouse_id:
+                query = query.filter(Location.warehouse_id == warehouse_id)
+            
+            location = query.order_by(Location.id).first()
+            if location:
+                logger.debug(f"Location found via canonical lookup: {canonical_code} -> {location.code}")
+                return location
+            
             # Generate minimal search variants
             search_variants = self.canonical.generate_search_variants(canonical_code)
             
@@ -550,53 +446,151 @@ class LocationMatcher:
             logger.error(f"Database lookup failed for {canonical_code}: {e}")
             return None
     
-    def batch_find_locations(self, location_codes: List[str], warehouse_id: str = None) -> Dict[str, Optional[Location]]:
+    def batch_find_locations(self, location_codes: List[str], warehouse_id: str = None,
+                             auto_create: bool = True) -> Dict[str, Optional[Location]]:
         """
-        Efficient batch location lookup with enhanced session binding protection.
+        Set-based batch location lookup.
+        
+        Optimized for processing many locations at once (e.g., during inventory
+        analysis). Resolves the same way as find_location() - canonical match,
+        search variants, then auto-creation of valid storage codes - but for
+        the whole batch at once:
+        
+        1. Canonicalize every code (each distinct code parsed once)
+        2. ONE query on the persisted canonical_code for all of them
+        3. ONE query on the search variants of the codes still missing
+        4. Auto-creatable misses are inserted in ONE statement, then re-read
+           in ONE query
         
-        Optimized for processing many locations at once (e.g., during inventory analysis).
-        Uses single database query for all missing locations after cache lookup.
+        Round trips are constant in the number of codes (IN lists are split
+        every LOOKUP_CHUNK_SIZE codes); see batch_stats.
+        
+        Returns:
+            Dict mapping each input code -> Location bound to the current session (None if not found)
+        """
+        codes = list(dict.fromkeys(location_codes))
+        results: Dict[str, Optional[Location]] = {code: None for code in codes}
+        round_trips = 0
+        
+        valid_codes = [code for code in codes if code]
+        if not valid_codes:
+            return results
+        canonical_by_code = dict(zip(valid_codes, self.canonical.to_canonical_series(pd.Series(valid_codes, dtype=object))))
+        canonicals = list(dict.fromkeys(canonical_by_code.values()))
+        active = or_(Location.is_active == True, Location.is_active.is_(None))
+        
+        # Step 2: Canonical match (idx_location_warehouse_canonical); inactive rows only block auto-creation
+        resolved: Dict[str, Location] = {}
+        existing_codes: Set[str] = set()
+        for chunk in self._chunks(canonicals):
+            query = Location.query.filter(Location.canonical_code.in_(chunk))
+            if warehouse_id:
+                query = query.filter(Location.warehouse_id == warehouse_id)
+            round_trips += 1
+            for location in query.order_by(Location.id):
+                existing_codes.add(location.code)
+                if location.is_active is not False:
+                    resolved.setdefault(location.canonical_code, location)
+        
+        # Step 3: Search variants of the misses (rows written before canonical_code was backfilled)
+        missing = [canonical for canonical in canonicals if canonical not in resolved]
+        creatable = []
+        if missing:
+            canonicals_by_variant: Dict[str, List[str]] = {}
+            for canonical in missing:
+                for variant in self.canonical.generate_search_variants(canonical):
+                    canonicals_by_variant.setdefault(variant, []).append(canonical)
+            creatable = [canonical for canonical in missing
+                         if warehouse_id and auto_create and self._is_auto_creatable_location(canonical)]
+            # Previously auto-created rows carry warehouse-prefixed codes
+            prefixed = {f"{warehouse_id}_{canonical}": canonical for canonical in creatable}
+            lookup_codes = list(canonicals_by_variant) + list(prefixed)
+            
+            for chunk in self._chunks(lookup_codes):
+                query = Location.query.filter(Location.code.in_(chunk), active)
+                if warehouse_id:
+                    query = query.filter(Location.warehouse_id == warehouse_id)
+                round_trips += 1
+                for location in query.order_by(Location.id):
+                    existing_codes.add(location.code)
+                    for canonical in canonicals_by_variant.get(location.code, ()):
+                        resolved.setdefault(canonical, location)
+                    if location.code in prefixed:
+                        resolved.setdefault(prefixed[location.code], location)
+        
+        # Step 4: Bulk auto-creation
+        to_create = [canonical for canonical in creatable
+                     if canonical not in resolved and canonical not in existing_codes
+                     and f"{warehouse_id}_{canonical}" not in existing_codes]
+        if to_create:
+            created, trips = self._bulk_auto_create_locations(to_create, warehouse_id)
+            resolved.update(created)
+            round_trips += trips
+        
+        for code, canonical in canonical_by_code.items():
+            results[code] = resolved.get(canonical)
+        
+        self.batch_stats['batches'] += 1
+        self.batch_stats['codes'] += len(valid_codes)
+        self.batch_stats['round_trips'] += round_trips
+        self.batch_stats['last_round_trips'] = round_trips
+        
+        found = sum(1 for location in results.values() if location is not None)
+        logger.info(f"Batch lookup: {found}/{len(codes)} locations resolved in {round_trips} queries "
+                    f"({len(to_create)} auto-created)")
+        return results
+    
+    @classmethod
+    def _chunks(cls, values: List[str]):
+        for start in range(0, len(values), cls.LOOKUP_CHUNK_SIZE):
+            yield values[start:start + cls.LOOKUP_CHUNK_SIZE]
+    
+    def _bulk_auto_create_locations(self, canonical_codes: List[str], warehouse_id: str) -> Tuple[Dict[str, Location], int]:
+        """
+        Auto-create many storage locations (see _auto_create_location) with one INSERT.
         
-        ENHANCED: Uses RequestScopedSessionManager for web request context safety.
+        Returns:
+            (canonical code -> created Location, database round trips)
         """
-        results = {}
-        found_locations = []
+        from models import WarehouseConfig
+        from services.capacity_resolver import bump_location_version
         
-        # Step 1: Try to resolve as many as possible from cache
-        for location_code in location_codes:
-            location = self.find_location(location_code, warehouse_id)
+        try:
+            config = WarehouseConfig.query.filter_by(warehouse_id=warehouse_id).first()
+            default_capacity = config.default_pallet_capacity if config else 1
             
-            if location is not None:
-                found_locations.append(location)
-                results[location_code] = location
-            else:
-                results[location_code] = None
-        
-        # Step 2: Ensure all found locations are session-bound using batch processing
-        if found_locations:
-            bound_locations = ensure_locations_bound(found_locations)
-            
-            # Update results with bound locations
-            for i, location_code in enumerate(location_codes):
-                if results[location_code] is not None:
-                    # Find the corresponding bound location
-                    original_location = results[location_code]
-                    bound_location = None
-                    
-                    for bound_loc in bound_locations:
-                        if (hasattr(bound_loc, 'code') and hasattr(original_location, 'code') 
-                            and bound_loc.code == original_location.code):
-                            bound_location = bound_loc
-                            break
-                    
-                    results[location_code] = bound_location
-        
-        # Step 3: Log summary
-        successful_bindings = sum(1 for loc in results.values() if loc is not None)
-        if successful_bindings < len(location_codes):
-            logger.info(f"Batch lookup: {successful_bindings}/{len(location_codes)} locations successfully bound to session")
+            rows = [{
+                'warehouse_id': warehouse_id,
+                'code': f"{warehouse_id}_{canonical}",  # Prefixed, as in _auto_create_location
+                'location_type': 'STORAGE',
+                'zone': 'STORAGE',
+                'pallet_capacity': default_capacity,
+                'is_active': True,
+                'created_by': 1,
+            } for canonical in canonical_codes]
+            for row, canonical_code in zip(rows, normalize_series([row['code'] for row in rows], 'canonical')):
+                row['canonical_code'] = canonical_code
+            
+            # CRITICAL: One executemany INSERT through Core (no per-object flush)
+            db.session.execute(Location.__table__.insert(), rows)
+            db.session.commit()
+            bump_location_version(warehouse_id)
+            
+            by_code = {}
+            for chunk in self._chunks([row['code'] for row in rows]):
+                by_code.update((location.code, location) for location in Location.query.filter(
+                    Location.warehouse_id == warehouse_id, Location.code.in_(chunk)
+                ))
+            trips = 2 + len(range(0, len(rows), self.LOOKUP_CHUNK_SIZE))
+            
+            logger.info(f"Auto-created {len(by_code)} missing locations for warehouse {warehouse_id}")
+            return {canonical: by_code[row['code']] for canonical, row in zip(canonical_codes, rows)
+                    if row['code'] in by_code}, trips
         
-        return results
+        except Exception as e:
+            logger.error(f"Failed to bulk auto-create {len(canonical_codes)} locations: {e}")
+            db.session.rollback()
+            return {}, 0
     
     def _is_auto_creatable_location(self, canonical_code: str) -> bool:
         """
@@ -702,6 +696,9 @@ class LocationMatcher:
             db.session.add(location)
             db.session.commit()
             
+            from services.capacity_resolver import bump_location_version
+            bump_location_version(warehouse_id)
+            
             logger.info(f"Successfully auto-created location: {canonical_code} "
                        f"in warehouse {warehouse_id} with capacity {default_capacity}")
             
@@ -732,7 +729,8 @@ class LocationMatcher:
             'warehouse_caches': len(self.warehouse_caches),
             'global_cache_size': len(self.global_cache),
             'cached_warehouses': list(self.cache_built),
-            'total_cached_locations': sum(len(cache) for cache in self.warehouse_caches.values())
+            'total_cached_locations': sum(len(cache) for cache in self.warehouse_caches.values()),
+            'batch_lookups': dict(self.batch_stats)
         }
     
     def clear_cache(self, warehouse_id: str = None):
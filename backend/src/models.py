@@ -10,8 +10,11 @@ from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event
 import json
 
+from location_normalizer import get_location_normalizer, normalize_series
+
 # Import the shared database instance
 from database import db
 
@@ -267,6 +270,7 @@ class Location(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     code = db.Column(db.String(50), nullable=False)
+    canonical_code = db.Column(db.String(50))  # Normalized code, maintained on insert/update (see below)
     pattern = db.Column(db.String(100))  # Regex pattern for matching location codes
     location_type = db.Column(db.String(30), nullable=False)  # RECEIVING, STORAGE, STAGING, DOCK
     capacity = db.Column(db.Integer, default=1)
@@ -309,6 +313,8 @@ class Location(db.Model):
         db.Index('idx_location_warehouse_active', 'warehouse_id', 'is_active'),
         db.Index('idx_location_structure', 'warehouse_id', 'aisle_number', 'rack_number'),
         db.Index('idx_location_code_active', 'code', 'is_active'),
+        # PERFORMANCE: Single equality lookup/join on normalized codes (no variant generation)
+        db.Index('idx_location_warehouse_canonical', 'warehouse_id', 'canonical_code'),
         db.Index('idx_location_created_by', 'created_by'),
         db.Index('idx_location_tracking', 'warehouse_id', 'is_tracked', 'unit_type'),
         # TEMPLATE-BINDING: Indexes for filtering locations by template/config
@@ -327,6 +333,20 @@ class Location(db.Model):
         """Set allowed products from list to JSON string"""
         self.allowed_products = json.dumps(products_list)
     
+    @staticmethod
+    def assign_canonical_codes(locations):
+        """
+        Fill canonical_code for a batch of locations in one vectorized pass.
+        
+        Required before session.bulk_save_objects(), which bypasses the
+        insert/update hooks that normally maintain the column.
+        """
+        locations = list(locations)
+        canonical_codes = normalize_series([location.code for location in locations], 'canonical')
+        for location, canonical in zip(locations, canonical_codes):
+            location.canonical_code = canonical
+        return locations
+    
     def get_location_hierarchy(self):
         """Parse location hierarchy JSON string into dict"""
         try:
@@ -447,6 +467,13 @@ class Location(db.Model):
             'creator_username': self.creator.username if self.creator else None
         }
 
+@event.listens_for(Location, 'before_insert')
+@event.listens_for(Location, 'before_update')
+def _maintain_location_canonical_code(mapper, connection, target):
+    """Keep Location.canonical_code in sync with Location.code on every ORM flush"""
+    target.canonical_code = get_location_normalizer().normalize(target.code, 'canonical')
+
+
 class WarehouseConfig(db.Model):
     """
     Warehouse configuration settings for setup wizard and templates
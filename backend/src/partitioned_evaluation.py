@@ -0,0 +1,377 @@
+"""
+Partitioned Out-of-Core Rule Evaluation
+
+For the largest sites, holding one normalized inventory DataFrame in a single
+worker while every evaluator runs over it is not viable. This module evaluates
+rules over locality-keyed shards instead:
+
+1. Shard the normalized inventory by a locality key per rule type
+   - location:       capacity and location-local rules (all pallets of a
+                     location land in the same shard)
+   - receipt_number: lot rules (every lot is complete inside one shard, so
+                     completion ratios are exact)
+   - pallet_id:      duplicate detection
+2. Write each shard to local Parquet
+3. Evaluate each shard in a process pool (one task per shard per key, all
+   rules sharing the key run on the same shard read)
+4. Merge anomaly batches per rule and register them with the precedence
+   system in precedence order, exactly once, in the coordinator
+
+Rules whose semantics need the whole inventory (statistical overcapacity,
+unknown rule types) run in the coordinator on the full frame.
+
+Results equal in-memory mode per rule; anomalies within a rule are grouped by
+shard rather than in original row order.
+
+Usage:
+    engine = PartitionedRuleEngine(rule_engine, shard_count=16, max_workers=4)
+    results = engine.evaluate_all_rules(inventory_df)
+"""
+
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from evaluation_overlay import DerivedColumnOverlay
+from rule_precedence_system import create_precedence_manager
+
+# Locality key per rule type. Every rule listed here only relates rows that
+# share the same key value, so evaluating key-partitioned shards independently
+# yields the same anomalies as evaluating the full frame.
+PARTITION_KEYS = {
+    'STAGNANT_PALLETS': 'location',
+    'OVERCAPACITY': 'location',
+    'INVALID_LOCATION': 'location',
+    'LOCATION_SPECIFIC_STAGNANT': 'location',
+    'TEMPERATURE_ZONE_MISMATCH': 'location',
+    'LOCATION_MAPPING_ERROR': 'location',
+    'MISSING_LOCATION': 'location',
+    'PRODUCT_INCOMPATIBILITY': 'location',
+    'UNCOORDINATED_LOTS': 'receipt_number',
+    'DATA_INTEGRITY': 'pallet_id',
+}
+
+GLOBAL_PARTITION = 'global'
+
+# Worker process state, populated by _init_worker (inherited on fork)
+_WORKER_STATE: Dict[str, Any] = {}
+
+
+def get_partition_key(rule, available_columns) -> str:
+    """
+    Get the locality key a rule can be sharded by.
+
+    Args:
+        rule: Rule being planned
+        available_columns: Columns of the normalized inventory
+
+    Returns:
+        Column name to shard by, or GLOBAL_PARTITION for whole-frame rules
+    """
+    key = PARTITION_KEYS.get(rule.rule_type)
+    if key is None:
+        return GLOBAL_PARTITION
+
+    if rule.rule_type == 'OVERCAPACITY':
+        # Statistical mode compares against warehouse-wide averages
+        if _parse_json(rule.parameters).get('use_statistical_analysis', False):
+            return GLOBAL_PARTITION
+
+    if key not in available_columns:
+        # Evaluator short-circuits without its key column; any locality works
+        key = 'location' if 'location' in available_columns else GLOBAL_PARTITION
+
+    return key
+
+
+def _parse_json(raw) -> Dict[str, Any]:
+    try:
+        return json.loads(raw) if raw else {}
+    except (TypeError, ValueError):
+        return {}
+
+
+def assign_shards(key_values: pd.Series, shard_count: int) -> np.ndarray:
+    """
+    Hash-partition key values into shard numbers.
+
+    Equal keys always map to the same shard; missing keys share one shard.
+    """
+    hashes = pd.util.hash_pandas_object(key_values.astype(str), index=False).to_numpy()
+    return (hashes % np.uint64(shard_count)).astype(np.int64)
+
+
+def write_shard(shard_df: pd.DataFrame, base_path: str) -> str:
+    """
+    Write one shard to local Parquet, falling back to pickle.
+
+    Parquet needs pyarrow and homogeneous object columns; inventories read from
+    Excel can mix ints and strings in one column, which pickle preserves as-is.
+    """
+    try:
+        path = f"{base_path}.parquet"
+        shard_df.to_parquet(path, index=True)
+        return path
+    except (ImportError, ValueError, TypeError) as e:
+        print(f"[PARTITIONED] Parquet unavailable for {os.path.basename(base_path)} ({type(e).__name__}) - using pickle")
+    except Exception as e:
+        # pyarrow raises ArrowTypeError/ArrowInvalid for mixed object columns
+        print(f"[PARTITIONED] Parquet write failed for {os.path.basename(base_path)} ({type(e).__name__}) - using pickle")
+
+    path = f"{base_path}.pkl"
+    shard_df.to_pickle(path)
+    return path
+
+
+def read_shard(path: str) -> pd.DataFrame:
+    """Read a shard written by write_shard."""
+    if path.endswith('.pkl'):
+        return pd.read_pickle(path)
+
+    shard_df = pd.read_parquet(path)
+    # Parquet nulls come back as None in object columns; pandas readers use NaN
+    for column in shard_df.columns:
+        if shard_df[column].dtype == object:
+            shard_df[column] = shard_df[column].where(shard_df[column].notna(), np.nan)
+    return shard_df
+
+
+def _init_worker(rule_engine, rules_by_id, warehouse_context, forked: bool = False):
+    """Pool initializer: keep the warm engine and rules for every shard task."""
+    _WORKER_STATE['engine'] = rule_engine
+    _WORKER_STATE['rules_by_id'] = rules_by_id
+    _WORKER_STATE['warehouse_context'] = warehouse_context
+
+    # Forked children must not reuse the parent's pooled DB connections
+    if forked and getattr(rule_engine, 'app', None) is not None:
+        try:
+            from database import db
+            with rule_engine.app.app_context():
+                db.engine.dispose(close=False)
+        except Exception as e:
+            print(f"[PARTITIONED] Worker DB pool reset skipped: {e}")
+
+
+def _evaluate_shard(shard_path: str, rule_ids: List[int]) -> List[Tuple[int, bool, List[Dict[str, Any]], int, Optional[str]]]:
+    """
+    Evaluate all rules sharing one partition key against one shard.
+
+    Returns:
+        List of (rule_id, success, anomalies, execution_time_ms, error_message)
+    """
+    engine = _WORKER_STATE['engine']
+    rules_by_id = _WORKER_STATE['rules_by_id']
+
+    shard_df = read_shard(shard_path)
+
+    # Shard-scoped context: shared resources, private overlay
+    warehouse_context = dict(_WORKER_STATE['warehouse_context'] or {})
+    warehouse_context['derived_columns'] = DerivedColumnOverlay(shard_df)
+
+    context = engine._ensure_app_context()
+    if context:
+        with context:
+            results = [engine.evaluate_rule(rules_by_id[rule_id], shard_df, warehouse_context) for rule_id in rule_ids]
+    else:
+        results = [engine.evaluate_rule(rules_by_id[rule_id], shard_df, warehouse_context) for rule_id in rule_ids]
+
+    return [
+        (result.rule_id, result.success, result.anomalies, result.execution_time_ms, result.error_message)
+        for result in results
+    ]
+
+
+class PartitionedRuleEngine:
+    """
+    Out-of-core evaluation mode for a RuleEngine.
+
+    Shards are evaluated in a fork-based process pool so workers inherit the
+    warm engine (evaluators, pattern caches, bulk-loaded LocationRepository)
+    without pickling. Where fork is unavailable, or max_workers is 1, shards
+    are evaluated one at a time in-process, which still bounds the working set
+    to one shard.
+    """
+
+    def __init__(self, rule_engine, shard_count: int = 8, max_workers: int = None,
+                 work_dir: str = None, keep_shards: bool = False):
+        if shard_count < 1:
+            raise ValueError("shard_count must be at least 1")
+
+        self.rule_engine = rule_engine
+        self.shard_count = shard_count
+        self.max_workers = max_workers or min(shard_count, os.cpu_count() or 1)
+        self.work_dir = work_dir
+        self.keep_shards = keep_shards
+        self.last_run_stats: Dict[str, Any] = {}
+
+    def evaluate_all_rules(self, inventory_df: pd.DataFrame,
+                           rule_ids: List[int] = None) -> List:
+        """
+        Evaluate all active rules against inventory data in partitioned mode
+
+        Args:
+            inventory_df: Inventory data to analyze
+            rule_ids: Optional list of specific rule IDs to evaluate
+
+        Returns:
+            List of evaluation results for each rule, in precedence order
+        """
+        context = self.rule_engine._ensure_app_context()
+        if context:
+            with context:
+                return self._evaluate_all_rules_internal(inventory_df, rule_ids)
+        return self._evaluate_all_rules_internal(inventory_df, rule_ids)
+
+    def _evaluate_all_rules_internal(self, inventory_df: pd.DataFrame,
+                                     rule_ids: List[int] = None) -> List:
+        from rule_engine import Rule, RuleEvaluationResult
+
+        engine = self.rule_engine
+        start_time = time.time()
+
+        if rule_ids:
+            rules = Rule.query.filter(Rule.id.in_(rule_ids), Rule.is_active == True).all()
+        else:
+            rules = engine.load_active_rules()
+
+        precedence_manager = create_precedence_manager()
+        precedence_manager.reset_for_new_evaluation()
+        rules = precedence_manager.sort_rules_by_precedence(rules)
+
+        inventory_df = engine._normalize_dataframe_columns(inventory_df)
+        scope_metrics = engine._apply_scope_filtering(inventory_df)
+        if scope_metrics['scope_applied']:
+            inventory_df = scope_metrics['filtered_df']
+
+        warehouse_context = engine._build_warehouse_context(inventory_df)
+        rules, skipped_results = engine._plan_rules(rules, inventory_df, warehouse_context,
+                                                    precedence_manager.enable_precedence)
+
+        # Plan: group rules by locality key
+        plan: Dict[str, List[Any]] = {}
+        for rule in rules:
+            plan.setdefault(get_partition_key(rule, inventory_df.columns), []).append(rule)
+
+        print(f"\n[PARTITIONED] Evaluating {len(rules)} rules on {len(inventory_df):,} records "
+              f"({self.shard_count} shards, {self.max_workers} workers)")
+        for key, key_rules in plan.items():
+            print(f"[PARTITIONED]   {key}: {[rule.rule_type for rule in key_rules]}")
+
+        shard_results: Dict[int, List[Tuple]] = {rule.id: [] for rule in rules}
+        work_dir = tempfile.mkdtemp(prefix='ware_shards_', dir=self.work_dir)
+
+        try:
+            # Step 1-2: Shard and spill to disk
+            t_shard = time.time()
+            tasks = []
+            for key, key_rules in plan.items():
+                if key == GLOBAL_PARTITION:
+                    continue
+                for shard_path in self._write_shards(inventory_df, key, work_dir):
+                    tasks.append((shard_path, [rule.id for rule in key_rules]))
+            shard_ms = int((time.time() - t_shard) * 1000)
+
+            # Step 3: Evaluate shards
+            t_eval = time.time()
+            for shard_output in self._run_tasks(tasks, rules, warehouse_context):
+                for rule_id, success, anomalies, execution_ms, error in shard_output:
+                    shard_results[rule_id].append((success, anomalies, execution_ms, error))
+
+            # Whole-frame rules run in the coordinator
+            if GLOBAL_PARTITION in plan:
+                warehouse_context['derived_columns'] = DerivedColumnOverlay(inventory_df)
+                for rule in plan[GLOBAL_PARTITION]:
+                    result = engine.evaluate_rule(rule, inventory_df, warehouse_context)
+                    shard_results[rule.id].append(
+                        (result.success, result.anomalies, result.execution_time_ms, result.error_message)
+                    )
+            eval_ms = int((time.time() - t_eval) * 1000)
+        finally:
+            if not self.keep_shards:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+        # Step 4: Merge per rule, register exclusions in precedence order
+        results = list(skipped_results)
+        for rule in rules:
+            batches = shard_results[rule.id]
+            failures = [error for success, _, _, error in batches if not success]
+            anomalies = [] if failures else [anomaly for _, batch, _, _ in batches for anomaly in batch]
+
+            result = RuleEvaluationResult(
+                anomalies=anomalies,
+                execution_time_ms=sum(execution_ms for _, _, execution_ms, _ in batches),
+                rule_id=rule.id,
+                success=not failures,
+                error_message=failures[0] if failures else None
+            )
+            results.append(result)
+
+            if result.success and precedence_manager.enable_precedence and anomalies:
+                precedence_manager.register_anomalies(rule, anomalies)
+
+        self.last_run_stats = {
+            'records': len(inventory_df),
+            'shard_tasks': len(tasks),
+            'partition_keys': {key: len(key_rules) for key, key_rules in plan.items()},
+            'shard_write_ms': shard_ms,
+            'evaluation_ms': eval_ms,
+            'total_ms': int((time.time() - start_time) * 1000),
+        }
+        print(f"[PARTITIONED] {len(tasks)} shard tasks: write {shard_ms}ms, evaluate {eval_ms}ms, "
+              f"{sum(len(r.anomalies) for r in results)} anomalies")
+
+        return results
+
+    def _write_shards(self, inventory_df: pd.DataFrame, key: str, work_dir: str) -> List[str]:
+        """Split the frame by key hash and write each non-empty shard."""
+        shard_ids = assign_shards(inventory_df[key], self.shard_count)
+
+        # One stable sort instead of shard_count boolean scans
+        order = np.argsort(shard_ids, kind='stable')
+        boundaries = np.searchsorted(shard_ids[order], np.arange(self.shard_count + 1))
+
+        paths = []
+        for shard in range(self.shard_count):
+            positions = order[boundaries[shard]:boundaries[shard + 1]]
+            if len(positions) == 0:
+                continue
+            base_path = os.path.join(work_dir, f"{key}_{shard:04d}")
+            paths.append(write_shard(inventory_df.iloc[positions], base_path))
+        return paths
+
+    def _run_tasks(self, tasks: List[Tuple[str, List[int]]], rules: List[Any], warehouse_context: dict):
+        """Evaluate shard tasks in a process pool, or sequentially as fallback."""
+        rules_by_id = {rule.id: rule for rule in rules}
+        shared_context = {k: v for k, v in (warehouse_context or {}).items() if k != 'derived_columns'}
+
+        use_pool = (
+            self.max_workers > 1 and len(tasks) > 1 and
+            'fork' in multiprocessing.get_all_start_methods()
+        )
+
+        if not use_pool:
+            _init_worker(self.rule_engine, rules_by_id, shared_context)
+            try:
+                for shard_path, rule_ids in tasks:
+                    yield _evaluate_shard(shard_path, rule_ids)
+            finally:
+                _WORKER_STATE.clear()
+            return
+
+        with ProcessPoolExecutor(
+            max_workers=min(self.max_workers, len(tasks)),
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=_init_worker,
+            initargs=(self.rule_engine, rules_by_id, shared_context, True)
+        ) as pool:
+            futures = [pool.submit(_evaluate_shard, shard_path, rule_ids) for shard_path, rule_ids in tasks]
+            for future in futures:
+                yield future.result()
@@ -73,6 +73,9 @@ class PatternResolutionMonitor:
             'cache_evictions': 0
         }
 
+        # Pattern cache performance per template source
+        self._source_cache_stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+
         # Template resolution tracking
         self._template_resolution_stats = defaultdict(lambda: {
             'success_count': 0,
@@ -146,14 +149,17 @@ class PatternResolutionMonitor:
         # Check for performance issues
         self._check_performance_thresholds(metric)
 
-    def record_cache_operation(self, operation_type: str, hit: bool = True):
-        """Record cache hit/miss operations"""
+    def record_cache_operation(self, operation_type: str, hit: bool = True, template_source: str = None):
+        """Record cache hit/miss operations (pattern cache lookups optionally per template source)"""
         with self._lock:
             if operation_type == 'pattern_cache':
                 if hit:
                     self._cache_stats['pattern_cache_hits'] += 1
                 else:
                     self._cache_stats['pattern_cache_misses'] += 1
+                if template_source:
+                    source_stats = self._source_cache_stats[template_source]
+                    source_stats['hits' if hit else 'misses'] += 1
             elif operation_type == 'template_cache':
                 if hit:
                     self._cache_stats['template_cache_hits'] += 1
@@ -213,6 +219,7 @@ class PatternResolutionMonitor:
                     'min_duration_ms': round(min_duration, 2)
                 },
                 'cache_performance': dict(self._cache_stats),
+                'cache_performance_by_source': self._get_source_cache_performance(),
                 'template_sources': dict(template_sources),
                 'warehouse_performance': {
                     wid: {
@@ -225,6 +232,17 @@ class PatternResolutionMonitor:
                 'performance_alerts': self._generate_performance_alerts(recent_metrics)
             }
 
+    def _get_source_cache_performance(self) -> Dict[str, Dict[str, Any]]:
+        """Pattern cache hits, misses and hit rate per template source (caller holds the lock)"""
+        return {
+            source: {
+                'hits': stats['hits'],
+                'misses': stats['misses'],
+                'hit_rate': stats['hits'] / (stats['hits'] + stats['misses'])
+            }
+            for source, stats in self._source_cache_stats.items()
+        }
+
     def get_detailed_metrics(self, limit: int = 100) -> List[Dict[str, Any]]:
         """Get detailed metrics for analysis"""
         with self._lock:
@@ -301,6 +319,7 @@ class PatternResolutionMonitor:
                 'cache_evictions': 0
             }
             self._template_resolution_stats.clear()
+            self._source_cache_stats.clear()
 
         logger.info("Performance metrics reset")
 
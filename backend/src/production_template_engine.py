@@ -21,6 +21,7 @@ from sqlalchemy import and_, or_
 
 from models import Location, WarehouseConfig, WarehouseTemplate, db
 from location_service import get_canonical_service
+from services.capacity_resolver import bump_location_version
 
 logger = logging.getLogger(__name__)
 
@@ -129,6 +130,7 @@ class ProductionTemplateEngine:
             
             # Step 5: Commit everything
             db.session.commit()
+            bump_location_version(warehouse_id)
             
             # Step 6: Validate final result
             final_validation = self._validate_warehouse_completeness(warehouse_id)
@@ -223,12 +225,12 @@ class ProductionTemplateEngine:
         try:
             # Generate storage locations in batches
             storage_locations = self._generate_storage_locations(warehouse_id, structure, created_by)
-            db.session.bulk_save_objects(storage_locations)
+            db.session.bulk_save_objects(Location.assign_canonical_codes(storage_locations))
             locations_created['storage'] = len(storage_locations)
             
             # Generate special areas
             special_locations = self._generate_special_areas(warehouse_id, structure, created_by)
-            db.session.bulk_save_objects(special_locations)
+            db.session.bulk_save_objects(Location.assign_canonical_codes(special_locations))
             
             # Count special area types
             for location in special_locations:
@@ -8,22 +8,34 @@ warehouse location formats by leveraging template configuration intelligence.
 Key Features:
 - Template-aware pattern generation
 - Multi-format support (canonical, numeric, zone-based)
-- Performance caching with TTL
+- Process-wide cache of precompiled PatternSets shared by every resolver
 - Graceful fallback mechanisms
 - Zero-breaking-change integration
 
 Architecture Integration:
 RuleEngine → RulePatternResolver → WarehouseTemplate → location_format_config
+
+PERFORMANCE: Resolved PatternSets are cached process-wide in PatternSetCache,
+keyed by (warehouse_id, rule_type, template version), with every pattern list
+precompiled. Each RuleEngine builds a new resolver, so the previous
+per-instance caches started cold on every analysis. Template configurations are
+re-read at most every revalidate_seconds; a changed template produces a new
+version and therefore new cache keys. warm_pattern_cache() fills the cache at
+worker start.
 """
 
 import re
 import json
+import threading
 import time
 import logging
-from typing import Dict, List, Optional, Set, Any
-from dataclasses import dataclass
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Set, Any, Tuple
+from dataclasses import dataclass, field
 from enum import Enum
 
+from rule_plan_cache import CompiledPatternSet, compile_pattern_set, get_template_state
+
 logger = logging.getLogger(__name__)
 
 try:
@@ -47,9 +59,18 @@ except ImportError:
     def get_pattern_resolution_monitor():
         return None
 
+# Rule types whose evaluators request patterns from the resolver (warmed at worker start)
+RESOLVER_RULE_TYPES = ('LOCATION_SPECIFIC_STAGNANT', 'LOCATION_MAPPING_ERROR')
+
+PATTERN_CATEGORIES = ('storage', 'transitional', 'receiving', 'staging', 'dock', 'special')
+
 @dataclass
 class PatternSet:
-    """Container for rule-specific patterns organized by location type"""
+    """
+    Container for rule-specific patterns organized by location type
+
+    Cached PatternSets are shared across engines: treat them as read-only.
+    """
     storage_patterns: List[str]
     transitional_patterns: List[str]
     receiving_patterns: List[str]
@@ -58,6 +79,143 @@ class PatternSet:
     special_patterns: List[str]
     confidence: float = 0.0
     source: str = "default"
+    compiled: Dict[str, CompiledPatternSet] = field(default_factory=dict, repr=False, compare=False)
+
+    def precompile(self) -> 'PatternSet':
+        """Compile every pattern list once (see compiled_patterns)"""
+        for category in PATTERN_CATEGORIES:
+            self.compiled[category] = compile_pattern_set(getattr(self, f'{category}_patterns'))
+        return self
+
+    def compiled_patterns(self, category: str) -> CompiledPatternSet:
+        """Precompiled patterns of a category ('storage', 'transitional', ...)"""
+        compiled = self.compiled.get(category)
+        if compiled is None:
+            compiled = self.compiled[category] = compile_pattern_set(getattr(self, f'{category}_patterns'))
+        return compiled
+
+
+class PatternSetCache:
+    """
+    Process-wide cache of resolved, precompiled PatternSets
+
+    Two tiers:
+    - templates: warehouse_id -> (template version, config), re-read at most
+      every revalidate_seconds
+    - pattern sets: (warehouse_id, rule_type, template version) -> PatternSet, LRU
+
+    Hits and misses are also counted per template source (PatternSet.source).
+    """
+
+    def __init__(self, max_entries: int = 1024, revalidate_seconds: float = 30.0):
+        self.max_entries = max_entries
+        self.revalidate_seconds = revalidate_seconds
+        self._patterns: 'OrderedDict[Tuple[str, str, str], PatternSet]' = OrderedDict()
+        self._templates: Dict[str, Tuple[str, Optional[Dict], float]] = {}
+        self._lock = threading.RLock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0,
+                       'template_hits': 0, 'template_misses': 0, 'template_changes': 0, 'warmed': 0}
+        self._source_stats: Dict[str, Dict[str, int]] = {}
+
+    def get_template(self, warehouse_id: str,
+                     load: Callable[[], Tuple[str, Optional[Dict]]]) -> Tuple[str, Optional[Dict], bool]:
+        """(template version, config, cache hit) for a warehouse, loading at most every revalidate_seconds"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._templates.get(warehouse_id)
+            if entry is not None and now - entry[2] < self.revalidate_seconds:
+                self._stats['template_hits'] += 1
+                return entry[0], entry[1], True
+            self._stats['template_misses'] += 1
+
+        version, config = load()
+        with self._lock:
+            if entry is not None and entry[0] != version:
+                # Template changed: drop pattern sets resolved from the old version
+                self._stats['template_changes'] += 1
+                self._drop(lambda key: key[0] == warehouse_id and key[2] != version)
+            self._templates[warehouse_id] = (version, config, now)
+        return version, config, False
+
+    def get_patterns(self, key: Tuple[str, str, str],
+                     resolve: Callable[[], PatternSet]) -> Tuple[PatternSet, bool]:
+        """(PatternSet, cache hit) for (warehouse_id, rule_type, template version)"""
+        with self._lock:
+            patterns = self._patterns.get(key)
+            if patterns is not None:
+                self._patterns.move_to_end(key)
+                self._record(patterns.source, hit=True)
+                return patterns, True
+
+        # Resolve outside the lock; errors propagate uncached
+        patterns = resolve().precompile()
+        with self._lock:
+            self._record(patterns.source, hit=False)
+            self._patterns[key] = patterns
+            self._patterns.move_to_end(key)
+            while len(self._patterns) > self.max_entries:
+                self._patterns.popitem(last=False)
+                self._stats['evictions'] += 1
+        return patterns, False
+
+    def invalidate(self, warehouse_id: Optional[str] = None) -> None:
+        """Drop cached templates and pattern sets for one warehouse (or all)"""
+        with self._lock:
+            if warehouse_id is None:
+                self._stats['invalidations'] += len(self._patterns)
+                self._patterns.clear()
+                self._templates.clear()
+            else:
+                self._drop(lambda key: key[0] == warehouse_id)
+                self._templates.pop(warehouse_id, None)
+
+    def record_warmup(self, count: int) -> None:
+        with self._lock:
+            self._stats['warmed'] += count
+
+    def _drop(self, predicate: Callable[[Tuple[str, str, str]], bool]) -> None:
+        stale = [key for key in self._patterns if predicate(key)]
+        for key in stale:
+            del self._patterns[key]
+        self._stats['invalidations'] += len(stale)
+
+    def _record(self, source: str, hit: bool) -> None:
+        self._stats['hits' if hit else 'misses'] += 1
+        source_stats = self._source_stats.setdefault(source, {'hits': 0, 'misses': 0})
+        source_stats['hits' if hit else 'misses'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                'size': len(self._patterns),
+                'max_entries': self.max_entries,
+                'templates': len(self._templates),
+                'revalidate_seconds': self.revalidate_seconds,
+                'hit_rate': round(self._stats['hits'] / lookups, 3) if lookups else 0.0,
+                **self._stats,
+                'by_source': {
+                    source: dict(stats, hit_rate=round(stats['hits'] / (stats['hits'] + stats['misses']), 3))
+                    for source, stats in self._source_stats.items()
+                },
+                'keys': [':'.join(key) for key in self._patterns],
+                'template_keys': list(self._templates),
+            }
+
+
+# Global instance
+_pattern_set_cache = PatternSetCache()
+
+
+def get_pattern_set_cache() -> PatternSetCache:
+    """Get the process-wide PatternSet cache"""
+    return _pattern_set_cache
+
+
+def get_pattern_set_cache_stats() -> Dict[str, Any]:
+    """PatternSet cache statistics (for the admin cache-stats endpoint)"""
+    return _pattern_set_cache.get_stats()
+
 
 class RulePatternResolver:
     """
@@ -71,13 +229,10 @@ class RulePatternResolver:
         self.db = db_session
         self.app = app
 
-        # Multi-level caching for performance
-        self._template_cache = {}      # Cache template configs by warehouse_id
-        self._pattern_cache = {}       # Cache compiled patterns by warehouse_id:rule_type
-        self._cache_ttl = 300          # 5-minute TTL for template configurations
-        self._max_cache_size = 1000    # LRU cache management
+        # PERFORMANCE: Resolved patterns are shared by every resolver in the process
+        self._cache = get_pattern_set_cache()
 
-        logger.info("RulePatternResolver initialized with caching enabled")
+        logger.info("RulePatternResolver initialized with shared pattern cache")
 
     def get_patterns_for_rule(self, rule_type: str, warehouse_context: dict) -> PatternSet:
         """
@@ -88,7 +243,7 @@ class RulePatternResolver:
             warehouse_context: Warehouse context containing warehouse_id and other metadata
 
         Returns:
-            PatternSet with patterns for all location types
+            PatternSet with patterns for all location types (precompiled, shared: read-only)
         """
         warehouse_id = self._extract_warehouse_id(warehouse_context) or "UNKNOWN"
 
@@ -100,54 +255,23 @@ class RulePatternResolver:
                 timer.set_template_source("no_warehouse_id_fallback").set_pattern_count(len(patterns.storage_patterns))
                 return patterns
 
-            # Check pattern cache first
             cache_key = f"{warehouse_id}:{rule_type}"
-            cache_hit = False
-
-            if cache_key in self._pattern_cache:
-                cached_entry = self._pattern_cache[cache_key]
-                # Check TTL
-                if time.time() - cached_entry['timestamp'] < self._cache_ttl:
-                    logger.debug(f"Using cached patterns for {cache_key}")
-                    patterns = cached_entry['patterns']
-                    cache_hit = True
-
-                    # Record cache performance
-                    monitor = get_pattern_resolution_monitor()
-                    if monitor:
-                        monitor.record_cache_operation('pattern_cache', hit=True)
-
-                    timer.set_cache_hit(True).set_template_source(patterns.source).set_pattern_count(len(patterns.storage_patterns))
-                    return patterns
-                else:
-                    # Cache expired
-                    del self._pattern_cache[cache_key]
-
-            # Record cache miss
-            monitor = get_pattern_resolution_monitor()
-            if monitor:
-                monitor.record_cache_operation('pattern_cache', hit=False)
-
-            # Resolve patterns
             try:
-                patterns = self._resolve_patterns(rule_type, warehouse_context)
-
-                # Cache the results
-                self._pattern_cache[cache_key] = {
-                    'patterns': patterns,
-                    'timestamp': time.time()
-                }
+                template_version, template_config = self._get_template_state(warehouse_id)
+                patterns, cache_hit = self._cache.get_patterns(
+                    (warehouse_id, rule_type, template_version),
+                    lambda: self._patterns_from_config(template_config, rule_type)
+                )
 
-                # LRU cache management
-                if len(self._pattern_cache) > self._max_cache_size:
-                    self._cleanup_cache()
-                    if monitor:
-                        monitor.record_cache_operation('cache_eviction')
+                monitor = get_pattern_resolution_monitor()
+                if monitor:
+                    monitor.record_cache_operation('pattern_cache', hit=cache_hit, template_source=patterns.source)
 
-                logger.debug(f"Resolved and cached patterns for {cache_key}, source: {patterns.source}")
+                logger.debug(f"{'Using cached' if cache_hit else 'Resolved and cached'} patterns for {cache_key} "
+                             f"(template {template_version}), source: {patterns.source}")
 
                 # Set performance monitoring metadata
-                timer.set_template_source(patterns.source).set_pattern_count(len(patterns.storage_patterns))
+                timer.set_cache_hit(cache_hit).set_template_source(patterns.source).set_pattern_count(len(patterns.storage_patterns))
 
                 return patterns
 
@@ -188,15 +312,16 @@ class RulePatternResolver:
         3. Default patterns (fallback)
         """
         warehouse_id = self._extract_warehouse_id(warehouse_context)
+        return self._patterns_from_config(self._get_template_config(warehouse_id), rule_type)
 
-        # Try template-based resolution first
-        template_patterns = self._resolve_template_patterns(warehouse_id, rule_type)
-        if template_patterns:
-            logger.debug(f"Using template patterns for warehouse {warehouse_id}")
-            return template_patterns
+    def _patterns_from_config(self, template_config: Optional[Dict], rule_type: str) -> PatternSet:
+        """Patterns for a rule type from a template configuration (defaults without one)"""
+        if template_config:
+            try:
+                return self._convert_template_to_patterns(template_config, rule_type)
+            except Exception as e:
+                logger.error(f"Template pattern conversion failed: {e}")
 
-        # Fallback to default patterns
-        logger.debug(f"Using default patterns for warehouse {warehouse_id}")
         return self._get_default_patterns(rule_type)
 
     def _resolve_template_patterns(self, warehouse_id: str, rule_type: str) -> Optional[PatternSet]:
@@ -215,66 +340,63 @@ class RulePatternResolver:
             return None
 
     def _get_template_config(self, warehouse_id: str) -> Optional[Dict]:
-        """Get and cache template configuration for warehouse"""
+        """Get (shared cache) template configuration for warehouse"""
+        return self._get_template_state(warehouse_id)[1]
+
+    def _get_template_state(self, warehouse_id: str) -> Tuple[str, Optional[Dict]]:
+        """(template version, config) for warehouse through the shared template tier"""
+        version, config, hit = self._cache.get_template(warehouse_id, lambda: self._load_template(warehouse_id))
+
+        monitor = get_pattern_resolution_monitor()
+        if monitor:
+            monitor.record_cache_operation('template_cache', hit=hit)
+
+        return version, config
+
+    def _load_template(self, warehouse_id: str) -> Tuple[str, Optional[Dict]]:
+        """
+        Query the warehouse template configuration
+
+        Returns (version, config): version is get_template_state()'s token for
+        the warehouse's config and linked templates ('none' without a config),
+        so an edited template resolves into new cache keys.
+        """
         # USER_MTEST zone patch - temporary fix for zone-based template
         if warehouse_id == 'USER_MTEST':
-            return {
+            return 'user_mtest_patch', {
                 "pattern_type": "zone_based",
                 "confidence": 0.95,
                 "business_zones": ["PICK", "BULK", "OVER", "CASE", "EACH"],
                 "transitional_zones": ["TRAN", "FLOW", "TRANSIT"]
             }
 
-        # Check template cache
-        if warehouse_id in self._template_cache:
-            cached_entry = self._template_cache[warehouse_id]
-            if time.time() - cached_entry['timestamp'] < self._cache_ttl:
-                # Record template cache hit
-                monitor = get_pattern_resolution_monitor()
-                if monitor:
-                    monitor.record_cache_operation('template_cache', hit=True)
-                return cached_entry['config']
-            else:
-                del self._template_cache[warehouse_id]
-
-        # Record template cache miss
-        monitor = get_pattern_resolution_monitor()
-        if monitor:
-            monitor.record_cache_operation('template_cache', hit=False)
-
         # Query database for template
         query_start_time = time.time()
         try:
             if not self.app:
-                return None
+                return 'no_app', None
 
             with self.app.app_context():
                 from models import WarehouseTemplate
 
-                template = WarehouseTemplate.query.filter_by(
-                    warehouse_id=warehouse_id,
-                    is_active=True
-                ).first()
+                # Version from the warehouse's config and linked templates (shared with compiled rule plans)
+                version, template_id = get_template_state(warehouse_id)
+                if version is None:
+                    return 'none', None
 
-                if template and template.location_format_config:
-                    config = template.get_location_format_config()
+                template = WarehouseTemplate.query.filter_by(id=template_id).first() if template_id is not None else None
+                config = template.get_location_format_config() if template and template.location_format_config else None
 
-                    # Cache the config
-                    self._template_cache[warehouse_id] = {
-                        'config': config,
-                        'timestamp': time.time()
-                    }
+                query_duration = (time.time() - query_start_time) * 1000
+                logger.debug(f"Template config retrieved for {warehouse_id} in {query_duration:.2f}ms")
 
-                    query_duration = (time.time() - query_start_time) * 1000
-                    logger.debug(f"Template config retrieved for {warehouse_id} in {query_duration:.2f}ms")
-
-                    return config
+                return version, config
 
         except Exception as e:
             query_duration = (time.time() - query_start_time) * 1000
             logger.error(f"Template config query failed for {warehouse_id} after {query_duration:.2f}ms: {e}")
 
-        return None
+        return 'none', None
 
     def _convert_template_to_patterns(self, template_config: Dict, rule_type: str) -> PatternSet:
         """Convert template configuration to rule-specific patterns"""
@@ -373,49 +495,26 @@ class RulePatternResolver:
             source="default_fallback"
         )
 
-    def _cleanup_cache(self):
-        """LRU cache cleanup when max size exceeded"""
-        # Remove oldest 20% of cache entries
-        cleanup_count = max(1, len(self._pattern_cache) // 5)
-
-        # Sort by timestamp and remove oldest
-        sorted_entries = sorted(
-            self._pattern_cache.items(),
-            key=lambda x: x[1]['timestamp']
-        )
-
-        for cache_key, _ in sorted_entries[:cleanup_count]:
-            del self._pattern_cache[cache_key]
-
-        logger.debug(f"Cleaned up {cleanup_count} cache entries")
-
     def clear_cache(self, warehouse_id: str = None):
-        """Clear cache for specific warehouse or all warehouses"""
+        """Clear cache for specific warehouse or all warehouses (shared by all resolvers)"""
+        self._cache.invalidate(warehouse_id)
         if warehouse_id:
-            # Clear specific warehouse
-            keys_to_remove = [key for key in self._pattern_cache.keys() if key.startswith(f"{warehouse_id}:")]
-            for key in keys_to_remove:
-                del self._pattern_cache[key]
-
-            if warehouse_id in self._template_cache:
-                del self._template_cache[warehouse_id]
-
             logger.info(f"Cleared cache for warehouse {warehouse_id}")
         else:
-            # Clear all caches
-            self._pattern_cache.clear()
-            self._template_cache.clear()
             logger.info("Cleared all pattern resolver caches")
 
     def get_cache_stats(self) -> Dict[str, Any]:
         """Get cache statistics for monitoring and debugging"""
+        stats = self._cache.get_stats()
         return {
-            'pattern_cache_size': len(self._pattern_cache),
-            'template_cache_size': len(self._template_cache),
-            'cache_ttl': self._cache_ttl,
-            'max_cache_size': self._max_cache_size,
-            'pattern_cache_keys': list(self._pattern_cache.keys()),
-            'template_cache_keys': list(self._template_cache.keys())
+            'pattern_cache_size': stats['size'],
+            'template_cache_size': stats['templates'],
+            'cache_ttl': stats['revalidate_seconds'],
+            'max_cache_size': stats['max_entries'],
+            'pattern_cache_keys': stats['keys'],
+            'template_cache_keys': stats['template_keys'],
+            'hit_rate': stats['hit_rate'],
+            'by_source': stats['by_source']
         }
 
     def get_performance_stats(self, time_window_hours: int = 1) -> Dict[str, Any]:
@@ -432,4 +531,41 @@ class RulePatternResolver:
             'cache_statistics': cache_stats,
             'performance_metrics': performance_summary,
             'monitoring_enabled': monitor is not None
-        }
\ No newline at end of file
+        }
+
+
+def warm_pattern_cache(app, warehouse_ids: Optional[List[str]] = None,
+                       rule_types: Tuple[str, ...] = RESOLVER_RULE_TYPES) -> int:
+    """
+    Resolve and precompile the PatternSets of every active warehouse (worker start)
+
+    Args:
+        app: Flask application (for template queries)
+        warehouse_ids: Warehouses to warm (default: every active WarehouseConfig)
+        rule_types: Rule types requesting resolver patterns
+
+    Returns:
+        Number of PatternSets warmed
+    """
+    start_time = time.time()
+    try:
+        if warehouse_ids is None:
+            with app.app_context():
+                from models import WarehouseConfig
+                warehouse_ids = [row[0] for row in WarehouseConfig.query.with_entities(
+                    WarehouseConfig.warehouse_id).filter_by(is_active=True).all()]
+
+        resolver = RulePatternResolver(None, app)
+        for warehouse_id in warehouse_ids:
+            for rule_type in rule_types:
+                resolver.get_patterns_for_rule(rule_type, {'warehouse_id': warehouse_id})
+
+    except Exception as e:
+        logger.warning(f"Pattern cache warmup failed: {e}")
+        return 0
+
+    warmed = len(warehouse_ids) * len(rule_types)
+    _pattern_set_cache.record_warmup(warmed)
+    print(f"[PATTERN_CACHE] Warmed {warmed} pattern sets for {len(warehouse_ids)} warehouses "
+          f"in {(time.time() - start_time) * 1000:.1f}ms")
+    return warmed
@@ -0,0 +1,307 @@
+"""
+Compiled Rule Plans
+
+Every evaluate() call used to re-parse rule.conditions / rule.parameters with
+json.loads, re-derive location-type patterns and re-ask the pattern resolver,
+then run one regex pass per pattern over the location column.
+
+A rule is now compiled ONCE into an immutable CompiledRulePlan holding:
+- conditions / parameters (read-only mappings, lists frozen to tuples)
+- thresholds resolved per rule type (e.g. max_days_in_location -> hours)
+- CompiledPatternSets: patterns precompiled into one alternation regex
+- column requirements (shared with the rule planner)
+
+Plans live in a process-wide LRU keyed by
+(rule id, updated_at, warehouse id, template version, content fingerprint),
+so they are shared across requests, go stale automatically when a rule or
+warehouse template is edited, and are dropped eagerly by rules_api on edits.
+"""
+
+import logging
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def freeze(value: Any) -> Any:
+    """Recursively convert JSON values to immutable equivalents"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+@dataclass(frozen=True)
+class CompiledPatternSet:
+    """
+    Location patterns compiled for vectorized matching.
+
+    Semantics match the evaluators' original loop: a location matches when
+    re.match succeeds for ANY pattern. Invalid patterns are dropped (and kept
+    in `invalid` for reporting) exactly like the loop skipped them.
+    """
+    patterns: Tuple[str, ...]
+    invalid: Tuple[Tuple[str, str], ...] = ()
+    combined: Optional[re.Pattern] = None
+    regexes: Tuple[re.Pattern, ...] = ()
+
+    @property
+    def key(self) -> Tuple[str, ...]:
+        """Canonical identity of the set (order and duplicates do not change matches)"""
+        return tuple(sorted(set(self.patterns)))
+
+    def __bool__(self) -> bool:
+        return bool(self.patterns)
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def match_mask(self, values: pd.Series) -> np.ndarray:
+        """
+        Boolean mask of values matching any pattern
+
+        Args:
+            values: Prepared string Series (callers upper-case locations)
+        """
+        if not self.patterns:
+            return np.zeros(len(values), dtype=bool)
+
+        if self.combined is not None:
+            # Single regex pass instead of one pass per pattern
+            return values.str.match(self.combined, na=False).to_numpy(dtype=bool)
+
+        mask = np.zeros(len(values), dtype=bool)
+        for regex in self.regexes:
+            mask |= values.str.match(regex, na=False).to_numpy(dtype=bool)
+        return mask
+
+    def matches(self, value: str) -> bool:
+        """Scalar variant of match_mask"""
+        if self.combined is not None:
+            return self.combined.match(value) is not None
+        return any(regex.match(value) for regex in self.regexes)
+
+
+# Numbered backreference (\\1..\\9...) or group conditional (?(1)...), not preceded by an escaping backslash
+_GROUP_REFERENCE = re.compile(r'(?<!\\)(?:\\\\)*(?:\\[1-9]|\(\?\()')
+
+
+@lru_cache(maxsize=1024)
+def _compile_pattern_tuple(patterns: Tuple[str, ...]) -> CompiledPatternSet:
+    valid, invalid, regexes = [], [], []
+    for pattern in patterns:
+        try:
+            regexes.append(re.compile(pattern))
+            valid.append(pattern)
+        except (re.error, TypeError) as e:
+            invalid.append((str(pattern), str(e)))
+
+    combined = None
+    # Joining renumbers groups, so numbered backreferences / group conditionals would silently
+    # point at another pattern's group - such sets (and named groups) are matched one by one
+    references_groups = any(regex.groupindex or (regex.groups and _GROUP_REFERENCE.search(regex.pattern))
+                            for regex in regexes)
+    if valid and not references_groups:
+        try:
+            combined = re.compile('|'.join(f'(?:{pattern})' for pattern in valid))
+        except re.error:
+            # e.g. inline global flags - match one by one
+            combined = None
+
+    return CompiledPatternSet(
+        patterns=tuple(valid),
+        invalid=tuple(invalid),
+        combined=combined,
+        regexes=tuple(regexes)
+    )
+
+
+def compile_pattern_set(patterns: Optional[Iterable[str]]) -> CompiledPatternSet:
+    """Compile (process-wide cached) a list of location regex patterns"""
+    if isinstance(patterns, CompiledPatternSet):
+        return patterns
+    return _compile_pattern_tuple(tuple(patterns or ()))
+
+
+EMPTY_PATTERN_SET = compile_pattern_set(())
+
+
+@dataclass(frozen=True)
+class CompiledRulePlan:
+    """Immutable, executable form of a Rule"""
+    rule_id: int
+    rule_type: str
+    cache_key: Tuple
+    conditions: Mapping[str, Any]
+    parameters: Mapping[str, Any]
+    thresholds: Mapping[str, Any] = field(default_factory=lambda: MappingProxyType({}))
+    pattern_sets: Mapping[str, CompiledPatternSet] = field(default_factory=lambda: MappingProxyType({}))
+    required_columns: Tuple[str, ...] = ()
+
+    def pattern_set(self, role: str) -> CompiledPatternSet:
+        """Get a compiled pattern set by role ('include', 'source', ...)"""
+        return self.pattern_sets.get(role, EMPTY_PATTERN_SET)
+
+
+def get_template_state(warehouse_id: Optional[str]) -> Tuple[Optional[str], Optional[int]]:
+    """
+    (version token, current template id) of a warehouse's layout definition
+
+    WarehouseTemplate rows have no warehouse column; a warehouse's templates
+    are the active ones linked to its WarehouseConfig (WarehouseConfig.templates).
+    The token combines the config's edit stamps (id, updated_at,
+    format_learned_date, as get_engine_version) with the id and updated_at of
+    every linked active template, so editing, adding or deactivating a template
+    changes it. The current template is picked as in the upload flow: the most
+    recently updated one with a location format config, else the most recent.
+
+    Two indexed queries; (None, None) when there is no warehouse, no config
+    or no database.
+    """
+    if not warehouse_id:
+        return None, None
+    try:
+        from flask import has_app_context
+        if not has_app_context():
+            return None, None
+        from models import WarehouseConfig, WarehouseTemplate
+    except ImportError:
+        return None, None
+
+    try:
+        config = WarehouseConfig.query.with_entities(
+            WarehouseConfig.id, WarehouseConfig.updated_at, WarehouseConfig.format_learned_date
+        ).filter_by(warehouse_id=str(warehouse_id)).first()
+        if config is None:
+            return None, None
+
+        templates = WarehouseTemplate.query.with_entities(
+            WarehouseTemplate.id, WarehouseTemplate.updated_at, WarehouseTemplate.location_format_config.isnot(None)
+        ).filter_by(based_on_config_id=config[0], is_active=True).order_by(
+            WarehouseTemplate.updated_at.desc(), WarehouseTemplate.id.desc()
+        ).all()
+    except Exception as e:
+        logger.warning(f"Template version lookup failed for {warehouse_id}: {e}")
+        # A failed query aborts the transaction (PostgreSQL); reset it for the evaluation that follows
+        try:
+            from database import db
+            db.session.rollback()
+        except Exception:
+            pass
+        return None, None
+
+    def stamp(value):
+        return value.isoformat() if value else ''
+
+    version = ':'.join([str(config[0]), stamp(config[1]), stamp(config[2])])
+    version += ''.join(f"|{template_id}:{stamp(updated_at)}" for template_id, updated_at, _ in templates)
+    current = next((row for row in templates if row[2]), templates[0] if templates else None)
+    return version, (current[0] if current else None)
+
+
+def get_template_version(warehouse_id: Optional[str]) -> Optional[str]:
+    """Version token of the warehouse's config and linked templates (see get_template_state)"""
+    return get_template_state(warehouse_id)[0]
+
+
+def build_plan_key(rule: Any, warehouse_context: Optional[dict] = None, scope: Optional[str] = None) -> Tuple:
+    """Cache key for a rule's plan in a warehouse context (scope: compiling evaluator)"""
+    context = warehouse_context or {}
+    updated_at = getattr(rule, 'updated_at', None)
+    return (
+        rule.id,
+        updated_at.isoformat() if hasattr(updated_at, 'isoformat') else updated_at,
+        context.get('warehouse_id'),
+        context.get('template_version'),
+        # Guards against edits that bypass updated_at (raw SQL, migrations)
+        hash((rule.rule_type, rule.conditions, getattr(rule, 'parameters', None))),
+        scope,
+    )
+
+
+class RulePlanCache:
+    """
+    Process-wide bounded LRU of compiled rule plans.
+
+    Thread-safe; compilation happens outside the lock (plans are pure), so a
+    rare concurrent miss compiles twice and keeps one result.
+    """
+
+    def __init__(self, max_size: int = 512):
+        self.max_size = max_size
+        self._plans: "OrderedDict[Tuple, CompiledRulePlan]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get_plan(self, rule: Any, warehouse_context: Optional[dict],
+                 compiler: Callable[[Any, Optional[dict], Tuple], CompiledRulePlan],
+                 scope: Optional[str] = None) -> CompiledRulePlan:
+        """Get a cached plan, compiling it on miss"""
+        key = build_plan_key(rule, warehouse_context, scope)
+
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                self._stats['hits'] += 1
+                return plan
+            self._stats['misses'] += 1
+
+        plan = compiler(rule, warehouse_context, key)
+
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.max_size:
+                self._plans.popitem(last=False)
+                self._stats['evictions'] += 1
+        return plan
+
+    def invalidate_rule(self, rule_id: int) -> int:
+        """Drop every plan compiled for a rule (all warehouses/versions)"""
+        with self._lock:
+            stale = [key for key in self._plans if key[0] == rule_id]
+            for key in stale:
+                del self._plans[key]
+            self._stats['invalidations'] += len(stale)
+        if stale:
+            logger.debug(f"Invalidated {len(stale)} compiled plan(s) for rule {rule_id}")
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stats['invalidations'] += len(self._plans)
+            self._plans.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self._stats['hits'] + self._stats['misses']
+            return {
+                'size': len(self._plans),
+                'max_size': self.max_size,
+                'hit_rate': round(self._stats['hits'] / total, 3) if total else 0.0,
+                **self._stats
+            }
+
+
+_rule_plan_cache = RulePlanCache()
+
+
+def get_rule_plan_cache() -> RulePlanCache:
+    """Get the process-wide rule plan cache"""
+    return _rule_plan_cache
+
+
+def invalidate_rule_plan(rule_id: int) -> int:
+    """Drop compiled plans for an edited/deleted rule"""
+    return _rule_plan_cache.invalidate_rule(rule_id)
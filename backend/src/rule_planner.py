@@ -0,0 +1,213 @@
+"""
+Column-Dependency-Aware Rule Planner
+
+Decides which active rules can run against a given (normalized) inventory
+frame and in what order, before any evaluator touches the data.
+
+1. Requirements: each rule type statically declares the columns its evaluator
+   reads and whether it needs a resolved warehouse (Location records)
+2. Pruning: rules whose requirements are not met are skipped with a reason
+   instead of failing inside the evaluator
+3. Ordering: within a precedence level, rules run cheapest-first using the
+   historical average RulePerformance.execution_time_ms, so cheap
+   exclusion-producing rules register their pallets early
+
+Precedence levels are never reordered - only rules sharing a level.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+WAREHOUSE_REQUIRED = 'required'   # Cannot produce meaningful results without Location records
+WAREHOUSE_OPTIONAL = 'optional'   # Degrades to pattern/default behavior without a warehouse
+WAREHOUSE_NONE = 'none'           # Pure inventory-frame rule
+
+
+@dataclass(frozen=True)
+class RuleRequirements:
+    """Static dependencies of a rule type's evaluator"""
+    columns: Tuple[str, ...]
+    warehouse: str = WAREHOUSE_NONE
+    default_cost_ms: float = 50.0  # Used when no performance history exists
+
+
+# Columns are post-normalization names (see RuleEngine._normalize_dataframe_columns, which
+# maps Description/Product columns to 'product')
+RULE_REQUIREMENTS: Dict[str, RuleRequirements] = {
+    'STAGNANT_PALLETS': RuleRequirements(('pallet_id', 'location', 'creation_date'), WAREHOUSE_OPTIONAL, 20.0),
+    'UNCOORDINATED_LOTS': RuleRequirements(('pallet_id', 'location', 'receipt_number'), WAREHOUSE_NONE, 30.0),
+    'OVERCAPACITY': RuleRequirements(('pallet_id', 'location'), WAREHOUSE_OPTIONAL, 200.0),
+    'INVALID_LOCATION': RuleRequirements(('pallet_id', 'location'), WAREHOUSE_OPTIONAL, 200.0),
+    'LOCATION_SPECIFIC_STAGNANT': RuleRequirements(('pallet_id', 'location', 'creation_date'), WAREHOUSE_NONE, 20.0),
+    'TEMPERATURE_ZONE_MISMATCH': RuleRequirements(('pallet_id', 'location', 'product'), WAREHOUSE_REQUIRED, 500.0),
+    'DATA_INTEGRITY': RuleRequirements(('pallet_id',), WAREHOUSE_NONE, 10.0),
+    'LOCATION_MAPPING_ERROR': RuleRequirements(('location',), WAREHOUSE_OPTIONAL, 500.0),
+    'MISSING_LOCATION': RuleRequirements(('pallet_id', 'location'), WAREHOUSE_NONE, 5.0),
+    'PRODUCT_INCOMPATIBILITY': RuleRequirements(('pallet_id', 'location', 'product'), WAREHOUSE_REQUIRED, 500.0),
+}
+
+# Unknown rule types run through DefaultRuleEvaluator, which reads nothing
+DEFAULT_REQUIREMENTS = RuleRequirements(())
+
+
+@dataclass
+class PrunedRule:
+    """A rule the planner decided not to run"""
+    rule: Any
+    reason: str
+
+
+@dataclass
+class RulePlan:
+    """Planner output: runnable rules in execution order plus pruned rules"""
+    rules: List[Any] = field(default_factory=list)
+    pruned: List[PrunedRule] = field(default_factory=list)
+    cost_estimates: Dict[int, float] = field(default_factory=dict)
+    cost_sources: Dict[int, str] = field(default_factory=dict)  # rule_id -> 'history' | 'default'
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'runnable': len(self.rules),
+            'pruned': len(self.pruned),
+            'history_estimates': sum(1 for source in self.cost_sources.values() if source == 'history'),
+            'pruned_reasons': {pruned.rule.id: pruned.reason for pruned in self.pruned},
+        }
+
+
+def get_rule_requirements(rule_type: str) -> RuleRequirements:
+    """Get the static requirements for a rule type"""
+    return RULE_REQUIREMENTS.get(rule_type, DEFAULT_REQUIREMENTS)
+
+
+def load_historical_costs(rule_ids: List[int]) -> Dict[int, float]:
+    """
+    Average historical execution time per rule from RulePerformance
+
+    One grouped query for all rules. Returns {} when the database is not
+    reachable (offline tools, tests) so planning falls back to defaults.
+    """
+    if not rule_ids:
+        return {}
+
+    try:
+        from flask import has_app_context
+        from database import db
+    except ImportError as e:
+        logger.debug(f"Rule performance history unavailable: {e}")
+        return {}
+    if not has_app_context():
+        return {}  # Offline tools and tests: no database
+
+    try:
+        from sqlalchemy import func
+        from models import RulePerformance
+
+        rows = db.session.query(
+            RulePerformance.rule_id,
+            func.avg(RulePerformance.execution_time_ms)
+        ).filter(
+            RulePerformance.rule_id.in_(rule_ids),
+            RulePerformance.execution_time_ms.isnot(None)
+        ).group_by(RulePerformance.rule_id).all()
+
+        return {rule_id: float(avg_ms) for rule_id, avg_ms in rows if avg_ms is not None}
+    except Exception as e:
+        logger.warning(f"Rule performance history unavailable: {e}")
+        # A failed query aborts the transaction (PostgreSQL); reset it for the evaluation that follows
+        try:
+            db.session.rollback()
+        except Exception:
+            pass
+        return {}
+
+
+class RulePlanner:
+    """
+    Plans rule execution for one inventory frame.
+
+    Usage:
+        planner = RulePlanner()
+        plan = planner.plan(rules, inventory_df.columns, warehouse_context)
+        for rule in plan.rules: ...
+        for pruned in plan.pruned: print(pruned.rule.name, pruned.reason)
+    """
+
+    def __init__(self, cost_loader: Callable[[List[int]], Dict[int, float]] = load_historical_costs):
+        self.cost_loader = cost_loader
+
+    def check_rule(self, rule: Any, available_columns: Iterable[str],
+                   warehouse_context: Optional[dict] = None) -> Optional[str]:
+        """
+        Check whether a rule can run
+
+        Returns:
+            None if runnable, otherwise the reason it cannot run
+        """
+        requirements = get_rule_requirements(rule.rule_type)
+        available = set(available_columns)
+
+        missing = [column for column in requirements.columns if column not in available]
+        if missing:
+            return f"missing required column(s): {', '.join(missing)}"
+
+        if requirements.warehouse == WAREHOUSE_REQUIRED and \
+                not (warehouse_context and warehouse_context.get('warehouse_id')):
+            return "requires a resolved warehouse (Location records) but none is available"
+
+        return None
+
+    def estimate_costs(self, rules: List[Any]) -> Tuple[Dict[int, float], Dict[int, str]]:
+        """Estimate each rule's cost from history, falling back to per-type defaults"""
+        history = self.cost_loader([rule.id for rule in rules]) if rules else {}
+
+        estimates, sources = {}, {}
+        for rule in rules:
+            if rule.id in history:
+                estimates[rule.id] = history[rule.id]
+                sources[rule.id] = 'history'
+            else:
+                estimates[rule.id] = get_rule_requirements(rule.rule_type).default_cost_ms
+                sources[rule.id] = 'default'
+        return estimates, sources
+
+    def plan(self, rules: List[Any], available_columns: Iterable[str],
+             warehouse_context: Optional[dict] = None,
+             order_by_precedence: bool = True) -> RulePlan:
+        """
+        Prune unrunnable rules and order the rest
+
+        Args:
+            rules: Active rules to plan
+            available_columns: Columns of the normalized inventory frame
+            warehouse_context: Resolved warehouse context (may be None)
+            order_by_precedence: Sort by (precedence, cost, id); when False the
+                incoming order is kept (precedence system disabled)
+
+        Returns:
+            RulePlan with runnable rules in execution order
+        """
+        available_columns = list(available_columns)
+        plan = RulePlan()
+
+        runnable = []
+        for rule in rules:
+            reason = self.check_rule(rule, available_columns, warehouse_context)
+            if reason:
+                plan.pruned.append(PrunedRule(rule=rule, reason=reason))
+            else:
+                runnable.append(rule)
+
+        plan.cost_estimates, plan.cost_sources = self.estimate_costs(runnable)
+
+        if order_by_precedence:
+            runnable.sort(key=lambda rule: (
+                getattr(rule, 'precedence_level', 4),
+                plan.cost_estimates[rule.id],
+                rule.id
+            ))
+
+        plan.rules = runnable
+        return plan
@@ -21,6 +21,7 @@ from models import (
     RulePerformance, Location
 )
 from rule_engine import RuleEngine
+from rule_plan_cache import invalidate_rule_plan
 # from rule_validator import RuleValidator, RulePerformanceEstimator, RuleDebugger  # TODO: Implement these
 
 def get_token_required():
@@ -270,6 +271,7 @@ def update_rule(current_user, rule_id):
             db.session.add(history)
         
         db.session.commit()
+        invalidate_rule_plan(rule_id)  # Drop compiled plans of the edited rule
         
         return jsonify({
             'success': True,
@@ -330,6 +332,7 @@ def delete_rule(current_user, rule_id):
         # Delete the rule (cascade will handle history)
         db.session.delete(rule)
         db.session.commit()
+        invalidate_rule_plan(rule_id)  # Drop compiled plans of the edited rule
         
         return jsonify({
             'success': True,
@@ -373,6 +376,7 @@ def toggle_rule_activation(current_user, rule_id):
         db.session.add(history)
         
         db.session.commit()
+        invalidate_rule_plan(rule_id)  # Drop compiled plans of the edited rule
         
         return jsonify({
             'success': True,
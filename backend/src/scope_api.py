@@ -5,13 +5,14 @@ Handles warehouse scope configuration, excluded patterns, and unit type manageme
 
 import json
 from datetime import datetime
+import pandas as pd
 from flask import Blueprint, request, jsonify, current_app
 from sqlalchemy import and_, or_
 from functools import wraps
 from database import db
 from models import WarehouseScopeConfig, Location
 from core_models import User
-from services.simple_scope_service import SimpleScopeService, validate_scope_configuration
+from services.simple_scope_service import SimpleScopeService, compile_scope_patterns, validate_scope_configuration
 
 # Create the scope management API blueprint
 scope_bp = Blueprint('scope_api', __name__, url_prefix='/api/v1/scope')
@@ -180,8 +181,13 @@ def preview_scope_filtering(current_user, warehouse_id):
     Expected JSON payload:
     {
         "sample_locations": ["A-01", "BOX-001", "RECV-01", "ITEM-123"],
-        "excluded_patterns": ["BOX-*", "ITEM-*"]
+        "excluded_patterns": ["BOX-*", "ITEM-*"],
+        "summary_only": false
     }
+
+    PERFORMANCE: Uses the same compiled matcher as inventory filtering (one match
+    per unique location); pass summary_only for full inventories to get the
+    counts without per-location results.
     """
     try:
         data = request.get_json()
@@ -190,6 +196,7 @@ def preview_scope_filtering(current_user, warehouse_id):
 
         sample_locations = data.get('sample_locations', [])
         excluded_patterns = data.get('excluded_patterns', [])
+        summary_only = bool(data.get('summary_only', False))
 
         if not sample_locations:
             return jsonify({'success': False, 'error': 'No sample locations provided'}), 400
@@ -203,38 +210,33 @@ def preview_scope_filtering(current_user, warehouse_id):
                 'validation_issues': validation_result['issues']
             }), 400
 
-        # Create temporary scope service to test filtering
-        scope_service = SimpleScopeService(warehouse_id)
-
-        # Test each location against the patterns
-        preview_results = []
-        for location in sample_locations:
-            is_excluded = any(
-                scope_service._is_location_excluded(location, [pattern])
-                for pattern in excluded_patterns
-            )
-
-            preview_results.append({
-                'location': location,
-                'excluded': is_excluded,
-                'status': 'excluded' if is_excluded else 'included'
-            })
+        # Test every location against the compiled patterns
+        locations = pd.Series(sample_locations, dtype=object)
+        excluded_mask = compile_scope_patterns(excluded_patterns).excluded_mask(locations)
 
         # Summary statistics
-        excluded_count = sum(1 for result in preview_results if result['excluded'])
-        included_count = len(preview_results) - excluded_count
+        excluded_count = int(excluded_mask.sum())
+        included_count = len(sample_locations) - excluded_count
 
-        return jsonify({
+        response = {
             'success': True,
             'warehouse_id': warehouse_id,
             'excluded_patterns': excluded_patterns,
-            'preview_results': preview_results,
             'summary': {
                 'total_locations': len(sample_locations),
+                'unique_locations': int(locations.nunique(dropna=False)),
                 'included_locations': included_count,
                 'excluded_locations': excluded_count
             }
-        })
+        }
+        if not summary_only:
+            response['preview_results'] = [{
+                'location': location,
+                'excluded': is_excluded,
+                'status': 'excluded' if is_excluded else 'included'
+            } for location, is_excluded in zip(sample_locations, excluded_mask.tolist())]
+
+        return jsonify(response)
 
     except Exception as e:
         return jsonify({
@@ -9,24 +9,49 @@ Performance Impact:
 - NEW: 2000 locations = 1 query + cache lookups = <3s
 
 Scalability:
-- Handles 100-10,000+ locations efficiently
-- Memory overhead: ~1KB per location (10MB for 10k locations)
+- Handles 100-100,000+ locations efficiently
+- Column-projected load (no ORM objects) into a compact LocationSnapshot
+  (see services/location_snapshot.py): ~0.2KB per location vs ~1KB+ for
+  full Location objects
+- With a location version, loaded codes are row indices into the machine-wide
+  memory-mapped warehouse snapshot (SelectedLocationSnapshot): one flag per
+  mapped row plus a private delta of placeholder rows, not a copy
 - Lookup time: <0.001ms (microseconds)
 
+Cross-request reuse:
+- get_warehouse_location_repository() keeps one warm repository per warehouse
+  in a process-wide LRU, stamped with the location version
+  (services.capacity_resolver.get_location_version)
+- Loads are incremental, so hourly uploads of the same inventory query only
+  codes not seen before; a version change (location API writes, template
+  application, classification corrections bump it) starts a fresh repository
+
 Usage:
     repository = LocationRepository(warehouse_id='USER_NTEST', db_session=db.session)
     repository.bulk_load_locations(['LOC1', 'LOC2', 'LOC3'])
 
+    # Warm, cross-request repository
+    repository = get_warehouse_location_repository('USER_NTEST', db.session, location_version)
+
     # O(1) lookups
     capacity = repository.get_capacity('LOC1')
     is_special = repository.is_physical_special_location('RECV-01')
 """
 
 import logging
+import threading
 import time
-from typing import List, Optional, Dict, Set
+from collections import OrderedDict
+from typing import Any, List, Optional, Dict, Set
+
+import pandas as pd
 from sqlalchemy.orm import Session
 
+from services.location_snapshot import (
+    LocationSnapshot, LocationView, SelectedLocationSnapshot, load_location_frame
+)
+from services.shared_location_snapshot import database_key_for, get_shared_snapshot_store
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -47,19 +72,22 @@ class LocationRepository:
     DEFAULT_UNIT_TYPE = 'pallets'
     DEFAULT_CAPACITY = 1
 
-    def __init__(self, warehouse_id: str, db_session: Session):
+    def __init__(self, warehouse_id: str, db_session: Session, location_version: Optional[str] = None):
         """
         Initialize location repository for a specific warehouse.
 
         Args:
             warehouse_id: The warehouse identifier
             db_session: SQLAlchemy database session for queries
+            location_version: Location table fingerprint (get_location_version); when
+                given, rows come from the machine-wide memory-mapped warehouse snapshot
         """
         self.warehouse_id = str(warehouse_id)
         self.db_session = db_session
+        self.location_version = location_version
 
-        # Primary cache: code -> Location object
-        self._locations_cache: Dict[str, 'Location'] = {}
+        # Primary cache: compact columnar snapshot (code -> row -> column arrays)
+        self._snapshot = LocationSnapshot.empty(self.warehouse_id)
 
         # Fast lookup sets for O(1) checks
         self._special_locations_set: Set[str] = set()
@@ -67,19 +95,30 @@ class LocationRepository:
         # Loading status
         self._is_bulk_loaded = False
 
+        # Serializes incremental loads of a shared (warm) repository
+        self._load_lock = threading.Lock()
+
         # Metrics for monitoring
         self._cache_hits = 0
         self._cache_misses = 0
         self._load_time_ms = 0
+        self._loads = 0
+        self._codes_requested = 0  # Codes passed to bulk_load_locations
+        self._codes_warm = 0       # ... of which were already loaded (no query)
+        self._codes_queried = 0
 
         logger.info(f"[LOCATION_REPO] Initialized for warehouse {self.warehouse_id}")
 
     def bulk_load_locations(self, location_codes: List[str]) -> None:
         """
-        Bulk load all location data in a SINGLE optimized database query.
+        Bulk load location data in a SINGLE optimized database query.
 
         This is the core optimization that replaces 1000+ individual queries
-        with ONE bulk query. Called once at the start of analysis.
+        with ONE bulk query. Loading is incremental: codes already held
+        (database rows or placeholders) are served from memory and only the
+        codes not yet seen are queried, so a warm repository (see
+        get_warehouse_location_repository) re-analyzing the same inventory
+        issues no query at all.
 
         Args:
             location_codes: List of all location codes to load
@@ -89,74 +128,117 @@ class LocationRepository:
             - vs individual queries: ~30,000ms (2000 queries × 15ms)
             - Speedup: 60-100x faster
         """
-        if self._is_bulk_loaded:
-            logger.debug(f"[LOCATION_REPO] Already loaded {len(self._locations_cache)} locations")
-            return
-
         # Filter out empty/None codes
-        valid_codes = [str(code).strip() for code in location_codes
-                      if code and str(code).strip()]
+        valid_codes = list(dict.fromkeys(self._clean_codes(location_codes)))
 
         if not valid_codes:
             logger.warning(f"[LOCATION_REPO] No valid location codes to load")
             self._is_bulk_loaded = True
             return
 
-        logger.info(f"[LOCATION_REPO] Bulk loading {len(valid_codes)} locations for warehouse {self.warehouse_id}")
-        start_time = time.time()
-
-        try:
-            # Import here to avoid circular imports
-            from models import Location
-
-            # CRITICAL: Single bulk query with composite index
-            # Uses: idx_location_code_warehouse (code, warehouse_id)
-            locations = self.db_session.query(Location).filter(
-                Location.code.in_(valid_codes),
-                Location.warehouse_id == self.warehouse_id
-            ).all()
-
-            # Build primary cache
-            for loc in locations:
-                self._locations_cache[loc.code] = loc
-
-                # Build special locations set for O(1) lookup
-                if loc.location_type in self.SPECIAL_LOCATION_TYPES:
-                    self._special_locations_set.add(loc.code)
-
-            # Create placeholder entries for locations not in database
-            # This prevents repeated failed lookups
-            found_codes = set(self._locations_cache.keys())
-            for code in valid_codes:
-                if code not in found_codes:
-                    # Create virtual location object with defaults
-                    placeholder = self._create_placeholder_location(code)
-                    self._locations_cache[code] = placeholder
-
-            # Mark as loaded
-            self._is_bulk_loaded = True
-
-            # Calculate metrics
-            elapsed = time.time() - start_time
-            self._load_time_ms = int(elapsed * 1000)
-
-            logger.info(f"[LOCATION_REPO] ✅ Loaded {len(locations)} DB records, "
-                       f"{len(valid_codes) - len(locations)} defaults in {elapsed:.2f}s")
-
-        except Exception as e:
-            logger.error(f"[LOCATION_REPO] ❌ Failed to bulk load: {e}", exc_info=True)
-            # Don't mark as loaded so it can be retried
-            raise
-
-    def get_location(self, code: str) -> Optional['Location']:
+        with self._load_lock:
+            snapshot = self._snapshot
+            new_codes = [code for code, row in zip(valid_codes, snapshot.rows_for(valid_codes)) if row < 0]
+            self._codes_requested += len(valid_codes)
+            self._codes_warm += len(valid_codes) - len(new_codes)
+
+            if not new_codes:
+                logger.debug(f"[LOCATION_REPO] All {len(valid_codes)} locations already loaded")
+                self._is_bulk_loaded = True
+                self._load_time_ms = 0
+                return
+
+            logger.info(f"[LOCATION_REPO] Bulk loading {len(new_codes)} new locations for warehouse {self.warehouse_id} "
+                        f"({len(valid_codes) - len(new_codes)} already loaded)")
+            start_time = time.time()
+
+            try:
+                shared = self._shared_snapshot()
+                if shared is not None:
+                    # SHARED: Hold row indices into the mapped warehouse snapshot (no row copies);
+                    # only placeholders for codes it lacks are stored privately
+                    held = snapshot if isinstance(snapshot, SelectedLocationSnapshot) and snapshot.base is shared \
+                        else self._rebase(snapshot, shared)
+                    rows = shared.rows_for(new_codes)
+                    missing_codes = [code for code, row in zip(new_codes, rows) if row < 0]
+                    db_records = len(new_codes) - len(missing_codes)
+                    merged = held.extend(rows[rows >= 0],
+                                         self._placeholder_frame(missing_codes) if missing_codes else None)
+                else:
+                    # CRITICAL: Single column-projected query with composite index
+                    # Uses: uq_location_warehouse_code (warehouse_id, code); no ORM objects are built
+                    frame = load_location_frame(self.db_session, self.warehouse_id, new_codes)
+                    db_records = len(frame)
+
+                    # Create placeholder rows for locations not in database
+                    # This prevents repeated failed lookups
+                    found_codes = set(frame['code'])
+                    missing_codes = [code for code in new_codes if code not in found_codes]
+                    if missing_codes:
+                        frame = pd.concat([frame, self._placeholder_frame(missing_codes)], ignore_index=True)
+
+                    # INCREMENTAL: Append to the rows already held (no query for them)
+                    if len(snapshot):
+                        frame = pd.concat([snapshot.to_frame(), frame], ignore_index=True)
+                    merged = LocationSnapshot.from_frame(frame, warehouse_id=self.warehouse_id)
+
+                # Build the special locations set for O(1) lookup and swap the primary cache
+                # in whole, so concurrent readers see the old or the new snapshot
+                special_rows = merged.rows_where('location_type', self.SPECIAL_LOCATION_TYPES)
+                self._special_locations_set = set(merged.codes_at(special_rows).tolist())
+                self._snapshot = merged
+
+                # Mark as loaded
+                self._is_bulk_loaded = True
+                self._codes_queried += len(new_codes)
+                self._loads += 1
+
+                # Calculate metrics
+                elapsed = time.time() - start_time
+                self._load_time_ms = int(elapsed * 1000)
+
+                logger.info(f"[LOCATION_REPO] ✅ Loaded {db_records} DB records, "
+                           f"{len(missing_codes)} defaults in {elapsed:.2f}s")
+
+            except Exception as e:
+                logger.error(f"[LOCATION_REPO] ❌ Failed to bulk load: {e}", exc_info=True)
+                # Don't mark as loaded so it can be retried
+                raise
+
+    def _shared_snapshot(self) -> Optional[LocationSnapshot]:
+        """
+        Warehouse snapshot memory-mapped by every worker on this machine (built
+        once per location version), or None without a version or when sharing
+        is unavailable.
         """
-        Get full Location object for a location code.
+        if not self.location_version:
+            return None
+        return get_shared_snapshot_store().acquire(
+            self.warehouse_id, self.location_version,
+            build=lambda: LocationSnapshot.from_frame(load_location_frame(self.db_session, self.warehouse_id),
+                                                      warehouse_id=self.warehouse_id),
+            database_key=database_key_for(self.db_session)
+        )
+
+    def _rebase(self, snapshot: LocationSnapshot, shared: LocationSnapshot) -> SelectedLocationSnapshot:
+        """Selection over a (re)mapped shared snapshot holding the codes already loaded"""
+        selection = SelectedLocationSnapshot.select(shared, self.warehouse_id)
+        if not len(snapshot):
+            return selection
+        frame = snapshot.to_frame()
+        rows = shared.rows_for(frame['code'].tolist())
+        # Held rows the mapping lacks keep their values in the private delta
+        return selection.extend(rows[rows >= 0], frame[rows < 0])
+
+    def get_location(self, code: str) -> Optional[LocationView]:
+        """
+        Get location data for a location code.
 
         Args:
             code: Location code to look up
 
         Returns:
-            Location object if found, None otherwise
+            Read-only LocationView (Location attribute names) if found, None otherwise
 
         Performance: O(1) - instant hash table lookup
         """
@@ -165,7 +247,7 @@ class LocationRepository:
         if not code:
             return None
 
-        location = self._locations_cache.get(code)
+        location = self._snapshot.get(code)
 
         # Track metrics
         if location:
@@ -287,22 +369,12 @@ class LocationRepository:
             >>> capacities = repo.get_capacities_bulk(codes)
             >>> # Use with pandas: pd.Series(capacities)
         """
-        # OPTIMIZED: Direct cache access, no function call overhead (837 calls eliminated)
-        result = {}
-        for code in location_codes:
-            if not code:
-                continue
-
-            code_str = str(code).strip()
-            if not code_str:
-                continue
+        # OPTIMIZED: One vectorized gather over the snapshot's capacity column
+        codes = self._clean_codes(location_codes)
+        capacities = self._snapshot.column('capacity', self._snapshot.rows_for(codes))
+        present = ~pd.isna(capacities)
 
-            # Direct cache lookup (no function call)
-            location = self._locations_cache.get(code_str)
-            if location and hasattr(location, 'capacity') and location.capacity is not None:
-                result[code_str] = location.capacity
-
-        return result
+        return dict(zip((code for code, keep in zip(codes, present) if keep), capacities[present].astype(int).tolist()))
 
     def get_unit_types_bulk(self, location_codes: List[str]) -> Dict[str, str]:
         """
@@ -319,25 +391,17 @@ class LocationRepository:
             >>> unit_types = repo.get_unit_types_bulk(codes)
             >>> # Use with pandas: pd.Series(unit_types)
         """
-        # OPTIMIZED: Direct cache access, no function call overhead
-        result = {}
-        for code in location_codes:
-            if not code:
-                continue
-
-            code_str = str(code).strip()
-            if not code_str:
-                continue
-
-            # Direct cache lookup (no function call)
-            location = self._locations_cache.get(code_str)
-            if location and hasattr(location, 'unit_type') and location.unit_type:
-                result[code_str] = location.unit_type
-            else:
-                # Use default if not found
-                result[code_str] = self.DEFAULT_UNIT_TYPE
-
-        return result
+        # OPTIMIZED: One vectorized gather over the snapshot's unit_type column
+        codes = self._clean_codes(location_codes)
+        unit_types = self._snapshot.column('unit_type', self._snapshot.rows_for(codes))
+
+        # Use default if not found
+        return {code: unit_type or self.DEFAULT_UNIT_TYPE for code, unit_type in zip(codes, unit_types)}
+
+    @staticmethod
+    def _clean_codes(location_codes: List[str]) -> List[str]:
+        """Stripped string codes, skipping empty values"""
+        return [code_str for code_str in (str(code).strip() for code in location_codes if code) if code_str]
 
     def is_loaded(self) -> bool:
         """Check if repository has been bulk loaded."""
@@ -353,55 +417,57 @@ class LocationRepository:
             - cache_hits: Number of successful cache lookups
             - cache_misses: Number of failed cache lookups
             - hit_rate: Percentage of successful lookups
-            - load_time_ms: Time taken to bulk load
+            - load_time_ms: Time taken by the last bulk load
+            - memory_bytes: Approximate size of the location snapshot
+            - warm_hit_rate: Percentage of requested codes served without a query
         """
         total_lookups = self._cache_hits + self._cache_misses
         hit_rate = (self._cache_hits / total_lookups * 100) if total_lookups > 0 else 0.0
+        warm_hit_rate = (self._codes_warm / self._codes_requested * 100) if self._codes_requested else 0.0
 
         return {
-            'total_cached': len(self._locations_cache),
+            'total_cached': len(self._snapshot),
             'special_locations': len(self._special_locations_set),
             'cache_hits': self._cache_hits,
             'cache_misses': self._cache_misses,
             'hit_rate': hit_rate,
             'load_time_ms': self._load_time_ms,
+            'memory_bytes': self._snapshot.memory_bytes(),
+            'loads': self._loads,
+            'codes_requested': self._codes_requested,
+            'codes_queried': self._codes_queried,
+            'warm_hit_rate': warm_hit_rate,
+            'location_version': self.location_version,
             'is_loaded': self._is_bulk_loaded
         }
 
     def clear_cache(self) -> None:
         """Clear all cached data. Used for testing or memory management."""
-        self._locations_cache.clear()
+        self._snapshot = LocationSnapshot.empty(self.warehouse_id)
         self._special_locations_set.clear()
         self._is_bulk_loaded = False
         self._cache_hits = 0
         self._cache_misses = 0
         logger.info(f"[LOCATION_REPO] Cache cleared for warehouse {self.warehouse_id}")
 
-    def _create_placeholder_location(self, code: str) -> 'Location':
+    def _placeholder_frame(self, codes: List[str]) -> pd.DataFrame:
         """
-        Create a placeholder Location object for codes not in database.
+        Placeholder rows for codes not in database.
 
         This prevents repeated failed lookups and provides sensible defaults.
 
         Args:
-            code: Location code
+            codes: Location codes
 
         Returns:
-            Placeholder Location object with default values
+            Snapshot rows with default capacity/unit type and unknown location type
         """
-        # Import here to avoid circular imports
-        from models import Location
-
-        # Create a Location-like object with defaults
-        # Note: This is a detached object, not saved to database
-        placeholder = Location()
-        placeholder.code = code
-        placeholder.warehouse_id = self.warehouse_id
-        placeholder.capacity = self.DEFAULT_CAPACITY
-        placeholder.unit_type = self.DEFAULT_UNIT_TYPE
-        placeholder.location_type = None  # Unknown type
-
-        return placeholder
+        return pd.DataFrame({
+            'code': codes,
+            'capacity': self.DEFAULT_CAPACITY,
+            'unit_type': self.DEFAULT_UNIT_TYPE,
+            'location_type': None,  # Unknown type
+        })
 
     def _get_default_unit_type(self) -> str:
         """
@@ -430,3 +496,97 @@ def create_location_repository(warehouse_id: str, db_session: Session) -> Locati
         Configured LocationRepository instance
     """
     return LocationRepository(warehouse_id, db_session)
+
+
+class WarehouseRepositoryCache:
+    """
+    Thread-safe LRU of warm LocationRepository instances, one per warehouse
+
+    Each repository is stamped with the location version it was created for;
+    a lookup with a different version replaces it with an empty repository
+    (which then loads incrementally again). Repositories without a version
+    cannot be validated and are never cached.
+    """
+
+    def __init__(self, max_warehouses: int = 16):
+        self.max_warehouses = max_warehouses
+        self._repositories = OrderedDict()  # warehouse_id -> LocationRepository
+        self._lock = threading.RLock()
+        self._stats = {'hits': 0, 'misses': 0, 'rebuilds': 0, 'evictions': 0, 'invalidations': 0, 'uncached': 0}
+
+    def get(self, warehouse_id: str, db_session: Session, location_version: Optional[str]) -> LocationRepository:
+        """Warm repository for the warehouse's current location version"""
+        warehouse_id = str(warehouse_id)
+        if not location_version:
+            with self._lock:
+                self._stats['uncached'] += 1
+            return LocationRepository(warehouse_id, db_session)
+
+        with self._lock:
+            repository = self._repositories.get(warehouse_id)
+            if repository is not None and repository.location_version == location_version:
+                self._repositories.move_to_end(warehouse_id)
+                self._stats['hits'] += 1
+                repository.db_session = db_session  # Queries for new codes use the caller's session
+                return repository
+
+            self._stats['rebuilds' if repository is not None else 'misses'] += 1
+            repository = LocationRepository(warehouse_id, db_session, location_version=location_version)
+            self._repositories[warehouse_id] = repository
+            self._repositories.move_to_end(warehouse_id)
+            while len(self._repositories) > self.max_warehouses:
+                self._repositories.popitem(last=False)
+                self._stats['evictions'] += 1
+            return repository
+
+    def invalidate(self, warehouse_id: Optional[str] = None) -> None:
+        """Drop the repository of one warehouse or of every warehouse"""
+        with self._lock:
+            stale = [key for key in self._repositories if warehouse_id is None or key == str(warehouse_id)]
+            for key in stale:
+                del self._repositories[key]
+            self._stats['invalidations'] += len(stale)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            repositories = list(self._repositories.items())
+            lookups = self._stats['hits'] + self._stats['misses'] + self._stats['rebuilds']
+            stats = {
+                'size': len(repositories),
+                'max_warehouses': self.max_warehouses,
+                'hit_rate': round(self._stats['hits'] / lookups, 3) if lookups else 0.0,
+                **self._stats,
+            }
+
+        per_warehouse = {warehouse_id: repository.get_cache_stats() for warehouse_id, repository in repositories}
+        requested = sum(entry['codes_requested'] for entry in per_warehouse.values())
+        queried = sum(entry['codes_queried'] for entry in per_warehouse.values())
+        stats.update({
+            'code_hit_rate': round(1 - queried / requested, 3) if requested else 0.0,
+            'locations_held': sum(entry['total_cached'] for entry in per_warehouse.values()),
+            'memory_bytes': sum(entry['memory_bytes'] for entry in per_warehouse.values()),
+            'warehouses': {warehouse_id: {key: entry[key] for key in (
+                'total_cached', 'memory_bytes', 'loads', 'codes_requested', 'codes_queried', 'location_version'
+            )} for warehouse_id, entry in per_warehouse.items()},
+        })
+        return stats
+
+
+# Global instance
+_warehouse_repository_cache = WarehouseRepositoryCache()
+
+
+def get_warehouse_location_repository(warehouse_id: str, db_session: Session,
+                                      location_version: Optional[str]) -> LocationRepository:
+    """Get the process-wide warm repository for a warehouse location version"""
+    return _warehouse_repository_cache.get(warehouse_id, db_session, location_version)
+
+
+def get_warehouse_repository_cache() -> WarehouseRepositoryCache:
+    """Get the process-wide warehouse repository cache"""
+    return _warehouse_repository_cache
+
+
+def get_warehouse_repository_stats() -> Dict[str, Any]:
+    """Warm repository cache statistics (for the admin cache-stats endpoint)"""
+    return _warehouse_repository_cache.get_stats()
@@ -0,0 +1,379 @@
+"""
+LocationSnapshot: Compact Array-Backed Location Data
+
+Evaluators only read a handful of Location columns (type, capacity, unit type,
+zone, structure), yet LocationRepository used to hold one full SQLAlchemy
+Location object per code (~1KB each, plus identity-map bookkeeping).
+
+This module replaces those objects with a column-projected snapshot:
+
+- load_location_frame() selects ONLY the snapshot columns with SQLAlchemy Core
+  (no ORM object construction, no session identity map)
+- LocationSnapshot stores them column-wise: string columns as int32 category
+  codes, numeric columns as float64 (NaN = NULL), plus one code -> row dict
+- Lookups return LocationView, a two-slot object exposing the same attribute
+  names as Location (view.capacity, view.location_type, ...)
+- Bulk accessors work on row arrays, so vectorized callers never build views
+
+Usage:
+    frame = load_location_frame(db.session, 'USER_NTEST', location_codes)
+    snapshot = LocationSnapshot.from_frame(frame, warehouse_id='USER_NTEST')
+
+    view = snapshot.get('RECV-01')
+    rows = snapshot.rows_for(['RECV-01', '01-01-001A'])   # -1 where missing
+    capacities = snapshot.column('capacity', rows)        # float64, NaN where missing
+
+    # Codes held from a shared (memory-mapped) snapshot without copying its rows
+    held = SelectedLocationSnapshot.select(mapped_snapshot).extend(mapped_snapshot.rows_for(codes))
+"""
+
+import logging
+import sys
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Location columns carried by the snapshot, by storage kind
+STRING_COLUMNS = ('location_type', 'unit_type', 'zone', 'level')
+NUMERIC_COLUMNS = ('capacity', 'pallet_capacity', 'aisle_number', 'rack_number', 'position_number')
+BOOLEAN_COLUMNS = ('is_tracked',)
+SNAPSHOT_COLUMNS = ('code',) + STRING_COLUMNS + NUMERIC_COLUMNS + BOOLEAN_COLUMNS
+
+# Keep IN (...) lists well under driver parameter limits (SQLite: 32766)
+LOAD_CHUNK_SIZE = 10_000
+
+
+def load_location_frame(db_session, warehouse_id: str, location_codes: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """
+    Column-projected Location load for one warehouse
+
+    Selects only SNAPSHOT_COLUMNS through SQLAlchemy Core, so no ORM objects
+    are built. location_codes=None loads the whole warehouse; code lists
+    larger than LOAD_CHUNK_SIZE also scan the warehouse once (filtered in
+    pandas) instead of issuing several IN (...) batches.
+    """
+    from sqlalchemy import select
+    from models import Location
+
+    table = Location.__table__
+    query = select(*(table.c[name] for name in SNAPSHOT_COLUMNS)).where(table.c.warehouse_id == str(warehouse_id))
+
+    codes = None if location_codes is None else list(dict.fromkeys(location_codes))
+    if codes is None or len(codes) > LOAD_CHUNK_SIZE:
+        rows = db_session.execute(query).fetchall()
+    else:
+        rows = db_session.execute(query.where(table.c.code.in_(codes))).fetchall()
+
+    frame = pd.DataFrame.from_records(rows, columns=list(SNAPSHOT_COLUMNS))
+    if codes is not None and len(codes) > LOAD_CHUNK_SIZE:
+        frame = frame[frame['code'].isin(codes)].reset_index(drop=True)
+    return frame
+
+
+class LocationView:
+    """
+    Read-only view of one snapshot row
+
+    Exposes the Location attribute names used by evaluators; values are read
+    from the snapshot arrays on access.
+    """
+
+    __slots__ = ('_snapshot', '_row')
+
+    def __init__(self, snapshot: 'LocationSnapshot', row: int):
+        self._snapshot = snapshot
+        self._row = row
+
+    @property
+    def code(self) -> str:
+        return self._snapshot.code_at(self._row)
+
+    @property
+    def warehouse_id(self) -> Optional[str]:
+        return self._snapshot.warehouse_id
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in SNAPSHOT_COLUMNS}
+
+    def __repr__(self) -> str:
+        return f"<LocationView {self.code} ({self.location_type})>"
+
+
+def _column_property(name: str) -> property:
+    return property(lambda view: view._snapshot.value(name, view._row), doc=f"Location.{name}")
+
+
+for _name in SNAPSHOT_COLUMNS[1:]:
+    setattr(LocationView, _name, _column_property(_name))
+
+
+class LocationSnapshot:
+    """
+    Columnar store of Location rows for one warehouse
+
+    Strings are factorized (int32 codes, -1 = NULL, into a per-column category
+    array), numbers are float64 with NaN for NULL, booleans are int8 with -1
+    for NULL. Rows are addressed by position; `codes` maps back to the code.
+    """
+
+    def __init__(self, codes: np.ndarray, strings: Dict[str, tuple], numbers: Dict[str, np.ndarray],
+                 booleans: Dict[str, np.ndarray], warehouse_id: Optional[str] = None):
+        self.codes = codes
+        self.warehouse_id = warehouse_id
+        self._strings = strings    # name -> (int32 codes, categories)
+        self._numbers = numbers    # name -> float64
+        self._booleans = booleans  # name -> int8
+        self._row_by_code = {code: row for row, code in enumerate(codes.tolist())}
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, warehouse_id: Optional[str] = None) -> 'LocationSnapshot':
+        """Build a snapshot from a load_location_frame()-shaped DataFrame (missing columns are NULL)"""
+        size = len(frame)
+
+        def column(name):
+            return frame[name] if name in frame else pd.Series([None] * size, index=frame.index, dtype=object)
+
+        strings = {}
+        for name in STRING_COLUMNS:
+            codes, categories = pd.factorize(column(name), use_na_sentinel=True)
+            strings[name] = (codes.astype(np.int32), np.asarray(categories, dtype=object))
+
+        numbers = {name: pd.to_numeric(column(name), errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+                   for name in NUMERIC_COLUMNS}
+
+        booleans = {}
+        for name in BOOLEAN_COLUMNS:
+            values = column(name)
+            flags = np.full(size, -1, dtype=np.int8)
+            present = values.notna().to_numpy()
+            flags[present] = values[present].astype(bool).to_numpy(dtype=np.int8)
+            booleans[name] = flags
+
+        codes = frame['code'].astype(str).to_numpy(dtype=object) if size else np.empty(0, dtype=object)
+        return cls(codes, strings, numbers, booleans, warehouse_id=warehouse_id)
+
+    @classmethod
+    def empty(cls, warehouse_id: Optional[str] = None) -> 'LocationSnapshot':
+        return cls.from_frame(pd.DataFrame(columns=list(SNAPSHOT_COLUMNS)), warehouse_id=warehouse_id)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __contains__(self, code: str) -> bool:
+        return self.row_of(code) >= 0
+
+    # ==== Row access ====
+
+    def row_of(self, code: str) -> int:
+        """Row of a code, -1 when absent"""
+        return self._row_by_code.get(code, -1)
+
+    def rows_for(self, location_codes: Iterable[str]) -> np.ndarray:
+        """Rows of many codes (int64, -1 where absent)"""
+        lookup = self._row_by_code.get
+        return np.fromiter((lookup(code, -1) for code in location_codes), dtype=np.int64)
+
+    def get(self, code: str) -> Optional[LocationView]:
+        row = self.row_of(code)
+        return None if row < 0 else LocationView(self, row)
+
+    def code_at(self, row: int) -> str:
+        return self.codes[row]
+
+    def codes_at(self, rows: np.ndarray) -> np.ndarray:
+        """Codes of a row array (object array)"""
+        return self.codes[rows]
+
+    def to_frame(self, rows: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """
+        Rows as a load_location_frame()-shaped DataFrame (all rows by default)
+
+        Used to copy a subset out of a shared snapshot into a private one.
+        """
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows, dtype=np.int64)
+        frame = {name: self.column(name, rows) for name in SNAPSHOT_COLUMNS}
+        return pd.DataFrame(frame, columns=list(SNAPSHOT_COLUMNS))
+
+    def value(self, name: str, row: int) -> Any:
+        """Python value of one cell (None for NULL)"""
+        if name in self._strings:
+            codes, categories = self._strings[name]
+            index = codes[row]
+            return None if index < 0 else categories[index]
+        if name in self._numbers:
+            number = self._numbers[name][row]
+            return None if np.isnan(number) else int(number)
+        if name in self._booleans:
+            flag = self._booleans[name][row]
+            return None if flag < 0 else bool(flag)
+        if name == 'code':
+            return self.code_at(row)
+        raise KeyError(name)
+
+    def column(self, name: str, rows: np.ndarray) -> np.ndarray:
+        """
+        Vectorized column values for a row array (-1 rows read as NULL)
+
+        Numeric columns come back as float64 (NaN = NULL); string, code and
+        boolean columns as object arrays (None = NULL).
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        missing = rows < 0
+        safe_rows = np.where(missing, 0, rows)
+
+        if name in self._numbers:
+            values = self._numbers[name][safe_rows] if len(self) else np.full(len(rows), np.nan)
+            values[missing] = np.nan
+            return values
+
+        result = np.full(len(rows), None, dtype=object)
+        present = ~missing
+        if name in self._strings:
+            codes, categories = self._strings[name]
+            indices = codes[rows[present]]
+            has_value = indices >= 0
+            selected = np.flatnonzero(present)[has_value]
+            result[selected] = categories[indices[has_value]]
+        elif name in self._booleans:
+            flags = self._booleans[name][rows[present]]
+            has_value = flags >= 0
+            result[np.flatnonzero(present)[has_value]] = flags[has_value].astype(bool)
+        elif name == 'code':
+            result[present] = self.codes_at(rows[present])
+        else:
+            raise KeyError(name)
+        return result
+
+    def rows_where(self, name: str, values: Iterable[str]) -> np.ndarray:
+        """Rows whose string column is one of values"""
+        codes, categories = self._strings[name]
+        wanted = np.flatnonzero(pd.Index(categories).isin(list(values)))
+        return np.flatnonzero(np.isin(codes, wanted))
+
+    # ==== Monitoring ====
+
+    def memory_bytes(self) -> int:
+        """Approximate resident size: arrays, category values, code strings and the code index"""
+        total = self.codes.nbytes + sys.getsizeof(self._row_by_code)
+        total += sum(sys.getsizeof(code) for code in self._row_by_code)
+        for codes, categories in self._strings.values():
+            total += codes.nbytes + categories.nbytes + sum(sys.getsizeof(value) for value in categories)
+        total += sum(values.nbytes for values in self._numbers.values())
+        total += sum(values.nbytes for values in self._booleans.values())
+        return total
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'warehouse_id': self.warehouse_id,
+            'locations': len(self),
+            'memory_bytes': self.memory_bytes(),
+        }
+
+
+
+class SelectedLocationSnapshot(LocationSnapshot):
+    """
+    Rows selected from a shared base snapshot, plus a small private delta
+
+    The selection is one flag per base row, so holding codes of a memory-mapped
+    warehouse snapshot copies none of its rows; only rows the base lacks
+    (placeholders for unknown codes) are stored privately. Rows below len(base)
+    address the base, rows from len(base) on address the delta.
+    Immutable: extend() returns a new snapshot.
+    """
+
+    def __init__(self, base: LocationSnapshot, selected: np.ndarray, delta: LocationSnapshot,
+                 warehouse_id: Optional[str] = None):
+        self.base = base
+        self.selected = selected
+        self.delta = delta
+        self.warehouse_id = warehouse_id if warehouse_id is not None else base.warehouse_id
+        self._offset = len(base)
+        self._size = int(selected.sum()) + len(delta)
+
+    @classmethod
+    def select(cls, base: LocationSnapshot, warehouse_id: Optional[str] = None) -> 'SelectedLocationSnapshot':
+        """Empty selection over a base snapshot"""
+        warehouse_id = warehouse_id if warehouse_id is not None else base.warehouse_id
+        return cls(base, np.zeros(len(base), dtype=bool), LocationSnapshot.empty(warehouse_id), warehouse_id)
+
+    def extend(self, base_rows: np.ndarray, delta_frame: Optional[pd.DataFrame] = None) -> 'SelectedLocationSnapshot':
+        """New snapshot also holding base_rows and the delta_frame rows (load_location_frame()-shaped)"""
+        selected = self.selected.copy()
+        selected[np.asarray(base_rows, dtype=np.int64)] = True
+
+        delta = self.delta
+        if delta_frame is not None and len(delta_frame):
+            frame = delta_frame.reset_index(drop=True)
+            if len(delta):
+                frame = pd.concat([delta.to_frame(), frame], ignore_index=True)
+            delta = LocationSnapshot.from_frame(frame, warehouse_id=self.warehouse_id)
+        return SelectedLocationSnapshot(self.base, selected, delta, self.warehouse_id)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _all_rows(self) -> np.ndarray:
+        return np.concatenate([np.flatnonzero(self.selected), np.arange(len(self.delta)) + self._offset])
+
+    # ==== Row access ====
+
+    def row_of(self, code: str) -> int:
+        return int(self.rows_for([code])[0])
+
+    def rows_for(self, location_codes: Iterable[str]) -> np.ndarray:
+        codes = list(location_codes)
+        rows = self.base.rows_for(codes)
+        if self._offset:
+            rows = np.where((rows >= 0) & self.selected[np.maximum(rows, 0)], rows, -1)
+
+        absent = np.flatnonzero(rows < 0)
+        if len(absent) and len(self.delta):
+            delta_rows = self.delta.rows_for([codes[position] for position in absent])
+            rows[absent] = np.where(delta_rows >= 0, delta_rows + self._offset, -1)
+        return rows
+
+    def code_at(self, row: int) -> str:
+        return self.base.code_at(row) if row < self._offset else self.delta.code_at(row - self._offset)
+
+    def codes_at(self, rows: np.ndarray) -> np.ndarray:
+        rows = np.asarray(rows, dtype=np.int64)
+        in_delta = rows >= self._offset
+        result = np.empty(len(rows), dtype=object)
+        result[~in_delta] = self.base.codes_at(rows[~in_delta])
+        result[in_delta] = self.delta.codes_at(rows[in_delta] - self._offset)
+        return result
+
+    def to_frame(self, rows: Optional[np.ndarray] = None) -> pd.DataFrame:
+        return super().to_frame(self._all_rows() if rows is None else rows)
+
+    def value(self, name: str, row: int) -> Any:
+        return self.base.value(name, row) if row < self._offset else self.delta.value(name, row - self._offset)
+
+    def column(self, name: str, rows: np.ndarray) -> np.ndarray:
+        rows = np.asarray(rows, dtype=np.int64)
+        in_delta = rows >= self._offset
+        values = self.base.column(name, np.where(in_delta, -1, rows))
+        if in_delta.any():
+            values[in_delta] = self.delta.column(name, rows[in_delta] - self._offset)
+        return values
+
+    def rows_where(self, name: str, values: Iterable[str]) -> np.ndarray:
+        values = list(values)
+        base_rows = self.base.rows_where(name, values)
+        return np.concatenate([base_rows[self.selected[base_rows]],
+                               self.delta.rows_where(name, values) + self._offset])
+
+    # ==== Monitoring ====
+
+    def memory_bytes(self) -> int:
+        """Private bytes: selection flags, the delta and the base's private part"""
+        return self.selected.nbytes + self.delta.memory_bytes() + self.base.memory_bytes()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = super().get_stats()
+        stats.update({'base_rows': int(self.selected.sum()), 'delta_rows': len(self.delta)})
+        return stats
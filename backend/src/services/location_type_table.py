@@ -0,0 +1,177 @@
+"""
+LocationTypeTable: Merge-Based Location Type Assignment
+
+Location types used to be assigned with a per-row Python function over the
+inventory: an exact dict lookup, a prefix-normalized lookup, a scan of every
+database code (normalizing each one again) and a scan of every location
+pattern, repeated for each of the inventory's rows.
+
+This module does the same resolution set-wise:
+
+- the warehouse's active locations are loaded column-projected (code, type,
+  pattern) into a compact key table with one row per (key, tier):
+      tier 0  exact code                         (probed with the stripped inventory code)
+      tier 1  prefix-normalized code             (probed with the normalized inventory code)
+      tier 2  prefix-normalized code, reversed   (probed with the stripped inventory code)
+- the inventory's unique codes are stripped and normalized once, and all
+  probes are resolved with a single merge against the key table; the lowest
+  tier wins
+- location wildcard patterns are compiled once and tried only on the unique
+  codes the merge did not resolve
+
+Results match the per-row lookup: blank codes are 'MISSING', unresolved ones
+'UNKNOWN' (or None with unknown=None, so callers can classify the misses).
+
+Usage:
+    table = load_location_type_table(db.session, 'USER_TESTF')
+    location_types = table.assign(inventory_df['location'])   # np.ndarray aligned with the rows
+"""
+
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from location_normalizer import normalize_series
+
+TIER_EXACT, TIER_NORMALIZED, TIER_REVERSE = 0, 1, 2
+
+
+class LocationTypeTable:
+    """
+    Code -> location type keys of one warehouse, resolved by merge
+
+    Built from the warehouse's locations in load order (for duplicate codes the
+    last type wins, as with a dict built in that order).
+    """
+
+    def __init__(self, codes: Iterable[str], location_types: Iterable[str],
+                 patterns: Optional[Iterable[Optional[str]]] = None):
+        frame = pd.DataFrame({'code': list(codes), 'location_type': list(location_types)}, dtype=object)
+        frame['pattern'] = list(patterns) if patterns is not None else None
+        frame = frame.dropna(subset=['code']).reset_index(drop=True)
+        frame['normalized'] = normalize_series(frame['code'], 'warehouse_prefix').to_numpy()
+
+        # Tier 0: code -> type (last wins)
+        exact = frame.drop_duplicates('code', keep='last')
+        # Tier 1: normalized -> type for codes the normalization changes (last wins)
+        changed = frame[frame['normalized'] != frame['code']]
+        normalized = changed.drop_duplicates('normalized', keep='last')
+        # Tier 2: first code (in load order) whose normalized form equals the raw code
+        first_codes = frame.drop_duplicates('code', keep='first')
+        reverse = first_codes.drop_duplicates('normalized', keep='first')
+        reverse_types = exact.set_index('code')['location_type'].reindex(reverse['code']).to_numpy()
+
+        self.keys = pd.DataFrame({
+            'key': np.concatenate([exact['code'].to_numpy(), normalized['normalized'].to_numpy(),
+                                   reverse['normalized'].to_numpy()]),
+            'tier': np.repeat(np.array([TIER_EXACT, TIER_NORMALIZED, TIER_REVERSE], dtype=np.int8),
+                              [len(exact), len(normalized), len(reverse)]),
+            'location_type': np.concatenate([exact['location_type'].to_numpy(), normalized['location_type'].to_numpy(),
+                                             reverse_types]),
+        })
+
+        # Location patterns in load order (first match wins)
+        self.patterns = []
+        for pattern, location_type in zip(frame['pattern'], frame['location_type']):
+            if pattern:
+                try:
+                    self.patterns.append((re.compile(f"^{pattern.replace('*', '.*')}$", re.IGNORECASE), location_type))
+                except re.error:
+                    continue
+
+        self.location_count = len(frame)
+        self.last_stats = {}
+
+    def __len__(self) -> int:
+        return self.location_count
+
+    def resolve(self, location_codes: Iterable[Any], unknown: Optional[str] = 'UNKNOWN') -> Dict[Any, Optional[str]]:
+        """Location type of each distinct code (blank -> 'MISSING', unresolved -> unknown)"""
+        uniques = pd.unique(pd.Series(list(location_codes), dtype=object).dropna())
+        types = self._resolve_unique(uniques, unknown)
+        return dict(zip(uniques, types))
+
+    def assign(self, locations: pd.Series, unknown: Optional[str] = 'UNKNOWN') -> np.ndarray:
+        """Location type per row of an inventory location column (object array, same length)"""
+        value_ids, uniques = pd.factorize(locations)
+        types = self._resolve_unique(np.asarray(uniques, dtype=object), unknown)
+        # Missing values (-1) take the trailing 'MISSING'
+        return np.append(types, 'MISSING').astype(object)[value_ids]
+
+    def _resolve_unique(self, uniques: np.ndarray, unknown: Optional[str]) -> np.ndarray:
+        start = time.perf_counter()
+        stripped = pd.Series(uniques, dtype=object).astype(str).str.strip()
+        blank = (stripped == '').to_numpy()
+        normalized = normalize_series(stripped, 'warehouse_prefix')
+
+        # PERFORMANCE: Every tier of every unique code probed with one merge
+        count = len(uniques)
+        positions = np.arange(count)
+        probes = pd.DataFrame({
+            'position': np.tile(positions, 3),
+            'key': np.concatenate([stripped.to_numpy(), normalized.to_numpy(), stripped.to_numpy()]),
+            'tier': np.repeat(np.array([TIER_EXACT, TIER_NORMALIZED, TIER_REVERSE], dtype=np.int8), count),
+        })
+        hits = probes.merge(self.keys, on=['key', 'tier'], how='inner', sort=False)
+        best = hits.sort_values(['position', 'tier'], kind='stable').drop_duplicates('position')
+
+        types = np.full(count, None, dtype=object)
+        types[best['position'].to_numpy()] = best['location_type'].to_numpy()
+        types[blank] = 'MISSING'
+
+        # Pattern fallback only for unresolved codes
+        misses = np.flatnonzero(pd.isna(types) & ~blank)
+        pattern_hits = 0
+        if self.patterns:
+            for position in misses:
+                candidates = (stripped.iat[position], normalized.iat[position])
+                for regex, location_type in self.patterns:
+                    if any(regex.match(candidate) for candidate in candidates):
+                        types[position] = location_type
+                        pattern_hits += 1
+                        break
+
+        unresolved = pd.isna(types) & ~blank
+        types[unresolved] = unknown
+        self.last_stats = {
+            'unique_codes': count,
+            'merged': int(len(best)),
+            'pattern_matches': pattern_hits,
+            'unresolved': int(unresolved.sum()),
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+        }
+        return types
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'locations': self.location_count,
+            'keys': len(self.keys),
+            'patterns': len(self.patterns),
+            'last_assignment': dict(self.last_stats),
+        }
+
+
+def load_location_type_table(db_session, warehouse_id: Optional[str] = None) -> LocationTypeTable:
+    """
+    Column-projected load of active locations (code, type, pattern) into a LocationTypeTable
+
+    Without a warehouse_id, at most 1000 active locations are loaded (same
+    safety limit as RuleEngine._get_warehouse_locations).
+    """
+    from sqlalchemy import or_, select
+    from models import Location
+
+    table = Location.__table__
+    query = select(table.c.code, table.c.location_type, table.c.pattern).where(
+        or_(table.c.is_active == True, table.c.is_active.is_(None))  # noqa: E712
+    )
+    if warehouse_id:
+        query = query.where(table.c.warehouse_id == str(warehouse_id))
+    else:
+        query = query.limit(1000)
+
+    rows = db_session.execute(query).fetchall()
+    return LocationTypeTable([row[0] for row in rows], [row[1] for row in rows], [row[2] for row in rows])
@@ -0,0 +1,310 @@
+"""
+Shared Location Snapshots: One Memory-Mapped Copy Per Machine
+
+Every gunicorn worker used to load and keep its own copy of a warehouse's
+locations. This module serializes a warehouse's compact LocationSnapshot
+(services/location_snapshot.py) to a versioned file on local disk that all
+workers map read-only, so resident memory no longer grows with worker count.
+
+File layout (root = config.get_location_snapshot_folder()):
+
+    <root>/<database key>/<warehouse key>/<version key>.npy   NumPy structured array,
+                                                             one row per location, sorted by code
+    <root>/<database key>/<warehouse key>/<version key>.json  manifest: category values, row count
+    <root>/generations/<warehouse key>                        location version counter (one byte per bump)
+    <root>/generations/all                                    counter over every warehouse (cross-warehouse indexes)
+
+- Rows are sorted by code, so lookups are a vectorized searchsorted over the
+  mapped fixed-width code field (no per-worker code -> row dict)
+- Files are written under temporary names and published with os.replace();
+  the manifest goes last, so a visible manifest always has its data file
+- A new version replaces the warehouse's old files; workers still mapping
+  them keep reading the unlinked inode until they move to the new version
+- invalidate() removes a warehouse's files
+- bump_generation() advances a warehouse's machine-wide location version
+  counter; get_location_version() folds it into the version, so edits that
+  keep the table fingerprint unchanged (a type or zone change) still move
+  every worker to a new version. Bumps append one byte (O_APPEND is atomic
+  across processes), and the counter is the file size: one stat() per read
+
+Usage:
+    store = get_shared_snapshot_store()
+    snapshot = store.acquire(warehouse_id, location_version, build=lambda: LocationSnapshot.from_frame(...),
+                             database_key=database_key_for(db.session))
+    rows = snapshot.rows_for(codes)
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import numpy as np
+
+from config import get_location_snapshot_folder
+from services.location_snapshot import (
+    BOOLEAN_COLUMNS, NUMERIC_COLUMNS, STRING_COLUMNS, LocationSnapshot
+)
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 1
+
+
+def _key(value: str) -> str:
+    return hashlib.sha1(value.encode('utf-8')).hexdigest()[:16]
+
+
+def database_key_for(db_session) -> Optional[str]:
+    """
+    Identity of the database behind a session (password hidden)
+
+    None for in-memory SQLite, whose data is private to one process.
+    """
+    try:
+        url = db_session.get_bind().url
+    except Exception:
+        return None
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return None
+    return url.render_as_string(hide_password=True)
+
+
+def _encode_codes(codes: Iterable[str]) -> np.ndarray:
+    return np.array([str(code).encode('utf-8') for code in codes], dtype=bytes)
+
+
+def write_snapshot_file(snapshot: LocationSnapshot, data_path: str, manifest_path: str,
+                        version: Optional[str] = None) -> None:
+    """Serialize a snapshot (sorted by code) and publish it atomically"""
+    size = len(snapshot)
+    encoded = _encode_codes(snapshot.codes_at(np.arange(size))) if size else np.empty(0, dtype='S1')
+    order = np.argsort(encoded, kind='stable')
+
+    fields = [('code', encoded.dtype if size else 'S1')]
+    fields += [(name, np.int32) for name in STRING_COLUMNS]
+    fields += [(name, np.float64) for name in NUMERIC_COLUMNS]
+    fields += [(name, np.int8) for name in BOOLEAN_COLUMNS]
+    table = np.empty(size, dtype=fields)
+    table['code'] = encoded[order]
+    for name in STRING_COLUMNS:
+        table[name] = snapshot._strings[name][0][order]
+    for name in NUMERIC_COLUMNS:
+        table[name] = snapshot._numbers[name][order]
+    for name in BOOLEAN_COLUMNS:
+        table[name] = snapshot._booleans[name][order]
+
+    manifest = {
+        'format': SNAPSHOT_FORMAT,
+        'warehouse_id': snapshot.warehouse_id,
+        'version': version,
+        'rows': size,
+        'categories': {name: snapshot._strings[name][1].tolist() for name in STRING_COLUMNS},
+    }
+
+    suffix = f".tmp-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    with open(data_path + suffix, 'wb') as data_file:
+        np.save(data_file, table, allow_pickle=False)
+    with open(manifest_path + suffix, 'w') as manifest_file:
+        json.dump(manifest, manifest_file)
+
+    os.replace(data_path + suffix, data_path)
+    os.replace(manifest_path + suffix, manifest_path)
+
+
+class MappedLocationSnapshot(LocationSnapshot):
+    """
+    LocationSnapshot over a memory-mapped snapshot file
+
+    Column arrays are read-only views into the mapping (shared page cache);
+    only category values are private to the worker.
+    """
+
+    def __init__(self, data_path: str, manifest_path: str):
+        with open(manifest_path) as manifest_file:
+            manifest = json.load(manifest_file)
+        if manifest.get('format') != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported location snapshot format: {manifest.get('format')}")
+
+        table = np.load(data_path, mmap_mode='r', allow_pickle=False)
+        if len(table) != manifest['rows']:
+            raise ValueError(f"Location snapshot {data_path} is incomplete")
+
+        self.data_path = data_path
+        self.manifest_path = manifest_path
+        self.version = manifest.get('version')
+        self.codes = table['code']
+        self.warehouse_id = manifest.get('warehouse_id')
+        self._table = table
+        self._strings = {name: (table[name], np.asarray(manifest['categories'][name], dtype=object))
+                         for name in STRING_COLUMNS}
+        self._numbers = {name: table[name] for name in NUMERIC_COLUMNS}
+        self._booleans = {name: table[name] for name in BOOLEAN_COLUMNS}
+        self._code_width = table.dtype['code'].itemsize
+
+    def row_of(self, code: str) -> int:
+        return int(self.rows_for([code])[0])
+
+    def rows_for(self, location_codes: Iterable[str]) -> np.ndarray:
+        """Rows of many codes (int64, -1 where absent) by binary search over the sorted codes"""
+        codes = list(location_codes)
+        if not codes or not len(self):
+            return np.full(len(codes), -1, dtype=np.int64)
+
+        encoded = [str(code).encode('utf-8') for code in codes]
+        fits = np.fromiter((len(value) <= self._code_width for value in encoded), dtype=bool, count=len(encoded))
+        queries = np.array([value if fit else b'' for value, fit in zip(encoded, fits)], dtype=self.codes.dtype)
+
+        positions = np.minimum(np.searchsorted(self.codes, queries), len(self) - 1)
+        found = fits & (self.codes[positions] == queries)
+        return np.where(found, positions, -1).astype(np.int64)
+
+    def code_at(self, row: int) -> str:
+        return self.codes[row].decode('utf-8')
+
+    def codes_at(self, rows: np.ndarray) -> np.ndarray:
+        return np.array([value.decode('utf-8') for value in self.codes[rows]], dtype=object)
+
+    def memory_bytes(self) -> int:
+        """Private (per-worker) bytes; the mapped table is shared page cache"""
+        return sum(categories.nbytes for _, categories in self._strings.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = super().get_stats()
+        stats['mapped_bytes'] = int(self._table.nbytes)
+        return stats
+
+
+class SharedSnapshotStore:
+    """
+    Per-machine store of memory-mapped location snapshots
+
+    acquire() returns the mapping for (database, warehouse, version): the
+    worker's current mapping when still published, else the published file,
+    else a freshly built and published one.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or get_location_snapshot_folder()
+        self._mapped: Dict[tuple, MappedLocationSnapshot] = {}  # (database, warehouse) -> mapping
+        self._lock = threading.Lock()
+        self._local_generations: Dict[str, int] = {}  # Fallback when the counter file is unwritable
+        self._stats = {'hits': 0, 'maps': 0, 'builds': 0, 'invalidations': 0, 'bumps': 0, 'errors': 0}
+
+    def _paths(self, database_key: str, warehouse_id: str, version: str) -> tuple:
+        folder = os.path.join(self.root, _key(database_key), _key(str(warehouse_id)))
+        base = os.path.join(folder, _key(str(version)))
+        return folder, base + '.npy', base + '.json'
+
+    def acquire(self, warehouse_id: str, version: Optional[str], build: Callable[[], LocationSnapshot],
+                database_key: Optional[str]) -> Optional[MappedLocationSnapshot]:
+        """Mapped snapshot for a warehouse version (None when sharing is unavailable)"""
+        if not version or not database_key:
+            return None
+
+        folder, data_path, manifest_path = self._paths(database_key, warehouse_id, version)
+        cache_key = (database_key, str(warehouse_id))
+        try:
+            with self._lock:
+                current = self._mapped.get(cache_key)
+                if current is not None and current.manifest_path == manifest_path and os.path.exists(manifest_path):
+                    self._stats['hits'] += 1
+                    return current
+
+                if os.path.exists(manifest_path):
+                    self._stats['maps'] += 1
+                else:
+                    os.makedirs(folder, exist_ok=True)
+                    write_snapshot_file(build(), data_path, manifest_path, version=version)
+                    self._remove_other_versions(folder, data_path, manifest_path)
+                    self._stats['builds'] += 1
+                    print(f"[LOCATION_SNAPSHOT] Published snapshot for warehouse {warehouse_id} (version {version})")
+
+                mapped = MappedLocationSnapshot(data_path, manifest_path)
+                self._mapped[cache_key] = mapped
+                return mapped
+        except Exception as e:
+            self._stats['errors'] += 1
+            logger.warning(f"[LOCATION_SNAPSHOT] Shared snapshot unavailable for {warehouse_id}: {e}")
+            return None
+
+    def invalidate(self, warehouse_id: str) -> None:
+        """Remove a warehouse's published snapshots (every database key)"""
+        with self._lock:
+            warehouse_key = _key(str(warehouse_id))
+            for path in sorted(glob.glob(os.path.join(self.root, '*', warehouse_key, '*'))):
+                # Manifests (.json) sort before data files (.npy) and are removed first
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._mapped = {key: value for key, value in self._mapped.items() if key[1] != str(warehouse_id)}
+            self._stats['invalidations'] += 1
+
+    def _generation_path(self, warehouse_id: Optional[str]) -> str:
+        return os.path.join(self.root, 'generations', 'all' if warehouse_id is None else _key(str(warehouse_id)))
+
+    def generation(self, warehouse_id: Optional[str]) -> int:
+        """Machine-wide location version counter of a warehouse, or of all warehouses for None (0 until first bumped)"""
+        try:
+            counter = os.stat(self._generation_path(warehouse_id)).st_size
+        except OSError:
+            counter = 0
+        return counter + self._local_generations.get(str(warehouse_id), 0)
+
+    def bump_generation(self, warehouse_id: str) -> int:
+        """Advance a warehouse's location version counter, and the all-warehouses one (after committing location writes)"""
+        for counter_id in (warehouse_id, None):
+            path = self._generation_path(counter_id)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                handle = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+                try:
+                    os.write(handle, b'.')
+                finally:
+                    os.close(handle)
+            except OSError as e:
+                # Unwritable folder: the bump is only visible to this worker
+                logger.warning(f"[LOCATION_SNAPSHOT] Version counter unavailable for {counter_id}: {e}")
+                with self._lock:
+                    self._local_generations[str(counter_id)] = self._local_generations.get(str(counter_id), 0) + 1
+                    self._stats['errors'] += 1
+        with self._lock:
+            self._stats['bumps'] += 1
+        return self.generation(warehouse_id)
+
+    @staticmethod
+    def _remove_other_versions(folder: str, data_path: str, manifest_path: str) -> None:
+        for path in glob.glob(os.path.join(folder, '*')):
+            if path not in (data_path, manifest_path) and '.tmp-' not in path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'root': self.root,
+                'mapped_warehouses': len(self._mapped),
+                'mapped_bytes': sum(int(mapped._table.nbytes) for mapped in self._mapped.values()),
+                **self._stats,
+            }
+
+
+# Global instance
+_shared_snapshot_store = SharedSnapshotStore()
+
+
+def get_shared_snapshot_store() -> SharedSnapshotStore:
+    """Get the process-wide shared snapshot store"""
+    return _shared_snapshot_store
+
+
+def get_shared_snapshot_stats() -> Dict[str, Any]:
+    """Get shared snapshot store statistics (for the admin cache-stats endpoint)"""
+    return _shared_snapshot_store.get_stats()
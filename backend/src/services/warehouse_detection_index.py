@@ -0,0 +1,288 @@
+"""
+WarehouseDetectionIndex: Inverted Location-Code Index for Warehouse Auto-Detection
+
+Warehouse auto-detection used to score every candidate warehouse separately
+(a batch location lookup per warehouse, or one variant IN (...) aggregate over
+every tenant's locations), so detection time grew with the total location
+count of all warehouses.
+
+This module keeps one compact, process-wide inverted index instead:
+
+- canonical location code -> warehouses holding an active location with it
+- format signature (canonical code shape, e.g. "99-99-999A") -> warehouses
+
+Both are stored as CSR posting lists (int32 warehouse ordinals) behind a hash
+index of the distinct keys; distinct canonical codes are shared by every
+warehouse using them. Scoring an inventory is a hash lookup of its unique
+codes plus one bincount over the gathered postings, so it costs milliseconds
+regardless of how many warehouses exist.
+
+The index is versioned by a one-query fingerprint of the Location table and
+the all-warehouses location version counter (bump_location_version), checked
+at most every revalidate_seconds.
+
+Usage:
+    index = get_warehouse_detection_index(db.session)
+    scores = index.score(canonical_codes, candidates=['USER_TESTF', 'USER_MARCOS9'])
+    best = scores[0] if scores else None   # {'warehouse_id', 'matches', 'coverage', ...}
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from location_normalizer import normalize_series
+
+logger = logging.getLogger(__name__)
+
+
+def format_signatures(canonical_codes: Iterable[str]) -> pd.Series:
+    """Shape of each canonical code: digits -> 9, letters -> A (e.g. 01-02-003B -> 99-99-999A)"""
+    codes = pd.Series(list(canonical_codes), dtype=object).astype(str)
+    return codes.str.replace(r'\d', '9', regex=True).str.replace(r'[A-Za-z]', 'A', regex=True)
+
+
+class _Postings:
+    """Key -> warehouse ordinals (CSR: one offsets array, one int32 postings array)"""
+
+    def __init__(self, keys: pd.Series, warehouse_ordinals: np.ndarray):
+        key_ordinals, values = pd.factorize(keys)
+        order = np.argsort(key_ordinals, kind='stable')
+        counts = np.bincount(key_ordinals, minlength=len(values))
+
+        self.keys = pd.Index(values)
+        self.offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        self.postings = warehouse_ordinals[order].astype(np.int32)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def gather(self, keys: Iterable[str], weights: Optional[np.ndarray] = None) -> tuple:
+        """(warehouse ordinals, per-ordinal weights) of every posting of the given keys"""
+        positions = self.keys.get_indexer(list(keys))
+        found = positions >= 0
+        positions = positions[found]
+        starts = self.offsets[positions]
+        lengths = self.offsets[positions + 1] - starts
+        if not lengths.sum():
+            return np.empty(0, dtype=np.int32), np.empty(0)
+
+        # Vectorized concatenation of the posting ranges
+        run_starts = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        ordinals = self.postings[run_starts + np.arange(lengths.sum())]
+        key_weights = np.ones(len(positions)) if weights is None else np.asarray(weights, dtype=np.float64)[found]
+        return ordinals, np.repeat(key_weights, lengths)
+
+    def memory_bytes(self) -> int:
+        return int(self.offsets.nbytes + self.postings.nbytes + self.keys.memory_usage(deep=True))
+
+
+class WarehouseDetectionIndex:
+    """
+    Inverted index from canonical codes and format signatures to warehouses
+
+    Built from (warehouse_id, canonical_code) pairs of active locations.
+    """
+
+    def __init__(self, warehouse_ids: Iterable[str], canonical_codes: Iterable[str]):
+        start = time.perf_counter()
+        pairs = pd.DataFrame({'warehouse_id': list(warehouse_ids), 'code': list(canonical_codes)}, dtype=object)
+        pairs = pairs.dropna().drop_duplicates(ignore_index=True)
+
+        warehouse_ordinals, warehouses = pd.factorize(pairs['warehouse_id'])
+        self.warehouses = np.asarray(warehouses, dtype=object)
+        self.location_counts = np.bincount(warehouse_ordinals, minlength=len(self.warehouses))
+        self._codes = _Postings(pairs['code'], warehouse_ordinals)
+
+        signatures = pd.DataFrame({'signature': format_signatures(pairs['code']), 'warehouse': warehouse_ordinals})
+        signatures = signatures.drop_duplicates(ignore_index=True)
+        self._signatures = _Postings(signatures['signature'], signatures['warehouse'].to_numpy())
+
+        self._warehouse_ordinal = {warehouse_id: ordinal for ordinal, warehouse_id in enumerate(self.warehouses)}
+        self.build_ms = (time.perf_counter() - start) * 1000
+
+    def __len__(self) -> int:
+        return int(self.location_counts.sum())
+
+    @property
+    def warehouse_ids(self) -> List[str]:
+        return self.warehouses.tolist()
+
+    def score(self, canonical_codes: Iterable[str], candidates: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Score warehouses against an inventory's canonical codes
+
+        Pass one canonical code per unique inventory location (two locations
+        normalizing to the same code count twice, as in per-location validation).
+        Returns one entry per known candidate warehouse (without candidates: per
+        warehouse with at least one matching code or format), best first
+        (matches, then density):
+            matches          inventory locations present in the warehouse
+            coverage         matches / inventory locations (0-1)
+            density          matches / warehouse locations (0-1)
+            format_coverage  share of inventory locations whose format the warehouse uses (0-1)
+        """
+        counts = pd.Series(list(canonical_codes), dtype=object).dropna().value_counts(sort=False)
+        total = int(counts.sum())
+        size = len(self.warehouses)
+        if not total or not size:
+            return []
+
+        ordinals, weights = self._codes.gather(counts.index, counts.to_numpy())
+        matches = np.bincount(ordinals, weights=weights, minlength=size).astype(np.int64)
+
+        signature_counts = counts.groupby(format_signatures(counts.index).to_numpy()).sum()
+        ordinals, weights = self._signatures.gather(signature_counts.index, signature_counts.to_numpy())
+        format_matches = np.bincount(ordinals, weights=weights, minlength=size)
+
+        if candidates is None:
+            selected = np.flatnonzero((matches > 0) | (format_matches > 0))
+        else:
+            selected = np.array([self._warehouse_ordinal[warehouse_id] for warehouse_id in dict.fromkeys(candidates)
+                                 if warehouse_id in self._warehouse_ordinal], dtype=np.int64)
+
+        density = matches[selected] / np.maximum(self.location_counts[selected], 1)
+        ranking = selected[np.lexsort((-density, -matches[selected]))]
+        return [{
+            'warehouse_id': self.warehouses[ordinal],
+            'matches': int(matches[ordinal]),
+            'total_locations': int(self.location_counts[ordinal]),
+            'coverage': matches[ordinal] / total,
+            'density': matches[ordinal] / max(int(self.location_counts[ordinal]), 1),
+            'format_coverage': format_matches[ordinal] / total,
+        } for ordinal in ranking]
+
+    def memory_bytes(self) -> int:
+        return int(self._codes.memory_bytes() + self._signatures.memory_bytes() +
+                   self.location_counts.nbytes + sum(len(str(warehouse)) + 49 for warehouse in self.warehouses))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'warehouses': len(self.warehouses),
+            'locations': len(self),
+            'distinct_codes': len(self._codes),
+            'format_signatures': len(self._signatures),
+            'memory_mb': round(self.memory_bytes() / 1024 / 1024, 2),
+            'build_ms': round(self.build_ms, 2),
+        }
+
+
+def build_detection_index(db_session) -> WarehouseDetectionIndex:
+    """
+    Build the index from one column-projected scan of active locations
+
+    Uses the persisted canonical_code; rows not yet backfilled are normalized here.
+    """
+    from sqlalchemy import or_, select
+    from models import Location
+
+    table = Location.__table__
+    rows = db_session.execute(
+        select(table.c.warehouse_id, table.c.canonical_code, table.c.code).where(
+            or_(table.c.is_active == True, table.c.is_active.is_(None))  # noqa: E712
+        )
+    ).fetchall()
+
+    frame = pd.DataFrame.from_records(rows, columns=['warehouse_id', 'canonical_code', 'code'])
+    missing = frame['canonical_code'].isna().to_numpy()
+    if missing.any():
+        frame.loc[missing, 'canonical_code'] = normalize_series(frame.loc[missing, 'code'], 'canonical').to_numpy()
+    return WarehouseDetectionIndex(frame['warehouse_id'], frame['canonical_code'])
+
+
+def get_detection_index_version(db_session) -> Optional[str]:
+    """Fingerprint of every warehouse's locations (count, max id, active count) plus the all-warehouses counter"""
+    try:
+        from sqlalchemy import case, func
+        from models import Location
+        from services.shared_location_snapshot import get_shared_snapshot_store
+
+        row = db_session.query(
+            func.count(Location.id), func.max(Location.id),
+            func.sum(case((Location.is_active == False, 1), else_=0))  # noqa: E712
+        ).one()
+        fingerprint = ':'.join('' if value is None else str(value) for value in row)
+        return f"{fingerprint}:g{get_shared_snapshot_store().generation(None)}"
+    except Exception as e:
+        logger.debug(f"Detection index version lookup failed: {e}")
+        return None
+
+
+class DetectionIndexCache:
+    """
+    Holds the current detection index, rebuilt when the version changes
+
+    The version is re-checked at most every revalidate_seconds, so several
+    detections in a burst cost a single version query.
+    """
+
+    def __init__(self, revalidate_seconds: float = 5.0):
+        self.revalidate_seconds = revalidate_seconds
+        self._entry = None  # (version, index, validated_at)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'rebuilds': 0, 'builds': 0, 'total_build_ms': 0.0}
+
+    def get(self, db_session, get_version: Optional[Callable[[], Optional[str]]] = None,
+            build: Optional[Callable[[], WarehouseDetectionIndex]] = None) -> WarehouseDetectionIndex:
+        """Current index (built on first use or version change)"""
+        get_version = get_version or (lambda: get_detection_index_version(db_session))
+        build = build or (lambda: build_detection_index(db_session))
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entry
+            if entry is not None and now - entry[2] < self.revalidate_seconds:
+                self._stats['hits'] += 1
+                return entry[1]
+
+        version = get_version()
+        with self._lock:
+            entry = self._entry
+            if entry is not None and version is not None and entry[0] == version:
+                self._entry = (version, entry[1], now)
+                self._stats['hits'] += 1
+                return entry[1]
+            self._stats['rebuilds' if entry is not None else 'misses'] += 1
+
+        # Build outside the lock (scans the Location table)
+        index = build()
+        with self._lock:
+            self._stats['builds'] += 1
+            self._stats['total_build_ms'] += index.build_ms
+            self._entry = (version, index, now)
+
+        print(f"[WAREHOUSE_INDEX] Built detection index: {len(index.warehouses)} warehouses, "
+              f"{len(index):,} locations in {index.build_ms:.1f}ms")
+        return index
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entry = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entry = self._entry
+            lookups = self._stats['hits'] + self._stats['misses'] + self._stats['rebuilds']
+            return {
+                'hit_rate': round(self._stats['hits'] / lookups, 3) if lookups else 0.0,
+                **{key: round(value, 2) if isinstance(value, float) else value for key, value in self._stats.items()},
+                'index': entry[1].get_stats() if entry is not None else None,
+            }
+
+
+# Global instance
+_detection_index_cache = DetectionIndexCache()
+
+
+def get_warehouse_detection_index(db_session) -> WarehouseDetectionIndex:
+    """Get the process-wide warehouse detection index for the current Location table"""
+    return _detection_index_cache.get(db_session)
+
+
+def get_detection_index_stats() -> Dict[str, Any]:
+    """Detection index statistics (for the admin cache-stats endpoint)"""
+    return _detection_index_cache.get_stats()
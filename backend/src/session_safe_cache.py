@@ -10,13 +10,32 @@ Key Features:
 - Web request context awareness
 - Automatic cache invalidation strategies
 - Performance monitoring and debugging
+
+Cache tiers:
+- Memory tier: per-warehouse OrderedDict LRUs plus one global recency order,
+  so lookups, promotion and eviction are O(1). Entries are keyed by
+  (warehouse_id, code); a warehouse-scoped lookup never returns another
+  warehouse's location. TTL expiry is lazy (checked on lookup), and each
+  warehouse has a byte budget next to the global entry limit
+- Shared tier (optional, config.get_session_cache_shared_path()): one SQLite
+  file per machine, so a location resolved by one worker is a hit for the
+  others. Rows are scoped by database, expire with the same TTL and are
+  promoted into the memory tier on hit
 """
 
+import json
 import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
 from typing import Dict, Any, Optional, List, Union
 from datetime import datetime, timedelta
 from dataclasses import dataclass, asdict
 from flask import g
+from config import get_session_cache_shared_path
 from session_manager import RequestScopedSessionManager, get_session
 
 logger = logging.getLogger(__name__)
@@ -46,6 +65,24 @@ class CachedLocationData:
         """Convert to dictionary for JSON serialization"""
         return asdict(self)
     
+    def to_json(self) -> str:
+        """Serialize for the shared tier (metadata excluded)"""
+        data = self.to_dict()
+        data.pop('cached_at')
+        data.pop('cache_hits')
+        return json.dumps(data)
+    
+    @classmethod
+    def from_json(cls, payload: str, cached_at: datetime) -> 'CachedLocationData':
+        """Rebuild cached data read from the shared tier"""
+        return cls(**json.loads(payload), cached_at=cached_at, cache_hits=0)
+    
+    def estimated_bytes(self) -> int:
+        """Approximate resident size of the entry (object, field values, key)"""
+        return sys.getsizeof(self) + sys.getsizeof(self.__dict__) + sum(
+            sys.getsizeof(value) for value in self.__dict__.values()
+        ) + sys.getsizeof(self.code)
+    
     @classmethod
     def from_location(cls, location) -> 'CachedLocationData':
         """Create cached data from a Location object"""
@@ -62,6 +99,115 @@ class CachedLocationData:
             cache_hits=0
         )
 
+class SharedLocationTier:
+    """
+    Machine-wide second cache tier in a local SQLite file
+
+    Rows are keyed by (database key, warehouse, code) and hold the cached
+    location data as JSON. Each thread uses its own connection; every error
+    is counted and treated as a miss, so the tier can never fail a lookup.
+    """
+    
+    PRUNE_EVERY = 512  # Writes between pruning passes
+    
+    def __init__(self, path: str, ttl_seconds: float, max_rows: int = 100_000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_rows = max_rows
+        self._local = threading.local()
+        self._writes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'expirations': 0, 'evictions': 0, 'errors': 0}
+    
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS location_cache ('
+                ' scope TEXT NOT NULL, warehouse_id TEXT NOT NULL, code TEXT NOT NULL,'
+                ' payload TEXT NOT NULL, cached_at REAL NOT NULL,'
+                ' PRIMARY KEY (scope, warehouse_id, code))'
+            )
+            self._local.connection = connection
+        return connection
+    
+    def get(self, scope: str, warehouse_id: Optional[str], code: str) -> Optional[CachedLocationData]:
+        try:
+            row = self._connection().execute(
+                'SELECT payload, cached_at FROM location_cache WHERE scope = ? AND warehouse_id = ? AND code = ?',
+                (scope, warehouse_id or '', code)
+            ).fetchone()
+        except sqlite3.Error as e:
+            self.stats['errors'] += 1
+            logger.debug(f"Shared location cache read failed: {e}")
+            return None
+        
+        if row is None:
+            self.stats['misses'] += 1
+            return None
+        if time.time() - row[1] > self.ttl_seconds:
+            self.stats['expirations'] += 1
+            self.stats['misses'] += 1
+            self.delete(scope, warehouse_id, code)
+            return None
+        
+        self.stats['hits'] += 1
+        return CachedLocationData.from_json(row[0], datetime.utcfromtimestamp(row[1]))
+    
+    def put(self, scope: str, warehouse_id: Optional[str], code: str, cached_data: CachedLocationData) -> None:
+        try:
+            connection = self._connection()
+            connection.execute(
+                'INSERT OR REPLACE INTO location_cache (scope, warehouse_id, code, payload, cached_at) VALUES (?, ?, ?, ?, ?)',
+                (scope, warehouse_id or '', code, cached_data.to_json(), time.time())
+            )
+            self.stats['writes'] += 1
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                self._prune(connection)
+        except sqlite3.Error as e:
+            self.stats['errors'] += 1
+            logger.debug(f"Shared location cache write failed: {e}")
+    
+    def delete(self, scope: Optional[str], warehouse_id: Optional[str], code: Optional[str] = None) -> None:
+        """Delete one entry, a warehouse's entries (code=None) or everything (warehouse_id=None too)"""
+        clauses, params = [], []
+        for column, value in (('scope', scope), ('warehouse_id', warehouse_id), ('code', code)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+        try:
+            self._connection().execute(f"DELETE FROM location_cache{where}", params)
+        except sqlite3.Error as e:
+            self.stats['errors'] += 1
+            logger.debug(f"Shared location cache delete failed: {e}")
+    
+    def _prune(self, connection: sqlite3.Connection) -> None:
+        """Drop expired rows, then the oldest rows beyond max_rows"""
+        expired = connection.execute('DELETE FROM location_cache WHERE cached_at < ?',
+                                     (time.time() - self.ttl_seconds,)).rowcount
+        overflow = connection.execute(
+            'DELETE FROM location_cache WHERE rowid IN (SELECT rowid FROM location_cache'
+            ' ORDER BY cached_at DESC LIMIT -1 OFFSET ?)', (self.max_rows,)
+        ).rowcount
+        self.stats['expirations'] += max(expired, 0)
+        self.stats['evictions'] += max(overflow, 0)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            'path': self.path,
+            'hit_rate_percent': round(self.stats['hits'] / lookups * 100, 2) if lookups else 0,
+            **self.stats,
+        }
+
+
 class SessionSafeLocationCache:
     """
     Session-safe caching system for Location objects.
@@ -70,13 +216,22 @@ class SessionSafeLocationCache:
     the "Instance not bound to a Session" errors that plague the current system.
     """
     
-    def __init__(self, max_cache_size: int = 1000, cache_ttl_hours: int = 24):
+    def __init__(self, max_cache_size: int = 1000, cache_ttl_hours: int = 24,
+                 max_warehouse_bytes: int = 4 * 1024 * 1024, shared_path: Optional[str] = None):
         self.max_cache_size = max_cache_size
+        self.max_warehouse_bytes = max_warehouse_bytes
         self.cache_ttl = timedelta(hours=cache_ttl_hours)
         
         # Cache structures (store data, not objects)
-        self.global_cache: Dict[str, CachedLocationData] = {}
-        self.warehouse_caches: Dict[str, Dict[str, CachedLocationData]] = {}
+        # warehouse_id (None = unscoped) -> OrderedDict(code -> data), least recently used first
+        self.warehouse_caches: Dict[Optional[str], OrderedDict] = {}
+        # PERFORMANCE: Global recency order, (warehouse_id, code) -> entry bytes; O(1) move/evict
+        self._lru: OrderedDict = OrderedDict()
+        self._warehouse_bytes: Dict[Optional[str], int] = {}
+        self._lock = threading.RLock()
+        
+        # Optional machine-wide tier shared by all workers
+        self.shared_tier = SharedLocationTier(shared_path, self.cache_ttl.total_seconds()) if shared_path else None
         
         # Cache metadata
         self.cache_stats = {
@@ -84,10 +239,12 @@ class SessionSafeLocationCache:
             'misses': 0,
             'reconstructions': 0,
             'evictions': 0,
+            'expirations': 0,
             'created_at': datetime.utcnow()
         }
         
-        logger.info(f"SessionSafeLocationCache initialized (max_size: {max_cache_size}, ttl: {cache_ttl_hours}h)")
+        logger.info(f"SessionSafeLocationCache initialized (max_size: {max_cache_size}, ttl: {cache_ttl_hours}h, "
+                    f"shared tier: {shared_path or 'disabled'})")
     
     def get_location(self, location_code: str, warehouse_id: str = None) -> Optional[Any]:
         """
@@ -100,16 +257,19 @@ class SessionSafeLocationCache:
         Returns:
             Location object bound to current session, or None if not cached
         """
-        # Try warehouse-specific cache first if warehouse_id provided
-        if warehouse_id and warehouse_id in self.warehouse_caches:
-            cached_data = self.warehouse_caches[warehouse_id].get(location_code)
-            if cached_data:
-                return self._reconstruct_location(cached_data, source='warehouse_cache')
+        cached_data = self._get_memory(location_code, warehouse_id)
+        source = 'memory_tier'
+        
+        if cached_data is None and self.shared_tier is not None:
+            scope = self._shared_scope()
+            if scope is not None:
+                cached_data = self.shared_tier.get(scope, warehouse_id, location_code)
+                if cached_data is not None:
+                    self._put_memory(location_code, cached_data, warehouse_id)
+                    source = 'shared_tier'
         
-        # Try global cache
-        cached_data = self.global_cache.get(location_code)
-        if cached_data:
-            return self._reconstruct_location(cached_data, source='global_cache')
+        if cached_data is not None:
+            return self._reconstruct_location(location_code, cached_data, warehouse_id, source=source)
         
         # Cache miss
         self.cache_stats['misses'] += 1
@@ -134,17 +294,12 @@ class SessionSafeLocationCache:
             # Convert Location object to cacheable data
             cached_data = CachedLocationData.from_location(location_obj)
             
-            # Store in appropriate cache
-            if warehouse_id:
-                if warehouse_id not in self.warehouse_caches:
-                    self.warehouse_caches[warehouse_id] = {}
-                self.warehouse_caches[warehouse_id][location_code] = cached_data
-            
-            # Always store in global cache as well
-            self.global_cache[location_code] = cached_data
+            self._put_memory(location_code, cached_data, warehouse_id)
             
-            # Perform cache maintenance if needed
-            self._maintain_cache_size()
+            if self.shared_tier is not None:
+                scope = self._shared_scope()
+                if scope is not None:
+                    self.shared_tier.put(scope, warehouse_id, location_code, cached_data)
             
             logger.debug(f"Cached location data: {location_code} (warehouse: {warehouse_id or 'global'})")
             return True
@@ -153,25 +308,94 @@ class SessionSafeLocationCache:
             logger.error(f"Failed to cache location {location_code}: {e}")
             return False
     
-    def _reconstruct_location(self, cached_data: CachedLocationData, source: str = 'unknown') -> Optional[Any]:
+    # ==== Memory tier (O(1) LRU) ====
+    
+    def _get_memory(self, location_code: str, warehouse_id: Optional[str]) -> Optional[CachedLocationData]:
+        with self._lock:
+            warehouse_cache = self.warehouse_caches.get(warehouse_id)
+            cached_data = warehouse_cache.get(location_code) if warehouse_cache else None
+            if cached_data is None:
+                return None
+            
+            # Lazy TTL expiry
+            if cached_data.cached_at and datetime.utcnow() - cached_data.cached_at > self.cache_ttl:
+                logger.debug(f"Cache data expired for location {cached_data.code}")
+                self._remove(warehouse_id, location_code)
+                self.cache_stats['expirations'] += 1
+                return None
+            
+            warehouse_cache.move_to_end(location_code)
+            self._lru.move_to_end((warehouse_id, location_code))
+            return cached_data
+    
+    def _put_memory(self, location_code: str, cached_data: CachedLocationData, warehouse_id: Optional[str]) -> None:
+        with self._lock:
+            self._remove(warehouse_id, location_code)
+            
+            entry_bytes = cached_data.estimated_bytes()
+            self.warehouse_caches.setdefault(warehouse_id, OrderedDict())[location_code] = cached_data
+            self._lru[(warehouse_id, location_code)] = entry_bytes
+            self._warehouse_bytes[warehouse_id] = self._warehouse_bytes.get(warehouse_id, 0) + entry_bytes
+            
+            self._maintain_cache_size(warehouse_id)
+    
+    def _remove(self, warehouse_id: Optional[str], location_code: str) -> bool:
+        """Remove one entry from the memory tier (caller holds the lock)"""
+        entry_bytes = self._lru.pop((warehouse_id, location_code), None)
+        if entry_bytes is None:
+            return False
+        
+        warehouse_cache = self.warehouse_caches[warehouse_id]
+        del warehouse_cache[location_code]
+        self._warehouse_bytes[warehouse_id] -= entry_bytes
+        if not warehouse_cache:
+            del self.warehouse_caches[warehouse_id]
+            del self._warehouse_bytes[warehouse_id]
+        return True
+    
+    def _maintain_cache_size(self, warehouse_id: Optional[str]):
+        """Evict least recently used entries: first over the warehouse byte budget, then over the entry limit"""
+        warehouse_cache = self.warehouse_caches.get(warehouse_id)
+        while warehouse_cache and len(warehouse_cache) > 1 and self._warehouse_bytes[warehouse_id] > self.max_warehouse_bytes:
+            self._remove(warehouse_id, next(iter(warehouse_cache)))
+            self.cache_stats['evictions'] += 1
+        
+        while len(self._lru) > self.max_cache_size:
+            self._remove(*next(iter(self._lru)))
+            self.cache_stats['evictions'] += 1
+    
+    def _evict_location(self, location_code: str, warehouse_id: Optional[str] = None):
+        """Remove a location from both tiers"""
+        with self._lock:
+            self._remove(warehouse_id, location_code)
+        if self.shared_tier is not None:
+            scope = self._shared_scope()
+            if scope is not None:
+                self.shared_tier.delete(scope, warehouse_id or '', location_code)
+    
+    # ==== Shared tier ====
+    
+    @staticmethod
+    def _shared_scope() -> Optional[str]:
+        """Database key of the current session (None for in-memory SQLite: nothing to share)"""
+        from services.shared_location_snapshot import database_key_for
+        return database_key_for(get_session())
+    
+    def _reconstruct_location(self, location_code: str, cached_data: CachedLocationData,
+                              warehouse_id: Optional[str] = None, source: str = 'unknown') -> Optional[Any]:
         """
         Reconstruct a Location object from cached data using current session.
         
         Args:
+            location_code: Code the data is cached under
             cached_data: Cached location data
+            warehouse_id: Warehouse scope the data was cached under
             source: Cache source for debugging
             
         Returns:
             Location object bound to current session
         """
         try:
-            # Check if cached data is still valid (TTL)
-            if cached_data.cached_at and datetime.utcnow() - cached_data.cached_at > self.cache_ttl:
-                logger.debug(f"Cache data expired for location {cached_data.code}")
-                self._evict_location(cached_data.code)
-                self.cache_stats['evictions'] += 1
-                return None
-            
             # Get current session
             current_session = get_session()
             
@@ -192,7 +416,7 @@ class SessionSafeLocationCache:
             else:
                 # Object no longer exists in database - evict from cache
                 logger.warning(f"Cached location {cached_data.code} no longer exists in database")
-                self._evict_location(cached_data.code)
+                self._evict_location(location_code, warehouse_id)
                 return None
                 
         except Exception as e:
@@ -200,37 +424,6 @@ class SessionSafeLocationCache:
             # Don't evict on reconstruction errors - might be temporary session issues
             return None
     
-    def _evict_location(self, location_code: str):
-        """Remove location from all caches"""
-        # Remove from global cache
-        if location_code in self.global_cache:
-            del self.global_cache[location_code]
-        
-        # Remove from warehouse caches
-        for warehouse_cache in self.warehouse_caches.values():
-            if location_code in warehouse_cache:
-                del warehouse_cache[location_code]
-    
-    def _maintain_cache_size(self):
-        """Maintain cache size limits using LRU-like eviction"""
-        if len(self.global_cache) <= self.max_cache_size:
-            return
-        
-        # Find least recently used items (lowest cache_hits, oldest cached_at)
-        items_by_usage = sorted(
-            self.global_cache.items(),
-            key=lambda x: (x[1].cache_hits, x[1].cached_at or datetime.min)
-        )
-        
-        # Evict oldest/least used items
-        evict_count = len(self.global_cache) - self.max_cache_size + int(self.max_cache_size * 0.1)  # Evict 10% extra
-        
-        for location_code, _ in items_by_usage[:evict_count]:
-            self._evict_location(location_code)
-            self.cache_stats['evictions'] += 1
-        
-        logger.info(f"Cache maintenance: evicted {evict_count} locations")
-    
     def invalidate_request_cache(self):
         """
         Invalidate cache for current request context.
@@ -245,50 +438,71 @@ class SessionSafeLocationCache:
     
     def clear_cache(self, warehouse_id: str = None):
         """
-        Clear cache completely or for specific warehouse.
+        Clear cache completely or for specific warehouse (both tiers).
         
         Args:
             warehouse_id: If provided, clear only this warehouse's cache
         """
-        if warehouse_id:
-            if warehouse_id in self.warehouse_caches:
-                del self.warehouse_caches[warehouse_id]
-            logger.info(f"Cleared cache for warehouse: {warehouse_id}")
-        else:
-            self.global_cache.clear()
-            self.warehouse_caches.clear()
-            self.cache_stats['hits'] = 0
-            self.cache_stats['misses'] = 0
-            self.cache_stats['reconstructions'] = 0
-            logger.info("Cleared all caches")
+        with self._lock:
+            if warehouse_id:
+                for location_code in list(self.warehouse_caches.get(warehouse_id, ())):
+                    self._remove(warehouse_id, location_code)
+                logger.info(f"Cleared cache for warehouse: {warehouse_id}")
+            else:
+                self.warehouse_caches.clear()
+                self._lru.clear()
+                self._warehouse_bytes.clear()
+                self.cache_stats['hits'] = 0
+                self.cache_stats['misses'] = 0
+                self.cache_stats['reconstructions'] = 0
+                logger.info("Cleared all caches")
+        
+        if self.shared_tier is not None:
+            self.shared_tier.delete(None, warehouse_id)
     
     def get_cache_stats(self) -> Dict[str, Any]:
-        """Get cache performance statistics"""
+        """Get cache performance statistics (overall and per tier)"""
         total_requests = self.cache_stats['hits'] + self.cache_stats['misses']
         hit_rate = (self.cache_stats['hits'] / total_requests * 100) if total_requests > 0 else 0
         
+        with self._lock:
+            memory_tier = {
+                'entries': len(self._lru),
+                'bytes': sum(self._warehouse_bytes.values()),
+                'evictions': self.cache_stats['evictions'],
+                'expirations': self.cache_stats['expirations'],
+                'warehouse_bytes': {str(key): value for key, value in self._warehouse_bytes.items()},
+            }
+        
         return {
             'cache_stats': self.cache_stats.copy(),
             'hit_rate_percent': round(hit_rate, 2),
-            'total_cached_locations': len(self.global_cache),
+            'total_cached_locations': len(self._lru),
             'total_warehouses': len(self.warehouse_caches),
             'cache_size_limit': self.max_cache_size,
+            'warehouse_bytes_limit': self.max_warehouse_bytes,
             'cache_ttl_hours': self.cache_ttl.total_seconds() / 3600,
-            'uptime_hours': (datetime.utcnow() - self.cache_stats['created_at']).total_seconds() / 3600
+            'uptime_hours': (datetime.utcnow() - self.cache_stats['created_at']).total_seconds() / 3600,
+            'tiers': {
+                'memory': memory_tier,
+                'shared': self.shared_tier.get_stats() if self.shared_tier is not None else None,
+            }
         }
     
     def get_debug_info(self) -> Dict[str, Any]:
         """Get detailed debug information"""
         warehouse_stats = {}
-        for warehouse_id, cache in self.warehouse_caches.items():
-            warehouse_stats[warehouse_id] = {
-                'location_count': len(cache),
-                'total_hits': sum(data.cache_hits for data in cache.values()),
-                'avg_hits_per_location': sum(data.cache_hits for data in cache.values()) / len(cache) if cache else 0
-            }
+        with self._lock:
+            for warehouse_id, cache in self.warehouse_caches.items():
+                warehouse_stats[warehouse_id or 'global'] = {
+                    'location_count': len(cache),
+                    'bytes': self._warehouse_bytes.get(warehouse_id, 0),
+                    'total_hits': sum(data.cache_hits for data in cache.values()),
+                    'avg_hits_per_location': sum(data.cache_hits for data in cache.values()) / len(cache) if cache else 0
+                }
         
         return {
-            'global_cache_size': len(self.global_cache),
+            'global_cache_size': len(self._lru),
             'warehouse_caches': warehouse_stats,
             'performance': self.get_cache_stats(),
             'is_web_request': RequestScopedSessionManager.is_web_request_context()
@@ -301,7 +515,7 @@ def get_session_safe_cache() -> SessionSafeLocationCache:
     """Get the global session-safe cache instance"""
     global _global_cache
     if _global_cache is None:
-        _global_cache = SessionSafeLocationCache()
+        _global_cache = SessionSafeLocationCache(shared_path=get_session_cache_shared_path())
     return _global_cache
 
 def clear_global_cache():
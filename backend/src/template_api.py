@@ -77,7 +77,7 @@ def generate_locations_from_template(template, warehouse_id, current_user):
         # Bulk add storage locations in batches of 1000 for optimal performance
         batch_size = 1000
         for i in range(0, len(storage_locations_batch), batch_size):
-            batch = storage_locations_batch[i:i + batch_size]
+            batch = Location.assign_canonical_codes(storage_locations_batch[i:i + batch_size])
             db.session.bulk_save_objects(batch)
             db.session.flush()  # Flush each batch to avoid memory issues
 
@@ -146,7 +146,7 @@ def generate_locations_from_template(template, warehouse_id, current_user):
         
         # Bulk add special locations
         if special_locations_batch:
-            db.session.bulk_save_objects(special_locations_batch)
+            db.session.bulk_save_objects(Location.assign_canonical_codes(special_locations_batch))
             db.session.flush()
 
         return created_locations
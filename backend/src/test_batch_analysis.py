@@ -0,0 +1,180 @@
+"""
+Batch Analysis CLI Test Suite
+
+Validates the offline batch runner:
+1. Manifest and directory job discovery
+2. Warm engine reuse across files in a worker
+3. Parquet/JSONL anomaly batches and throughput summary
+4. Rules pruned by the planner are reported as skipped, not failed
+"""
+
+import unittest
+import json
+import io
+import contextlib
+import tempfile
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+# Test imports
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from batch_analysis import BatchJob, discover_jobs, load_manifest, run_batch, summarize_batch
+
+
+class MockRule:
+    """Minimal stand-in for the Rule model"""
+
+    def __init__(self, rule_id, rule_type, conditions=None, precedence_level=4):
+        self.id = rule_id
+        self.name = f"{rule_type} test rule"
+        self.rule_type = rule_type
+        self.priority = 'HIGH'
+        self.conditions = json.dumps(conditions or {})
+        self.parameters = json.dumps({})
+        self.precedence_level = precedence_level
+
+
+TEST_RULES = [
+    MockRule(1, 'DATA_INTEGRITY', precedence_level=1),
+    MockRule(2, 'STAGNANT_PALLETS', {'time_threshold_hours': 6}, precedence_level=3),
+]
+
+
+def offline_engine_factory():
+    """Engine factory for tests: no database, fixed rules"""
+    from rule_engine import RuleEngine
+
+    engine = RuleEngine(db_session=None)
+    engine.load_active_rules = lambda category_filter=None: TEST_RULES
+    return engine
+
+
+def write_inventory(path: str, pallets: int):
+    now = datetime.now()
+    inventory = pd.DataFrame({
+        'pallet_id': [f"P{i}" for i in range(pallets)] + ['P0'],  # one duplicate
+        'location': ['RECV-01' if i % 2 else '1.1A' for i in range(pallets + 1)],
+        'creation_date': [now - timedelta(hours=12)] * (pallets + 1),
+    })
+    if path.endswith('.csv'):
+        inventory.to_csv(path, index=False)
+    else:
+        inventory.to_parquet(path, index=False)
+
+
+class TestJobDiscovery(unittest.TestCase):
+    """Test manifest and directory job discovery"""
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.work_dir.cleanup)
+
+    def test_discover_jobs_skips_unsupported_files(self):
+        for name in ['a.csv', 'b.xlsx', 'notes.txt', '~$b.xlsx']:
+            open(os.path.join(self.work_dir.name, name), 'w').close()
+
+        jobs = discover_jobs(self.work_dir.name, 'WH1')
+
+        self.assertEqual([os.path.basename(job.path) for job in jobs], ['a.csv', 'b.xlsx'])
+        self.assertTrue(all(job.warehouse_id == 'WH1' for job in jobs))
+
+    def test_csv_manifest(self):
+        manifest = os.path.join(self.work_dir.name, 'sites.csv')
+        with open(manifest, 'w') as f:
+            f.write("path,warehouse_id,user_id,rule_ids\n")
+            f.write("site_a.xlsx,WH_A,3,\"1,2\"\n")
+            f.write("/data/site_b.csv,,,\n")
+
+        jobs = load_manifest(manifest, default_warehouse_id='WH_DEFAULT')
+
+        self.assertEqual(jobs[0].path, os.path.join(self.work_dir.name, 'site_a.xlsx'))
+        self.assertEqual((jobs[0].warehouse_id, jobs[0].user_id, jobs[0].rule_ids), ('WH_A', 3, [1, 2]))
+        self.assertEqual((jobs[1].path, jobs[1].warehouse_id, jobs[1].rule_ids), ('/data/site_b.csv', 'WH_DEFAULT', None))
+
+    def test_jsonl_manifest_requires_path(self):
+        manifest = os.path.join(self.work_dir.name, 'sites.jsonl')
+        with open(manifest, 'w') as f:
+            f.write(json.dumps({'warehouse_id': 'WH_A'}) + '\n')
+
+        with self.assertRaises(ValueError):
+            load_manifest(manifest)
+
+
+class TestRunBatch(unittest.TestCase):
+    """Test batch execution across warm workers"""
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.work_dir.cleanup)
+        self.output_dir = os.path.join(self.work_dir.name, 'out')
+
+        self.jobs = []
+        for index, extension in enumerate(['csv', 'parquet', 'csv']):
+            path = os.path.join(self.work_dir.name, f"site_{index}.{extension}")
+            write_inventory(path, 20 * (index + 1))
+            self.jobs.append(BatchJob(path=path))
+        self.jobs.append(BatchJob(path=os.path.join(self.work_dir.name, 'missing.csv')))
+
+    def _run(self, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return run_batch(self.jobs, self.output_dir, engine_factory=offline_engine_factory, **kwargs)
+
+    def test_in_process_jsonl(self):
+        results = self._run(workers=1, output_format='jsonl')
+
+        self.assertEqual([r.success for r in results], [True, True, True, False])
+        self.assertIn('FileNotFoundError', results[3].error)
+
+        with open(results[0].output_path) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), results[0].anomalies)
+        self.assertEqual({r['rule_type'] for r in records}, {'DATA_INTEGRITY', 'STAGNANT_PALLETS'})
+        self.assertTrue(all(r['source_file'] == 'site_0.csv' for r in records))
+
+    def test_process_pool_parquet(self):
+        results = self._run(workers=2, output_format='parquet')
+
+        self.assertEqual([r.path for r in results], [job.path for job in self.jobs])
+        for result in results[:3]:
+            self.assertTrue(result.success, result.error)
+            self.assertEqual(len(pd.read_parquet(result.output_path)), result.anomalies)
+            # 1 duplicate pair + the stagnant RECV pallets
+            self.assertEqual(result.anomalies, 2 + (result.rows - 1) // 2)
+
+        summary = summarize_batch(results, wall_seconds=2.0)
+        self.assertEqual((summary['succeeded'], summary['failed']), (3, 1))
+        self.assertEqual(summary['total_rows'], 21 + 41 + 61)
+        self.assertEqual(summary['rows_per_second'], 61.5)
+
+    def test_same_file_names_do_not_collide(self):
+        self.jobs = []
+        for folder, extension in (('site1', 'csv'), ('site2', 'csv'), ('site2', 'parquet')):
+            os.makedirs(os.path.join(self.work_dir.name, folder), exist_ok=True)
+            path = os.path.join(self.work_dir.name, folder, f"inventory.{extension}")
+            write_inventory(path, 20)
+            self.jobs.append(BatchJob(path=path))
+
+        results = self._run(workers=1, output_format='jsonl')
+
+        self.assertTrue(all(result.success for result in results))
+        self.assertEqual(len({result.output_path for result in results}), 3)
+        self.assertEqual(len(os.listdir(self.output_dir)), 3)
+
+    def test_pruned_rules_are_skipped_not_failed(self):
+        TEST_RULES.append(MockRule(3, 'UNCOORDINATED_LOTS', precedence_level=3))  # No receipt_number column
+        self.addCleanup(TEST_RULES.pop)
+
+        results = self._run(workers=1, output_format='jsonl')
+
+        for result in results[:3]:
+            self.assertEqual((result.failed_rules, result.skipped_rules), ([], [3]))
+        summary = summarize_batch(results, wall_seconds=1.0)
+        self.assertEqual((summary['files_with_rule_failures'], summary['files_with_skipped_rules']), (0, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,258 @@
+"""
+Capacity Resolver Test Suite
+
+Validates unified bulk capacity resolution:
+1. Sources are consulted in precedence order, each only for unresolved codes
+2. Results are memoized per warehouse version and refreshed on version change
+3. Vectorized defaults match the per-location heuristics (10k-location benchmark)
+4. Virtual engine and database stages resolve all missing codes in bulk
+"""
+
+import unittest
+import io
+import contextlib
+import time
+
+import numpy as np
+import pandas as pd
+from flask import Flask
+from sqlalchemy import event
+
+# Test imports
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import db
+import core_models  # noqa: F401  (registers the user table referenced by foreign keys)
+from models import Location
+from virtual_location_engine import VirtualLocationEngine
+from services.capacity_resolver import (
+    CapacityResolver, UNRESOLVED, clear_capacity_resolver_memo,
+    default_capacities, default_capacity_for_code, get_capacity_resolver_stats,
+    load_location_records
+)
+
+
+class StubSource:
+    """Scope service / repository stand-in recording bulk calls"""
+
+    def __init__(self, capacities, unit_types=None):
+        self.capacities = capacities
+        self.unit_types = unit_types or {}
+        self.calls = []
+
+    def bulk_load_locations(self, location_codes):
+        pass
+
+    def get_capacities_bulk(self, location_codes):
+        self.calls.append(list(location_codes))
+        return {code: self.capacities[code] for code in location_codes if code in self.capacities}
+
+    def get_unit_types_bulk(self, location_codes):
+        return {code: self.unit_types[code] for code in location_codes if code in self.unit_types}
+
+
+class StubLocation:
+    """Location record stand-in"""
+
+    def __init__(self, capacity=None, pallet_capacity=None, location_type=None, unit_type=None):
+        self.capacity = capacity
+        self.pallet_capacity = pallet_capacity
+        self.location_type = location_type
+        self.unit_type = unit_type
+
+
+def build_codes(count: int, seed: int = 11) -> list:
+    rng = np.random.default_rng(seed)
+    stems = np.array(['RECV-', 'STAGE-', 'DOCK', 'AISLE-', 'BULK', 'USER_', 'RACK', 'ZONE', ''], dtype=object)
+    numbers = rng.integers(0, 1000, size=count).astype(str)
+    suffixes = np.array(['', 'A', 'B', 'AB'], dtype=object)[rng.integers(0, 4, size=count)]
+    codes = stems[rng.integers(0, len(stems), size=count)] + numbers + suffixes
+    return pd.unique(codes).tolist()
+
+
+class TestResolutionPrecedence(unittest.TestCase):
+    """Test source precedence, alignment and stop_after"""
+
+    def setUp(self):
+        clear_capacity_resolver_memo()
+        self.scope = StubSource({'001A': 3}, unit_types={'001A': 'boxes'})
+        self.repository = StubSource({'001A': 9, 'RECV-01': 20})
+        self.records = {'STAGE-01': StubLocation(capacity=7), 'DOCK-1': StubLocation(location_type='DOCK')}
+
+    def _resolver(self, **overrides):
+        options = dict(
+            scope_service=self.scope, location_repository=self.repository,
+            location_finder=self.records.get
+        )
+        options.update(overrides)
+        return CapacityResolver(**options)
+
+    def test_first_source_wins(self):
+        resolution = self._resolver().resolve(['001A', 'RECV-01', 'STAGE-01', 'DOCK-1', 'FOO'])
+
+        self.assertEqual(resolution.capacity_series().tolist(), [3, 20, 7, 2, 5])
+        self.assertEqual(resolution.source_series().tolist(),
+                         ['scope_service', 'repository', 'database', 'database', 'default'])
+        self.assertEqual(resolution.unit_type_series().tolist(), ['boxes'] + ['pallets'] * 4)
+
+        # Later sources only see codes earlier sources left unresolved
+        self.assertEqual(self.repository.calls, [['RECV-01', 'STAGE-01', 'DOCK-1', 'FOO']])
+
+    def test_stop_after_leaves_unresolved(self):
+        resolution = self._resolver().resolve(['001A', 'RECV-01', 'STAGE-01'], stop_after='repository')
+
+        self.assertEqual(resolution.source_series().tolist(), ['scope_service', 'repository', UNRESOLVED])
+        self.assertTrue(np.isnan(resolution.capacity[2]))
+        self.assertEqual(resolution.capacity_series().dtype, np.float64)
+
+    def test_failing_source_falls_through(self):
+        class Broken(StubSource):
+            def get_capacities_bulk(self, location_codes):
+                raise RuntimeError("database unavailable")
+
+        resolution = self._resolver(scope_service=Broken({})).resolve(['001A'])
+
+        self.assertEqual(resolution.capacity_series().tolist(), [9])
+        self.assertEqual(resolution.source_series().tolist(), ['repository'])
+
+
+class TestResolutionMemo(unittest.TestCase):
+    """Test per-warehouse-version memoization"""
+
+    def setUp(self):
+        clear_capacity_resolver_memo()
+
+    def test_memo_hits_until_version_changes(self):
+        repository = StubSource({'001A': 4})
+        context = {'warehouse_id': 'WH1', 'template_version': '1:a', 'location_version': '10:99:40:40',
+                   'location_repository': repository}
+
+        first = CapacityResolver.for_context(context).resolve(['001A', 'RECV-01'])
+        resolver = CapacityResolver.for_context(context)
+        second = resolver.resolve(['RECV-01', '001A'])
+
+        self.assertEqual(second.capacity_series().tolist(), [10, 4])
+        self.assertEqual(second.source_series().tolist(), ['default', 'repository'])
+        self.assertEqual(resolver.last_stats['memo_hits'], 2)
+        self.assertEqual(len(repository.calls), 1)
+        self.assertEqual(first.capacity_series()['001A'], 4)
+
+        # A capacity edit changes the location version and forces a fresh lookup
+        repository.capacities['001A'] = 6
+        context['location_version'] = '10:99:42:42'
+        self.assertEqual(CapacityResolver.for_context(context).resolve(['001A']).capacity_series().tolist(), [6])
+        self.assertEqual(get_capacity_resolver_stats()['warehouse_versions'], 2)
+
+    def test_no_memo_without_version(self):
+        resolver = CapacityResolver.for_context({'warehouse_id': 'WH1'})
+        resolver.resolve(['001A'])
+        resolver.resolve(['001A'])
+
+        self.assertEqual(resolver.last_stats['memo_hits'], 0)
+        self.assertEqual(get_capacity_resolver_stats()['warehouse_versions'], 0)
+
+
+class TestDefaultCapacities(unittest.TestCase):
+    """Test vectorized defaults against the scalar heuristics"""
+
+    def test_matches_scalar_defaults(self):
+        codes = build_codes(2_000) + ['receiving', ' 001A ', 'rack', 'FLOOR-2', '12-34-567B', 'A', '']
+        self.assertEqual(
+            default_capacities(pd.Series(codes, dtype=object)).tolist(),
+            [default_capacity_for_code(code) for code in codes]
+        )
+
+    def test_bulk_resolution_benchmark(self):
+        clear_capacity_resolver_memo()
+        codes = build_codes(30_000)[:10_000]
+        repository = StubSource({code: 2 for code in codes[::3]})
+        context = {'warehouse_id': 'WH-BENCH', 'template_version': None, 'location_version': '1',
+                   'location_repository': repository}
+
+        start = time.perf_counter()
+        resolution = CapacityResolver.for_context(context).resolve(codes)
+        cold_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        CapacityResolver.for_context(context).resolve(codes)
+        warm_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for code in codes:
+            default_capacity_for_code(code)
+        scalar_ms = (time.perf_counter() - start) * 1000
+
+        print(f"\n[CAPACITY_RESOLVER] {len(codes):,} locations: cold {cold_ms:.1f}ms, "
+              f"memoized {warm_ms:.1f}ms (scalar defaults alone {scalar_ms:.1f}ms)")
+
+        self.assertEqual(len(resolution), 10_000)
+        self.assertFalse((resolution.capacity_source == UNRESOLVED).any())
+        self.assertLess(cold_ms, 5_000)
+        self.assertLess(warm_ms, 5_000)
+
+
+class TestBulkStages(unittest.TestCase):
+    """Test the bulk virtual engine and database stages"""
+
+    def setUp(self):
+        clear_capacity_resolver_memo()
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        db.session.add_all([
+            Location(code='WH1_STAGE-01', location_type='STAGING', unit_type='boxes', capacity=7, warehouse_id='WH1'),
+            Location(code='DOCK-1', location_type='DOCK', pallet_capacity=3, warehouse_id='WH1'),
+            Location(code='BULK-9', location_type='STORAGE', pallet_capacity=4, warehouse_id='WH1', is_active=False),
+            Location(code='DOCK-1', location_type='STORAGE', capacity=30, warehouse_id='WH2'),
+        ])
+        db.session.commit()
+
+        self.statements = []
+        event.listen(db.engine, 'before_cursor_execute', self._record)
+
+    def tearDown(self):
+        event.remove(db.engine, 'before_cursor_execute', self._record)
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def test_database_stage_one_query(self):
+        codes = ['STAGE-01', 'DOCK-1', 'BULK-9', 'FOO'] + [f"MISS-{n}" for n in range(500)]
+        resolver = CapacityResolver(location_batch_finder=lambda missing: load_location_records(db.session, missing, 'WH1'))
+
+        resolution = resolver.resolve(codes)
+
+        self.assertEqual(resolution.capacity_series().tolist()[:4], [7, 3, default_capacity_for_code('BULK-9'), 5])
+        self.assertEqual(resolution.source_series().tolist()[:4], ['database', 'database', 'default', 'default'])  # Inactive and other-warehouse rows ignored
+        self.assertEqual(sum(statement.startswith('SELECT') for statement in self.statements), 1)
+
+    def test_virtual_engine_batch_matches_properties(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            engine = VirtualLocationEngine({
+                'warehouse_id': 'WH1', 'num_aisles': 2, 'racks_per_aisle': 2, 'positions_per_rack': 10,
+                'level_names': 'ABCD', 'default_pallet_capacity': 2,
+                'receiving_areas': [{'code': 'RECV-01', 'capacity': 10}],
+            })
+        codes = ['01-01-001A', 'WH1_02-02-010D', 'RECV-01', ' recv-01 ', '09-09-999Z', 'FOO', '']
+
+        self.assertEqual(engine.capacities_batch(codes).tolist(),
+                         [engine.get_location_properties(code).capacity for code in codes])
+
+        finder_calls = []
+        resolution = CapacityResolver(virtual_engine=engine, location_finder=finder_calls.append).resolve(codes)
+        self.assertEqual(resolution.capacity_series().tolist()[:4], [2, 2, 10, 10])
+        self.assertEqual(finder_calls, [])  # Every code resolved by the engine
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,180 @@
+"""
+Copy-Free Evaluation Test Suite
+
+Validates the evaluator contract introduced with DerivedColumnOverlay:
+1. Evaluators never deep-copy the shared inventory frame
+2. Evaluators never materialize filtered sub-frames (row positions only)
+3. Derived columns live in the overlay, not on the shared frame
+4. Rules filtering on the same location set share one cached mask
+"""
+
+import unittest
+import json
+import io
+import contextlib
+from datetime import datetime
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+# Test imports
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from evaluation_overlay import DerivedColumnOverlay, FrameCopyMonitor, get_overlay
+from rule_engine import RuleEngine
+
+
+class MockRule:
+    """Minimal stand-in for the Rule model"""
+
+    def __init__(self, rule_id, rule_type, conditions=None, precedence_level=4):
+        self.id = rule_id
+        self.name = f"{rule_type} test rule"
+        self.rule_type = rule_type
+        self.priority = 'HIGH'
+        self.conditions = json.dumps(conditions or {})
+        self.parameters = json.dumps({})
+        self.precedence_level = precedence_level
+
+
+def build_inventory(rows: int, seed: int = 7) -> pd.DataFrame:
+    """Build a normalized inventory frame with receiving, aisle and storage locations"""
+    rng = np.random.default_rng(seed)
+    locations = np.array(
+        [f"RECV-{i:02d}" for i in range(1, 6)] +
+        [f"AISLE-{i:02d}" for i in range(1, 6)] +
+        [f"{rack}.{level}A" for rack in range(1, 40) for level in range(1, 6)]
+    )
+    now = datetime.now()
+    ages_hours = rng.integers(0, 12, size=rows)
+
+    return pd.DataFrame({
+        'pallet_id': np.char.add('P', np.arange(rows).astype(str)),
+        'location': locations[rng.integers(0, len(locations), size=rows)],
+        'creation_date': pd.to_datetime(now) - pd.to_timedelta(ages_hours, unit='h'),
+        'receipt_number': np.char.add('R', rng.integers(0, 5000, size=rows).astype(str)),
+    })
+
+
+class TestDerivedColumnOverlay(unittest.TestCase):
+    """Test DerivedColumnOverlay core functionality"""
+
+    def setUp(self):
+        self.frame = pd.DataFrame({
+            'pallet_id': ['P1', 'P2', 'P3'],
+            'location': ['RECV-01', '01-01-001A', 'AISLE-01']
+        }, index=[10, 20, 30])
+        self.overlay = DerivedColumnOverlay(self.frame)
+
+    def test_derived_column_does_not_touch_frame(self):
+        self.overlay.set('is_source', [True, False, True])
+
+        self.assertIn('is_source', self.overlay)
+        self.assertNotIn('is_source', self.frame.columns)
+        self.assertEqual(list(self.overlay.series('is_source').index), [10, 20, 30])
+
+    def test_length_mismatch_rejected(self):
+        with self.assertRaises(ValueError):
+            self.overlay.set('is_source', [True])
+
+    def test_positions_and_values_at(self):
+        self.overlay.set('is_source', np.array([True, False, True]))
+        positions = self.overlay.positions(self.overlay.get('is_source'))
+
+        self.assertEqual(positions.tolist(), [0, 2])
+        self.assertEqual(self.overlay.values_at('pallet_id', positions).tolist(), ['P1', 'P3'])
+        self.assertEqual(self.overlay.values_at('is_source', positions).tolist(), [True, True])
+
+    def test_get_overlay_reuses_bound_overlay(self):
+        context = {'derived_columns': self.overlay}
+
+        self.assertIs(get_overlay(self.frame, context), self.overlay)
+        self.assertIsNot(get_overlay(self.frame.copy(), context), self.overlay)
+
+
+class TestLocationMaskCache(unittest.TestCase):
+    """Test analysis-scoped location mask sharing"""
+
+    def setUp(self):
+        self.frame = pd.DataFrame({'location': ['recv-01', 'RECV-02', '1.1A', None, 'STAGE-01']})
+        self.masks = DerivedColumnOverlay(self.frame).location_masks
+
+    def test_equivalent_pattern_sets_share_one_mask(self):
+        first = self.masks.positions([r'^RECV-\d+$', r'^STAGE'])
+        second = self.masks.positions([r'^STAGE', r'^RECV-\d+$', r'^STAGE'])
+
+        self.assertEqual(first.tolist(), [0, 1, 4])
+        self.assertIs(first, second)
+        self.assertFalse(first.flags.writeable)
+        self.assertEqual(self.masks.get_stats()['computed'], 1)
+        self.assertEqual(self.masks.get_stats()['reused'], 1)
+
+    def test_empty_pattern_set_is_not_cached(self):
+        self.assertEqual(self.masks.positions([]).tolist(), [])
+        self.assertEqual(self.masks.get_stats()['distinct_masks'], 0)
+
+    def test_rules_reuse_receiving_mask(self):
+        inventory_df = build_inventory(5_000)
+        rules = [
+            MockRule(1, 'STAGNANT_PALLETS', {'time_threshold_hours': 10}),
+            MockRule(2, 'STAGNANT_PALLETS', {'time_threshold_hours': 6}),
+            MockRule(3, 'UNCOORDINATED_LOTS', {'completion_threshold': 0.8}),
+        ]
+        engine = RuleEngine(db_session=None)
+
+        with patch.object(RuleEngine, 'load_active_rules', return_value=rules), \
+                contextlib.redirect_stdout(io.StringIO()):
+            engine.evaluate_all_rules(inventory_df)
+
+        # RECEIVING mask computed once for three rules, plus the lots rule's FINAL mask
+        self.assertEqual(engine.last_mask_stats['distinct_masks'], 2)
+        self.assertEqual(engine.last_mask_stats['reused'], 2)
+
+
+class TestCopyFreeEvaluation(unittest.TestCase):
+    """Test that evaluate_all_rules never copies the shared inventory frame"""
+
+    ROWS = 500_000
+
+    def test_zero_full_frame_copies_on_large_inventory(self):
+        inventory_df = build_inventory(self.ROWS)
+        rules = [
+            MockRule(1, 'STAGNANT_PALLETS', {'time_threshold_hours': 10}, precedence_level=3),
+            MockRule(2, 'UNCOORDINATED_LOTS', {'completion_threshold': 0.8}, precedence_level=3),
+            MockRule(3, 'LOCATION_SPECIFIC_STAGNANT', {'location_pattern': 'AISLE*', 'time_threshold_hours': 10}),
+            MockRule(4, 'DATA_INTEGRITY', {}, precedence_level=1),
+            MockRule(5, 'MISSING_LOCATION', {}, precedence_level=1),
+            MockRule(6, 'OVERCAPACITY', {}, precedence_level=2),
+            MockRule(7, 'INVALID_LOCATION', {}, precedence_level=2),
+        ]
+
+        engine = RuleEngine(db_session=None)
+
+        with patch.object(RuleEngine, 'load_active_rules', return_value=rules), \
+                contextlib.redirect_stdout(io.StringIO()):
+            with FrameCopyMonitor(min_rows=self.ROWS) as monitor:
+                results = engine.evaluate_all_rules(inventory_df)
+
+        self.assertTrue(all(result.success for result in results),
+                        [result.error_message for result in results if not result.success])
+        self.assertEqual(monitor.full_copies, 0, f"Full-frame copies: {monitor.copies}")
+        self.assertEqual(monitor.materializations, 0, f"Sub-frame materializations: {monitor.takes}")
+
+        # Shared frame was not widened with derived columns
+        self.assertEqual(list(inventory_df.columns), ['pallet_id', 'location', 'creation_date', 'receipt_number'])
+
+        # Sanity check: the stagnant rule still finds old receiving pallets
+        stagnant = next(result for result in results if result.rule_id == 1)
+        self.assertGreater(len(stagnant.anomalies), 0)
+
+        # ...and the vectorized capacity and location checks ran too
+        self.assertEqual({6, 7} - {result.rule_id for result in results}, set())
+        overcapacity = next(result for result in results if result.rule_id == 6)
+        self.assertGreater(len(overcapacity.anomalies), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
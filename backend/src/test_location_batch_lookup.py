@@ -0,0 +1,158 @@
+"""
+Location Batch Lookup Test Suite
+
+Validates the set-based LocationMatcher.batch_find_locations:
+1. Batch results match per-code find_location() (canonical, variant and inactive cases)
+2. Missing storage codes are auto-created with one INSERT and found again afterwards
+3. Database round trips stay constant as the batch grows
+"""
+
+import unittest
+import io
+import contextlib
+
+import pandas as pd
+from flask import Flask
+from sqlalchemy import event
+
+# Test imports
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import db
+import core_models  # noqa: F401  (registers the user table referenced by foreign keys)
+from models import Location
+from location_service import CanonicalLocationService, InventoryLocationValidator, LocationMatcher
+
+
+class BatchLookupTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        locations = [Location(code=f"{aisle:02d}-01-{position:03d}A", location_type='STORAGE', warehouse_id='WH1')
+                     for aisle in range(1, 5) for position in range(1, 101)]
+        locations += [
+            Location(code='RECV-1', location_type='RECEIVING', warehouse_id='WH1'),
+            Location(code='5-1-7B', location_type='STORAGE', warehouse_id='WH1'),
+            Location(code='06-01-001A', location_type='STORAGE', warehouse_id='WH1', is_active=False),
+            Location(code='07-01-02A', location_type='STORAGE', warehouse_id='WH1'),
+            Location(code='01-01-001A', location_type='DOCK', warehouse_id='WH2'),
+        ]
+        db.session.bulk_save_objects(Location.assign_canonical_codes(locations))
+        db.session.commit()
+        # Legacy row written before canonical_code existed (variant fallback)
+        db.session.execute(Location.__table__.update().where(Location.code == '07-01-02A').values(canonical_code=None))
+        db.session.commit()
+
+        self.matcher = LocationMatcher(CanonicalLocationService())
+        self.matcher.use_session_safe_cache = False
+        self.statements = []
+        event.listen(db.engine, 'before_cursor_execute', self._record)
+
+    def tearDown(self):
+        event.remove(db.engine, 'before_cursor_execute', self._record)
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def _batch(self, codes, warehouse_id='WH1', **kwargs):
+        self.statements.clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.matcher.batch_find_locations(codes, warehouse_id, **kwargs)
+
+
+class TestBatchResolution(BatchLookupTestCase):
+    """Test batch results against single lookups"""
+
+    def test_matches_single_lookups(self):
+        codes = ['1-1-1A', '01-01-001A', 'wh01_2-1-50A', 'RECV-01', '05-01-007B', '07-01-002A', '06-01-001A',
+                 'DOCK-77', 'NOT A CODE', '']
+
+        batch = self._batch(codes, auto_create=False)
+        self.statements.clear()
+        single = {code: self.matcher.find_location(code, 'WH1') for code in codes if code}
+
+        self.assertFalse(any(statement.startswith('INSERT') for statement in self.statements))  # No auto-creation
+        for code, location in single.items():
+            if code != '06-01-001A':
+                self.assertIs(batch[code], location, code)
+        self.assertEqual(batch['07-01-002A'].code, '07-01-02A')  # Variant fallback
+        # Inactive (the single path returns it from its auto-create existence check)
+        self.assertIsNone(batch['06-01-001A'])
+        self.assertEqual(batch['RECV-01'].location_type, 'RECEIVING')
+        self.assertIsNone(batch[''])
+
+    def test_warehouse_scoping(self):
+        self.assertEqual(self._batch(['1-1-1A'], 'WH2')['1-1-1A'].location_type, 'DOCK')
+        self.assertEqual(self._batch(['1-1-1A'], 'WH1')['1-1-1A'].location_type, 'STORAGE')
+
+
+class TestBatchAutoCreation(BatchLookupTestCase):
+    """Test bulk auto-creation of missing storage locations"""
+
+    def test_bulk_insert_and_reuse(self):
+        codes = [f"9-2-{position}C" for position in range(1, 301)] + ['06-01-001A', '99-01-001A', 'DOCK-77']
+
+        first = self._batch(codes)
+        inserts = [statement for statement in self.statements if statement.startswith('INSERT')]
+
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(first['9-2-1C'].code, 'WH1_09-02-001C')
+        self.assertEqual(first['9-2-1C'].canonical_code, '09-02-001C')
+        self.assertTrue(all(first[code].warehouse_id == 'WH1' for code in codes[:300]))
+        self.assertIsNone(first['06-01-001A'])  # Exists (inactive): not re-created
+        self.assertIsNone(first['99-01-001A'])  # Over the aisle limit
+        self.assertIsNone(first['DOCK-77'])     # Special areas are never auto-created
+
+        second = self._batch(codes)
+        self.assertFalse(any(statement.startswith('INSERT') for statement in self.statements))
+        self.assertEqual([second[code].id for code in codes[:300]], [first[code].id for code in codes[:300]])
+
+
+class TestBatchRoundTrips(BatchLookupTestCase):
+    """Test that round trips do not grow with the batch"""
+
+    def test_constant_round_trips(self):
+        small = ['1-1-1A', 'RECV-01', 'MISSING-1']
+        large = [f"{aisle}-1-{position}A" for aisle in range(1, 5) for position in range(1, 101)]
+        large += [f"ZZ-{n}" for n in range(500)] + ['7-1-2A']
+
+        self._batch(small, auto_create=False)
+        small_statements = len(self.statements)
+        results = self._batch(large, auto_create=False)
+
+        self.assertEqual(small_statements, 2)
+        self.assertEqual(len(self.statements), 2)
+        self.assertEqual(self.matcher.batch_stats['last_round_trips'], 2)
+        self.assertEqual(sum(location is not None for location in results.values()), 401)
+
+        self._batch([f"8-3-{position}D" for position in range(1, 201)])
+        self.assertEqual(len(self.statements), self.matcher.batch_stats['last_round_trips'])
+        self.assertLessEqual(len(self.statements), 5)
+
+    def test_validator_uses_batch_path(self):
+        validator = InventoryLocationValidator(self.matcher.canonical, self.matcher)
+        inventory = pd.DataFrame({'location': ['1-1-1A', '2-1-5A', '2-1-5A', 'NOWHERE', None]})
+
+        self.statements.clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = validator.validate_inventory_locations(inventory, 'WH1')
+
+        self.assertEqual(len(results['valid_locations']), 2)
+        self.assertEqual([entry['location_code'] for entry in results['invalid_locations']], ['NOWHERE'])
+        self.assertEqual(len(self.statements), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
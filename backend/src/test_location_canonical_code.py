@@ -0,0 +1,118 @@
+"""
+Location Canonical Code Test Suite
+
+Validates the persisted Location.canonical_code column:
+1. ORM inserts/updates and bulk saves keep canonical_code in sync with code
+2. LocationMatcher resolves any supported format with one equality lookup
+3. Rule evaluators resolve codes through the canonical map, with variant fallback
+"""
+
+import unittest
+import io
+import contextlib
+
+from flask import Flask
+
+# Test imports
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import db
+import core_models  # noqa: F401  (registers the user table referenced by foreign keys)
+from models import Location
+from location_normalizer import canonical_code
+from location_service import CanonicalLocationService, LocationMatcher
+from rule_engine import BaseRuleEvaluator
+
+
+def build_app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+class CanonicalCodeTestCase(unittest.TestCase):
+
+    CODES = ['01-01-001A', '2-1-11B', 'USER_ALICE_03-02-015C', 'RECV-1', 'DOCK', 'BULK-ZONE']
+
+    def setUp(self):
+        self.app = build_app()
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        db.session.add_all([
+            Location(code=code, location_type='STORAGE', warehouse_id='WH1', created_by=1) for code in self.CODES
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+
+class TestCanonicalCodeMaintenance(CanonicalCodeTestCase):
+    """Test that every write path fills canonical_code"""
+
+    def test_insert_and_update(self):
+        for location in Location.query.all():
+            self.assertEqual(location.canonical_code, canonical_code(location.code))
+
+        location = Location.query.filter_by(code='DOCK').one()
+        location.code = '4-4-4D'
+        db.session.commit()
+
+        self.assertEqual(Location.query.get(location.id).canonical_code, '04-04-004D')
+
+    def test_bulk_save(self):
+        locations = [Location(code=f"9-1-{n}A", location_type='STORAGE', warehouse_id='WH2') for n in range(1, 6)]
+
+        db.session.bulk_save_objects(Location.assign_canonical_codes(locations))
+        db.session.commit()
+
+        self.assertEqual(
+            sorted(location.canonical_code for location in Location.query.filter_by(warehouse_id='WH2')),
+            [f"09-01-00{n}A" for n in range(1, 6)]
+        )
+
+
+class TestCanonicalLookups(CanonicalCodeTestCase):
+    """Test matcher and evaluator lookups against the persisted column"""
+
+    def test_matcher_equality_lookup(self):
+        matcher = LocationMatcher(CanonicalLocationService())
+
+        for query, expected in (('1-1-1A', '01-01-001A'), ('02-01-011B', '2-1-11B'), ('wh01_3-2-15C', 'USER_ALICE_03-02-015C'),
+                                ('RECV-01', 'RECV-1')):
+            location = matcher._database_lookup_with_variants(canonical_code(query), 'WH1')
+            self.assertEqual(location.code, expected, query)
+
+        self.assertIsNone(matcher._database_lookup_with_variants(canonical_code('1-1-1A'), 'WH9'))
+
+    def test_matcher_falls_back_for_unfilled_rows(self):
+        db.session.execute(Location.__table__.update().values(canonical_code=None))
+        db.session.commit()
+        matcher = LocationMatcher(CanonicalLocationService())
+
+        self.assertEqual(matcher._database_lookup_with_variants('01-01-001A', 'WH1').code, '01-01-001A')
+
+    def test_evaluator_lookup(self):
+        evaluator = BaseRuleEvaluator()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(evaluator._find_location_by_code_internal('2-01-011B').code, '2-1-11B')
+            self.assertEqual(evaluator._find_location_by_code_internal('WH01_03-2-15C').code, 'USER_ALICE_03-02-015C')
+            self.assertEqual(evaluator._find_location_by_code_internal('BULK-ZONE').code, 'BULK-ZONE')
+            self.assertIsNone(evaluator._variant_lookup)  # Variants never generated
+
+            # Legacy variant fallback ("Force common warehouse format")
+            self.assertEqual(evaluator._find_location_by_code_internal('07-03-1A').code, '01-01-001A')
+            self.assertIsNotNone(evaluator._variant_lookup)
+            self.assertIsNone(evaluator._find_location_by_code_internal('NOWHERE'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,257 @@
+"""
+Location Classifier Batch Test Suite
+
+Validates EnhancedLocationClassifier.classify_batch:
+1. Batch results match per-location classify_location() (patterns, behavior, dwell times,
+   date formats that differ between locations)
+2. User corrections come from one preloaded query, with applied counts committed once
+3. A 50k-location inventory is classified in seconds
+4. Bulk corrections isolate failing rows (validation and per-row savepoints)
+"""
+
+import unittest
+import io
+import contextlib
+import time
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+from flask import Flask
+from flask_login import LoginManager
+from sqlalchemy import event
+
+# Test imports
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import db
+import core_models  # noqa: F401  (registers the user table referenced by foreign keys)
+from core_models import User
+from models import LocationClassificationCorrection
+from enhanced_location_classifier import EnhancedLocationClassifier
+
+
+def build_inventory():
+    now = pd.Timestamp.now()
+    rows = []
+    # Many products, fresh pallets: receiving behavior
+    rows += [('MIXED-ZONE', f"P{n}", now - pd.Timedelta(hours=2), f"R{n}") for n in range(5)]
+    # One product, old pallets: storage behavior
+    rows += [('01-01-001A', 'P1', now - pd.Timedelta(days=10), 'R1') for _ in range(6)]
+    # Medium diversity: decided by dwell time
+    rows += [('ZONE-7', f"P{n % 2}", now - pd.Timedelta(hours=5), 'R1') for n in range(4)]
+    rows += [('ZONE-8', f"P{n % 2}", now - pd.Timedelta(days=9), 'R1') for n in range(4)]
+    # Unparseable date: no dwell time for the whole location
+    rows += [('ZONE-9', f"P{n % 2}", 'not a date' if n == 0 else now - pd.Timedelta(days=9), 'R1') for n in range(4)]
+    rows += [('RECV-01', 'P1', now, 'R1'), (' padded ', 'P1', now, 'R1'), (' padded ', 'P2', now, 'R1')]
+    return pd.DataFrame(rows, columns=['location', 'product', 'creation_date', 'receipt_number'])
+
+
+class TestBatchMatchesSingle(unittest.TestCase):
+    """Test batch classification against classify_location"""
+
+    def setUp(self):
+        self.classifier = EnhancedLocationClassifier()
+        self.inventory = build_inventory()
+
+    def test_same_results(self):
+        locations = list(self.inventory['location'].unique()) + ['DOCK-03', 'STAGE_A', 'AISLE-04', 'XQ', '', None]
+
+        batch = self.classifier.classify_batch(locations, self.inventory)
+
+        for location in locations:
+            rows = self.inventory[self.inventory['location'] == location].copy()
+            with contextlib.redirect_stdout(io.StringIO()):
+                single = self.classifier.classify_location(location, rows)
+            self.assertEqual(batch[location], single, repr(location))
+
+        self.assertEqual(batch['MIXED-ZONE'].method, 'behavioral')
+        self.assertEqual(batch['01-01-001A'].method, 'combined')
+        self.assertEqual(batch['ZONE-8'].location_type, 'STORAGE')
+        self.assertEqual(batch[None].location_type, 'MISSING')
+
+    def test_date_formats_per_location(self):
+        now = pd.Timestamp.now()
+        rows = [('A-1', f"P{n % 2}", (now - pd.Timedelta(hours=3)).strftime('%Y-%m-%d %H:%M:%S')) for n in range(4)]
+        rows += [('B-2', f"P{n % 2}", (now - pd.Timedelta(days=31)).strftime('%d/%m/%Y')) for n in range(4)]
+        rows += [('C-3', f"P{n % 2}", now - pd.Timedelta(days=9)) for n in range(4)]  # Timestamps, object column
+        inventory = pd.DataFrame(rows, columns=['location', 'product', 'creation_date'])
+
+        batch = self.classifier.classify_batch(['A-1', 'B-2', 'C-3'], inventory)
+
+        for location in ('A-1', 'B-2', 'C-3'):
+            with contextlib.redirect_stdout(io.StringIO()):
+                single = self.classifier.classify_location(location, inventory[inventory['location'] == location].copy())
+            self.assertEqual(batch[location], single, location)
+        self.assertEqual((batch['A-1'].location_type, batch['A-1'].method), ('RECEIVING', 'behavioral'))
+        self.assertEqual((batch['B-2'].location_type, batch['B-2'].method), ('STORAGE', 'behavioral'))
+
+    def test_behavioral_features(self):
+        features = self.classifier.behavioral_features(self.inventory)
+
+        self.assertEqual(features.loc['MIXED-ZONE', ['pallet_count', 'unique_products', 'unique_lots']].tolist(),
+                         [5, 5, 5])
+        self.assertLess(features.loc['ZONE-7', 'max_dwell_hours'], 6)
+        self.assertTrue(np.isnan(features.loc['ZONE-9', 'avg_dwell_hours']))
+
+
+class TestBatchCorrections(unittest.TestCase):
+    """Test the preloaded user corrections map"""
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        user = User(username='tester', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        for code, corrected_type, accuracy in (('SPOT-1', 'DOCK', 0.5), ('RACK-9', 'STORAGE', 1.0),
+                                               ('ZZ-1', 'RECEIVING', 1.0)):
+            correction = LocationClassificationCorrection(warehouse_id='WH1', location_code=code, corrected_by=user.id,
+                                                          corrected_type=corrected_type, accuracy_score=accuracy,
+                                                          pattern_confidence=1.0, applied_count=0)
+            correction.location_pattern = correction.extract_pattern()
+            db.session.add(correction)
+        db.session.commit()
+
+        self.statements = []
+        event.listen(db.engine, 'before_cursor_execute', self._record)
+
+    def tearDown(self):
+        event.remove(db.engine, 'before_cursor_execute', self._record)
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def test_corrections_match_single_lookups(self):
+        locations = ['SPOT-1', 'rack-9', 'ZZ-2', 'RACK-1', 'NONE-1', 'spot-1']
+        expected = {}
+        for location in locations:
+            correction = LocationClassificationCorrection.find_correction_for_location('WH1', location)
+            expected[location] = correction.corrected_type if correction else None
+
+        self.statements.clear()
+        results = EnhancedLocationClassifier(db.session).classify_batch(locations, warehouse_context={'warehouse_id': 'WH1'})
+
+        for location in locations:
+            method = results[location].method
+            actual = results[location].location_type if method == 'user_correction' else None
+            self.assertEqual(actual, expected[location], location)
+
+        selects = [statement for statement in self.statements if statement.startswith('SELECT')]
+        self.assertEqual(len(selects), 1)
+        self.assertEqual(sum(statement.startswith('UPDATE') for statement in self.statements), 1)
+
+        counts = {c.location_code: c.applied_count for c in LocationClassificationCorrection.query}
+        self.assertEqual(counts, {'SPOT-1': 2, 'RACK-9': 1, 'ZZ-1': 0})  # Stored patterns are EXACT
+
+    def test_corrections_skipped_on_request(self):
+        self.statements.clear()
+        results = EnhancedLocationClassifier(db.session).classify_batch(
+            ['SPOT-1'], warehouse_context={'warehouse_id': 'WH1'}, apply_user_corrections=False)
+
+        self.assertNotEqual(results['SPOT-1'].method, 'user_correction')
+        self.assertEqual(self.statements, [])
+
+
+class TestBulkCorrectEndpoint(unittest.TestCase):
+    """Test row isolation of POST /classification/bulk-correct"""
+
+    def setUp(self):
+        from location_api import location_bp
+
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        self.app.config['SECRET_KEY'] = 'test'
+        db.init_app(self.app)
+        self.app.register_blueprint(location_bp)
+        login_manager = LoginManager(self.app)
+        login_manager.request_loader(lambda request: db.session.get(User, 1))
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        db.session.add(User(id=1, username='tester', password_hash='x'))
+        db.session.add(LocationClassificationCorrection(warehouse_id='WH1', location_code='OLD-1', corrected_by=1,
+                                                        corrected_type='DOCK', location_pattern='OLD-1'))
+        db.session.add(LocationClassificationCorrection(warehouse_id='WH1', location_code='BOOM-2', corrected_by=1,
+                                                        corrected_type='DOCK', location_pattern='BOOM-2'))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def _post(self, corrections):
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = self.app.test_client().post('/api/v1/locations/classification/bulk-correct',
+                                                   json={'warehouse_id': 'WH1', 'corrections': corrections})
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    def test_bad_rows_do_not_discard_good_rows(self):
+        original = LocationClassificationCorrection.extract_pattern
+
+        def extract_pattern(correction):
+            if correction.location_code.startswith('BOOM'):
+                raise ValueError("pattern extraction failed")
+            return original(correction)
+
+        with patch.object(LocationClassificationCorrection, 'extract_pattern', extract_pattern):
+            body = self._post([
+                {'location_code': 'NEW-1', 'corrected_type': 'STORAGE'},
+                'not an object',
+                {'location_code': 'LONG-1', 'corrected_type': 'X' * 31},
+                {'location_code': 'BOOM-1', 'corrected_type': 'DOCK'},
+                {'location_code': 'OLD-1', 'corrected_type': 'STAGING'},
+                {'location_code': 'NEW-2'},
+                {'location_code': 'BOOM-2', 'corrected_type': 'STORAGE'},  # Update rolled back to its savepoint
+            ])
+
+        self.assertEqual([result['success'] for result in body['results']], [True, False, False, False, True, False, False])
+        self.assertIn('corrected_type longer than 30', body['results'][2]['error'])
+        self.assertIn('pattern extraction failed', body['results'][3]['error'])
+        self.assertEqual((body['summary']['success_count'], body['summary']['error_count']), (2, 5))
+
+        db.session.expire_all()
+        stored = {c.location_code: c.corrected_type for c in LocationClassificationCorrection.query}
+        self.assertEqual(stored, {'OLD-1': 'STAGING', 'BOOM-2': 'DOCK', 'NEW-1': 'STORAGE'})
+
+
+class TestBatchSpeed(unittest.TestCase):
+    """Test classification time of a 50k-location inventory"""
+
+    def test_fifty_thousand_locations(self):
+        rng = np.random.default_rng(3)
+        locations = [f"{n % 60 + 1:02d}-{n // 60 % 4 + 1:02d}-{n // 240:03d}{'ABCD'[n % 4]}" for n in range(49000)]
+        locations += [f"{prefix}-{n:03d}" for prefix in ('RECV', 'DOCK', 'STAGE', 'AISLE', 'ZONE') for n in range(200)]
+        rows = rng.integers(0, len(locations), 200000)
+        inventory = pd.DataFrame({
+            'location': np.asarray(locations, dtype=object)[rows],
+            'product': rng.integers(0, 500, len(rows)).astype(str),
+            'creation_date': pd.Timestamp.now() - pd.to_timedelta(rng.integers(1, 400, len(rows)), unit='h'),
+        })
+
+        start = time.perf_counter()
+        results = EnhancedLocationClassifier().classify_batch(locations, inventory)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(len(results), 50000)
+        self.assertEqual(results['RECV-001'].location_type, 'RECEIVING')
+        self.assertLess(elapsed, 10.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
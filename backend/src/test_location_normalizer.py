@@ -0,0 +1,223 @@
+"""
+Location Normalizer Test Suite
+
+Differential test of the shared normalization engine against the
+implementations it replaced (kept below as reference copies):
+1. Every mode returns exactly the legacy result for a broad code corpus
+2. normalize_series equals the scalar results, index and missing values included
+3. The memo is bounded and shared across calls
+"""
+
+import unittest
+import itertools
+import re
+
+import numpy as np
+import pandas as pd
+
+# Test imports
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from location_normalizer import LocationNormalizer, NORMALIZATION_MODES, CANONICAL_SPECIAL_LOCATIONS
+
+
+# ==== Reference copies of the legacy implementations ====
+
+def legacy_to_canonical(location_code):
+    """CanonicalLocationService.to_canonical"""
+    if not location_code or not isinstance(location_code, str):
+        return str(location_code) if location_code else ""
+    code = location_code.strip().upper()
+    for prefix_pattern in [r'^USER_[A-Z0-9]+_', r'^WH[0-9]+_', r'^DEFAULT_', r'^WAREHOUSE_']:
+        code = re.sub(prefix_pattern, '', code)
+
+    if code in CANONICAL_SPECIAL_LOCATIONS:
+        return code
+    match = re.match(r'^(RECV|STAGE|DOCK|AISLE)-(\d{1,3})$', code)
+    if match:
+        return f"{match.group(1)}-{int(match.group(2)):02d}"
+    match = re.match(r'^(\d{1,2})-(\d{1,2})-(\d{1,3})([A-Z])$', code)
+    if match:
+        aisle, rack, position, level = match.groups()
+        return f"{int(aisle):02d}-{int(rack):02d}-{int(position):03d}{level}"
+    match = re.match(r'^(\d{1,2})([A-Z])(\d{1,2})([A-Z])$', code)
+    if match:
+        aisle, rack_level, position, level = match.groups()
+        return f"{int(aisle):02d}-01-{int(position):03d}{level}"
+    for pattern, order in ((r'^(\d{1,3})([A-Z])(\d{1,2})$', 'plr'), (r'^([A-Z])(\d{1,2})-(\d{1,3})$', 'lrp'),
+                           (r'^(\d{1,2})([A-Z])(\d{1,2})$', 'plr')):
+        match = re.match(pattern, code)
+        if match:
+            parts = dict(zip(order, match.groups()))
+            return f"{1:02d}-{int(parts['r']):02d}-{int(parts['p']):03d}{parts['l']}"
+    return location_code.strip().upper()
+
+
+def legacy_api_normalize(location_code):
+    """location_api._normalize_location_code"""
+    if not location_code:
+        return location_code
+    code = str(location_code).strip().upper()
+    for prefix_pattern in [r'^USER_[A-Z0-9]+_', r'^[A-Z]{2,10}_', r'^WH\d*_', r'^DEFAULT_']:
+        code = re.sub(prefix_pattern, '', code)
+    return code
+
+
+def legacy_evaluator_normalize(location_code):
+    """BaseRuleEvaluator._normalize_location_code"""
+    if not location_code:
+        return location_code
+    code = str(location_code).strip().upper()
+    for prefix in ['WH01_', 'WH02_', 'WH03_', 'WH04_', 'WH_', 'DEFAULT_']:
+        if code.startswith(prefix):
+            code = code[len(prefix):]
+            break
+    return code
+
+
+def _dedupe(variants):
+    seen, unique_variants = set(), []
+    for variant in variants:
+        if variant not in seen:
+            seen.add(variant)
+            unique_variants.append(variant)
+    return unique_variants
+
+
+def legacy_rule_engine_variants(location_code):
+    """RuleEngine._normalize_position_format"""
+    if not location_code:
+        return [location_code]
+    code = str(location_code).strip().upper()
+    variants = [code]
+    standard_pattern = re.match(r'^(\d{1,2})-(\d{1,2})-(\d{1,3})([A-Z])$', code)
+    if standard_pattern:
+        aisle, rack, position, level = standard_pattern.groups()
+        base_variants = [
+            f"{aisle.zfill(2)}-{rack.zfill(2)}-{position.zfill(3)}{level}",
+            f"{aisle.zfill(2)}-{rack.lstrip('0') or '0'}-{position.zfill(3)}{level}",
+            f"{aisle.zfill(2)}-{rack.zfill(2)}-{position.lstrip('0').zfill(2)}{level}",
+            f"{aisle.zfill(2)}-{rack.lstrip('0') or '0'}-{position.lstrip('0').zfill(2)}{level}",
+            f"{aisle.lstrip('0') or '0'}-{rack.lstrip('0') or '0'}-{position.lstrip('0') or '0'}{level}",
+            f"{aisle.zfill(2)}-{aisle.zfill(2)}-{position.zfill(3)}{level}",
+            f"{aisle.zfill(2)}-01-{position.zfill(3)}{level}",
+            f"01-{rack.zfill(2)}-{position.zfill(3)}{level}",
+            f"01-01-{position.zfill(3)}{level}",
+        ]
+        variants.extend(base_variants)
+        for base_variant in base_variants:
+            variants.extend([f"{base_variant}_{n}" for n in range(1, 6)])
+        if len(position) == 3:
+            alt_position_1 = position.lstrip('0') or '0'
+            alt_position_2 = position[1:].lstrip('0') or '0'
+            alt_variants = [
+                f"{aisle.zfill(2)}-{rack.zfill(2)}-{alt_position_1.zfill(3)}{level}",
+                f"{aisle.zfill(2)}-{rack.zfill(2)}-{alt_position_2.zfill(3)}{level}",
+            ]
+            variants.extend(alt_variants)
+            for alt_var in alt_variants:
+                variants.extend([f"{alt_var}_1", f"{alt_var}_2", f"{alt_var}_3"])
+    special_pattern = re.match(r'^([A-Z]+)-(\d{1,3})$', code)
+    if special_pattern:
+        prefix, number = special_pattern.groups()
+        variants.extend([f"{prefix}-{number.zfill(3)}", f"{prefix}-{number.zfill(2)}",
+                         f"{prefix}-{number.lstrip('0') or '0'}"])
+    simple_pattern = re.match(r'^([A-Z]+)(\d{1,3})$', code)
+    if simple_pattern:
+        prefix, number = simple_pattern.groups()
+        variants.extend([f"{prefix}-{number}", f"{prefix}-{number.zfill(2)}", f"{prefix}-{number.zfill(3)}"])
+    return _dedupe(variants)
+
+
+def legacy_evaluator_variants(location_code):
+    """BaseRuleEvaluator._normalize_position_format"""
+    if not location_code:
+        return [location_code]
+    code = str(location_code).strip().upper()
+    variants = [code]
+    standard_pattern = re.match(r'^(\d{1,2})-(\d{1,2})-(\d{1,3})([A-Z])$', code)
+    if standard_pattern:
+        aisle, rack, position, level = standard_pattern.groups()
+        base_variants = [
+            f"{aisle.zfill(2)}-{rack.zfill(2)}-{position.zfill(3)}{level}",
+            f"{aisle.zfill(2)}-{rack.lstrip('0') or '0'}-{position.zfill(3)}{level}",
+            f"{aisle.zfill(2)}-01-{position.zfill(3)}{level}",
+            f"01-01-{position.zfill(3)}{level}",
+        ]
+        variants.extend(base_variants)
+        for base_variant in base_variants:
+            variants.extend([f"{base_variant}_1", f"{base_variant}_2", f"{base_variant}_3"])
+    return _dedupe(variants)
+
+
+LEGACY = {
+    'canonical': legacy_to_canonical,
+    'user_prefix': legacy_api_normalize,
+    'warehouse_prefix': legacy_evaluator_normalize,
+    'position_variants': legacy_rule_engine_variants,
+    'evaluator_variants': legacy_evaluator_variants,
+}
+
+
+def build_corpus():
+    prefixes = ['', 'USER_TESTF_', 'user_bob_', 'WH01_', 'WH_', 'DEFAULT_', 'WAREHOUSE_', 'ALICE_', 'ABCDEFGHIJK_',
+                'WH01_DEFAULT_', 'USER_X_WH2_']
+    stems = ['01-01-001A', '1-1-1a', '02-1-011B', '2-06-3B', '001-01-001A', '01A01A', '02B15C', '001A01', '5A10',
+             'A1-001', 'b2-015', 'RECV-1', 'RECV-01', 'recv-001', 'STAGE-7', 'DOCK', 'DOCK1', 'FINAL12', 'AISLE-002',
+             'RECEIVING', '01-01-001A_1', '12-34-5678A', 'A-01-01A', '١٢-1-1A', '  03-2-45C  ', 'ZONE-1234', '_', '']
+    corpus = [prefix + stem for prefix, stem in itertools.product(prefixes, stems)]
+    return corpus + [None, np.nan, '', ' ', 7, 0, 1.5]
+
+
+class TestLegacyEquivalence(unittest.TestCase):
+    """Test every mode against its legacy implementation"""
+
+    def test_scalar_matches_legacy(self):
+        normalizer = LocationNormalizer()
+        for mode, legacy in LEGACY.items():
+            for code in build_corpus() * 2:  # Second pass is served by the memo
+                self.assertEqual(normalizer.normalize(code, mode), legacy(code), f"{mode}: {code!r}")
+
+    def test_series_matches_scalar(self):
+        normalizer = LocationNormalizer()
+        corpus = build_corpus()
+        series = pd.Series(corpus * 3, index=np.arange(len(corpus) * 3)[::-1], dtype=object)
+
+        for mode, legacy in LEGACY.items():
+            result = normalizer.normalize_series(series, mode)
+
+            self.assertEqual(result.index.tolist(), series.index.tolist())
+            for code, normalized in zip(series, result):
+                self.assertEqual(normalized, legacy(code), f"{mode}: {code!r}")
+
+    def test_modes_covered(self):
+        self.assertEqual(set(LEGACY), set(NORMALIZATION_MODES))
+
+
+class TestNormalizerMemo(unittest.TestCase):
+    """Test memo bounds, sharing and isolation of list results"""
+
+    def test_bounded_and_shared(self):
+        normalizer = LocationNormalizer(max_entries=10)
+        codes = [f"{n:02d}-01-01A" for n in range(30)]
+
+        normalizer.normalize_series(codes)
+        normalizer.normalize_series(codes[-5:] * 100)
+
+        stats = normalizer.get_stats()
+        self.assertEqual(stats['entries']['canonical'], 10)
+        self.assertEqual((stats['misses'], stats['hits'], stats['evictions']), (30, 5, 20))
+
+    def test_list_results_are_copies(self):
+        normalizer = LocationNormalizer()
+
+        normalizer.normalize('RECV-1', 'position_variants').append('MUTATED')
+
+        self.assertNotIn('MUTATED', normalizer.normalize('RECV-1', 'position_variants'))
+        self.assertNotIn('MUTATED', normalizer.normalize_series(['RECV-1'], 'position_variants')[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
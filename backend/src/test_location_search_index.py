@@ -0,0 +1,145 @@
+"""
+Location Search Index Test Suite
+
+Validates the per-warehouse location search index:
+1. Infix, prefix and structured queries equal brute-force scans
+2. Indexes are cached per version and rebuilt when the version changes
+3. Virtual location searches page through the index in API order
+"""
+
+import unittest
+import io
+import contextlib
+import time
+
+import numpy as np
+
+# Test imports
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from location_search_index import LocationSearchIndex, SearchIndexCache, parse_search_query
+from test_virtual_location_index import build_engine, build_specials
+from virtual_location_index import VirtualLocationIndex
+
+
+def build_codes():
+    codes = [f"{aisle:02d}-{rack}{position:02d}-{level}"
+             for aisle in range(1, 11) for rack in 'ABC' for position in range(1, 120) for level in 'ABCD']
+    return codes + ['RECV-01', 'dock_1', 'ÄÖ-1', 'USER_X_001A', '']
+
+
+class TestLocationSearchIndex(unittest.TestCase):
+    """Test index queries against brute-force scans"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.codes = build_codes()
+        cls.zones = ['STORAGE'] * (len(cls.codes) - 5) + ['RECEIVING', 'DOCK', None, 'GENERAL', 'Cold']
+        cls.index = LocationSearchIndex(
+            cls.codes, text_fields={'zone': cls.zones},
+            fields={'level': [code[-1:] for code in cls.codes],
+                    'aisle_number': [int(code[:2]) if code[:2].isdigit() else None for code in cls.codes]}
+        )
+
+    def test_infix_terms(self):
+        for term in ['1', '01', '-A1', '01-A', '01-A01', '9-C11', 'XX', 'recv', 'ä', 'DOCK', 'stor', 'old',
+                     '_0', 'C-F', '01-A01-B', '10-C119-D']:
+            expected = [i for i, code in enumerate(self.codes)
+                        if term.upper() in code.upper() or term.upper() in str(self.zones[i] or '').upper()]
+            self.assertEqual(self.index.match_term(term).tolist(), expected, term)
+
+    def test_prefixes(self):
+        for prefix in ['01-A', '1', 'recv', 'Z', '10-C119-D']:
+            expected = [i for i, code in enumerate(self.codes) if code.upper().startswith(prefix.upper())]
+            self.assertEqual(self.index.match_prefix(prefix).tolist(), expected, prefix)
+
+    def test_structured_query(self):
+        query = parse_search_query('aisle:3 level:b A1 03*')
+
+        self.assertEqual((query.terms, query.prefixes, query.fields),
+                         (['A1'], ['03'], {'aisle_number': '3', 'level': 'B'}))
+        expected = [i for i, code in enumerate(self.codes) if code.startswith('03') and code.endswith('B') and 'A1' in code]
+        self.assertEqual(self.index.query(query).tolist(), expected)
+        self.assertEqual(len(self.index.query(parse_search_query(''))), len(self.codes))
+
+    def test_search_benchmark(self):
+        codes = [f"{aisle:02d}-{rack}{position:03d}-{level}"
+                 for aisle in range(1, 21) for rack in 'ABCDE' for position in range(1, 401) for level in 'ABCDE']
+        index = LocationSearchIndex(codes, fields={'aisle_number': [int(code[:2]) for code in codes],
+                                                   'level': [code[-1] for code in codes]})
+
+        timings = {}
+        for query in ('07-C1', '12-B*', 'aisle:7 level:C 3', 'D37'):
+            parsed = parse_search_query(query)
+            start = time.perf_counter()
+            for _ in range(20):
+                ordinals = index.query(parsed)
+            timings[query] = (time.perf_counter() - start) * 1000 / 20
+            self.assertEqual(len(ordinals), sum(1 for code in codes if self._brute_force(code, parsed)), query)
+
+        print(f"\n[SEARCH_INDEX] {len(codes):,} codes built in {index.build_ms:.0f}ms; "
+              + ', '.join(f"{query!r} {ms:.2f}ms" for query, ms in timings.items()))
+        self.assertLess(max(timings.values()), 50)
+
+    @staticmethod
+    def _brute_force(code, parsed):
+        fields = {'aisle_number': str(int(code[:2])), 'level': code[-1]}
+        return (all(term in code for term in parsed.terms) and all(code.startswith(p) for p in parsed.prefixes)
+                and all(fields[name] == value for name, value in parsed.fields.items()))
+
+
+class TestSearchIndexCache(unittest.TestCase):
+    """Test version stamping, invalidation and LRU bounds"""
+
+    def _get(self, cache, key, version):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return cache.get_or_build(key, version, lambda: LocationSearchIndex(['01-A01-A']))
+
+    def test_rebuild_on_version_change(self):
+        cache = SearchIndexCache(max_indexes=2)
+
+        index = self._get(cache, ('physical', 'WH1', 1), 'v1')
+        self.assertIs(self._get(cache, ('physical', 'WH1', 1), 'v1'), index)
+        self.assertIsNot(self._get(cache, ('physical', 'WH1', 1), 'v2'), index)
+
+        self._get(cache, ('virtual', 'WH2'), 'v1')
+        self._get(cache, ('virtual', 'WH3'), 'v1')
+        cache.invalidate('WH3')
+
+        stats = cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['rebuilds']), (1, 3, 1))
+        self.assertEqual((stats['evictions'], stats['invalidations'], stats['size']), (1, 1, 1))
+
+
+class TestVirtualLocationSearch(unittest.TestCase):
+    """Test virtual selections that page through the search index"""
+
+    def test_search_index_matches_scan(self):
+        index = VirtualLocationIndex(build_engine(num_aisles=4, positions_per_rack=30), build_specials())
+        scanning = VirtualLocationIndex(build_engine(num_aisles=4, positions_per_rack=30), build_specials())
+        scanning.search_index = lambda: None
+
+        for search, aisle_number in [('b1', None), ('aisle:2 level:c', None), ('02-*', None), ('rack:A 1', 3),
+                                     ('type:storage -B2', None), ('type:dock', None), ('zone:storage A3', 4)]:
+            with contextlib.redirect_stdout(io.StringIO()):
+                indexed = index.select(search=search, aisle_number=aisle_number)
+            scanned = scanning.select(search=search, aisle_number=aisle_number)
+
+            self.assertIsInstance(indexed.storage_ordinals, (np.ndarray, type(None)))
+            self.assertEqual(len(indexed), len(scanned), search)
+            for offset in (0, 2, len(scanned) - 5):
+                self.assertEqual([loc['code'] for loc in indexed.page(offset, 25)],
+                                 [loc['code'] for loc in scanned.page(offset, 25)], f"{search} offset={offset}")
+
+    def test_structured_search_on_special_areas(self):
+        index = VirtualLocationIndex(build_engine(), build_specials())
+
+        self.assertEqual([loc['code'] for loc in index.select(search='aisle:2 type:transitional').page(0, 10)],
+                         ['AISLE-02'])
+        self.assertEqual([loc['code'] for loc in index.select(search='recv*').page(0, 10)], ['RECV-01'])
+
+
+if __name__ == '__main__':
+    unittest.main()
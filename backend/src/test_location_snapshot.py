@@ -0,0 +1,163 @@
+"""
+Location Snapshot Test Suite
+
+Validates the compact array-backed location data behind LocationRepository:
+1. Snapshot views return exactly the ORM attribute values (NULLs included)
+2. Repository lookups, placeholders and bulk accessors keep their behavior
+3. The snapshot is a fraction of the memory of ORM objects (10k-location benchmark)
+"""
+
+import unittest
+import io
+import gc
+import contextlib
+import tracemalloc
+
+import numpy as np
+from flask import Flask
+
+# Test imports
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import db
+import core_models  # noqa: F401  (registers the user table referenced by foreign keys)
+from models import Location
+from services.location_repository import LocationRepository
+from services.location_snapshot import SNAPSHOT_COLUMNS, LocationSnapshot, load_location_frame
+
+
+def build_rows(count: int, seed: int = 5) -> list:
+    rng = np.random.default_rng(seed)
+    types = ['STORAGE', 'RECEIVING', 'DOCK', 'STAGING', None]
+    rows = []
+    for n in range(count):
+        pick = rng.integers(0, 5, size=8)
+        rows.append({
+            'code': f"{n // 800 + 1:02d}-{n // 200 % 4 + 1:02d}-{n % 200 + 1:03d}{'ABCD'[n % 4]}",
+            'warehouse_id': 'WH1', 'location_type': types[pick[0]] or 'STORAGE',
+            'capacity': [None, 1, 2, 5, 40][pick[1]], 'pallet_capacity': [None, 1, 2, 1, 1][pick[2]],
+            'unit_type': [None, 'pallets', 'boxes', '', 'pallets'][pick[3]], 'is_tracked': [None, True, False, True, True][pick[4]],
+            'zone': [None, 'GENERAL', 'COLD', 'GENERAL', 'DOCK'][pick[5]], 'aisle_number': [None, 1, 2, 3, 4][pick[6]],
+            'rack_number': n % 3 or None, 'position_number': n % 200, 'level': [None, 'A', 'B', 'C', 'D'][pick[7]],
+        })
+    return rows
+
+
+class SnapshotTestCase(unittest.TestCase):
+
+    ROWS = 600
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        self.rows = build_rows(self.ROWS)
+        db.session.execute(Location.__table__.insert(), self.rows)
+        db.session.execute(Location.__table__.insert(), [dict(self.rows[0], warehouse_id='WH2', capacity=99)])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+
+class TestSnapshotEquivalence(SnapshotTestCase):
+    """Test views and bulk accessors against the ORM objects"""
+
+    def test_views_match_orm(self):
+        snapshot = LocationSnapshot.from_frame(load_location_frame(db.session, 'WH1'), warehouse_id='WH1')
+
+        self.assertEqual(len(snapshot), self.ROWS)
+        for location in Location.query.filter_by(warehouse_id='WH1'):
+            view = snapshot.get(location.code)
+            for name in SNAPSHOT_COLUMNS:
+                self.assertEqual(getattr(view, name), getattr(location, name), f"{location.code}.{name}")
+
+    def test_bulk_column_alignment(self):
+        snapshot = LocationSnapshot.from_frame(load_location_frame(db.session, 'WH1'), warehouse_id='WH1')
+        codes = ['NOPE'] + [row['code'] for row in self.rows[::7]] + ['ALSO-NOPE']
+
+        rows = snapshot.rows_for(codes)
+        capacities = snapshot.column('capacity', rows)
+        zones = snapshot.column('zone', rows)
+
+        self.assertEqual((rows[0], rows[-1]), (-1, -1))
+        self.assertTrue(np.isnan(capacities[0]) and zones[-1] is None)
+        for code, capacity, zone in zip(codes[1:-1], capacities[1:-1], zones[1:-1]):
+            view = snapshot.get(code)
+            self.assertEqual(None if np.isnan(capacity) else capacity, view.capacity)
+            self.assertEqual(zone, view.zone)
+
+
+class TestRepositoryBehavior(SnapshotTestCase):
+    """Test LocationRepository on top of the snapshot"""
+
+    def setUp(self):
+        super().setUp()
+        self.codes = [row['code'] for row in self.rows[:300]] + ['  ' + self.rows[1]['code'], 'GHOST-1', '', None]
+        self.repository = LocationRepository('WH1', db.session)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.repository.bulk_load_locations(self.codes)
+
+    def test_lookups_and_placeholders(self):
+        first = self.repository.get_location(self.rows[0]['code'])
+        ghost = self.repository.get_location('GHOST-1')
+
+        self.assertEqual(first.capacity, self.rows[0]['capacity'])  # WH2 copy is not loaded
+        self.assertEqual((ghost.capacity, ghost.unit_type, ghost.location_type), (1, 'pallets', None))
+        self.assertIsNone(self.repository.get_location(self.rows[400]['code']))
+        self.assertEqual(self.repository.get_cache_stats()['total_cached'], 301)
+
+    def test_bulk_accessors_match_orm(self):
+        records = {location.code: location for location in Location.query.filter_by(warehouse_id='WH1')}
+        codes = [row['code'] for row in self.rows[:300]] + ['GHOST-1', 'UNLOADED']
+
+        expected_capacities = {code: records[code].capacity for code in codes[:-2] if records[code].capacity is not None}
+        expected_capacities['GHOST-1'] = 1
+        expected_units = {code: records[code].unit_type or 'pallets' for code in codes[:-2]}
+        expected_units.update({'GHOST-1': 'pallets', 'UNLOADED': 'pallets'})
+        expected_special = {code for code in codes[:-2]
+                            if records[code].location_type in LocationRepository.SPECIAL_LOCATION_TYPES}
+
+        self.assertEqual(self.repository.get_capacities_bulk(codes + ['', None]), expected_capacities)
+        self.assertEqual(self.repository.get_unit_types_bulk(codes), expected_units)
+        self.assertEqual({code for code in codes if self.repository.is_physical_special_location(code)}, expected_special)
+
+
+class TestSnapshotMemory(SnapshotTestCase):
+    """Benchmark snapshot memory against cached ORM objects"""
+
+    ROWS = 10_000
+
+    def test_memory_against_orm_objects(self):
+        codes = [row['code'] for row in self.rows]
+
+        gc.collect()
+        tracemalloc.start()
+        locations = {location.code: location for location in
+                     Location.query.filter(Location.warehouse_id == 'WH1', Location.code.in_(codes)).all()}
+        orm_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del locations
+        db.session.expunge_all()
+
+        gc.collect()
+        tracemalloc.start()
+        snapshot = LocationSnapshot.from_frame(load_location_frame(db.session, 'WH1', codes))
+        snapshot_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        self.assertEqual(len(snapshot), 10_000)
+        self.assertLess(snapshot_bytes * 3, orm_bytes)
+        self.assertLess(snapshot.memory_bytes(), snapshot_bytes)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+"""
+Vectorized Overcapacity Test Suite
+
+Validates the bulk overcapacity paths against per-location reference logic:
+1. Capacities are resolved once per unique location, bulk sources first
+2. Statistical mode flags the same locations/representatives as the loop
+3. Bulk classification and the differentiation mode match per-location logic
+"""
+
+import unittest
+import json
+import io
+import contextlib
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+# Test imports
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from rule_engine import OvercapacityEvaluator
+from location_classification_service import LocationClassificationService
+
+
+class MockRule:
+    """Minimal stand-in for the Rule model"""
+
+    def __init__(self, rule_id=1, parameters=None, priority='High'):
+        self.id = rule_id
+        self.name = "Overcapacity test rule"
+        self.rule_type = 'OVERCAPACITY'
+        self.priority = priority
+        self.conditions = json.dumps({})
+        self.parameters = json.dumps(parameters or {})
+        self.precedence_level = 2
+
+
+class StubRepository:
+    """LocationRepository stand-in with a fixed capacity map"""
+
+    def __init__(self, capacities):
+        self.capacities = capacities
+
+    def get_capacities_bulk(self, location_codes):
+        return {code: self.capacities[code] for code in location_codes if code in self.capacities}
+
+    def get_unit_types_bulk(self, location_codes):
+        return {code: 'pallets' for code in location_codes}
+
+
+def build_inventory(rows: int, seed: int = 3) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    locations = np.array(
+        ['RECV-01', 'RECV-02', 'STAGE-01', 'DOCK-1', 'AISLE-01', 'TEMP-HOLD', 'BULK-7'] +
+        [f"{i:03d}A" for i in range(150)], dtype=object
+    )
+    frame = pd.DataFrame({
+        'pallet_id': np.char.add('P', np.arange(rows).astype(str)).astype(object),
+        'location': locations[rng.integers(0, len(locations), size=rows)],
+    })
+    frame.loc[::97, 'location'] = None
+    return frame
+
+
+class TestBulkCapacityResolution(unittest.TestCase):
+    """Test _resolve_capacities_bulk against _get_location_capacity"""
+
+    def setUp(self):
+        self.evaluator = OvercapacityEvaluator()
+
+    def test_matches_per_location_capacity(self):
+        locations = pd.Index(['RECV-01', 'STAGE-01', 'DOCK-1', 'AISLE-01', 'TEMP-HOLD', 'BULK-7', '001A', 'X', None])
+
+        capacities = self.evaluator._resolve_capacities_bulk(locations)
+
+        expected = [self.evaluator._get_location_capacity(None, str(location)) for location in locations]
+        self.assertEqual(capacities.tolist(), expected)
+        self.assertEqual(capacities['TEMP-HOLD'], -1)
+
+    def test_repository_resolves_before_per_location_fallback(self):
+        context = {'location_repository': StubRepository({'001A': 4, 'RECV-01': 25})}
+
+        with patch.object(OvercapacityEvaluator, '_find_locations_bulk', return_value={}) as lookup:
+            capacities = self.evaluator._resolve_capacities_bulk(['001A', 'RECV-01', 'STAGE-01'], context)
+
+        self.assertEqual(capacities.tolist(), [4, 25, 5])
+        lookup.assert_called_once_with(['STAGE-01'], None)  # One bulk lookup for the misses
+
+
+class TestStatisticalOvercapacity(unittest.TestCase):
+    """Test the vectorized statistical mode against the per-location loop"""
+
+    def _reference(self, evaluator, inventory_df):
+        flagged = []
+        for location, count in inventory_df['location'].value_counts().items():
+            capacity = evaluator._get_location_capacity(None, str(location))
+            if count > capacity:
+                first_pallet = inventory_df.loc[inventory_df['location'] == location, 'pallet_id'].iloc[0]
+                flagged.append((location, count, capacity, first_pallet))
+        return flagged
+
+    def test_matches_reference_loop(self):
+        evaluator = OvercapacityEvaluator()
+        inventory_df = build_inventory(2_000)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            anomalies = evaluator.evaluate(MockRule(parameters={'use_statistical_analysis': True}), inventory_df)
+
+        self.assertEqual(
+            [(a['location'], a['affected_pallets'], a['affected_pallets'] - a['excess_pallets'], a['pallet_id'])
+             for a in anomalies],
+            self._reference(evaluator, inventory_df)
+        )
+        self.assertTrue(any(a['anomaly_type'] == 'Obvious Violation' for a in anomalies))
+
+    def test_warehouse_statistics_include_every_unique_location(self):
+        evaluator = OvercapacityEvaluator()
+        inventory_df = build_inventory(500)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = evaluator._calculate_warehouse_statistics(inventory_df)
+
+        unique_locations = inventory_df['location'].unique()
+        self.assertEqual(stats['total_locations'], len(unique_locations))
+        self.assertEqual(
+            stats['total_capacity'],
+            sum(evaluator._get_location_capacity(None, str(location)) for location in unique_locations)
+        )
+
+
+class TestLocationDifferentiation(unittest.TestCase):
+    """Test batch classification and differentiated alert generation"""
+
+    def test_bulk_classification_matches_scalar(self):
+        service = LocationClassificationService()
+        codes = ['RECV-01', 'stage-2', 'AISLE-07', 'AISLE-03', '1-01-01A', 'USER_X', 'X-RACK-1',
+                 'FOO-12', 'RACKED', 'FLOORING', 'ZZZ', 'TEMP1', '001A', '']
+        types = [None, 'STORAGE', 'RECEIVING', 'UNMAPPED']
+
+        rows = [(code, location_type) for code in codes for location_type in types]
+        bulk = service.classify_locations_bulk([code for code, _ in rows], [t for _, t in rows])
+
+        for position, (code, location_type) in enumerate(rows):
+            location_obj = type('Loc', (), {'location_type': location_type})() if location_type else None
+            self.assertEqual(
+                service.classify_location(location_obj, code),
+                (bulk['category'][position], bulk['priority'][position]),
+                f"{code} / {location_type}"
+            )
+
+    def test_storage_and_special_strategies(self):
+        evaluator = OvercapacityEvaluator()
+        inventory_df = pd.DataFrame({
+            'pallet_id': ['P1', 'P2', 'P3', 'P4', 'P5', 'P6', 'P7', 'P8'],
+            'location': ['001A', '001A', 'RECV-01', 'RECV-01', 'RECV-01', 'AISLE-09', 'AISLE-09', '002A'],
+        })
+        context = {'location_repository': StubRepository({'RECV-01': 2, '001A': 1})}
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            anomalies = evaluator._evaluate_with_location_differentiation(MockRule(), inventory_df, context)
+
+        by_location = {anomaly['location']: anomaly for anomaly in anomalies}
+        self.assertEqual(set(by_location), {'001A', 'RECV-01'})  # AISLE-09 fails pre-validation
+
+        self.assertEqual(by_location['001A']['location_category'], 'STORAGE')
+        self.assertEqual(by_location['001A']['pallet_id'], 'P1')
+        self.assertEqual(by_location['RECV-01']['location_category'], 'SPECIAL')
+        self.assertEqual(by_location['RECV-01']['capacity_percentage'], 150)
+        self.assertEqual(by_location['RECV-01']['excess_pallets'], 1)
+
+    def test_repository_misses_not_flagged(self):
+        evaluator = OvercapacityEvaluator()
+        inventory_df = pd.DataFrame({'pallet_id': ['P1', 'P2', 'P3', 'P4'], 'location': ['001A', '001A', '002A', '002A']})
+        context = {'location_repository': StubRepository({'001A': 1})}
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            anomalies = evaluator._evaluate_with_location_differentiation(MockRule(), inventory_df, context)
+
+        # 002A has no database capacity: no default capacity is assumed
+        self.assertEqual([anomaly['location'] for anomaly in anomalies], ['001A'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+"""
+Partitioned Evaluation Test Suite
+
+Validates that partitioned out-of-core evaluation produces the same anomalies
+as in-memory evaluation:
+1. Locality-keyed sharding keeps lots and locations whole
+2. Shard round-trip through Parquet preserves values
+3. Merged results equal evaluate_all_rules per rule
+"""
+
+import unittest
+import json
+import io
+import contextlib
+import tempfile
+from datetime import datetime
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+# Test imports
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from partitioned_evaluation import (
+    PartitionedRuleEngine, assign_shards, get_partition_key, read_shard, write_shard, GLOBAL_PARTITION
+)
+from rule_engine import RuleEngine
+
+
+class MockRule:
+    """Minimal stand-in for the Rule model"""
+
+    def __init__(self, rule_id, rule_type, conditions=None, parameters=None, precedence_level=4):
+        self.id = rule_id
+        self.name = f"{rule_type} test rule"
+        self.rule_type = rule_type
+        self.priority = 'HIGH'
+        self.conditions = json.dumps(conditions or {})
+        self.parameters = json.dumps(parameters or {})
+        self.precedence_level = precedence_level
+
+
+def build_benchmark_inventory(rows: int, seed: int = 11) -> pd.DataFrame:
+    """Benchmark-style inventory with lots, overfull locations, duplicates and gaps"""
+    rng = np.random.default_rng(seed)
+    locations = np.array(
+        [f"RECV-{i:02d}" for i in range(1, 4)] +
+        [f"AISLE-{i:02d}" for i in range(1, 4)] +
+        [f"{rack}.{level}{slot}" for rack in range(1, 20) for level in range(1, 6) for slot in 'ABCDEF']
+    )
+    # Whole hours plus 12 minutes keep rounded ages stable between the two runs
+    ages = pd.to_timedelta(rng.integers(0, 30, size=rows), unit='h') + pd.Timedelta(minutes=12)
+
+    inventory = pd.DataFrame({
+        'pallet_id': np.char.add('P', rng.integers(0, int(rows * 0.98), size=rows).astype(str)),
+        'location': locations[rng.integers(0, len(locations), size=rows)].astype(object),
+        'creation_date': pd.Timestamp(datetime.now()) - ages,
+        'receipt_number': np.char.add('R', rng.integers(0, rows // 8, size=rows).astype(str)),
+    })
+    inventory.loc[rng.choice(rows, size=rows // 100, replace=False), 'location'] = np.nan
+    return inventory
+
+
+def canonical(anomalies):
+    """Order-independent representation of an anomaly list"""
+    return sorted(json.dumps(anomaly, sort_keys=True, default=str) for anomaly in anomalies)
+
+
+class TestPartitionPlanning(unittest.TestCase):
+    """Test shard key selection and assignment"""
+
+    def test_lot_rules_shard_by_receipt(self):
+        rule = MockRule(1, 'UNCOORDINATED_LOTS')
+        self.assertEqual(get_partition_key(rule, ['pallet_id', 'location', 'receipt_number']), 'receipt_number')
+        self.assertEqual(get_partition_key(rule, ['pallet_id', 'location']), 'location')
+
+    def test_statistical_overcapacity_runs_globally(self):
+        rule = MockRule(1, 'OVERCAPACITY', parameters={'use_statistical_analysis': True})
+        self.assertEqual(get_partition_key(rule, ['pallet_id', 'location']), GLOBAL_PARTITION)
+        self.assertEqual(get_partition_key(MockRule(2, 'CUSTOM_RULE'), ['location']), GLOBAL_PARTITION)
+
+    def test_equal_keys_share_a_shard(self):
+        keys = pd.Series(['R1', 'R2', 'R1', np.nan, 'R3', np.nan])
+        shards = assign_shards(keys, 4)
+
+        self.assertEqual(shards[0], shards[2])
+        self.assertEqual(shards[3], shards[5])
+        self.assertTrue(((shards >= 0) & (shards < 4)).all())
+
+    def test_shard_round_trip(self):
+        shard = build_benchmark_inventory(500).iloc[::3]
+        with tempfile.TemporaryDirectory() as work_dir:
+            path = write_shard(shard, os.path.join(work_dir, 'location_0000'))
+            restored = read_shard(path)
+
+        self.assertTrue(path.endswith('.parquet'))
+        pd.testing.assert_frame_equal(restored, shard)
+
+
+class TestPartitionedEquivalence(unittest.TestCase):
+    """Test that partitioned mode equals in-memory mode on benchmark data"""
+
+    ROWS = 20_000
+
+    def setUp(self):
+        self.inventory_df = build_benchmark_inventory(self.ROWS)
+        self.rules = [
+            MockRule(1, 'DATA_INTEGRITY', precedence_level=1),
+            MockRule(2, 'MISSING_LOCATION', precedence_level=1),
+            MockRule(3, 'OVERCAPACITY', precedence_level=2),
+            MockRule(4, 'STAGNANT_PALLETS', {'time_threshold_hours': 10}, precedence_level=3),
+            MockRule(5, 'UNCOORDINATED_LOTS', {'completion_threshold': 0.6}, precedence_level=3),
+            MockRule(6, 'LOCATION_SPECIFIC_STAGNANT', {'location_pattern': 'AISLE*', 'time_threshold_hours': 4}),
+        ]
+
+    def _evaluate(self, evaluate):
+        engine = RuleEngine(db_session=None)
+        with patch.object(RuleEngine, 'load_active_rules', return_value=self.rules), \
+                contextlib.redirect_stdout(io.StringIO()):
+            return evaluate(engine)
+
+    def test_partitioned_equals_in_memory(self):
+        in_memory = self._evaluate(lambda engine: engine.evaluate_all_rules(self.inventory_df))
+        partitioned = self._evaluate(
+            lambda engine: engine.evaluate_all_rules_partitioned(self.inventory_df, shard_count=6, max_workers=3)
+        )
+
+        self.assertEqual([r.rule_id for r in in_memory], [r.rule_id for r in partitioned])
+        for expected, actual in zip(in_memory, partitioned):
+            with self.subTest(rule_id=expected.rule_id):
+                self.assertTrue(actual.success, actual.error_message)
+                self.assertGreater(len(expected.anomalies), 0)
+                self.assertEqual(canonical(actual.anomalies), canonical(expected.anomalies))
+
+    def test_sequential_fallback_equals_pool(self):
+        pooled = self._evaluate(
+            lambda engine: PartitionedRuleEngine(engine, shard_count=4, max_workers=2).evaluate_all_rules(self.inventory_df)
+        )
+        sequential = self._evaluate(
+            lambda engine: PartitionedRuleEngine(engine, shard_count=4, max_workers=1).evaluate_all_rules(self.inventory_df)
+        )
+
+        for expected, actual in zip(pooled, sequential):
+            self.assertEqual(canonical(actual.anomalies), canonical(expected.anomalies))
+
+
+if __name__ == '__main__':
+    unittest.main()
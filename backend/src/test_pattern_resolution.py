@@ -6,8 +6,9 @@ This test suite validates:
 1. Template-based pattern generation for zone-based, position-level, and canonical formats
 2. Pattern resolver integration with rule evaluators
 3. Backward compatibility with existing location formats
-4. Cache performance and TTL behavior
+4. Shared pattern cache: reuse across resolvers, template revalidation, LRU eviction
 5. Fallback mechanisms for error conditions
+6. Template edits in the database invalidate cached pattern sets
 """
 
 import unittest
@@ -24,8 +25,9 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from rule_pattern_resolver import RulePatternResolver, PatternSet
+from rule_pattern_resolver import RulePatternResolver, PatternSet, PatternSetCache, warm_pattern_cache
 from rule_engine import RuleEngine, LocationSpecificStagnantEvaluator, LocationMappingErrorEvaluator
+from test_rule_plan_cache import WarehouseTemplateTestCase
 
 
 class TestRulePatternResolver(unittest.TestCase):
@@ -36,8 +38,9 @@ class TestRulePatternResolver(unittest.TestCase):
         self.mock_db = Mock()
         self.mock_app = Mock()
 
-        # Create test resolver
+        # Create test resolver (isolated from the process-wide pattern cache)
         self.resolver = RulePatternResolver(self.mock_db, self.mock_app)
+        self.resolver._cache = PatternSetCache()
 
         # Test warehouse contexts
         self.zone_warehouse = {
@@ -134,83 +137,83 @@ class TestRulePatternResolver(unittest.TestCase):
         self.assertIn('\\d{2}-\\d{2}-\\d{3}[A-Z]', storage_pattern)
 
     def test_cache_functionality(self):
-        """Test caching behavior and TTL expiration"""
-        # Mock template config
-        with patch.object(self.resolver, '_get_template_config') as mock_template:
-            mock_template.return_value = {
-                'pattern_type': 'zone_based',
-                'confidence': 0.95,
-                'business_zones': ['PICK', 'BULK']
-            }
-
-            # First call should cache the result
+        """Test caching behavior and sharing across resolvers"""
+        zone_config = {
+            'pattern_type': 'zone_based',
+            'confidence': 0.95,
+            'business_zones': ['PICK', 'BULK']
+        }
+        with patch.object(RulePatternResolver, '_load_template', return_value=('7:v1', zone_config)) as mock_template:
+            # First call should cache the result (precompiled)
             patterns1 = self.resolver.get_patterns_for_rule('TEST_RULE', self.zone_warehouse)
-            self.assertEqual(len(self.resolver._pattern_cache), 1)
+            self.assertEqual(self.resolver.get_cache_stats()['pattern_cache_size'], 1)
+            self.assertTrue(patterns1.compiled_patterns('storage').matches('PICK-A-001'))
 
-            # Second call should use cache
-            patterns2 = self.resolver.get_patterns_for_rule('TEST_RULE', self.zone_warehouse)
-            self.assertEqual(patterns1.source, patterns2.source)
+            # Second call, even from another resolver sharing the cache, should use it
+            other = RulePatternResolver(self.mock_db, self.mock_app)
+            other._cache = self.resolver._cache
+            patterns2 = other.get_patterns_for_rule('TEST_RULE', self.zone_warehouse)
+            self.assertIs(patterns1, patterns2)
 
-            # Mock template should only be called once due to caching
+            # Template should only be loaded once due to caching
             self.assertEqual(mock_template.call_count, 1)
 
     def test_cache_ttl_expiration(self):
-        """Test cache TTL expiration behavior"""
-        # Set short TTL for testing
-        original_ttl = self.resolver._cache_ttl
-        self.resolver._cache_ttl = 0.1  # 100ms
-
-        try:
-            with patch.object(self.resolver, '_get_template_config') as mock_template:
-                mock_template.return_value = {
-                    'pattern_type': 'zone_based',
-                    'confidence': 0.95
-                }
-
-                # First call
-                self.resolver.get_patterns_for_rule('TEST_RULE', self.zone_warehouse)
-                self.assertEqual(mock_template.call_count, 1)
-
-                # Wait for TTL expiration
-                time.sleep(0.15)
+        """Test template revalidation and version-keyed pattern sets"""
+        self.resolver._cache.revalidate_seconds = 0.1  # 100ms
+        versions = [('7:v1', {'pattern_type': 'zone_based', 'confidence': 0.95})] * 2
+        versions.append(('7:v2', {'pattern_type': 'canonical', 'confidence': 0.85}))
+
+        with patch.object(RulePatternResolver, '_load_template', side_effect=versions) as mock_template:
+            # First call
+            first = self.resolver.get_patterns_for_rule('TEST_RULE', self.zone_warehouse)
+            self.assertEqual(mock_template.call_count, 1)
 
-                # Second call should re-query due to TTL expiration
-                self.resolver.get_patterns_for_rule('TEST_RULE', self.zone_warehouse)
-                self.assertEqual(mock_template.call_count, 2)
+            # Wait for revalidation: same template version keeps the pattern set
+            time.sleep(0.15)
+            self.assertIs(self.resolver.get_patterns_for_rule('TEST_RULE', self.zone_warehouse), first)
+            self.assertEqual(mock_template.call_count, 2)
 
-        finally:
-            self.resolver._cache_ttl = original_ttl
+            # Edited template: new version, new patterns
+            time.sleep(0.15)
+            updated = self.resolver.get_patterns_for_rule('TEST_RULE', self.zone_warehouse)
+            self.assertEqual(mock_template.call_count, 3)
+            self.assertEqual(updated.source, 'canonical_template')
+            self.assertEqual(self.resolver.get_cache_stats()['pattern_cache_keys'],
+                             ['USER_TESTWAREHOUSE:TEST_RULE:7:v2'])
 
     def test_cache_cleanup(self):
-        """Test LRU cache cleanup when max size exceeded"""
-        original_max_size = self.resolver._max_cache_size
-        self.resolver._max_cache_size = 3  # Small size for testing
+        """Test LRU eviction when max size exceeded"""
+        self.resolver._cache.max_entries = 3  # Small size for testing
 
-        try:
-            # Clear existing cache
-            self.resolver._pattern_cache.clear()
-
-            # Fill cache beyond max size
+        with patch.object(RulePatternResolver, '_load_template', return_value=('none', None)):
             for i in range(5):
-                cache_key = f"warehouse_{i}:rule_{i}"
-                self.resolver._pattern_cache[cache_key] = {
-                    'patterns': Mock(),
-                    'timestamp': time.time() - i  # Different timestamps for LRU
-                }
+                self.resolver.get_patterns_for_rule(f'rule_{i}', {'warehouse_id': 'USER_LRU'})
+            self.resolver.get_patterns_for_rule('rule_2', {'warehouse_id': 'USER_LRU'})  # Refresh
+            self.resolver.get_patterns_for_rule('rule_5', {'warehouse_id': 'USER_LRU'})
+
+        stats = self.resolver._cache.get_stats()
+        self.assertEqual(stats['size'], 3)
+        self.assertEqual(stats['evictions'], 3)
+        self.assertEqual(stats['keys'], ['USER_LRU:rule_4:none', 'USER_LRU:rule_2:none', 'USER_LRU:rule_5:none'])
 
-            # Trigger cleanup
-            self.resolver._cleanup_cache()
+    def test_worker_start_warmup(self):
+        """Test warmup precompiles pattern sets that later engines hit"""
+        with patch('rule_pattern_resolver._pattern_set_cache', PatternSetCache()) as shared, \
+                patch.object(RulePatternResolver, '_load_template', return_value=('none', None)), \
+                patch('builtins.print'):
+            self.assertEqual(warm_pattern_cache(self.mock_app, ['USER_A', 'USER_B']), 4)
 
-            # Should have removed oldest entries (20% cleanup)
-            expected_remaining = max(3, len(self.resolver._pattern_cache) - 1)  # At least max_size or current - 20%
-            self.assertLessEqual(len(self.resolver._pattern_cache), expected_remaining)
+            resolver = RulePatternResolver(self.mock_db, self.mock_app)
+            patterns = resolver.get_patterns_for_rule('LOCATION_MAPPING_ERROR', {'warehouse_id': 'USER_B'})
 
-        finally:
-            self.resolver._max_cache_size = original_max_size
+            self.assertEqual(set(patterns.compiled), {'storage', 'transitional', 'receiving', 'staging', 'dock', 'special'})
+            stats = shared.get_stats()
+            self.assertEqual((stats['warmed'], stats['misses'], stats['hits']), (4, 4, 1))
 
     def test_error_handling_fallback(self):
         """Test graceful fallback on template resolution errors"""
-        with patch.object(self.resolver, '_get_template_config') as mock_template:
+        with patch.object(self.resolver, '_load_template') as mock_template:
             # Simulate template resolution error
             mock_template.side_effect = Exception("Template query failed")
 
@@ -221,17 +224,41 @@ class TestRulePatternResolver(unittest.TestCase):
             self.assertGreater(len(patterns.storage_patterns), 0)
 
     def test_get_cache_stats(self):
-        """Test cache statistics reporting"""
-        # Add some cache entries
-        self.resolver._pattern_cache['test1:rule1'] = {'timestamp': time.time()}
-        self.resolver._template_cache['test1'] = {'timestamp': time.time()}
+        """Test cache statistics reporting, per template source"""
+        with patch.object(RulePatternResolver, '_load_template', return_value=('none', None)):
+            self.resolver.get_patterns_for_rule('rule1', {'warehouse_id': 'test1'})
+            self.resolver.get_patterns_for_rule('rule1', {'warehouse_id': 'test1'})
 
         stats = self.resolver.get_cache_stats()
 
         self.assertEqual(stats['pattern_cache_size'], 1)
         self.assertEqual(stats['template_cache_size'], 1)
-        self.assertIn('test1:rule1', stats['pattern_cache_keys'])
+        self.assertIn('test1:rule1:none', stats['pattern_cache_keys'])
         self.assertIn('test1', stats['template_cache_keys'])
+        self.assertEqual(stats['by_source']['default_fallback'], {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+
+class TestTemplateInvalidation(WarehouseTemplateTestCase):
+    """Test pattern sets resolved from a real warehouse template"""
+
+    def test_template_edit_invalidates_pattern_sets(self):
+        resolver = RulePatternResolver(None, self.app)
+        resolver._cache = PatternSetCache(revalidate_seconds=0)
+
+        zone = resolver.get_patterns_for_rule('TEST_RULE', {'warehouse_id': 'WH1'})
+        self.assertEqual(zone.source, 'zone_based_template')
+        self.assertIs(resolver.get_patterns_for_rule('TEST_RULE', {'warehouse_id': 'WH1'}), zone)
+        old_keys = resolver.get_cache_stats()['pattern_cache_keys']
+
+        self.template.set_location_format_config({'pattern_type': 'canonical', 'confidence': 0.85})
+        self.edit_template()
+
+        updated = resolver.get_patterns_for_rule('TEST_RULE', {'warehouse_id': 'WH1'})
+        self.assertEqual(updated.source, 'canonical_template')
+        new_keys = resolver.get_cache_stats()['pattern_cache_keys']
+        self.assertEqual(len(new_keys), 1)
+        self.assertNotEqual(new_keys, old_keys)
+        self.assertEqual(resolver._cache.get_stats()['template_changes'], 1)
 
 
 class TestRuleEvaluatorIntegration(unittest.TestCase):
@@ -0,0 +1,223 @@
+"""
+Compiled Rule Plan Test Suite
+
+Validates rule plan compilation and caching:
+1. Compiled pattern sets match exactly like the per-pattern loop, including group references
+2. Plans are cached and keyed by updated_at and rule content
+3. Edits invalidate plans; plan conditions are immutable
+4. Warehouse template edits change the template version in plan keys
+"""
+
+import unittest
+import json
+import io
+import contextlib
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+# Test imports
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from rule_plan_cache import (
+    RulePlanCache, build_plan_key, compile_pattern_set, get_rule_plan_cache, get_template_state, get_template_version
+)
+from rule_engine import StagnantPalletsEvaluator
+
+
+class MockRule:
+    """Minimal stand-in for the Rule model"""
+
+    def __init__(self, rule_id, rule_type, conditions, updated_at=None):
+        self.id = rule_id
+        self.name = f"{rule_type} test rule"
+        self.rule_type = rule_type
+        self.priority = 'HIGH'
+        self.conditions = json.dumps(conditions)
+        self.parameters = json.dumps({})
+        self.updated_at = updated_at or datetime(2025, 1, 1)
+
+
+class TestCompiledPatternSet(unittest.TestCase):
+    """Test single-pass matching against the per-pattern loop"""
+
+    def _loop_mask(self, values, patterns):
+        mask = pd.Series(False, index=values.index)
+        for pattern in patterns:
+            try:
+                mask = mask | values.str.match(pattern, na=False)
+            except Exception:
+                continue
+        return mask.to_numpy(dtype=bool)
+
+    def test_matches_loop_semantics(self):
+        values = pd.Series(['RECV-01', 'RECEIVING', '01-02-003A', 'STAGE-1', 'AISLE-07', 'DOCK', '1.1A', ''])
+        pattern_lists = [
+            [r'^RECV-\d+$', r'RECEIVING.*'],
+            [r'^\d{2}-\d{2}-\d{3}[A-Z]$', r'STAGE', r'AISLE-\d+'],
+            [r'(unclosed', r'^DOCK$'],
+            [r'(?i)dock'],
+            [],
+        ]
+
+        for patterns in pattern_lists:
+            compiled = compile_pattern_set(patterns)
+            self.assertEqual(compiled.match_mask(values).tolist(), self._loop_mask(values, patterns).tolist(),
+                             f"Mismatch for {patterns}")
+
+    def test_group_references_keep_per_pattern_matching(self):
+        values = pd.Series(['AA', 'BB', 'AB', 'XYX', 'XYY', 'C\\1'])
+        pattern_lists = [
+            [r'(A)\1', r'(B)\1'],
+            [r'(?P<x>X)Y(?P=x)', r'(?P<y>Z)'],
+            [r'(A)?(?(1)A|B)B', r'(X)Y(?(1)X|Y)'],
+        ]
+
+        for patterns in pattern_lists:
+            compiled = compile_pattern_set(patterns)
+            self.assertIsNone(compiled.combined, f"Joined {patterns}")
+            self.assertEqual(compiled.match_mask(values).tolist(), self._loop_mask(values, patterns).tolist(),
+                             f"Mismatch for {patterns}")
+        self.assertTrue(compile_pattern_set([r'(A)\1', r'(B)\1']).matches('BB'))
+
+        # Escaped backslashes are not references - the set is still joined
+        escaped = compile_pattern_set([r'(C)\\1', r'D'])
+        self.assertIsNotNone(escaped.combined)
+        self.assertTrue(escaped.matches('C\\1'))
+
+    def test_invalid_patterns_reported_and_key_canonical(self):
+        compiled = compile_pattern_set(['B', '(bad', 'A', 'B'])
+
+        self.assertEqual(compiled.patterns, ('B', 'A', 'B'))
+        self.assertEqual(compiled.invalid[0][0], '(bad')
+        self.assertEqual(compiled.key, ('A', 'B'))
+        self.assertIs(compile_pattern_set(['B', '(bad', 'A', 'B']), compiled)
+
+
+class TestRulePlanCache(unittest.TestCase):
+    """Test plan caching, keying and invalidation"""
+
+    def setUp(self):
+        self.evaluator = StagnantPalletsEvaluator()
+        get_rule_plan_cache().clear()
+
+    def _plan(self, rule, warehouse_context=None):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.evaluator._get_rule_plan(rule, warehouse_context)
+
+    def test_compiles_once_per_version(self):
+        rule = MockRule(1, 'STAGNANT_PALLETS', {'max_days_in_location': 2, 'location_patterns': ['^RECV']})
+
+        plan = self._plan(rule)
+        self.assertIs(self._plan(rule), plan)
+        self.assertEqual(plan.thresholds['time_threshold_hours'], 48)
+        self.assertEqual(plan.pattern_set('include').patterns, ('^RECV',))
+
+        # Edits recompile: via updated_at, or content edits that bypass it
+        rule.updated_at += timedelta(minutes=1)
+        self.assertIsNot(self._plan(rule), plan)
+        rule.conditions = json.dumps({'time_threshold_hours': 6})
+        self.assertEqual(self._plan(rule).thresholds['time_threshold_hours'], 6)
+
+        # Template versions key plans separately
+        self.assertIsNot(self._plan(rule, {'warehouse_id': 'WH1', 'template_version': '3:a'}),
+                         self._plan(rule, {'warehouse_id': 'WH1', 'template_version': '3:b'}))
+
+    def test_invalidate_and_lru(self):
+        cache = RulePlanCache(max_size=2)
+        compiler = lambda rule, ctx, key: key
+
+        for rule_id in (1, 2, 3):
+            cache.get_plan(MockRule(rule_id, 'DATA_INTEGRITY', {}), None, compiler)
+
+        stats = cache.get_stats()
+        self.assertEqual((stats['size'], stats['evictions'], stats['misses']), (2, 1, 3))
+        self.assertEqual(cache.invalidate_rule(3), 1)
+        self.assertEqual(cache.invalidate_rule(1), 0)
+
+    def test_conditions_are_read_only(self):
+        rule = MockRule(2, 'STAGNANT_PALLETS', {'location_types': ['RECEIVING']})
+        conditions = self._plan(rule).conditions
+
+        with self.assertRaises(TypeError):
+            conditions['location_types'] = ['STORAGE']
+        self.assertEqual(conditions['location_types'], ('RECEIVING',))
+
+
+class WarehouseTemplateTestCase(unittest.TestCase):
+    """In-memory database with one warehouse config and one linked template"""
+
+    FORMAT_CONFIG = {'pattern_type': 'zone_based', 'confidence': 0.95, 'business_zones': ['PICK', 'BULK']}
+
+    def setUp(self):
+        from flask import Flask
+        from database import db
+        import core_models  # noqa: F401  (registers the user table referenced by foreign keys)
+        from core_models import User
+        from models import WarehouseConfig, WarehouseTemplate
+
+        self.db = db
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        db.session.add(User(id=1, username='tester', password_hash='x'))
+        self.config = WarehouseConfig(warehouse_id='WH1', warehouse_name='Main', num_aisles=2, racks_per_aisle=2,
+                                      positions_per_rack=10, created_by=1)
+        db.session.add(self.config)
+        db.session.flush()
+        self.template = WarehouseTemplate(name='Layout', num_aisles=2, racks_per_aisle=2, positions_per_rack=10,
+                                          based_on_config_id=self.config.id, created_by=1,
+                                          updated_at=datetime(2025, 1, 1))
+        self.template.set_location_format_config(self.FORMAT_CONFIG)
+        db.session.add(self.template)
+        db.session.commit()
+
+    def tearDown(self):
+        self.db.session.remove()
+        self.db.drop_all()
+        self.context.pop()
+
+    def edit_template(self, **changes):
+        for name, value in changes.items():
+            setattr(self.template, name, value)
+        self.db.session.commit()
+
+
+class TestTemplateVersion(WarehouseTemplateTestCase):
+    """Test that template edits reach compiled plan keys"""
+
+    def test_template_edit_changes_plan_key(self):
+        rule = MockRule(1, 'STAGNANT_PALLETS', {'time_threshold_hours': 6})
+        version = get_template_version('WH1')
+        self.assertIsNotNone(version)
+        self.assertEqual(get_template_state('WH1')[1], self.template.id)
+        key = build_plan_key(rule, {'warehouse_id': 'WH1', 'template_version': version})
+
+        self.edit_template(name='Layout v2')  # updated_at moves on update
+        edited = get_template_version('WH1')
+        self.assertNotEqual(edited, version)
+        self.assertNotEqual(build_plan_key(rule, {'warehouse_id': 'WH1', 'template_version': edited}), key)
+
+        self.edit_template(is_active=False)
+        self.assertNotEqual(get_template_version('WH1'), edited)
+        self.assertEqual(get_template_state('WH1')[1], None)
+
+    def test_no_config_or_context(self):
+        self.assertEqual(get_template_state('NOWHERE'), (None, None))
+        self.assertIsNone(get_template_version(None))
+        self.context.pop()
+        try:
+            self.assertIsNone(get_template_version('WH1'))
+        finally:
+            self.context.push()
+
+
+if __name__ == '__main__':
+    unittest.main()
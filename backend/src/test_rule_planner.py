@@ -0,0 +1,161 @@
+"""
+Rule Planner Test Suite
+
+Validates column-dependency-aware rule planning:
+1. Rules missing required columns or warehouse are pruned with a reason
+2. Rules are ordered by cost within (never across) precedence levels
+3. The rule engine reports pruned rules as skipped results
+4. A failed performance-history query rolls the session back
+"""
+
+import unittest
+import json
+import io
+import contextlib
+from datetime import datetime
+from unittest.mock import patch
+
+import pandas as pd
+
+# Test imports
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from rule_planner import RulePlanner, get_rule_requirements, load_historical_costs, WAREHOUSE_REQUIRED
+from rule_engine import RuleEngine
+
+
+class MockRule:
+    """Minimal stand-in for the Rule model"""
+
+    def __init__(self, rule_id, rule_type, precedence_level=4):
+        self.id = rule_id
+        self.name = f"{rule_type} test rule"
+        self.rule_type = rule_type
+        self.priority = 'HIGH'
+        self.conditions = json.dumps({})
+        self.parameters = json.dumps({})
+        self.precedence_level = precedence_level
+
+
+BASE_COLUMNS = ['pallet_id', 'location', 'creation_date']
+
+
+class TestRulePruning(unittest.TestCase):
+    """Test pruning of rules that cannot run"""
+
+    def setUp(self):
+        self.planner = RulePlanner(cost_loader=lambda rule_ids: {})
+
+    def test_lots_rule_needs_receipt_number(self):
+        plan = self.planner.plan([MockRule(1, 'UNCOORDINATED_LOTS')], BASE_COLUMNS)
+
+        self.assertEqual(plan.rules, [])
+        self.assertIn('receipt_number', plan.pruned[0].reason)
+
+        plan = self.planner.plan([MockRule(1, 'UNCOORDINATED_LOTS')], BASE_COLUMNS + ['receipt_number'])
+        self.assertEqual([rule.id for rule in plan.rules], [1])
+
+    def test_product_rules_need_column_and_warehouse(self):
+        rules = [MockRule(1, 'TEMPERATURE_ZONE_MISMATCH'), MockRule(2, 'PRODUCT_INCOMPATIBILITY')]
+        self.assertEqual(get_rule_requirements('PRODUCT_INCOMPATIBILITY').warehouse, WAREHOUSE_REQUIRED)
+
+        plan = self.planner.plan(rules, BASE_COLUMNS, {'warehouse_id': 'WH1'})
+        self.assertTrue(all('product' in pruned.reason for pruned in plan.pruned))
+
+        plan = self.planner.plan(rules, BASE_COLUMNS + ['product'], {'warehouse_id': None})
+        self.assertTrue(all('warehouse' in pruned.reason for pruned in plan.pruned))
+
+        plan = self.planner.plan(rules, BASE_COLUMNS + ['product'], {'warehouse_id': 'WH1'})
+        self.assertEqual(len(plan.rules), 2)
+
+    def test_requirements_use_normalized_columns(self):
+        inventory_df = pd.DataFrame(columns=['Pallet ID', 'Location', 'Created Date', 'Description'])
+        with contextlib.redirect_stdout(io.StringIO()):
+            columns = RuleEngine(db_session=None)._normalize_dataframe_columns(inventory_df).columns
+
+        rules = [MockRule(1, 'TEMPERATURE_ZONE_MISMATCH'), MockRule(2, 'PRODUCT_INCOMPATIBILITY')]
+        plan = self.planner.plan(rules, columns, {'warehouse_id': 'WH1'})
+        self.assertEqual(len(plan.rules), 2)
+
+    def test_unknown_rule_types_are_not_pruned(self):
+        plan = self.planner.plan([MockRule(1, 'CUSTOM_RULE')], [])
+        self.assertEqual(len(plan.rules), 1)
+
+
+class TestRuleOrdering(unittest.TestCase):
+    """Test cost-based ordering inside precedence levels"""
+
+    def test_history_orders_within_level_only(self):
+        history = {1: 900.0, 2: 15.0, 3: 400.0, 4: 1.0}
+        planner = RulePlanner(cost_loader=lambda rule_ids: {i: history[i] for i in rule_ids if i in history})
+        rules = [
+            MockRule(1, 'OVERCAPACITY', precedence_level=2),
+            MockRule(2, 'DATA_INTEGRITY', precedence_level=2),
+            MockRule(3, 'STAGNANT_PALLETS', precedence_level=1),
+            MockRule(4, 'MISSING_LOCATION', precedence_level=3),
+            MockRule(5, 'MISSING_LOCATION', precedence_level=2),  # no history: default cost
+        ]
+
+        plan = planner.plan(rules, BASE_COLUMNS)
+
+        self.assertEqual([rule.id for rule in plan.rules], [3, 5, 2, 1, 4])
+        self.assertEqual(plan.cost_sources[5], 'default')
+        self.assertEqual(plan.cost_sources[1], 'history')
+
+    def test_disabled_precedence_keeps_order(self):
+        planner = RulePlanner(cost_loader=lambda rule_ids: {})
+        rules = [MockRule(1, 'OVERCAPACITY', 1), MockRule(2, 'DATA_INTEGRITY', 2)]
+
+        plan = planner.plan(list(reversed(rules)), BASE_COLUMNS, order_by_precedence=False)
+        self.assertEqual([rule.id for rule in plan.rules], [2, 1])
+
+
+class TestEnginePlanning(unittest.TestCase):
+    """Test that evaluate_all_rules reports pruned rules as skipped"""
+
+    def test_missing_receipt_number_is_skipped_not_failed(self):
+        inventory_df = pd.DataFrame({
+            'pallet_id': ['P1', 'P2', 'P2'],
+            'location': ['RECV-01', '1.1A', '1.2A'],
+            'creation_date': [datetime.now()] * 3,
+        })
+        rules = [MockRule(1, 'UNCOORDINATED_LOTS', 3), MockRule(2, 'DATA_INTEGRITY', 1)]
+        engine = RuleEngine(db_session=None)
+
+        with patch.object(RuleEngine, 'load_active_rules', return_value=rules), \
+                contextlib.redirect_stdout(io.StringIO()):
+            results = {result.rule_id: result for result in engine.evaluate_all_rules(inventory_df)}
+
+        self.assertTrue(results[1].skipped)
+        self.assertIn('receipt_number', results[1].error_message)
+        self.assertTrue(results[2].success)
+        self.assertEqual(len(results[2].anomalies), 2)
+
+
+class TestHistoricalCosts(unittest.TestCase):
+    """Test the RulePerformance history loader"""
+
+    def test_failed_query_rolls_back(self):
+        from flask import Flask
+        from database import db
+
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(app)
+
+        with app.app_context():  # No tables created: the query fails
+            with patch.object(db.session, 'rollback') as rollback, \
+                    self.assertLogs('rule_planner', level='WARNING'):
+                self.assertEqual(load_historical_costs([1, 2]), {})
+            rollback.assert_called_once()
+            db.session.remove()
+
+    def test_no_app_context(self):
+        self.assertEqual(load_historical_costs([1]), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
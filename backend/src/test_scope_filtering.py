@@ -0,0 +1,160 @@
+"""
+Scope Filtering Test Suite
+
+Validates compiled exclusion patterns in SimpleScopeService:
+1. ScopePatternMatcher gives the same answers as per-pattern fnmatch
+2. Inventory filtering matches each unique location once and broadcasts the mask
+3. A 1M-row inventory is filtered in well under a second
+4. The preview endpoint reports the same counts with and without per-location results
+"""
+
+import unittest
+import fnmatch
+import time
+import io
+import contextlib
+
+import numpy as np
+import pandas as pd
+from flask import Flask
+
+# Test imports
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.simple_scope_service import ScopePatternMatcher, SimpleScopeService, compile_scope_patterns
+
+
+def reference_excluded(location, patterns):
+    """Original per-row, per-pattern fnmatch evaluation"""
+    location = str(location)
+    if not patterns or not location:
+        return False
+    return any(fnmatch.fnmatch(location.upper().strip(), pattern.upper().strip()) for pattern in patterns if pattern)
+
+
+def scoped_service(patterns):
+    service = SimpleScopeService('WH1')
+    service._config_cache = {'excluded_patterns': patterns, 'default_unit_type': 'pallets', 'config_metadata': {},
+                             'pattern_matcher': compile_scope_patterns(patterns)}
+    return service
+
+
+class TestScopePatternMatcher(unittest.TestCase):
+    """Test compiled matching against fnmatch"""
+
+    PATTERNS = ['box-*', 'ITEM-??', ' RECV-1 ', 'A[12]-*', 'X.Y*', '']
+    LOCATIONS = ['BOX-001', 'box-9', 'ITEM-12', 'ITEM-123', 'recv-1', 'RECV-10', 'A1-05', 'A3-05', 'X.YZ', 'XAYZ',
+                 '  box-1  ', '', ' ', 'nan', 7, None, float('nan')]
+
+    def test_matches_fnmatch(self):
+        matcher = ScopePatternMatcher(self.PATTERNS)
+        for location in self.LOCATIONS:
+            self.assertEqual(matcher.is_excluded(location), reference_excluded(location, self.PATTERNS), repr(location))
+
+        mask = matcher.excluded_mask(pd.Series(self.LOCATIONS, dtype=object))
+        self.assertEqual(mask.tolist(), [reference_excluded(location, self.PATTERNS) for location in self.LOCATIONS])
+
+    def test_empty_patterns_and_sharing(self):
+        self.assertFalse(ScopePatternMatcher(['', None]))
+        self.assertFalse(compile_scope_patterns(None).is_excluded('BOX-1'))
+        self.assertIs(compile_scope_patterns(['BOX-*']), compile_scope_patterns(('BOX-*',)))
+
+    def test_service_methods_use_compiled_patterns(self):
+        service = scoped_service(['BOX-*'])
+        self.assertFalse(service.is_location_in_scope('box-7'))
+        self.assertTrue(service.is_location_in_scope('RECV-01'))
+        self.assertTrue(service._is_location_excluded('BOX-1', ['ITEM-*', 'BOX-*']))
+
+
+class TestInventoryFiltering(unittest.TestCase):
+    """Test mask broadcasting and throughput of filter_inventory_to_scope"""
+
+    def test_filtered_rows_and_metrics(self):
+        inventory = pd.DataFrame({'location': ['BOX-1', 'A-01', 'BOX-1', None, 'ITEM-1', 'A-01'],
+                                  'pallet_id': range(6)})
+
+        filtered, metrics = scoped_service(['BOX-*', 'ITEM-*']).filter_inventory_to_scope(inventory)
+
+        self.assertEqual(filtered['pallet_id'].tolist(), [1, 3, 5])
+        self.assertEqual((metrics['in_scope_records'], metrics['out_of_scope_records']), (3, 3))
+        self.assertTrue(metrics['scope_applied'])
+
+    def test_million_rows(self):
+        unique = np.array([f"BOX-{n:04d}" for n in range(2000)] + [f"{n:02d}-01-{n:03d}A" for n in range(3000)],
+                          dtype=object)
+        inventory = pd.DataFrame({'location': unique[np.random.default_rng(7).integers(0, len(unique), 1_000_000)]})
+        service = scoped_service(['BOX-*', 'ITEM-*', 'DOCK-??'])
+
+        start = time.perf_counter()
+        filtered, metrics = service.filter_inventory_to_scope(inventory)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(metrics['out_of_scope_records'], int(inventory['location'].str.startswith('BOX-').sum()))
+        self.assertEqual(len(filtered), metrics['in_scope_records'])
+        self.assertLess(elapsed, 1.0)
+
+
+class TestPreviewEndpoint(unittest.TestCase):
+    """Test POST /scope/preview/<warehouse_id>"""
+
+    SAMPLE = ['BOX-001', 'A-01', 123, None, 'box-001', 12.5, 'RECV-01']
+    PATTERNS = ['BOX-*', '12*']
+
+    def setUp(self):
+        import jwt
+        from database import db
+        import core_models  # noqa: F401  (registers the user table referenced by foreign keys)
+        from core_models import User
+        from scope_api import scope_bp
+
+        self.db = db
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        self.app.config['SECRET_KEY'] = 'test'
+        db.init_app(self.app)
+        self.app.register_blueprint(scope_bp)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        db.session.add(User(id=1, username='tester', password_hash='x'))
+        db.session.commit()
+        self.headers = {'Authorization': f"Bearer {jwt.encode({'user_id': 1}, 'test', algorithm='HS256')}"}
+
+    def tearDown(self):
+        self.db.session.remove()
+        self.db.drop_all()
+        self.context.pop()
+
+    def _post(self, payload):
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = self.app.test_client().post('/api/v1/scope/preview/WH1', json=payload, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    def test_preview_results_and_counts(self):
+        body = self._post({'sample_locations': self.SAMPLE, 'excluded_patterns': self.PATTERNS})
+
+        expected = [reference_excluded(location, self.PATTERNS) for location in self.SAMPLE]
+        self.assertEqual([result['excluded'] for result in body['preview_results']], expected)
+        self.assertEqual([result['location'] for result in body['preview_results']], self.SAMPLE)
+        self.assertEqual(body['preview_results'][2]['status'], 'excluded')
+        self.assertEqual(body['summary'], {'total_locations': 7, 'unique_locations': 7,
+                                           'included_locations': 3, 'excluded_locations': 4})
+
+    def test_summary_only(self):
+        full = self._post({'sample_locations': self.SAMPLE + ['BOX-001'], 'excluded_patterns': self.PATTERNS})
+        summary = self._post({'sample_locations': self.SAMPLE + ['BOX-001'], 'excluded_patterns': self.PATTERNS,
+                              'summary_only': True})
+
+        self.assertNotIn('preview_results', summary)
+        self.assertEqual(summary['summary'], full['summary'])
+        self.assertEqual((summary['summary']['total_locations'], summary['summary']['unique_locations'],
+                          summary['summary']['excluded_locations']), (8, 7, 5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+"""
+Session-Safe Location Cache Test Suite
+
+Validates the two-tier SessionSafeLocationCache:
+1. The memory tier is an LRU keyed by (warehouse, code) with lazy TTL expiry
+   and per-warehouse byte budgets
+2. The shared SQLite tier turns one worker's cached location into a hit for
+   another worker, scoped by database
+3. Hit, miss and eviction counters are reported per tier
+"""
+
+import unittest
+import tempfile
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+# Test imports
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import db
+import core_models  # noqa: F401  (registers the user table referenced by foreign keys)
+from models import Location
+from session_safe_cache import SessionSafeLocationCache
+
+
+class SessionCacheTestCase(unittest.TestCase):
+
+    DATABASE_URI = 'sqlite:///:memory:'
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = self.DATABASE_URI.format(folder=self.folder.name)
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        db.session.add_all([Location(code=f"{warehouse}-{n:02d}", location_type='STORAGE', warehouse_id=warehouse)
+                            for warehouse in ('WH1', 'WH2') for n in range(20)])
+        db.session.add(Location(code='WH1-00', location_type='DOCK', warehouse_id='WH2'))  # Same code, other warehouse
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+        self.folder.cleanup()
+
+    def _location(self, code, warehouse_id):
+        return Location.query.filter_by(code=code, warehouse_id=warehouse_id).one()
+
+    def _fill(self, cache, warehouse_id, count):
+        for n in range(count):
+            code = f"{warehouse_id}-{n:02d}"
+            cache.put_location(code, self._location(code, warehouse_id), warehouse_id)
+
+
+class TestMemoryTier(SessionCacheTestCase):
+    """Test LRU order, warehouse scoping, TTL and byte budgets"""
+
+    def test_lru_eviction_keeps_recently_used(self):
+        cache = SessionSafeLocationCache(max_cache_size=5)
+        self._fill(cache, 'WH1', 5)
+        cache.get_location('WH1-00', 'WH1')  # Promote the oldest entry
+
+        self._fill(cache, 'WH2', 2)
+
+        self.assertIsNotNone(cache.get_location('WH1-00', 'WH1'))
+        self.assertIsNone(cache.get_location('WH1-01', 'WH1'))
+        self.assertIsNone(cache.get_location('WH1-02', 'WH1'))
+        self.assertEqual(cache.get_cache_stats()['tiers']['memory']['entries'], 5)
+        self.assertEqual(cache.cache_stats['evictions'], 2)
+
+    def test_lookups_are_scoped_by_warehouse(self):
+        cache = SessionSafeLocationCache()
+        cache.put_location('WH1-00', self._location('WH1-00', 'WH1'), 'WH1')
+
+        self.assertEqual(cache.get_location('WH1-00', 'WH1').warehouse_id, 'WH1')
+        self.assertIsNone(cache.get_location('WH1-00', 'WH2'))
+        self.assertIsNone(cache.get_location('WH1-00'))
+
+        cache.put_location('WH1-00', self._location('WH1-00', 'WH2'), 'WH2')
+        self.assertEqual(cache.get_location('WH1-00', 'WH2').location_type, 'DOCK')
+        self.assertEqual(cache.get_location('WH1-00', 'WH1').location_type, 'STORAGE')
+
+    def test_lazy_ttl_expiry(self):
+        cache = SessionSafeLocationCache(cache_ttl_hours=1)
+        self._fill(cache, 'WH1', 3)
+        cache.warehouse_caches['WH1']['WH1-01'].cached_at = datetime.utcnow() - timedelta(hours=2)
+
+        self.assertIsNone(cache.get_location('WH1-01', 'WH1'))
+        self.assertIsNotNone(cache.get_location('WH1-02', 'WH1'))
+        self.assertEqual((cache.cache_stats['expirations'], len(cache.warehouse_caches['WH1'])), (1, 2))
+
+    def test_warehouse_byte_budget(self):
+        probe = SessionSafeLocationCache()
+        self._fill(probe, 'WH1', 1)
+        entry_bytes = probe.get_cache_stats()['tiers']['memory']['bytes']
+
+        cache = SessionSafeLocationCache(max_warehouse_bytes=entry_bytes * 4 + entry_bytes // 2)
+        self._fill(cache, 'WH1', 10)
+        self._fill(cache, 'WH2', 3)
+
+        memory = cache.get_cache_stats()['tiers']['memory']
+        self.assertEqual(list(cache.warehouse_caches['WH1']), [f"WH1-{n:02d}" for n in range(6, 10)])
+        self.assertEqual(len(cache.warehouse_caches['WH2']), 3)
+        self.assertLessEqual(memory['warehouse_bytes']['WH1'], cache.max_warehouse_bytes)
+        self.assertEqual(memory['evictions'], 6)
+
+        cache.clear_cache('WH1')
+        self.assertEqual(cache.get_cache_stats()['tiers']['memory']['entries'], 3)
+
+
+class TestSharedTier(SessionCacheTestCase):
+    """Test cross-worker hits through the shared SQLite tier"""
+
+    DATABASE_URI = 'sqlite:///{folder}/test.db'
+
+    def test_hits_across_workers(self):
+        path = os.path.join(self.folder.name, 'shared', 'locations.sqlite')
+        worker_a = SessionSafeLocationCache(shared_path=path)
+        worker_b = SessionSafeLocationCache(shared_path=path)
+
+        self._fill(worker_a, 'WH1', 4)
+        location = worker_b.get_location('WH1-02', 'WH1')
+        again = worker_b.get_location('WH1-02', 'WH1')  # Promoted into the memory tier
+
+        self.assertEqual((location.code, again.code), ('WH1-02', 'WH1-02'))
+        self.assertIsNone(worker_b.get_location('WH1-02', 'WH2'))
+
+        shared = worker_b.get_cache_stats()['tiers']['shared']
+        self.assertEqual((shared['hits'], shared['misses']), (1, 1))
+        self.assertEqual(worker_b.get_cache_stats()['tiers']['memory']['entries'], 1)
+        self.assertEqual(worker_a.get_cache_stats()['tiers']['shared']['writes'], 4)
+
+        worker_a.clear_cache('WH1')
+        self.assertIsNone(SessionSafeLocationCache(shared_path=path).get_location('WH1-03', 'WH1'))
+
+    def test_expired_shared_rows_are_misses(self):
+        path = os.path.join(self.folder.name, 'locations.sqlite')
+        writer = SessionSafeLocationCache(shared_path=path)
+        self._fill(writer, 'WH1', 2)
+        writer.shared_tier._connection().execute('UPDATE location_cache SET cached_at = cached_at - 2 * 86400')
+
+        reader = SessionSafeLocationCache(shared_path=path)
+        self.assertIsNone(reader.get_location('WH1-01', 'WH1'))
+        self.assertEqual(reader.get_cache_stats()['tiers']['shared']['expirations'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+"""
+Shared Location Snapshot Test Suite
+
+Validates machine-wide memory-mapped warehouse location snapshots:
+1. A mapped snapshot returns exactly the values of the in-memory snapshot
+2. Snapshots are built once per version, mapped by other workers, replaced on
+   version change and removed on invalidation
+3. LocationRepository serves identical data from the shared snapshot
+"""
+
+import unittest
+import io
+import contextlib
+import tempfile
+
+import pandas as pd
+from flask import Flask
+
+# Test imports
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import db
+import core_models  # noqa: F401  (registers the user table referenced by foreign keys)
+from models import Location
+from services.location_repository import LocationRepository
+from services.location_snapshot import SNAPSHOT_COLUMNS, LocationSnapshot
+from services.shared_location_snapshot import MappedLocationSnapshot, SharedSnapshotStore, database_key_for
+from test_location_snapshot import build_rows
+
+
+def build_snapshot(rows=None) -> LocationSnapshot:
+    frame = pd.DataFrame(rows or build_rows(500), columns=list(SNAPSHOT_COLUMNS))
+    return LocationSnapshot.from_frame(frame, warehouse_id='WH1')
+
+
+def nulls_as_none(values) -> list:
+    return [None if pd.isna(value) else value for value in values]
+
+
+class TestMappedSnapshot(unittest.TestCase):
+    """Test the mapped file against the in-memory snapshot"""
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.store = SharedSnapshotStore(self.folder.name)
+        rows = build_rows(500) + [dict(build_rows(1)[0], code='ÁREA-Ñ1'), dict(build_rows(1)[0], code='Z' * 50)]
+        self.snapshot = build_snapshot(rows)
+        self.mapped = self.store.acquire('WH1', 'v1', build=lambda: self.snapshot, database_key='db')
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_values_match(self):
+        self.assertIsInstance(self.mapped, MappedLocationSnapshot)
+        self.assertEqual(len(self.mapped), len(self.snapshot))
+        for code in self.snapshot.codes:
+            self.assertEqual(self.mapped.get(code).to_dict(), self.snapshot.get(code).to_dict(), code)
+
+    def test_bulk_lookup(self):
+        codes = ['MISSING', 'Z' * 51, ''] + list(self.snapshot.codes[::-3]) + ['00-00-000A']
+
+        expected = self.snapshot.rows_for(codes)
+        rows = self.mapped.rows_for(codes)
+
+        self.assertEqual((rows < 0).tolist(), (expected < 0).tolist())
+        for name in SNAPSHOT_COLUMNS:
+            self.assertEqual(nulls_as_none(self.mapped.column(name, rows)),
+                             nulls_as_none(self.snapshot.column(name, expected)), name)
+        self.assertLess(self.mapped.memory_bytes() * 10, self.snapshot.memory_bytes())
+
+
+class TestSharedSnapshotStore(unittest.TestCase):
+    """Test build-once publishing, version switches and invalidation"""
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.builds = []
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def _build(self, rows=None):
+        self.builds.append(1)
+        return build_snapshot(rows)
+
+    def _files(self):
+        return sorted(os.path.basename(path) for _, _, files in os.walk(self.folder.name) for path in files)
+
+    def test_built_once_across_workers(self):
+        worker_a, worker_b = SharedSnapshotStore(self.folder.name), SharedSnapshotStore(self.folder.name)
+
+        first = worker_a.acquire('WH1', 'v1', build=self._build, database_key='db')
+        again = worker_a.acquire('WH1', 'v1', build=self._build, database_key='db')
+        other = worker_b.acquire('WH1', 'v1', build=self._build, database_key='db')
+
+        self.assertIs(first, again)
+        self.assertEqual(len(self.builds), 1)
+        self.assertEqual(other.get('01-01-001A').to_dict(), first.get('01-01-001A').to_dict())
+        self.assertEqual((worker_a.get_stats()['hits'], worker_b.get_stats()['maps']), (1, 1))
+
+    def test_version_switch_and_invalidation(self):
+        store = SharedSnapshotStore(self.folder.name)
+        old = store.acquire('WH1', 'v1', build=self._build, database_key='db')
+        old_capacity = old.get('01-01-001A').capacity
+
+        changed = [dict(row, capacity=77) for row in build_rows(500)]
+        new = store.acquire('WH1', 'v2', build=lambda: self._build(changed), database_key='db')
+
+        self.assertEqual(new.get('01-01-001A').capacity, 77)
+        self.assertEqual(old.get('01-01-001A').capacity, old_capacity)  # Existing mapping stays readable
+        self.assertEqual(len(self._files()), 2)
+
+        store.invalidate('WH1')
+        self.assertEqual(self._files(), [])
+        store.acquire('WH1', 'v2', build=self._build, database_key='db')
+        self.assertEqual(len(self.builds), 3)
+
+    def test_unshared_without_version_or_database(self):
+        store = SharedSnapshotStore(self.folder.name)
+
+        self.assertIsNone(store.acquire('WH1', None, build=self._build, database_key='db'))
+        self.assertIsNone(store.acquire('WH1', 'v1', build=self._build, database_key=None))
+        self.assertEqual(self.builds, [])
+
+
+class TestRepositoryFromSharedSnapshot(unittest.TestCase):
+    """Test LocationRepository results with and without the shared snapshot"""
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(self.folder.name, 'test.db')}"
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        self.rows = build_rows(800)
+        db.session.execute(Location.__table__.insert(), self.rows)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+        self.folder.cleanup()
+
+    def test_same_results(self):
+        import services.shared_location_snapshot as shared_module
+        store = SharedSnapshotStore(os.path.join(self.folder.name, 'snapshots'))
+        codes = [row['code'] for row in self.rows[::3]] + ['GHOST-1', 'GHOST-1']
+
+        original_store = shared_module._shared_snapshot_store
+        shared_module._shared_snapshot_store = store
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                shared = LocationRepository('WH1', db.session, location_version='v1')
+                shared.bulk_load_locations(codes)
+                direct = LocationRepository('WH1', db.session)
+                direct.bulk_load_locations(codes)
+        finally:
+            shared_module._shared_snapshot_store = original_store
+
+        self.assertIsNotNone(database_key_for(db.session))
+        self.assertEqual(store.get_stats()['builds'], 1)
+        self.assertEqual(shared.get_capacities_bulk(codes), direct.get_capacities_bulk(codes))
+        self.assertEqual(shared.get_unit_types_bulk(codes), direct.get_unit_types_bulk(codes))
+        self.assertEqual(shared.get_cache_stats()['total_cached'], direct.get_cache_stats()['total_cached'])
+        for code in codes:
+            self.assertEqual(shared.get_location(code).to_dict(), direct.get_location(code).to_dict())
+            self.assertEqual(shared.is_physical_special_location(code), direct.is_physical_special_location(code))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+Virtual Engine Cache Test Suite
+
+Validates the versioned virtual location engine cache:
+1. Engines are reused while the warehouse version is unchanged and rebuilt on change
+2. The cache is a bounded LRU over warehouses
+3. Fallback engines are shared instead of rebuilt per request
+"""
+
+import unittest
+import io
+import contextlib
+from unittest.mock import patch
+
+# Test imports
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from virtual_template_integration import VirtualLocationCache
+
+
+class TestVirtualLocationCache(unittest.TestCase):
+    """Test version keying, LRU bounds and statistics"""
+
+    def setUp(self):
+        self.versions = {'WH1': 1, 'WH2': 1, 'WH3': 1}
+        self.builds = []
+
+        def build(cache, warehouse_id):
+            self.builds.append(warehouse_id)
+            return object()
+
+        patches = [
+            patch.object(VirtualLocationCache, '_engine_version', lambda cache, wid: self.versions.get(wid)),
+            patch.object(VirtualLocationCache, '_build_engine', build),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _get(self, cache, warehouse_id):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return cache.get_engine(warehouse_id)
+
+    def test_rebuilds_only_on_version_change(self):
+        cache = VirtualLocationCache(revalidate_seconds=0)
+
+        engine = self._get(cache, 'WH1')
+        self.assertIs(self._get(cache, 'WH1'), engine)
+
+        self.versions['WH1'] = 2  # e.g. WarehouseConfig.updated_at or Location table changed
+        rebuilt = self._get(cache, 'WH1')
+
+        self.assertIsNot(rebuilt, engine)
+        self.assertEqual(self.builds, ['WH1', 'WH1'])
+        stats = cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['rebuilds'], stats['builds']), (1, 1, 1, 2))
+
+    def test_revalidation_window_skips_version_checks(self):
+        cache = VirtualLocationCache(revalidate_seconds=60)
+
+        engine = self._get(cache, 'WH1')
+        self.versions['WH1'] = 2
+        self.assertIs(self._get(cache, 'WH1'), engine)
+
+        cache.clear_cache('WH1')
+        self.assertIsNot(self._get(cache, 'WH1'), engine)
+
+    def test_lru_bound(self):
+        cache = VirtualLocationCache(max_warehouses=2, revalidate_seconds=60)
+
+        for warehouse_id in ('WH1', 'WH2', 'WH1', 'WH3'):
+            self._get(cache, warehouse_id)
+
+        stats = cache.get_stats()
+        self.assertEqual(stats['warehouses'], ['WH1', 'WH3'])
+        self.assertEqual(stats['evictions'], 1)
+
+    def test_missing_config_not_cached(self):
+        cache = VirtualLocationCache()
+
+        with patch.object(VirtualLocationCache, '_build_engine', lambda cache, wid: None):
+            self.assertIsNone(self._get(cache, 'UNKNOWN'))
+
+        self.assertEqual(cache.get_stats()['size'], 0)
+        self.assertEqual(cache.get_stats()['build_failures'], 1)
+
+    def test_fallback_engines_are_shared(self):
+        cache = VirtualLocationCache(revalidate_seconds=0)
+        config = {'warehouse_id': 'WH9', 'num_aisles': 2, 'racks_per_aisle': 2, 'positions_per_rack': 10}
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            engine = cache.get_fallback_engine('WH9', dict(config))
+            self.assertIs(cache.get_fallback_engine('WH9', dict(config)), engine)
+            self.assertIsNot(cache.get_fallback_engine('WH9', dict(config, num_aisles=3)), engine)
+
+        self.assertEqual(engine.warehouse_id, 'WH9')
+        self.assertEqual(cache.get_stats()['warehouses'], ['fallback:WH9'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Virtual Location Index Test Suite
+
+Validates lazy virtual location enumeration for the locations API:
+1. Pages equal filtering + sorting a fully materialized location list
+2. Counts and summaries are exact for the whole warehouse
+3. Paging a very large warehouse touches only the requested page
+"""
+
+import unittest
+import io
+import contextlib
+import time
+
+# Test imports
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from virtual_location_engine import VirtualLocationEngine
+from virtual_location_index import VirtualLocationIndex, location_sort_key
+
+
+def build_engine(**overrides):
+    config = {
+        'warehouse_id': 'WH9', 'num_aisles': 3, 'racks_per_aisle': 2, 'positions_per_rack': 12,
+        'level_names': 'DCBA', 'default_pallet_capacity': 2,
+        'receiving_areas': [{'code': 'RECV-01', 'capacity': 10}],
+        'dock_areas': [{'code': 'DOCK-01', 'capacity': 2}],
+    }
+    config.update(overrides)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return VirtualLocationEngine(config)
+
+
+def build_specials():
+    return [
+        {'code': 'AISLE-02', 'location_type': 'TRANSITIONAL', 'capacity': 10, 'zone': 'GENERAL', 'aisle_number': 2,
+         'is_active': True},
+        {'code': 'RECV-01', 'location_type': 'RECEIVING', 'capacity': 10, 'zone': 'RECEIVING', 'is_active': True},
+        {'code': 'DOCK-01', 'location_type': 'DOCK', 'capacity': 2, 'zone': None, 'is_active': False},
+    ]
+
+
+class TestVirtualLocationIndex(unittest.TestCase):
+    """Test the lazy index against the materialize-filter-sort reference"""
+
+    def setUp(self):
+        self.engine = build_engine()
+        self.index = VirtualLocationIndex(self.engine, build_specials())
+
+    def _reference(self, location_type=None, zone=None, is_active=None, aisle_number=None, search=None):
+        storage = [
+            self.index.storage_location(aisle, rack, position, level)
+            for aisle in self.engine.storage_space['aisles'] for rack in self.engine.storage_space['racks']
+            for position in self.engine.storage_space['positions'] for level in self.engine.storage_space['levels']
+        ]
+        locations = build_specials() + storage
+        if location_type:
+            locations = [loc for loc in locations if loc.get('location_type') == location_type]
+        if zone:
+            locations = [loc for loc in locations if loc.get('zone') == zone]
+        if is_active is not None:
+            locations = [loc for loc in locations if loc.get('is_active', True) == is_active]
+        if aisle_number:
+            locations = [loc for loc in locations if loc.get('aisle_number') == aisle_number]
+        if search:
+            term = search.strip().upper()
+            locations = [loc for loc in locations
+                         if term in str(loc.get('code', '')).upper() or term in str(loc.get('zone', '')).upper()]
+        return sorted(locations, key=location_sort_key)
+
+    def test_pages_match_sorted_reference(self):
+        filters = [
+            {}, {'location_type': 'STORAGE'}, {'location_type': 'DOCK'}, {'zone': 'STORAGE'}, {'is_active': False},
+            {'aisle_number': 2}, {'aisle_number': 7}, {'search': 'b1'}, {'search': 'stor'}, {'search': 'non'},
+            {'location_type': 'STORAGE', 'aisle_number': 3, 'search': '-A'},
+        ]
+        for criteria in filters:
+            expected = self._reference(**criteria)
+            selection = self.index.select(**criteria)
+
+            self.assertEqual(len(selection), len(expected), criteria)
+            for offset, limit in ((0, 50), (1, 7), (40, 50), (len(expected) - 3, 50), (len(expected) + 5, 10)):
+                self.assertEqual(
+                    [loc['code'] for loc in selection.page(offset, limit)],
+                    [loc['code'] for loc in expected[offset:offset + limit]],
+                    f"{criteria} offset={offset}"
+                )
+
+    def test_storage_codes_validate(self):
+        for location in self.index.select(location_type='STORAGE').page(0, 500):
+            self.assertTrue(self.engine.validate_location(location['code'])[0], location['code'])
+
+    def test_exact_summary(self):
+        summary = self.index.get_summary()
+
+        self.assertEqual(summary['storage_locations'], 3 * 2 * 12 * 4)
+        self.assertEqual(summary['total_locations'], 3 * 2 * 12 * 4 + 3)
+        self.assertEqual(summary['total_capacity'], 3 * 2 * 12 * 4 * 2 + 22)
+
+    def test_smart_configuration_without_canonical_storage(self):
+        engine = build_engine(location_format_config={'pattern_type': 'position_level',
+                                                      'regex_pattern': r'^(\d{3})([A-Z])$'})
+        index = VirtualLocationIndex(engine, build_specials())
+
+        self.assertEqual(index.storage_count, 0)
+        self.assertEqual(len(index.select()), 3)
+
+    def test_large_warehouse_paging(self):
+        engine = build_engine(num_aisles=99, racks_per_aisle=20, positions_per_rack=999, level_names='ABCDEF')
+        index = VirtualLocationIndex(engine, build_specials())
+
+        start = time.perf_counter()
+        selection = index.select(location_type='STORAGE')
+        last_page = selection.page(len(selection) - 50, 50)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        self.assertEqual(len(selection), 99 * 20 * 999 * 6)
+        self.assertEqual(last_page[-1]['code'], '99-T999-F')
+        self.assertLess(elapsed_ms, 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+"""
+Virtual Location Batch Validation Test Suite
+
+Validates VirtualLocationEngine.validate_batch against validate_location:
+1. Validity and reason messages match per code (standard and Smart Configuration formats)
+2. Reason codes are exposed as arrays aligned with the input, nulls included
+3. VirtualInvalidLocationEvaluator flags the same pallets as the per-row loop
+"""
+
+import unittest
+import io
+import contextlib
+import itertools
+
+import pandas as pd
+
+# Test imports
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from virtual_location_engine import VirtualLocationEngine, VALIDATION_REASONS
+from virtual_invalid_location_evaluator import VirtualInvalidLocationEvaluator
+
+
+STANDARD_CONFIG = {
+    'warehouse_id': 'WH9',
+    'num_aisles': 3,
+    'racks_per_aisle': 2,
+    'positions_per_rack': 40,
+    'level_names': 'ABCD',
+    'receiving_areas': [{'code': 'RECV-01', 'capacity': 10}],
+    'staging_areas': [{'code': ' stage-01 ', 'capacity': 5}],
+}
+
+SMART_CONFIG = {
+    'warehouse_id': 'WH9',
+    'level_names': 'AB',
+    'location_format_config': {'pattern_type': 'position_level', 'regex_pattern': r'^(\d{1,4})([A-Z])$'},
+}
+
+
+def build_engine(config):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return VirtualLocationEngine(config)
+
+
+def build_codes():
+    numbers = ['0', '01', '03', '4', '035', '041', '1234567']
+    letters = ['A', 'C', 'E', 'a']
+    codes = ['', '  ', 'RECV-01', 'USER_RECV-01', 'WH9_STAGE-01', 'AISLE-02', 'AISLE-07', ' 010a ', '12-A']
+    for first, second, third in itertools.product(numbers, letters, numbers[:4]):
+        codes += [
+            f"{first}{second}",
+            f"{third}-{second}{first}-{second}",
+            f"{third}-{second}-{first}-A",
+            f"{third}-{third}-{first}{second}",
+            f"ALICE_{first}{second}",
+        ]
+    return codes
+
+
+class TestValidateBatch(unittest.TestCase):
+    """Test validate_batch against validate_location"""
+
+    def _assert_matches_scalar(self, engine, codes):
+        batch = engine.validate_batch(pd.Series(codes, dtype=object))
+
+        for position, code in enumerate(codes):
+            self.assertEqual(
+                (bool(batch['is_valid'].iloc[position]), batch['reason'].iloc[position]),
+                engine.validate_location(code),
+                f"Mismatch for {code!r}"
+            )
+
+    def test_standard_formats_match_scalar(self):
+        self._assert_matches_scalar(build_engine(STANDARD_CONFIG), build_codes())
+
+    def test_smart_configuration_matches_scalar(self):
+        self._assert_matches_scalar(build_engine(SMART_CONFIG), build_codes())
+
+    def test_reason_codes_aligned_with_input(self):
+        engine = build_engine(STANDARD_CONFIG)
+        codes = pd.Series(['01-A-001-A', None, 'RECV-01', '04-A-001-A', '01-A-001-A', '02-03-001A'],
+                          index=[10, 11, 12, 13, 14, 15], dtype=object)
+
+        batch = engine.validate_batch(codes)
+
+        self.assertEqual(batch.index.tolist(), codes.index.tolist())
+        self.assertEqual(batch['reason_code'].tolist(), [
+            'storage', 'empty', 'special_area', 'aisle_out_of_range', 'storage', 'rack_number_out_of_range'
+        ])
+        self.assertEqual(batch['is_valid'].tolist(), [True, False, True, False, True, False])
+        self.assertTrue(set(batch['reason_code']) <= set(VALIDATION_REASONS))
+
+
+class TestVirtualInvalidLocationEvaluator(unittest.TestCase):
+    """Test batch-validated evaluation against the per-row loop"""
+
+    class StubRepository:
+        def is_physical_special_location(self, code):
+            return code == 'DOCK-09'
+
+    class MockRule:
+        id = 1
+        name = "Invalid locations"
+        priority = 'High'
+        conditions = '{}'
+
+    def _reference(self, evaluator, inventory_df, engine, context):
+        flagged, seen = [], set()
+        for _, pallet in inventory_df.iterrows():
+            location = str(pallet['location']).strip()
+            if pd.isna(pallet['location']) or not location or location in seen:
+                continue
+            seen.add(location)
+            is_valid, reason = evaluator._validate_location_with_physical_fallback(location, engine, context)
+            if not is_valid:
+                flagged.append((pallet['pallet_id'], pallet['location'], reason))
+        return flagged
+
+    def test_matches_reference_loop(self):
+        engine = build_engine(STANDARD_CONFIG)
+        codes = build_codes() + ['DOCK-09', None, ' 99-A-001-A ']
+        inventory_df = pd.DataFrame({
+            'pallet_id': [f"P{i}" for i in range(len(codes) * 2)],
+            'location': codes + codes[::-1],
+        }, index=[i % 7 for i in range(len(codes) * 2)])  # Duplicate labels must not matter
+        context = {'warehouse_id': 'WH9', 'virtual_engine': engine, 'location_repository': self.StubRepository()}
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            evaluator = VirtualInvalidLocationEvaluator()
+            anomalies = evaluator._evaluate_with_virtual_engine(self.MockRule(), inventory_df, engine, context)
+            expected = self._reference(evaluator, inventory_df, engine, context)
+
+        self.assertEqual([(a['pallet_id'], a['location'], a['enhanced_reason']) for a in anomalies], expected)
+        self.assertNotIn('DOCK-09', [a['location'] for a in anomalies])
+
+
+if __name__ == '__main__':
+    unittest.main()
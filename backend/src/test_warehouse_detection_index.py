@@ -0,0 +1,203 @@
+"""
+Warehouse Detection Index Test Suite
+
+Validates index-based warehouse auto-detection:
+1. Scores (matches, coverage, density, format coverage) and ranking of the inverted index
+2. RuleEngine detection filters candidates per user, creates no locations and
+   reuses the cached index until the location version changes
+3. Scoring stays in milliseconds with thousands of warehouses
+"""
+
+import unittest
+import io
+import contextlib
+import tempfile
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+from flask import Flask
+from sqlalchemy import event
+
+# Test imports
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import db
+import core_models  # noqa: F401  (registers the user table referenced by foreign keys)
+from models import Location
+from rule_engine import RuleEngine
+from services.capacity_resolver import bump_location_version
+from services.shared_location_snapshot import SharedSnapshotStore
+from services.warehouse_detection_index import DetectionIndexCache, WarehouseDetectionIndex, format_signatures
+
+
+class TestIndexScoring(unittest.TestCase):
+    """Test scores and ranking computed from the inverted index"""
+
+    def setUp(self):
+        warehouses, codes = [], []
+        for warehouse_id, aisles in (('WH_A', range(1, 3)), ('WH_B', range(1, 11)), ('WH_C', [])):
+            for aisle in aisles:
+                for position in range(1, 11):
+                    warehouses.append(warehouse_id)
+                    codes.append(f"{aisle:02d}-01-{position:03d}A")
+        warehouses += ['WH_C', 'WH_C', 'WH_A']
+        codes += ['RECV-01', 'STAGE-01', 'RECV-01']
+        self.index = WarehouseDetectionIndex(warehouses, codes)
+
+    def test_scores_and_ranking(self):
+        inventory = [f"01-01-{position:03d}A" for position in range(1, 11)] + ['RECV-01', '09-01-001A', '77-77-777Z']
+        scores = self.index.score(inventory)
+
+        # Equal matches: the denser warehouse ranks first
+        self.assertEqual([score['warehouse_id'] for score in scores], ['WH_A', 'WH_B', 'WH_C'])
+        wh_a, wh_b, wh_c = scores
+        self.assertEqual((wh_a['matches'], wh_a['total_locations']), (11, 21))
+        self.assertEqual((wh_b['matches'], wh_b['total_locations']), (11, 100))
+        self.assertAlmostEqual(wh_a['density'], 11 / 21)
+        self.assertAlmostEqual(wh_b['coverage'], 11 / 13)
+        self.assertAlmostEqual(wh_b['format_coverage'], 12 / 13)  # Same shape as 77-77-777Z
+        self.assertAlmostEqual(wh_a['format_coverage'], 1.0)
+        self.assertEqual((wh_c['matches'], wh_c['format_coverage']), (1, 1 / 13))
+
+    def test_candidates_and_duplicates(self):
+        scores = self.index.score(['01-01-001A', '01-01-001A', None], candidates=['WH_C', 'WH_A', 'UNKNOWN'])
+
+        self.assertEqual([score['warehouse_id'] for score in scores], ['WH_A', 'WH_C'])
+        self.assertEqual((scores[0]['matches'], scores[0]['coverage']), (2, 1.0))  # Two locations, one canonical code
+        self.assertEqual((scores[1]['matches'], scores[1]['format_coverage']), (0, 0.0))
+        self.assertEqual(self.index.score([]), [])
+
+    def test_format_signatures(self):
+        self.assertEqual(format_signatures(['01-02-003B', 'RECV-01']).tolist(), ['99-99-999A', 'AAAA-99'])
+
+
+class DetectionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        import services.shared_location_snapshot as shared_module
+        import services.warehouse_detection_index as index_module
+
+        self.folder = tempfile.TemporaryDirectory()
+        self.original_store = shared_module._shared_snapshot_store
+        self.original_cache = index_module._detection_index_cache
+        shared_module._shared_snapshot_store = SharedSnapshotStore(self.folder.name)
+        index_module._detection_index_cache = self.cache = DetectionIndexCache()
+
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        rows = [dict(code=f"{aisle:02d}-01-{position:03d}A", warehouse_id=warehouse_id, location_type='STORAGE')
+                for warehouse_id, aisles in (('USER_ALICE', range(1, 4)), ('USER_BOB', range(1, 3)),
+                                             ('USER_ALICE_OLD', range(5, 7)))
+                for aisle in aisles for position in range(1, 21)]
+        rows.append(dict(code='RECV-01', warehouse_id='USER_ALICE', location_type='RECEIVING'))
+        rows.append(dict(code='USER_BOB_09-01-001A', warehouse_id='USER_BOB', location_type='STORAGE'))
+        db.session.bulk_save_objects(Location.assign_canonical_codes([Location(**row) for row in rows]))
+        db.session.commit()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.engine = RuleEngine(db.session)
+        self.statements = []
+        event.listen(db.engine, 'before_cursor_execute', self._record)
+
+    def tearDown(self):
+        import services.shared_location_snapshot as shared_module
+        import services.warehouse_detection_index as index_module
+
+        event.remove(db.engine, 'before_cursor_execute', self._record)
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+        shared_module._shared_snapshot_store = self.original_store
+        index_module._detection_index_cache = self.original_cache
+        self.folder.cleanup()
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def _detect(self, locations, username=None):
+        self.statements.clear()
+        inventory = pd.DataFrame({'location': locations})
+        user = SimpleNamespace(username=username) if username else None
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.engine._detect_warehouse_context(inventory, user)
+
+
+class TestRuleEngineDetection(DetectionTestCase):
+    """Test detection through RuleEngine with the cached index"""
+
+    def test_user_scoped_detection(self):
+        locations = ['1-1-1A', '01-01-002A', '2-1-5A', '9-1-1A', 'RECV-01', 'NOWHERE']
+
+        alice = self._detect(locations, 'alice')
+        self.assertFalse(any(statement.startswith('INSERT') for statement in self.statements))
+        self.assertEqual(alice['warehouse_id'], 'USER_ALICE')
+        self.assertEqual(alice['confidence'], 'HIGH')
+        self.assertAlmostEqual(alice['coverage'], 4 / 6 * 100)
+        self.assertEqual(sorted(result['warehouse_id'] for result in alice['warehouse_results']),
+                         ['USER_ALICE', 'USER_ALICE_OLD'])
+
+        bob = self._detect(locations, 'bob')
+        self.assertEqual(bob['warehouse_id'], 'USER_BOB')
+        self.assertEqual(bob['warehouse_results'][0]['valid_locations'], 4)  # Prefixed code matches 9-1-1A
+        self.assertEqual(self.statements, [])  # Index reused within the revalidation window
+        self.assertEqual(Location.query.count(), 142)
+
+    def test_legacy_detection_uses_index(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = self.engine._detect_warehouse_legacy(None, ['5-1-1A', '6-1-2A', '1-1-1A'])
+
+        self.assertEqual(result['warehouse_id'], 'USER_ALICE_OLD')
+        self.assertEqual(result['matching_locations'], 2)
+        self.assertEqual(len(result['detailed_scores']), 3)
+
+    def test_rebuilt_when_locations_change(self):
+        self.cache.revalidate_seconds = 0
+        self._detect(['7-1-1A'], 'bob')
+        self.assertIsNone(self._detect(['7-1-1A'], 'bob')['warehouse_id'])
+
+        db.session.add(Location(code='07-01-001A', canonical_code='07-01-001A', warehouse_id='USER_BOB',
+                                location_type='STORAGE'))
+        db.session.commit()
+        self.assertEqual(self._detect(['7-1-1A'], 'bob')['warehouse_id'], 'USER_BOB')
+
+        db.session.execute(Location.__table__.update().where(Location.code == '07-01-001A').values(warehouse_id='USER_ALICE'))
+        db.session.commit()
+        bump_location_version('USER_BOB')  # Same row count and ids: only the version counter changes
+        self.assertIsNone(self._detect(['7-1-1A'], 'bob')['warehouse_id'])
+
+        stats = self.cache.get_stats()
+        self.assertEqual((stats['misses'], stats['rebuilds'], stats['hits']), (1, 2, 1))
+        self.assertEqual(stats['index']['warehouses'], 3)
+
+
+class TestDetectionSpeed(unittest.TestCase):
+    """Test scoring time with thousands of warehouses"""
+
+    def test_thousands_of_warehouses(self):
+        warehouses = [f"USER_{n:05d}" for n in range(3000) for _ in range(40)]
+        codes = [f"{n % 90 + 1:02d}-{position % 4 + 1:02d}-{n % 7 + position:03d}A"
+                 for n in range(3000) for position in range(40)]
+        index = WarehouseDetectionIndex(warehouses, codes)
+        inventory = [f"{aisle:02d}-0{level}-{position:03d}A" for aisle in range(1, 60)
+                     for level in range(1, 5) for position in range(1, 12)]
+
+        start = time.perf_counter()
+        scores = index.score(inventory)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        self.assertEqual(len(index.warehouses), 3000)
+        self.assertGreater(scores[0]['matches'], 0)
+        self.assertLess(elapsed_ms, 250)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+"""
+Warehouse Location Repository Test Suite
+
+Validates warm, cross-request LocationRepository instances:
+1. Loads are incremental: only codes not seen before are queried
+2. Repositories are reused per warehouse while the location version holds
+   and replaced when it changes (bump_location_version, table fingerprint)
+3. Statistics report hit rates and bytes held
+4. Warm repositories over a shared snapshot hold row indices plus a small delta
+"""
+
+import unittest
+import io
+import contextlib
+import tempfile
+from unittest.mock import patch
+
+from flask import Flask
+from sqlalchemy import event
+
+# Test imports
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import db
+import core_models  # noqa: F401  (registers the user table referenced by foreign keys)
+from models import Location
+from services.capacity_resolver import bump_location_version, get_location_version
+from services.location_repository import LocationRepository, WarehouseRepositoryCache
+from services.location_snapshot import SelectedLocationSnapshot
+from services.shared_location_snapshot import MappedLocationSnapshot, SharedSnapshotStore
+from test_location_snapshot import build_rows
+
+
+class WarmRepositoryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        self.rows = build_rows(600)
+        db.session.execute(Location.__table__.insert(), self.rows)
+        db.session.commit()
+        self.codes = [row['code'] for row in self.rows]
+
+        self.statements = []
+        event.listen(db.engine, 'before_cursor_execute', self._record)
+
+    def tearDown(self):
+        event.remove(db.engine, 'before_cursor_execute', self._record)
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(parameters)
+
+    def _load(self, repository, codes):
+        self.statements.clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            repository.bulk_load_locations(codes)
+        return self.statements
+
+
+class TestIncrementalLoad(WarmRepositoryTestCase):
+    """Test that repeated loads only query new codes"""
+
+    def test_only_new_codes_are_queried(self):
+        repository = LocationRepository('WH1', db.session)
+        self._load(repository, self.codes[:300] + ['GHOST-1'])
+
+        self.assertEqual(self._load(repository, self.codes[:300] + ['GHOST-1']), [])  # Fully warm: no query
+        statements = self._load(repository, self.codes[200:400] + ['GHOST-1', 'GHOST-2'])
+
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(sorted(value for value in statements[0] if value != 'WH1'),
+                         sorted(self.codes[300:400] + ['GHOST-2']))
+
+        stats = repository.get_cache_stats()
+        self.assertEqual((stats['total_cached'], stats['loads'], stats['codes_queried']), (402, 2, 402))
+        self.assertAlmostEqual(stats['warm_hit_rate'], (301 + 101) / (301 + 301 + 202) * 100)
+
+    def test_merged_rows_match_a_cold_load(self):
+        warm = LocationRepository('WH1', db.session)
+        for start in range(0, 600, 150):
+            self._load(warm, self.codes[start:start + 150] + [f"GHOST-{start}"])
+        cold = LocationRepository('WH1', db.session)
+        codes = self.codes + [f"GHOST-{start}" for start in range(0, 600, 150)]
+        self._load(cold, codes)
+
+        self.assertEqual(warm.get_capacities_bulk(codes), cold.get_capacities_bulk(codes))
+        self.assertEqual(warm.get_unit_types_bulk(codes), cold.get_unit_types_bulk(codes))
+        for code in codes:
+            self.assertEqual(warm.get_location(code).to_dict(), cold.get_location(code).to_dict(), code)
+            self.assertEqual(warm.is_physical_special_location(code), cold.is_physical_special_location(code))
+
+
+class TestWarehouseRepositoryCache(WarmRepositoryTestCase):
+    """Test reuse, version replacement and statistics of the warm repository cache"""
+
+    def setUp(self):
+        super().setUp()
+        import services.shared_location_snapshot as shared_module
+        self.folder = tempfile.TemporaryDirectory()
+        self.original_store = shared_module._shared_snapshot_store
+        shared_module._shared_snapshot_store = SharedSnapshotStore(self.folder.name)
+
+    def tearDown(self):
+        import services.shared_location_snapshot as shared_module
+        shared_module._shared_snapshot_store = self.original_store
+        self.folder.cleanup()
+        super().tearDown()
+
+    def test_reused_until_version_changes(self):
+        cache = WarehouseRepositoryCache(max_warehouses=2)
+        version = get_location_version('WH1')
+
+        first = cache.get('WH1', db.session, version)
+        self._load(first, self.codes[:100])
+        again = cache.get('WH1', db.session, get_location_version('WH1'))
+        self.assertIs(again, first)
+        self.assertEqual(self._load(again, self.codes[:100]), [])
+
+        bump_location_version('WH1')  # e.g. a location type edited through the API
+        self.assertNotEqual(get_location_version('WH1'), version)
+        fresh = cache.get('WH1', db.session, get_location_version('WH1'))
+        self.assertIsNot(fresh, first)
+        self.assertFalse(fresh.is_loaded())
+
+        db.session.execute(Location.__table__.insert(), [dict(self.rows[0], code='NEW-1')])
+        db.session.commit()
+        self.assertIsNot(cache.get('WH1', db.session, get_location_version('WH1')), fresh)
+
+        self.assertIsNot(cache.get('WH1', db.session, None), cache.get('WH1', db.session, None))
+        stats = cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['rebuilds'], stats['uncached']), (1, 1, 2, 2))
+
+    def test_shared_rows_are_indexed_not_copied(self):
+        warm = WarehouseRepositoryCache().get('WH1', db.session, get_location_version('WH1'))
+        # In-memory SQLite is never shared; give it a database key for this test
+        with patch('services.location_repository.database_key_for', return_value='test-db'):
+            self._load(warm, self.codes[:300] + ['GHOST-1'])
+            self._load(warm, self.codes[200:400] + ['GHOST-1', 'GHOST-2'])
+        cold = LocationRepository('WH1', db.session)
+        codes = self.codes[:400] + ['GHOST-1', 'GHOST-2', 'NEVER-LOADED', self.codes[500]]
+        self._load(cold, codes[:-2])
+
+        snapshot = warm._snapshot
+        self.assertIsInstance(snapshot, SelectedLocationSnapshot)
+        self.assertIsInstance(snapshot.base, MappedLocationSnapshot)
+        self.assertEqual((len(snapshot), len(snapshot.delta)), (402, 2))  # Only placeholders are private
+        self.assertLess(warm.get_cache_stats()['memory_bytes'], cold.get_cache_stats()['memory_bytes'])
+
+        self.assertEqual(warm.get_capacities_bulk(codes), cold.get_capacities_bulk(codes))
+        self.assertEqual(warm.get_unit_types_bulk(codes), cold.get_unit_types_bulk(codes))
+        self.assertIsNone(warm.get_location(self.codes[500]))  # In the mapping but never loaded
+        for code in codes[:-2]:
+            self.assertEqual(warm.get_location(code).to_dict(), cold.get_location(code).to_dict(), code)
+            self.assertEqual(warm.is_physical_special_location(code), cold.is_physical_special_location(code))
+
+    def test_stats_report_bytes_and_evictions(self):
+        cache = WarehouseRepositoryCache(max_warehouses=2)
+        for warehouse_id in ('WH1', 'WH2', 'WH3'):
+            self._load(cache.get(warehouse_id, db.session, 'v1'), self.codes[:50])
+        self._load(cache.get('WH3', db.session, 'v1'), self.codes[:100])
+
+        stats = cache.get_stats()
+        self.assertEqual((stats['size'], stats['evictions']), (2, 1))
+        self.assertEqual(sorted(stats['warehouses']), ['WH2', 'WH3'])
+        self.assertEqual(stats['locations_held'], 150)
+        self.assertEqual(stats['memory_bytes'], sum(entry['memory_bytes'] for entry in stats['warehouses'].values()))
+        self.assertAlmostEqual(stats['code_hit_rate'], round(1 - 150 / 200, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -12,6 +12,7 @@ from flask import current_app
 from models import WarehouseConfig, Location
 from database import db
 from virtual_template_integration import get_virtual_engine_for_warehouse
+from virtual_location_index import VirtualLocationIndex
 
 
 class VirtualLocationCompatibilityManager:
@@ -143,6 +144,30 @@ class VirtualLocationCompatibilityManager:
         # Fall back to physical locations
         return self._get_all_physical_locations(warehouse_id, created_by=created_by)
     
+    def get_virtual_location_index(self, warehouse_id: str, created_by: int = None) -> Optional[VirtualLocationIndex]:
+        """
+        Get a lazy, exact index over a virtual warehouse's locations
+
+        Unlike get_all_warehouse_locations, nothing beyond the special areas is
+        materialized: storage locations are computed from the warehouse dimensions
+        on demand, so counts are exact and paging costs O(page size).
+
+        Args:
+            warehouse_id: The warehouse identifier
+            created_by: User ID to filter physical special areas (for multi-tenancy)
+
+        Returns:
+            VirtualLocationIndex, or None when the warehouse has no virtual engine
+        """
+        if not self.enable_virtual_locations:
+            return None
+
+        virtual_engine = get_virtual_engine_for_warehouse(warehouse_id)
+        if not virtual_engine:
+            return None
+
+        return VirtualLocationIndex(virtual_engine, self._get_special_area_locations(virtual_engine, created_by))
+
     def _get_all_virtual_locations(self, virtual_engine, limit: int = 1000, created_by: int = None) -> List[Dict[str, Any]]:
         """
         Generate a representative sample of virtual locations
@@ -156,6 +181,25 @@ class VirtualLocationCompatibilityManager:
             limit: Maximum number of locations to return
             created_by: User ID to filter physical locations (for multi-tenancy)
         """
+        locations = self._get_special_area_locations(virtual_engine, created_by)
+        
+        # Add a sample of storage locations (not all - that could be millions!)
+        storage_sample = self._generate_storage_location_sample(virtual_engine, limit - len(locations))
+        locations.extend(storage_sample)
+        
+        if self.debug_compatibility:
+            print(f"[VIRTUAL_COMPAT] Generated {len(locations)} virtual locations (sample)")
+        
+        return locations
+    
+    def _get_special_area_locations(self, virtual_engine, created_by: int = None) -> List[Dict[str, Any]]:
+        """
+        Special area location dicts: physical (user-created) first, then virtual ones that don't conflict
+
+        Args:
+            virtual_engine: The virtual warehouse engine
+            created_by: User ID to filter physical locations (for multi-tenancy)
+        """
         locations = []
 
         # CRITICAL FIX: Add PHYSICAL special areas first (AISLE locations, etc.)
@@ -229,13 +273,6 @@ class VirtualLocationCompatibilityManager:
                     'source': 'virtual_special'
                 })
         
-        # Add a sample of storage locations (not all - that could be millions!)
-        storage_sample = self._generate_storage_location_sample(virtual_engine, limit - len(locations))
-        locations.extend(storage_sample)
-        
-        if self.debug_compatibility:
-            print(f"[VIRTUAL_COMPAT] Generated {len(locations)} virtual locations (sample)")
-        
         return locations
     
     def _generate_storage_location_sample(self, virtual_engine, limit: int) -> List[Dict[str, Any]]:
@@ -380,14 +417,14 @@ class VirtualLocationCompatibilityManager:
             # Count physical locations
             stats['physical_location_count'] = Location.query.filter_by(warehouse_id=warehouse_id).count()
             
-            # Calculate virtual locations if applicable
+            # Calculate virtual locations if applicable (exact counts from the lazy index)
             if stats['is_virtual'] and config:
-                virtual_engine = get_virtual_engine_for_warehouse(warehouse_id)
-                if virtual_engine:
-                    warehouse_summary = virtual_engine.get_warehouse_summary()
-                    stats['virtual_location_count'] = warehouse_summary['total_possible_locations']
-                    stats['virtual_storage_locations'] = warehouse_summary['storage_locations']
-                    stats['virtual_special_areas'] = warehouse_summary['special_areas']
+                location_index = self.get_virtual_location_index(warehouse_id)
+                if location_index:
+                    index_summary = location_index.get_summary()
+                    stats['virtual_location_count'] = index_summary['total_locations']
+                    stats['virtual_storage_locations'] = index_summary['storage_locations']
+                    stats['virtual_special_areas'] = index_summary['special_areas']
             
         except Exception as e:
             stats['error'] = str(e)
@@ -99,49 +99,54 @@ class VirtualInvalidLocationEvaluator:
         """
         Perform virtual location validation using the virtual engine.
 
-        Uses LocationRepository for repository-optimized physical location checks (O(1)).
+        PERFORMANCE: Unique locations are validated in one VirtualLocationEngine.validate_batch
+        call; LocationRepository physical checks (O(1)) run only for locations it rejects.
         """
         anomalies = []
-        processed_locations = set()  # Avoid duplicate processing
         invalid_locations = []  # Track invalid locations for logging
 
         if self.logger.should_log(LogLevel.VERBOSE, LogCategory.VIRTUAL_ENGINE):
             print(f"[{self.name}] Processing {len(inventory_df)} records, {inventory_df['location'].nunique()} unique locations")
 
-        for _, pallet in inventory_df.iterrows():
-            location = str(pallet.get('location', '')).strip()
+        # First pallet per unique location (skip empty/null locations)
+        raw_locations = inventory_df['location']
+        locations = pd.Series(raw_locations.astype(str).str.strip().to_numpy(), dtype=object)  # positional index
+        locations = locations[raw_locations.notna().to_numpy() & (locations != '').to_numpy()]
+        locations = locations[~locations.duplicated()]
+
+        validation = virtual_engine.validate_batch(locations)
+        pallet_ids = inventory_df['pallet_id'].to_numpy()
+        raw_values = raw_locations.to_numpy()
+        invalid = ~validation['is_valid'].to_numpy()
 
-            # Skip empty/null locations and already processed ones
-            if pd.isna(pallet.get('location')) or not location or location in processed_locations:
+        for row, location, reason in zip(locations.index[invalid], locations[invalid], validation['reason'][invalid]):
+            # CRITICAL FIX: Physical special locations are valid even when the template doesn't define them
+            # This ensures that locations created via "Add New Location" are recognized as valid
+            if self._is_physical_special_location(location, warehouse_context):
+                if self.logger.should_log(LogLevel.VERBOSE, LogCategory.LOCATION_VALIDATION):
+                    print(f"[LOCATION_VALIDATION] ✅ Physical special location recognized: '{location}'")
                 continue
 
-            processed_locations.add(location)
+            # Only log invalid locations - this dramatically reduces output
+            if self.logger.should_log(LogLevel.DIAGNOSTIC, LogCategory.LOCATION_VALIDATION):
+                print(f"[LOCATION_VALIDATION] ❌ Invalid: '{location}' -> {reason}")
 
-            # CRITICAL FIX: Check physical special locations first (repository-optimized)
-            # This ensures that locations created via "Add New Location" are recognized as valid
-            is_valid, reason = self._validate_location_with_physical_fallback(location, virtual_engine, warehouse_context)
-            
-            if not is_valid:
-                # Only log invalid locations - this dramatically reduces output
-                if self.logger.should_log(LogLevel.DIAGNOSTIC, LogCategory.LOCATION_VALIDATION):
-                    print(f"[LOCATION_VALIDATION] ❌ Invalid: '{location}' -> {reason}")
-                
-                invalid_locations.append(location)
-                
-                anomalies.append({
-                    'pallet_id': pallet['pallet_id'],
-                    'location': pallet['location'],
-                    'anomaly_type': 'Invalid Location',
-                    'priority': rule.priority,
-                    'issue_description': f"Location '{location}' is invalid: {reason}",
-                    'details': f"Location validation failed: {reason}",
-                    'validation_method': 'virtual_engine',
-                    'warehouse_context': virtual_engine.warehouse_id,
-                    'enhanced_reason': reason
-                })
+            invalid_locations.append(location)
+
+            anomalies.append({
+                'pallet_id': pallet_ids[row],
+                'location': raw_values[row],
+                'anomaly_type': 'Invalid Location',
+                'priority': rule.priority,
+                'issue_description': f"Location '{location}' is invalid: {reason}",
+                'details': f"Location validation failed: {reason}",
+                'validation_method': 'virtual_engine',
+                'warehouse_context': virtual_engine.warehouse_id,
+                'enhanced_reason': reason
+            })
         
         if self.logger.should_log(LogLevel.VERBOSE, LogCategory.LOCATION_VALIDATION):
-            print(f"[{self.name}] Validation complete: {len(anomalies)} anomalies from {len(processed_locations)} locations")
+            print(f"[{self.name}] Validation complete: {len(anomalies)} anomalies from {len(locations)} locations")
         
         return anomalies
     
@@ -12,6 +12,38 @@ from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
 from datetime import datetime
 
+import numpy as np
+import pandas as pd
+
+
+# Batch validation reason codes -> reason messages (same wording as validate_location)
+VALIDATION_REASONS = {
+    'empty': "Empty or null location code",
+    'special_area': "Valid special area",
+    'storage': "Valid storage location",
+    'position_level': "Valid position+level storage location",
+    'smart_format': "Valid {pattern_type} location",
+    'smart_pattern_unavailable': "Smart Configuration pattern not available",
+    'smart_format_mismatch': "Location '{code}' doesn't match {pattern_type} format pattern",
+    'smart_parse_error': "Error parsing {pattern_type} location: invalid position '{position}'",
+    'format_not_recognized': "Storage location format not recognized: '{code}'",
+    'position_out_of_range': "Position {position} out of configured range (1-{max_position})",
+    'rack_number_out_of_range': "Rack number {rack} exceeds warehouse racks (max: {rack_count})",
+    'aisle_out_of_range': "Aisle {aisle} exceeds warehouse capacity (max: {max_aisle})",
+    'rack_not_available': "Rack '{rack}' not available (available: {racks})",
+    'position_exceeds_rack': "Position {position} exceeds rack capacity (max: {max_rack_position})",
+    'level_not_available': "Level '{level}' not available (available: {levels})",
+    'smart_level_not_valid': "Level '{level}' not valid (available: {levels})",
+}
+VALID_REASON_CODES = frozenset({'special_area', 'storage', 'position_level', 'smart_format'})
+
+SPECIAL_AREA_PATTERNS = [
+    re.compile(r'^RECV-\d+$'),      # RECV-01, RECV-02
+    re.compile(r'^STAGE-\d+$'),     # STAGE-01
+    re.compile(r'^DOCK-\d+$'),      # DOCK-01
+    re.compile(r'^AISLE-\d+$'),     # AISLE-01, AISLE-02
+]
+
 
 @dataclass
 class VirtualLocationProperties:
@@ -73,6 +105,9 @@ class VirtualLocationEngine:
         
         # Build special areas lookup
         self.special_areas = self._build_special_areas_lookup()
+
+        # PERFORMANCE: Compile prefix, storage and Smart Configuration patterns once
+        self._compile_validation_patterns()
         
         print(f"[VIRTUAL_ENGINE] Initialized for warehouse {self.warehouse_id}")
         print(f"  Storage universe: {len(self.storage_space['aisles'])} aisles × {len(self.storage_space['racks'])} racks × {len(self.storage_space['positions'])} positions × {len(self.storage_space['levels'])} levels")
@@ -203,32 +238,258 @@ class VirtualLocationEngine:
         # Check storage location format and bounds
         return self._validate_storage_location(normalized_code)
     
-    def _remove_warehouse_prefix(self, location_code: str) -> str:
-        """Remove warehouse prefix from location code for validation"""
-        # Handle prefixes like USER_TESTF_, ALICE_, etc.
-        prefixes_to_remove = [
+    def validate_batch(self, location_codes, with_reasons: bool = True) -> pd.DataFrame:
+        """
+        BATCH METHOD: Vectorized validate_location for many codes at once
+        
+        Each distinct code is validated once (prefix strip, special-area lookup,
+        format parse and bounds check as array operations); results are then
+        broadcast back to every row.
+        
+        Args:
+            location_codes: Series (or list) of location codes from inventory file
+            with_reasons: Also render reason messages (skip when only validity is needed)
+            
+        Returns:
+            DataFrame aligned with location_codes:
+                is_valid (bool), reason_code (key of VALIDATION_REASONS),
+                reason (same message validate_location returns, None without with_reasons)
+        """
+        if not isinstance(location_codes, pd.Series):
+            location_codes = pd.Series(list(location_codes), dtype=object)
+        
+        # Validate unique codes only (nulls share the -1 'empty' slot)
+        positions, uniques = pd.factorize(location_codes, use_na_sentinel=True)
+        unique_results = self._validate_unique_codes(np.asarray(uniques, dtype=object), with_reasons)
+        empty_result = (False, 'empty', VALIDATION_REASONS['empty'] if with_reasons else None)
+        
+        take = np.where(positions < 0, len(uniques), positions)
+        columns = [np.append(column, np.array([value], dtype=column.dtype))[take]
+                   for column, value in zip(unique_results, empty_result)]
+        
+        return pd.DataFrame({
+            'is_valid': columns[0],
+            'reason_code': columns[1],
+            'reason': columns[2],
+        }, index=location_codes.index)
+    
+    def _validate_unique_codes(self, values: np.ndarray,
+                               with_reasons: bool = True) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Validity, reason codes and reasons for distinct non-null location values"""
+        count = len(values)
+        codes = pd.Series(values, dtype=object).astype(str).str.strip().str.upper()
+        
+        # Remove warehouse prefix in one vectorized replace
+        normalized = codes.str.replace(self._prefix_regex, '', n=1, regex=True)
+        
+        reason_codes = np.full(count, 'format_not_recognized', dtype=object)
+        empty = (codes == '').to_numpy() | np.fromiter((not value for value in values), dtype=bool, count=count)
+        special = ~empty & normalized.isin(list(self.special_areas)).to_numpy()
+        reason_codes[empty] = 'empty'
+        reason_codes[special] = 'special_area'
+        
+        storage = ~empty & ~special
+        parsed = pd.DataFrame(index=normalized.index, columns=['aisle', 'rack', 'position', 'level'], dtype=object)
+        if storage.any():
+            if self.location_format_config:
+                storage_reasons = self._validate_smart_configuration_batch(normalized[storage], parsed)
+            else:
+                storage_reasons = self._validate_standard_formats_batch(normalized[storage], parsed)
+            reason_codes[storage] = storage_reasons
+        
+        is_valid = np.isin(reason_codes, list(VALID_REASON_CODES))
+        if with_reasons:
+            reasons = self._reason_messages(reason_codes, normalized, parsed)
+        else:
+            reasons = np.full(count, None, dtype=object)
+        return is_valid, reason_codes, reasons
+    
+    def _validate_smart_configuration_batch(self, codes: pd.Series, parsed: pd.DataFrame) -> np.ndarray:
+        """Vectorized _validate_with_smart_configuration (fills parsed parts)"""
+        pattern_type = self.location_format_config.get('pattern_type')
+        pattern_regex = self.location_format_config.get('regex_pattern')
+        
+        if not pattern_regex:
+            return np.full(len(codes), 'smart_pattern_unavailable', dtype=object)
+        
+        smart_regex = self._smart_regex or re.compile(pattern_regex)
+        matched = codes.str.match(smart_regex, na=False).to_numpy(dtype=bool)
+        reason_codes = np.where(matched, 'smart_format', 'smart_format_mismatch').astype(object)
+        
+        # For position_level format (like 010A), validate against warehouse bounds
+        if pattern_type == 'position_level' and smart_regex.groups >= 2 and matched.any():
+            # Codes already match at their start, so extract's search finds that same match
+            groups = codes[matched].str.extract(smart_regex, expand=True)
+            position = pd.to_numeric(groups.iloc[:, 0], errors='coerce')
+            level = groups.iloc[:, 1].str.upper()
+            integral = position.notna() & (position == position.round())
+            position_text = groups.iloc[:, 0].astype(object)
+            position_text[integral] = position[integral].astype('int64').astype(str)
+            parsed.loc[groups.index, 'position'] = position_text
+            parsed.loc[groups.index, 'level'] = level
+            
+            reason_codes[matched] = np.select(
+                [
+                    ~integral.to_numpy(),
+                    ((position < 1) | (position > self.max_position)).to_numpy(),
+                    ~level.isin(self.storage_space['levels']).to_numpy(),
+                ],
+                ['smart_parse_error', 'position_out_of_range', 'smart_level_not_valid'],
+                default='smart_format'
+            )
+        
+        return reason_codes
+    
+    def _validate_standard_formats_batch(self, codes: pd.Series, parsed: pd.DataFrame) -> np.ndarray:
+        """Vectorized _validate_standard_formats (fills parsed parts)"""
+        parts = codes.str.extract(self._storage_batch_regex, expand=True)
+        
+        # Pattern 1: position+level
+        position_level = parts['p1_position'].notna().to_numpy()
+        # Patterns 2-4: aisle-rack-position-level (pattern 4 has a numeric rack)
+        aisle_str = self._coalesce(parts, ['p2_aisle', 'p3_aisle', 'p4_aisle'])
+        four_part = aisle_str.notna().to_numpy()
+        numeric_rack = parts['p4_rack'].notna().to_numpy()
+        
+        position_str = self._coalesce(parts, ['p1_position', 'p2_position', 'p3_position', 'p4_position'])
+        level = self._coalesce(parts, ['p1_level', 'p2_level', 'p3_level', 'p4_level'])
+        rack = self._coalesce(parts, ['p2_rack', 'p3_rack'])
+        
+        position = pd.to_numeric(position_str, errors='coerce').fillna(0).to_numpy(dtype='int64')
+        aisle = pd.to_numeric(aisle_str, errors='coerce').fillna(0).to_numpy(dtype='int64')
+        rack_number = pd.to_numeric(parts['p4_rack'], errors='coerce').fillna(0).to_numpy(dtype='int64')
+        
+        rack_count = len(self.storage_space['racks'])
+        level_ok = level.isin(self.storage_space['levels']).to_numpy()
+        aisle_ok = np.isin(aisle, self.storage_space['aisles'])
+        rack_ok = rack.isin(self.storage_space['racks']).to_numpy()
+        rack_position_ok = np.isin(position, self.storage_space['positions'])
+        
+        parsed.loc[codes.index, 'aisle'] = pd.Series(aisle, index=codes.index).astype(str).where(four_part)
+        parsed.loc[codes.index, 'rack'] = rack.where(~numeric_rack, pd.Series(rack_number, index=codes.index).astype(str))
+        parsed.loc[codes.index, 'position'] = pd.Series(position, index=codes.index).astype(str).where(position_str.notna())
+        parsed.loc[codes.index, 'level'] = level
+        
+        return np.select(
+            [
+                position_level & ((position < 1) | (position > self.max_position)),
+                position_level & ~level_ok,
+                position_level,
+                # Numeric racks map to letters (01 -> A); unmappable racks fail before the aisle check
+                four_part & numeric_rack & (rack_number > rack_count),
+                four_part & numeric_rack & (rack_count == 0),
+                four_part & ~aisle_ok,
+                four_part & ~numeric_rack & ~rack_ok,
+                four_part & ~rack_position_ok,
+                four_part & ~level_ok,
+                four_part,
+            ],
+            [
+                'position_out_of_range', 'level_not_available', 'position_level',
+                'rack_number_out_of_range', 'format_not_recognized',
+                # Bounds messages need a max; without aisles/positions the format is unrecognized
+                'aisle_out_of_range' if self.storage_space['aisles'] else 'format_not_recognized',
+                'rack_not_available',
+                'position_exceeds_rack' if self.storage_space['positions'] else 'format_not_recognized',
+                'level_not_available', 'storage',
+            ],
+            default='format_not_recognized'
+        ).astype(object)
+    
+    @staticmethod
+    def _coalesce(parts: pd.DataFrame, columns: List[str]) -> pd.Series:
+        """First non-null value across mutually exclusive format branches"""
+        values = parts[columns[0]].to_numpy(dtype=object).copy()
+        for column in columns[1:]:
+            missing = pd.isna(values)
+            values[missing] = parts[column].to_numpy(dtype=object)[missing]
+        return pd.Series(values, index=parts.index, dtype=object)
+    
+    def _reason_messages(self, reason_codes: np.ndarray, normalized: pd.Series, parsed: pd.DataFrame) -> np.ndarray:
+        """Render reason messages; code-specific wording is formatted for invalid codes only"""
+        storage_space = self.storage_space
+        fields = {
+            'pattern_type': (self.location_format_config or {}).get('pattern_type'),
+            'max_position': self.max_position,
+            'rack_count': len(storage_space['racks']),
+            'max_aisle': max(storage_space['aisles'], default=None),
+            'racks': ', '.join(storage_space['racks']),
+            'max_rack_position': max(storage_space['positions'], default=None),
+            'levels': ', '.join(storage_space['levels']),
+        }
+        
+        reasons = np.empty(len(reason_codes), dtype=object)
+        static = {code: template.format(**fields) for code, template in VALIDATION_REASONS.items()
+                  if code in VALID_REASON_CODES or code in ('empty', 'smart_pattern_unavailable')}
+        is_static = np.isin(reason_codes, list(static))
+        reasons[is_static] = pd.Series(reason_codes[is_static], dtype=object).map(static).to_numpy()
+        
+        detail_positions = np.flatnonzero(~is_static)
+        details = parsed.iloc[detail_positions]
+        for position, reason_code, code, aisle, rack, part_position, level in zip(
+                detail_positions, reason_codes[detail_positions], normalized.to_numpy()[detail_positions],
+                details['aisle'].to_numpy(), details['rack'].to_numpy(),
+                details['position'].to_numpy(), details['level'].to_numpy()):
+            reasons[position] = VALIDATION_REASONS[reason_code].format(
+                code=code, aisle=aisle, rack=rack, position=part_position, level=level, **fields
+            )
+        
+        return reasons
+    
+    def _compile_validation_patterns(self) -> None:
+        """Precompile the regexes used by validate_location and validate_batch"""
+        # Handle prefixes like USER_TESTF_, ALICE_, etc. (first listed prefix wins)
+        self.prefixes_to_remove = [
             f'{self.warehouse_id}_',
             'USER_', 'ALICE_', 'WH01_', 'WH02_', 'WH_', 'DEFAULT_'
         ]
-        
+        self._prefix_regex = re.compile('^(?:' + '|'.join(re.escape(prefix) for prefix in self.prefixes_to_remove) + ')')
+
+        # Standard canonical storage formats, with configurable position digits
+        # Support up to 6 digits for enterprise-scale warehouses
+        self.max_position_digits = self.config.get('max_position_digits', 6)
+        self.max_position = int('9' * self.max_position_digits)
+        position_pattern = fr'\d{{1,{self.max_position_digits}}}'
+        self._storage_patterns = [
+            # Pattern 1: ENTERPRISE POSITION+LEVEL (1230A, 5678B, 999999C) - NEW PRIORITY!
+            re.compile(rf'^({position_pattern})([A-Z])$'),
+            # Pattern 2: XX-YZZ-W (aisle-rack+position-level) - enhanced for 4+ digits
+            re.compile(rf'^(\d{{1,2}})-([A-Z])({position_pattern})-([A-Z])$'),
+            # Pattern 3: XX-Y-ZZZ-W (aisle-rack-position-level) - enhanced for 4+ digits
+            re.compile(rf'^(\d{{1,2}})-([A-Z])-({position_pattern})-([A-Z])$'),
+            # Pattern 4: XX-YY-ZZZ-W (aisle-rack-position-level with 2-digit rack) - enhanced for 4+ digits
+            re.compile(rf'^(\d{{1,2}})-(\d{{1,2}})-({position_pattern})([A-Z])$'),
+        ]
+        # All standard formats as one alternation for str.extract (one named branch per format)
+        self._storage_batch_regex = re.compile(
+            rf'^(?:(?P<p1_position>{position_pattern})(?P<p1_level>[A-Z])'
+            rf'|(?P<p2_aisle>\d{{1,2}})-(?P<p2_rack>[A-Z])(?P<p2_position>{position_pattern})-(?P<p2_level>[A-Z])'
+            rf'|(?P<p3_aisle>\d{{1,2}})-(?P<p3_rack>[A-Z])-(?P<p3_position>{position_pattern})-(?P<p3_level>[A-Z])'
+            rf'|(?P<p4_aisle>\d{{1,2}})-(?P<p4_rack>\d{{1,2}})-(?P<p4_position>{position_pattern})(?P<p4_level>[A-Z]))$'
+        )
+
+        # Smart Configuration pattern (None when not configured)
+        self._smart_regex = None
+        pattern_regex = (self.location_format_config or {}).get('regex_pattern')
+        if pattern_regex:
+            try:
+                self._smart_regex = re.compile(pattern_regex)
+            except re.error as e:
+                print(f"[VIRTUAL_ENGINE] Warning: Invalid Smart Configuration pattern '{pattern_regex}': {e}")
+
+    def _remove_warehouse_prefix(self, location_code: str) -> str:
+        """Remove warehouse prefix from location code for validation"""
         code = location_code.upper()
-        for prefix in prefixes_to_remove:
-            if code.startswith(prefix):
-                return code[len(prefix):]
+        prefix = self._prefix_regex.match(code)
+        if prefix:
+            return code[prefix.end():]
         
         return code
     
     def _is_special_area(self, location_code: str) -> bool:
         """Check if location code matches special area patterns"""
-        special_patterns = [
-            r'^RECV-\d+$',      # RECV-01, RECV-02
-            r'^STAGE-\d+$',     # STAGE-01
-            r'^DOCK-\d+$',      # DOCK-01
-            r'^AISLE-\d+$'      # AISLE-01, AISLE-02
-        ]
-        
-        for pattern in special_patterns:
-            if re.match(pattern, location_code):
+        for pattern in SPECIAL_AREA_PATTERNS:
+            if pattern.match(location_code):
                 return True
         
         return False
@@ -256,9 +517,9 @@ class VirtualLocationEngine:
         if not pattern_regex:
             return False, "Smart Configuration pattern not available"
         
-        # Apply the Smart Configuration pattern
-        import re
-        match = re.match(pattern_regex, location_code)
+        # Apply the Smart Configuration pattern (precompiled at construction)
+        smart_regex = self._smart_regex or re.compile(pattern_regex)
+        match = smart_regex.match(location_code)
         if not match:
             return False, f"Location '{location_code}' doesn't match {pattern_type} format pattern"
         
@@ -303,24 +564,10 @@ class VirtualLocationEngine:
         - 01-A-001-A (aisle-rack-position-level) 
         - 02-B15-C (aisle-rack+position-level)
         """
-        # Try different storage location patterns with configurable position digits
-        # Support up to 6 digits for enterprise-scale warehouses
-        max_position_digits = self.config.get('max_position_digits', 6)
-        position_pattern = fr'\d{{1,{max_position_digits}}}'
-        
-        storage_patterns = [
-            # Pattern 1: ENTERPRISE POSITION+LEVEL (1230A, 5678B, 999999C) - NEW PRIORITY!
-            rf'^({position_pattern})([A-Z])$',
-            # Pattern 2: XX-YZZ-W (aisle-rack+position-level) - enhanced for 4+ digits
-            rf'^(\d{{1,2}})-([A-Z])({position_pattern})-([A-Z])$',
-            # Pattern 3: XX-Y-ZZZ-W (aisle-rack-position-level) - enhanced for 4+ digits
-            rf'^(\d{{1,2}})-([A-Z])-({position_pattern})-([A-Z])$',
-            # Pattern 4: XX-YY-ZZZ-W (aisle-rack-position-level with 2-digit rack) - enhanced for 4+ digits
-            rf'^(\d{{1,2}})-(\d{{1,2}})-({position_pattern})([A-Z])$'
-        ]
+        max_position_digits = self.max_position_digits
         
-        for pattern in storage_patterns:
-            match = re.match(pattern, location_code)
+        for pattern in self._storage_patterns:
+            match = pattern.match(location_code)
             if match:
                 try:
                     # Handle position+level format (2 groups: position, level)
@@ -394,6 +641,25 @@ class VirtualLocationEngine:
         
         return True, "Valid storage location"
     
+    def capacities_batch(self, location_codes) -> np.ndarray:
+        """
+        BATCH METHOD: Capacity get_location_properties would report, for many codes at once
+
+        Invalid codes -> 0, special areas -> their configured capacity,
+        valid storage locations -> default_pallet_capacity.
+        """
+        codes = pd.Series(list(location_codes), dtype=object)
+        is_valid = self.validate_batch(codes, with_reasons=False)['is_valid'].to_numpy(dtype=bool)
+        normalized = codes.astype(str).str.strip().str.upper().str.replace(self._prefix_regex, '', n=1, regex=True)
+
+        special = normalized.isin(list(self.special_areas)).to_numpy()
+        special_capacities = {code: area['capacity'] for code, area in self.special_areas.items()}
+
+        capacities = np.full(len(codes), self.config.get('default_pallet_capacity', 1), dtype=object)
+        capacities[special] = normalized[special].map(special_capacities).to_numpy()
+        capacities[~is_valid] = 0
+        return pd.to_numeric(pd.Series(capacities, dtype=object), errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
     def get_location_properties(self, location_code: str) -> Optional[VirtualLocationProperties]:
         """
         Get complete properties for a location (replaces database lookup)
@@ -435,25 +701,14 @@ class VirtualLocationEngine:
     def _derive_storage_properties(self, original_code: str, normalized_code: str) -> VirtualLocationProperties:
         """Derive properties for storage locations"""
         # Parse storage location components
-        # Use configurable position digits for property derivation as well
-        max_position_digits = self.config.get('max_position_digits', 6)
-        position_pattern = fr'\d{{1,{max_position_digits}}}'
-        
-        storage_patterns = [
-            # Enterprise position+level pattern for properties derivation
-            rf'^({position_pattern})([A-Z])$',
-            rf'^(\d{{1,2}})-([A-Z])({position_pattern})-([A-Z])$',
-            rf'^(\d{{1,2}})-([A-Z])-({position_pattern})-([A-Z])$',
-            rf'^(\d{{1,2}})-(\d{{1,2}})-({position_pattern})([A-Z])$'
-        ]
-        
         aisle_number = None
         rack_identifier = None
         position_number = None
         level = None
         
-        for pattern in storage_patterns:
-            match = re.match(pattern, normalized_code)
+        # Same precompiled patterns as validation (configurable position digits)
+        for pattern in self._storage_patterns:
+            match = pattern.match(normalized_code)
             if match:
                 groups = match.groups()
                 level = groups[-1].upper()
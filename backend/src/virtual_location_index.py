@@ -0,0 +1,314 @@
+"""
+Virtual Location Index
+
+The locations API used to materialize up to 1000 location dicts (special
+areas plus a storage *sample* from the first 3 aisles), filter them with list
+comprehensions, sort them with a Python key and only then slice the page.
+Large warehouses were truncated and every page paid for the whole list.
+
+VirtualLocationIndex keeps the special areas (a handful) as a sorted list and
+treats storage as an arithmetic sequence over the warehouse dimensions:
+
+    index -> (aisle, position, level, rack)   via divmod
+
+so counting a selection is O(1) and building a page is O(page size). The
+order is exactly the API's previous sort key (type priority, aisle, rack
+number, position, level, code): special areas first, then storage by aisle,
+position, level and rack letter.
+
+Searches that do not match the storage zone go through a LocationSearchIndex
+over the storage codes (prefix, infix and ``aisle:3 level:B`` queries), built
+on first use and cached per warehouse dimensions. Warehouses beyond
+MAX_SEARCH_INDEX_STORAGE stream codes instead, without building location dicts.
+
+Usage:
+    index = get_compatibility_manager().get_virtual_location_index(warehouse_id, created_by=user_id)
+    selection = index.select(location_type='STORAGE', aisle_number=3)
+    total, page = len(selection), selection.page(offset=100, limit=50)
+"""
+
+import re
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from location_search_index import LocationSearchIndex, SearchQuery, get_search_index_cache, parse_search_query
+
+# Sort priority of location types (special areas first, then storage)
+LOCATION_TYPE_PRIORITY = {
+    'RECEIVING': 1,
+    'STAGING': 2,
+    'DOCK': 3,
+    'TRANSITIONAL': 4,  # CRITICAL FIX: Include AISLE locations in high priority
+    'STORAGE': 5
+}
+
+STORAGE_TYPE = 'STORAGE'
+STORAGE_ZONE = 'STORAGE'
+_SINGLE_LETTER = re.compile(r'^[A-Z]$')
+
+# Largest storage universe given an in-memory search index (~25MB per 150k codes)
+MAX_SEARCH_INDEX_STORAGE = 250_000
+
+# Special area dict keys of the structured search fields
+_SPECIAL_FIELD_KEYS = {'rack': 'rack_number'}
+
+
+def location_sort_key(location: Dict[str, Any]) -> Tuple:
+    """Sort key of the locations API (special areas first, then storage)"""
+    return (
+        LOCATION_TYPE_PRIORITY.get(location.get('location_type', 'STORAGE'), 5),
+        location.get('aisle_number') or 0,
+        location.get('rack_number') or 0,
+        location.get('position_number') or 0,
+        location.get('level', '') or '',
+        location.get('code', '')
+    )
+
+
+def storage_code(aisle: int, rack: str, position: int, level: str) -> str:
+    """Canonical virtual storage code (aisle-rack+position-level)"""
+    return f"{aisle:02d}-{rack}{position:02d}-{level}"
+
+
+def _field_equals(actual: Any, expected: str) -> bool:
+    if actual is None:
+        return False
+    if isinstance(actual, (int, float)):
+        try:
+            return float(actual) == float(expected)
+        except ValueError:
+            return False
+    return str(actual).upper() == expected.upper()
+
+
+def _special_matches(location: Dict[str, Any], query: SearchQuery) -> bool:
+    """Whether a special area dict matches every part of a parsed search"""
+    code = str(location.get('code', '')).upper()
+    zone = str(location.get('zone', '')).upper()
+    return (all(term in code or term in zone for term in query.terms)
+            and all(code.startswith(prefix) for prefix in query.prefixes)
+            and all(_field_equals(location.get(_SPECIAL_FIELD_KEYS.get(name, name)), value)
+                    for name, value in query.fields.items()))
+
+
+class VirtualLocationIndex:
+    """
+    Lazy, ordered view over a virtual warehouse's locations
+
+    Args:
+        virtual_engine: VirtualLocationEngine of the warehouse
+        special_locations: Special area location dicts (physical and virtual)
+    """
+
+    def __init__(self, virtual_engine, special_locations: List[Dict[str, Any]]):
+        self.warehouse_id = virtual_engine.warehouse_id
+        self.special_locations = sorted(special_locations, key=location_sort_key)
+        self.storage_capacity = virtual_engine.config.get('default_pallet_capacity', 1)
+
+        # Storage universe restricted to codes the canonical format can express
+        storage_space = virtual_engine.storage_space
+        max_position_digits = getattr(virtual_engine, 'max_position_digits', 6)
+        self.aisles = [aisle for aisle in storage_space['aisles'] if aisle <= 99]
+        self.racks = sorted(rack for rack in storage_space['racks'] if _SINGLE_LETTER.match(rack))
+        self.positions = [position for position in storage_space['positions']
+                          if len(f"{position:02d}") <= max_position_digits]
+        self.levels = sorted({level for level in storage_space['levels'] if _SINGLE_LETTER.match(level)})
+
+        # Smart Configuration warehouses may not accept the canonical format at all
+        if self.storage_slots_per_aisle and self.aisles:
+            probe = storage_code(self.aisles[0], self.racks[0], self.positions[0], self.levels[0])
+            if not virtual_engine.validate_location(probe)[0]:
+                self.aisles = []
+
+    @property
+    def storage_slots_per_aisle(self) -> int:
+        return len(self.racks) * len(self.positions) * len(self.levels)
+
+    @property
+    def storage_count(self) -> int:
+        return len(self.aisles) * self.storage_slots_per_aisle
+
+    def __len__(self) -> int:
+        return len(self.special_locations) + self.storage_count
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Exact totals over the whole warehouse (no sampling)"""
+        special_storage = sum(1 for loc in self.special_locations if loc.get('location_type') == STORAGE_TYPE)
+        return {
+            'total_locations': len(self),
+            'storage_locations': self.storage_count + special_storage,
+            'special_areas': len(self.special_locations) - special_storage,
+            'total_capacity': (sum(loc.get('capacity', 1) for loc in self.special_locations) +
+                               self.storage_count * self.storage_capacity),
+        }
+
+    def select(self, location_type: Optional[str] = None, zone: Optional[str] = None,
+               is_active: Optional[bool] = None, aisle_number: Optional[int] = None,
+               search: Optional[str] = None) -> 'VirtualLocationSelection':
+        """Filtered, ordered selection (same filter semantics as the locations API)"""
+        query = parse_search_query(search)
+
+        specials = [
+            loc for loc in self.special_locations
+            if (not location_type or loc.get('location_type') == location_type)
+            and (not zone or loc.get('zone') == zone)
+            and (is_active is None or loc.get('is_active', True) == is_active)
+            and (aisle_number is None or loc.get('aisle_number') == aisle_number)
+            and _special_matches(loc, query)
+        ]
+
+        # Storage locations are all STORAGE / zone STORAGE / active
+        fields = dict(query.fields)
+        type_filters = [value for value in (location_type, fields.pop('location_type', None)) if value]
+        zone_filters = [value for value in (zone, fields.pop('zone', None)) if value]
+        aisles = self.aisles
+        if (any(value != STORAGE_TYPE for value in type_filters) or any(value != STORAGE_ZONE for value in zone_filters)
+                or is_active is False):
+            aisles = []
+        elif aisle_number is not None:
+            aisles = [aisle for aisle in aisles if aisle == aisle_number]
+
+        # Terms matching the zone keep every storage location; the rest is matched on codes
+        storage_query = SearchQuery(
+            terms=[term for term in query.terms if term not in STORAGE_ZONE],
+            prefixes=query.prefixes, fields=fields
+        )
+        if not storage_query or not aisles:
+            return VirtualLocationSelection(self, specials, aisles)
+
+        search_index = self.search_index()
+        if search_index is None:
+            return VirtualLocationSelection(self, specials, aisles, storage_query=storage_query)
+
+        ordinals = search_index.query(storage_query)
+        if len(aisles) != len(self.aisles):
+            aisle_of_ordinal = np.asarray(self.aisles)[ordinals // self.storage_slots_per_aisle]
+            ordinals = ordinals[np.isin(aisle_of_ordinal, aisles)]
+        return VirtualLocationSelection(self, specials, aisles, storage_ordinals=ordinals)
+
+    def search_index(self) -> Optional[LocationSearchIndex]:
+        """Search index over the storage codes (None beyond MAX_SEARCH_INDEX_STORAGE)"""
+        if not self.storage_count or self.storage_count > MAX_SEARCH_INDEX_STORAGE:
+            return None
+        version = (tuple(self.aisles), tuple(self.racks), tuple(self.positions), tuple(self.levels))
+        return get_search_index_cache().get_or_build(('virtual', self.warehouse_id), version, self._build_search_index)
+
+    def _build_search_index(self) -> LocationSearchIndex:
+        ordinals = np.arange(self.storage_count)
+        aisle_index, remainder = np.divmod(ordinals, self.storage_slots_per_aisle)
+        position_index, remainder = np.divmod(remainder, len(self.racks) * len(self.levels))
+        level_index, rack_index = np.divmod(remainder, len(self.racks))
+        return LocationSearchIndex(
+            [storage_code(*slot) for slot in self.iter_storage_slots(self.aisles)],
+            fields={
+                'aisle_number': np.asarray(self.aisles)[aisle_index],
+                'rack': np.asarray(self.racks, dtype=object)[rack_index],
+                'position_number': np.asarray(self.positions)[position_index],
+                'level': np.asarray(self.levels, dtype=object)[level_index],
+            }
+        )
+
+    def storage_location(self, aisle: int, rack: str, position: int, level: str) -> Dict[str, Any]:
+        """Location dict for a storage slot (same fields as the compatibility layer)"""
+        code = storage_code(aisle, rack, position, level)
+        return {
+            'id': hash(code),  # Add ID for frontend compatibility
+            'code': code,
+            'location_type': STORAGE_TYPE,
+            'capacity': self.storage_capacity,
+            'pallet_capacity': self.storage_capacity,
+            'zone': STORAGE_ZONE,
+            'warehouse_id': self.warehouse_id,
+            'aisle_number': aisle,
+            'rack_number': None,  # Virtual uses rack_identifier
+            'position_number': position,
+            'level': level,
+            'is_storage_location': True,
+            'full_address': f"A{aisle:02d}-{rack}{position:02d}-{level}",
+            'is_active': True,
+            'created_at': '2025-01-01T00:00:00Z',  # Default timestamp
+            'source': 'virtual_storage'
+        }
+
+    def storage_slot_at(self, aisles: List[int], offset: int) -> Tuple[int, str, int, str]:
+        """(aisle, rack, position, level) of the offset-th storage slot over the given aisles"""
+        racks, levels = len(self.racks), len(self.levels)
+        aisle_index, remainder = divmod(offset, self.storage_slots_per_aisle)
+        position_index, remainder = divmod(remainder, racks * levels)
+        level_index, rack_index = divmod(remainder, racks)
+        return (aisles[aisle_index], self.racks[rack_index],
+                self.positions[position_index], self.levels[level_index])
+
+    def iter_storage_slots(self, aisles: List[int]) -> Iterator[Tuple[int, str, int, str]]:
+        """Storage slots in API order without materializing them"""
+        for aisle in aisles:
+            for position in self.positions:
+                for level in self.levels:
+                    for rack in self.racks:
+                        yield aisle, rack, position, level
+
+
+class VirtualLocationSelection:
+    """
+    Filtered view of a VirtualLocationIndex supporting len() and paging
+
+    Storage is either every slot of the selected aisles, the slots at
+    storage_ordinals (search index results), or the slots matching
+    storage_query (streamed when the warehouse is too large to index).
+    """
+
+    def __init__(self, index: VirtualLocationIndex, specials: List[Dict[str, Any]], aisles: List[int],
+                 storage_ordinals: Optional[np.ndarray] = None, storage_query: Optional[SearchQuery] = None):
+        self.index = index
+        self.specials = specials
+        self.aisles = aisles
+        self.storage_ordinals = storage_ordinals
+        self.storage_query = storage_query
+        self._scan_count = None
+
+    def __len__(self) -> int:
+        return len(self.specials) + self.storage_count
+
+    @property
+    def storage_count(self) -> int:
+        if self.storage_ordinals is not None:
+            return len(self.storage_ordinals)
+        if self.storage_query is None:
+            return len(self.aisles) * self.index.storage_slots_per_aisle
+        if self._scan_count is None:
+            self._scan_count = sum(1 for _ in self._matching_slots())
+        return self._scan_count
+
+    def page(self, offset: int, limit: int) -> List[Dict[str, Any]]:
+        """Locations [offset, offset + limit) of the selection in API order"""
+        offset = max(offset, 0)
+        locations = self.specials[offset:offset + limit]
+
+        storage_offset = max(offset - len(self.specials), 0)
+        remaining = limit - len(locations)
+        if remaining <= 0:
+            return locations
+
+        if self.storage_ordinals is not None:
+            ordinals = self.storage_ordinals[storage_offset:storage_offset + remaining]
+            slots = (self.index.storage_slot_at(self.index.aisles, int(n)) for n in ordinals)
+        elif self.storage_query is not None:
+            slots = islice(self._matching_slots(), storage_offset, storage_offset + remaining)
+        else:
+            end = min(storage_offset + remaining, self.storage_count)
+            slots = (self.index.storage_slot_at(self.aisles, n) for n in range(storage_offset, end))
+
+        locations.extend(self.index.storage_location(*slot) for slot in slots)
+        return locations
+
+    def _matching_slots(self) -> Iterator[Tuple[int, str, int, str]]:
+        query = self.storage_query
+        for slot in self.index.iter_storage_slots(self.aisles):
+            code = storage_code(*slot)
+            slot_fields = dict(zip(('aisle_number', 'rack', 'position_number', 'level'), slot))
+            if (all(term in code for term in query.terms)
+                    and all(code.startswith(prefix) for prefix in query.prefixes)
+                    and all(_field_equals(slot_fields.get(name), value) for name, value in query.fields.items())):
+                yield slot
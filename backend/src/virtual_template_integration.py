@@ -4,10 +4,14 @@ Enhances the template API to work with virtual locations while maintaining backw
 """
 
 import json
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 from flask import current_app
 from database import db
 from models import WarehouseConfig, WarehouseTemplate, Location
+from services.capacity_resolver import bump_location_version
 from virtual_location_engine import create_virtual_engine_from_warehouse_config
 
 
@@ -66,6 +70,9 @@ class VirtualTemplateManager:
             # Step 6: Increment template usage (only if no critical errors)
             if not special_locations_result.get('critical_error', False):
                 template.increment_usage()
+
+            # Location caches keyed by the location version move to the new template's locations
+            bump_location_version(warehouse_id)
             
             return {
                 'success': True,
@@ -113,6 +120,7 @@ class VirtualTemplateManager:
         created_locations = generate_locations_from_template(template, warehouse_id, current_user)
         
         db.session.commit()
+        bump_location_version(warehouse_id)
         
         template.increment_usage()
         
@@ -497,45 +505,146 @@ class VirtualTemplateManager:
         }
 
 
+def get_engine_version(warehouse_id):
+    """
+    Version token of a warehouse's virtual location universe
+
+    Combines the WarehouseConfig edit stamps (updated_at, format_learned_date)
+    with the Location table fingerprint, since engines also load special areas
+    added via "Add New Location". None when the warehouse has no config.
+    """
+    from services.capacity_resolver import get_location_version
+
+    row = WarehouseConfig.query.with_entities(
+        WarehouseConfig.id, WarehouseConfig.updated_at, WarehouseConfig.format_learned_date
+    ).filter_by(warehouse_id=warehouse_id).first()
+    if row is None:
+        return None
+
+    config_id, updated_at, format_learned_date = row
+    return (
+        config_id,
+        updated_at.isoformat() if updated_at else None,
+        format_learned_date.isoformat() if format_learned_date else None,
+        get_location_version(warehouse_id),
+    )
+
+
 class VirtualLocationCache:
     """
-    Cache for virtual location engines to avoid recreating them repeatedly
+    Bounded, versioned LRU of virtual location engines
+
+    Engines are keyed by warehouse and stamped with get_engine_version(); a
+    changed WarehouseConfig or Location table rebuilds the engine on the next
+    lookup. The version is re-checked at most every revalidate_seconds, so the
+    several lookups of one analysis cost a single version query. Fallback
+    engines (warehouses without WarehouseConfig) share the same LRU, keyed by
+    their default configuration.
     """
     
-    def __init__(self):
-        self._engine_cache = {}
-        self._cache_timestamps = {}
-        self.cache_ttl_seconds = 3600  # 1 hour cache TTL
+    def __init__(self, max_warehouses=64, revalidate_seconds=5.0):
+        self.max_warehouses = max_warehouses
+        self.revalidate_seconds = revalidate_seconds
+        self._engines = OrderedDict()  # cache key -> (version, engine, validated_at)
+        self._lock = threading.RLock()
+        self._stats = {
+            'hits': 0, 'misses': 0, 'rebuilds': 0, 'evictions': 0, 'invalidations': 0,
+            'builds': 0, 'build_failures': 0, 'total_build_ms': 0.0, 'max_build_ms': 0.0
+        }
     
     def get_engine(self, warehouse_id):
-        """Get cached virtual engine or create new one"""
-        now = datetime.utcnow().timestamp()
+        """Get the cached virtual engine for the warehouse's current version, building it on change"""
+        return self._get_or_build(
+            warehouse_id, lambda: self._engine_version(warehouse_id), lambda: self._build_engine(warehouse_id)
+        )
+    
+    def get_fallback_engine(self, warehouse_id, warehouse_config):
+        """Get a shared engine built from a default configuration (versioned by its content)"""
+        config_version = json.dumps(warehouse_config, sort_keys=True, default=str)
+        return self._get_or_build(
+            ('fallback', warehouse_id), lambda: config_version,
+            lambda: create_virtual_engine_from_warehouse_config(warehouse_config)
+        )
+    
+    def _get_or_build(self, cache_key, get_version, build):
+        now = time.monotonic()
         
-        # Check if we have a fresh cached engine
-        if (warehouse_id in self._engine_cache and 
-            warehouse_id in self._cache_timestamps and
-            (now - self._cache_timestamps[warehouse_id]) < self.cache_ttl_seconds):
-            
-            return self._engine_cache[warehouse_id]
+        with self._lock:
+            entry = self._engines.get(cache_key)
+            if entry is not None and now - entry[2] < self.revalidate_seconds:
+                self._engines.move_to_end(cache_key)
+                self._stats['hits'] += 1
+                return entry[1]
+        
+        try:
+            version = get_version()
+        except Exception as e:
+            print(f"[VIRTUAL_CACHE] Version check failed for {cache_key}: {e}")
+            version = entry[0] if entry is not None else None
         
-        # Create new engine and cache it
-        template_manager = VirtualTemplateManager()
-        engine = template_manager.get_virtual_location_engine_for_warehouse(warehouse_id)
+        with self._lock:
+            entry = self._engines.get(cache_key)
+            if entry is not None and entry[0] == version:
+                self._engines[cache_key] = (version, entry[1], now)
+                self._engines.move_to_end(cache_key)
+                self._stats['hits'] += 1
+                return entry[1]
+            self._stats['rebuilds' if entry is not None else 'misses'] += 1
         
-        if engine:
-            self._engine_cache[warehouse_id] = engine
-            self._cache_timestamps[warehouse_id] = now
+        # Build outside the lock (engine construction queries special areas)
+        start = time.perf_counter()
+        engine = build()
+        build_ms = (time.perf_counter() - start) * 1000
+        
+        with self._lock:
+            if not engine:
+                self._stats['build_failures'] += 1
+                self._engines.pop(cache_key, None)
+                return engine
             
+            self._stats['builds'] += 1
+            self._stats['total_build_ms'] += build_ms
+            self._stats['max_build_ms'] = max(self._stats['max_build_ms'], build_ms)
+            self._engines[cache_key] = (version, engine, now)
+            self._engines.move_to_end(cache_key)
+            while len(self._engines) > self.max_warehouses:
+                self._engines.popitem(last=False)
+                self._stats['evictions'] += 1
+        
+        print(f"[VIRTUAL_CACHE] Built virtual engine for {cache_key} in {build_ms:.1f}ms")
         return engine
     
+    def _engine_version(self, warehouse_id):
+        return get_engine_version(warehouse_id)
+    
+    def _build_engine(self, warehouse_id):
+        return VirtualTemplateManager().get_virtual_location_engine_for_warehouse(warehouse_id)
+    
     def clear_cache(self, warehouse_id=None):
         """Clear cache for specific warehouse or all warehouses"""
-        if warehouse_id:
-            self._engine_cache.pop(warehouse_id, None)
-            self._cache_timestamps.pop(warehouse_id, None)
-        else:
-            self._engine_cache.clear()
-            self._cache_timestamps.clear()
+        with self._lock:
+            if warehouse_id:
+                stale = [key for key in self._engines if key in (warehouse_id, ('fallback', warehouse_id))]
+            else:
+                stale = list(self._engines)
+            for key in stale:
+                del self._engines[key]
+            self._stats['invalidations'] += len(stale)
+    
+    def get_stats(self):
+        """Cache hit rate, build times and cached warehouses"""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses'] + self._stats['rebuilds']
+            builds = self._stats['builds']
+            return {
+                'size': len(self._engines),
+                'max_warehouses': self.max_warehouses,
+                'revalidate_seconds': self.revalidate_seconds,
+                'hit_rate': round(self._stats['hits'] / lookups, 3) if lookups else 0.0,
+                'avg_build_ms': round(self._stats['total_build_ms'] / builds, 2) if builds else 0.0,
+                **{key: round(value, 2) if isinstance(value, float) else value for key, value in self._stats.items()},
+                'warehouses': [key if isinstance(key, str) else ':'.join(key) for key in self._engines],
+            }
 
 
 # Global instances for easy access
@@ -550,4 +659,9 @@ def get_virtual_template_manager():
 
 def get_virtual_engine_for_warehouse(warehouse_id):
     """Convenience function to get virtual location engine for a warehouse"""
-    return virtual_location_cache.get_engine(warehouse_id)
\ No newline at end of file
+    return virtual_location_cache.get_engine(warehouse_id)
+
+
+def get_virtual_engine_cache_stats():
+    """Statistics of the process-wide virtual engine cache"""
+    return virtual_location_cache.get_stats()
\ No newline at end of file
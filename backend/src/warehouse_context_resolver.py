@@ -282,14 +282,15 @@ class WarehouseContextResolver:
         even for warehouses without explicit template configurations
         """
         try:
-            from virtual_location_engine import VirtualLocationEngine
+            from virtual_template_integration import virtual_location_cache
             
             # Use warehouse-specific config if available, otherwise use defaults
             warehouse_config = self.fallback_warehouse_configs.get('DEFAULT').copy()
             warehouse_config['warehouse_id'] = warehouse_id
             
-            virtual_engine = VirtualLocationEngine(warehouse_config)
-            print(f"[WAREHOUSE_RESOLVER] Created fallback virtual engine: {warehouse_id}")
+            # Shared with the engine cache so repeated fallbacks don't build duplicates
+            virtual_engine = virtual_location_cache.get_fallback_engine(warehouse_id, warehouse_config)
+            print(f"[WAREHOUSE_RESOLVER] Using fallback virtual engine: {warehouse_id}")
             
             return virtual_engine
             